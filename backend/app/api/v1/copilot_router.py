@@ -8,14 +8,15 @@ Registers a 'default' agent that:
      responses are streamed back to the frontend.
 """
 import os
-import json
 import uuid
 from typing import Optional, List, TypedDict, Annotated, Sequence, Any, AsyncGenerator
-from operator import add
 
-from langchain_core.messages import BaseMessage, SystemMessage, HumanMessage, AIMessage
+from langchain_core.messages import BaseMessage, SystemMessage, HumanMessage, AIMessage, RemoveMessage
 from langgraph.graph import StateGraph, END
-from langgraph.checkpoint.memory import MemorySaver
+from langgraph.graph.message import add_messages
+
+from app.core.checkpointer import build_checkpointer
+from app.core.serialization import dumps_str
 
 from copilotkit import CopilotKitRemoteEndpoint
 from copilotkit.agent import Agent, AgentDict
@@ -24,8 +25,19 @@ from copilotkit.action import ActionDict
 
 # ── LangGraph state ─────────────────────────────────────────────────────────
 
-class ResearchState(TypedDict):
-    messages: Annotated[Sequence[BaseMessage], add]
+class ResearchState(TypedDict, total=False):
+    messages: Annotated[Sequence[BaseMessage], add_messages]
+    # Rolling extractive summary of turns that fell out of the history window
+    summary: str
+
+
+# ── History windowing ───────────────────────────────────────────────────────
+# Only the newest HISTORY_WINDOW messages are sent to Gemini and kept in state;
+# older ones are folded into `summary`, so prompt size and checkpoint size per
+# thread stay bounded no matter how long the conversation runs.
+HISTORY_WINDOW = int(os.getenv("COPILOT_HISTORY_WINDOW", "12"))
+SUMMARY_MAX_CHARS = int(os.getenv("COPILOT_SUMMARY_MAX_CHARS", "2000"))
+_SUMMARY_SNIPPET_CHARS = 200
 
 
 # ── Gemini LLM (lazy loaded) ─────────────────────────────────────────────────
@@ -45,19 +57,44 @@ def _get_llm():
         streaming=True,
     )
 
+def _summarize_overflow(summary: str, overflow: Sequence[BaseMessage]) -> str:
+    """Append a one-line gist of each dropped message; keep the newest SUMMARY_MAX_CHARS."""
+    lines = [summary] if summary else []
+    for msg in overflow:
+        speaker = "User" if isinstance(msg, HumanMessage) else "MathBot"
+        text = " ".join(str(msg.content).split())
+        if len(text) > _SUMMARY_SNIPPET_CHARS:
+            text = text[:_SUMMARY_SNIPPET_CHARS] + "…"
+        lines.append(f"{speaker}: {text}")
+    return "\n".join(lines)[-SUMMARY_MAX_CHARS:]
+
 async def _chat_node(state: ResearchState):
     llm = _get_llm()
-    messages = [SystemMessage(content=SYSTEM_PROMPT), *state["messages"]]
+    history = list(state["messages"])
+    summary = state.get("summary", "")
+
+    system_prompt = SYSTEM_PROMPT
+    if summary:
+        system_prompt += f"\n\nEarlier in this conversation (summary):\n{summary}"
+    messages = [SystemMessage(content=system_prompt), *history[-HISTORY_WINDOW:]]
     response = await llm.ainvoke(messages)
-    return {"messages": [response]}
+
+    update = {"messages": [response]}
+    # The window includes the new reply; everything older is summarized and removed from state
+    overflow = history[:max(0, len(history) + 1 - HISTORY_WINDOW)]
+    if overflow:
+        update["summary"] = _summarize_overflow(summary, overflow)
+        update["messages"] = [RemoveMessage(id=m.id) for m in overflow if m.id] + [response]
+    return update
 
 def _build_graph():
     builder = StateGraph(ResearchState)
     builder.add_node("chat", _chat_node)
     builder.set_entry_point("chat")
     builder.add_edge("chat", END)
-    return builder.compile(checkpointer=MemorySaver())
+    return builder.compile(checkpointer=_checkpointer)
 
+_checkpointer = build_checkpointer()
 _graph = _build_graph()
 
 
@@ -101,7 +138,16 @@ class GeminiResearchAgent(Agent):
         """Stream SSE-compatible events from the LangGraph graph."""
         lc_messages = _convert_messages(messages)
         config = {"configurable": {"thread_id": thread_id}}
-        
+
+        # The client resends the whole conversation every turn. If the thread is already
+        # checkpointed, only the messages after the last assistant reply are new.
+        existing = await _graph.aget_state(config)
+        if existing.values and existing.values.get("messages"):
+            last_reply = max((i for i, m in enumerate(lc_messages) if isinstance(m, AIMessage)), default=-1)
+            lc_messages = lc_messages[last_reply + 1:]
+        if not lc_messages:
+            return
+
         async for event in _graph.astream_events(
             {"messages": lc_messages},
             config=config,
@@ -111,7 +157,7 @@ class GeminiResearchAgent(Agent):
             if event_type == "on_chat_model_stream":
                 chunk = event["data"].get("chunk")
                 if chunk and chunk.content:
-                    yield json.dumps({"delta": chunk.content}) + "\n"
+                    yield dumps_str({"delta": chunk.content}) + "\n"
 
     def execute(
         self,
@@ -25,11 +25,12 @@ def get_methodologies(task_id: str, db: Session = Depends(get_db)) -> List[Dict[
     if task.status != "COMPLETE":
         raise HTTPException(status_code=400, detail=f"Task is not complete. Current status: {task.status}")
 
-    # result_data contains the full Pydantic dump from the worker
-    if not task.result_data:
+    # The task result holds the full Pydantic dump from the worker
+    result = task.result
+    if not result:
         return []
 
-    return task.result_data.get("methodologies", [])
+    return result.get("methodologies", [])
 
 @router.get("/gap-radar/{task_id}")
 def get_research_gaps(task_id: str, db: Session = Depends(get_db)) -> List[Dict[str, Any]]:
@@ -43,10 +44,11 @@ def get_research_gaps(task_id: str, db: Session = Depends(get_db)) -> List[Dict[
     if task.status != "COMPLETE":
         raise HTTPException(status_code=400, detail=f"Task is not complete. Current status: {task.status}")
 
-    if not task.result_data:
+    result = task.result
+    if not result:
         return []
 
-    return task.result_data.get("limitations", [])
+    return result.get("limitations", [])
 
 @router.get("/contradictions/{task_id}")
 def get_contradictions(task_id: str, db: Session = Depends(get_db)) -> List[Dict[str, Any]]:
@@ -60,10 +62,11 @@ def get_contradictions(task_id: str, db: Session = Depends(get_db)) -> List[Dict
     if task.status != "COMPLETE":
         raise HTTPException(status_code=400, detail=f"Task is not complete. Current status: {task.status}")
 
-    if not task.result_data:
+    result = task.result
+    if not result:
         return []
 
-    return task.result_data.get("contradictions", [])
+    return result.get("contradictions", [])
 
 @router.get("/summary/{task_id}")
 def get_extraction_summary(task_id: str, db: Session = Depends(get_db)) -> Dict[str, Any]:
@@ -74,7 +77,8 @@ def get_extraction_summary(task_id: str, db: Session = Depends(get_db)) -> Dict[
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
 
-    if not task.result_data or "metadata" not in task.result_data:
+    result = task.result
+    if not result or "metadata" not in result:
         # If the task is incomplete, provide a basic status summary
         return {
             "task_id": task_id,
@@ -83,15 +87,15 @@ def get_extraction_summary(task_id: str, db: Session = Depends(get_db)) -> Dict[
             "metadata": None
         }
 
-    metadata = task.result_data.get("metadata", {})
+    metadata = result.get("metadata", {})
     return {
         "task_id": task_id,
         "status": task.status,
         "paper_title": task.paper_title or metadata.get("title"),
         "metadata": metadata,
         "counts": {
-            "methodologies": len(task.result_data.get("methodologies", [])),
-            "limitations": len(task.result_data.get("limitations", [])),
-            "contradictions": len(task.result_data.get("contradictions", []))
+            "methodologies": len(result.get("methodologies", [])),
+            "limitations": len(result.get("limitations", [])),
+            "contradictions": len(result.get("contradictions", []))
         }
     }
@@ -0,0 +1,157 @@
+import hashlib
+import logging
+import os
+import shutil
+import time
+import uuid
+from typing import Any, Optional
+
+from app.core.payload_codec import decode_payload, encode_payload
+from app.core.serialization import dumps
+
+logger = logging.getLogger(__name__)
+
+# On the data volume shared by the API and every worker container
+ARTIFACT_DIR = os.getenv(
+    "ARTIFACT_DIR", "/app/data/artifacts" if os.path.exists("/app/data") else "./data/artifacts"
+)
+# Kept this long so retries and re-analysis can reuse earlier stages
+ARTIFACT_RETENTION_DAYS = float(os.getenv("ARTIFACT_RETENTION_DAYS", "7"))
+
+
+def content_hash(*parts: Any) -> str:
+    """Stable digest of bytes, strings and JSON-serializable values, in order."""
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, (bytes, bytearray, memoryview)):
+            data = bytes(part)
+        elif isinstance(part, str):
+            data = part.encode("utf-8")
+        else:
+            data = dumps(part)
+        # Length prefix so ("ab", "c") and ("a", "bc") differ
+        digest.update(len(data).to_bytes(8, "big"))
+        digest.update(data)
+    return digest.hexdigest()[:32]
+
+
+def file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()[:32]
+
+
+class ArtifactStore:
+    """
+    Intermediate pipeline outputs (layout Markdown, ExtractedInsights JSON,
+    triplets) kept on shared disk, so chained stage tasks pass short references
+    through the broker instead of the payloads themselves.
+
+    Stage outputs are content-addressed: a reference is
+    "<task_id>/<stage>-<key>.bin", where the key hashes everything the stage's
+    output depends on (its input's key, prompt, model, settings). A retry or a
+    re-analysis whose key already exists reuses the stored output instead of
+    recomputing it. Payloads use the binary codec from app.core.payload_codec.
+    """
+
+    def __init__(self, root: str = ARTIFACT_DIR, retention_days: float = ARTIFACT_RETENTION_DAYS):
+        self.root = os.path.abspath(root)
+        self.retention_seconds = retention_days * 86400
+        self._last_prune = 0.0
+
+    def _path(self, ref: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, ref))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError(f"Artifact reference escapes the store: {ref}")
+        return path
+
+    # ── Stage outputs ────────────────────────────────────────────────────────
+
+    @staticmethod
+    def stage_ref(task_id: str, stage: str, key: str) -> str:
+        return f"{task_id}/{stage}-{key}.bin"
+
+    def lookup(self, task_id: str, stage: str, key: str) -> Optional[str]:
+        """Reference of an existing output for these inputs, or None."""
+        ref = self.stage_ref(task_id, stage, key)
+        return ref if os.path.exists(self._path(ref)) else None
+
+    def put(self, task_id: str, stage: str, key: str, obj: Any) -> str:
+        """Store `obj` as the output of `stage` for input key `key`; returns its reference."""
+        ref = self.stage_ref(task_id, stage, key)
+        self._write(ref, encode_payload(obj))
+        return ref
+
+    def _write(self, ref: str, data: bytes):
+        path = self._path(ref)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write-then-rename so a reader never sees a half-written artifact
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def get(self, ref: str) -> Any:
+        with open(self._path(ref), "rb") as f:
+            return decode_payload(f.read())
+
+    # ── Reports ──────────────────────────────────────────────────────────────
+    # Plain files meant for people and tools (profiles), stored as-is under a fixed name
+
+    def put_file(self, task_id: str, name: str, data: bytes) -> str:
+        ref = f"{task_id}/{name}"
+        self._write(ref, data)
+        return ref
+
+    def delete_file(self, task_id: str, name: str):
+        try:
+            os.remove(self._path(f"{task_id}/{name}"))
+        except FileNotFoundError:
+            pass
+
+    def read_file(self, task_id: str, name: str) -> Optional[bytes]:
+        try:
+            with open(self._path(f"{task_id}/{name}"), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    # ── Source PDF ───────────────────────────────────────────────────────────
+
+    def source_path(self, task_id: str) -> str:
+        # Named after the task, not "source.pdf": the layout stage derives its image crop directory from it
+        return self._path(f"{task_id}/{task_id}.pdf")
+
+    def adopt_source(self, task_id: str, file_path: str) -> str:
+        """Move the spooled upload into the task's directory so re-analysis can start from it."""
+        target = self.source_path(task_id)
+        if os.path.abspath(file_path) != target:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.move(file_path, target)
+        return target
+
+    # ── Housekeeping ─────────────────────────────────────────────────────────
+
+    def delete_task(self, task_id: str):
+        """Drop every artifact of a task."""
+        shutil.rmtree(self._path(task_id), ignore_errors=True)
+
+    def prune(self, min_interval: float = 3600.0) -> int:
+        """Delete task directories untouched for the retention period; runs at most once per interval."""
+        now = time.time()
+        if now - self._last_prune < min_interval or not os.path.isdir(self.root):
+            return 0
+        self._last_prune = now
+        removed = 0
+        for entry in os.scandir(self.root):
+            if entry.is_dir() and now - entry.stat().st_mtime > self.retention_seconds:
+                shutil.rmtree(entry.path, ignore_errors=True)
+                removed += 1
+        if removed:
+            logger.info(f"Pruned artifacts of {removed} task(s) older than {self.retention_seconds / 86400:g} days")
+        return removed
+
+
+artifact_store = ArtifactStore()
@@ -0,0 +1,76 @@
+import logging
+import os
+import threading
+
+from app.core.artifact_store import ARTIFACT_DIR
+
+logger = logging.getLogger(__name__)
+
+# ─── Cooperative cancellation ────────────────────────────────────────────────
+# Long-running work (the layout page loop, LLM stages) checks a token between
+# units of work and stops with `Cancelled`. A cancel is a flag file on the data
+# volume shared by the API, the layout process pool and every worker container,
+# so DELETE /api/v1/jobs/{id} on any API replica reaches the worker running the
+# job, and a disconnected upload reaches its layout subprocess.
+
+CANCEL_DIR = os.getenv("CANCEL_DIR", os.path.join(os.path.dirname(ARTIFACT_DIR), "cancel"))
+
+# Cancels seen or issued by this process; spares the stat once a token has fired
+_cancelled_here: set = set()
+_lock = threading.Lock()
+
+
+class Cancelled(Exception):
+    """The analysis was cancelled: the client went away or the job was revoked."""
+
+
+class CancelToken:
+    """
+    Cancellation flag for one analysis, keyed by job (or upload) id. Picklable,
+    so it can travel into process pools alongside the Deadline.
+    """
+
+    def __init__(self, key: str, root: str = CANCEL_DIR):
+        self.key = key
+        self.root = root
+
+    @property
+    def _flag(self) -> str:
+        return os.path.join(self.root, self.key)
+
+    def cancel(self, reason: str = "cancelled"):
+        with _lock:
+            _cancelled_here.add(self._flag)
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            with open(self._flag, "w", encoding="utf-8") as f:
+                f.write(reason)
+        except OSError as e:
+            # Still seen by work in this process
+            logger.warning(f"Could not write cancel flag for {self.key}: {e}")
+
+    def is_cancelled(self) -> bool:
+        if self._flag in _cancelled_here:
+            return True
+        if os.path.exists(self._flag):
+            with _lock:
+                _cancelled_here.add(self._flag)
+            return True
+        return False
+
+    def check(self, stage: str):
+        """
+        Raises:
+            Cancelled: The token was cancelled.
+        """
+        if self.is_cancelled():
+            raise Cancelled(f"Cancelled before {stage}")
+
+    def clear(self):
+        """Forget the cancel, e.g. before the same job id runs again."""
+        with _lock:
+            _cancelled_here.discard(self._flag)
+        try:
+            os.remove(self._flag)
+        except FileNotFoundError:
+            pass
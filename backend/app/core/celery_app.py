@@ -1,5 +1,6 @@
 import os
 from celery import Celery
+from celery.signals import worker_process_init, worker_ready
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -12,9 +13,15 @@ celery_app = Celery(
     "ai_paper_analyzer",
     broker=redis_url,
     backend=redis_url,
-    include=["app.services.extraction_worker"]
+    include=["app.services.extraction_worker", "app.services.pipeline_tasks"]
 )
 
+# Two queues so LLM round-trips never hold a CPU slot: "cpu" is consumed by a prefork
+# worker sized to the cores (validation, YOLO layout), "io" by a high-concurrency
+# threads worker (Gemini extraction, graph, stats, persistence). See docker-compose.yml.
+CPU_QUEUE = os.getenv("CELERY_CPU_QUEUE", "cpu")
+IO_QUEUE = os.getenv("CELERY_IO_QUEUE", "io")
+
 # Optional Configuration for production scaling
 celery_app.conf.update(
     task_serializer="json",
@@ -25,4 +32,38 @@ celery_app.conf.update(
     # Prevent a single massive PDF extraction from dragging down the worker pool indefinitely
     task_soft_time_limit=1800,  # 30 minutes soft limit
     task_time_limit=2000,       # Hard kill after ~33 minutes
+    task_routes={
+        "pipeline.validate": {"queue": CPU_QUEUE},
+        "pipeline.layout": {"queue": CPU_QUEUE},
+        "pipeline.*": {"queue": IO_QUEUE},
+        "process_pdf_extraction": {"queue": CPU_QUEUE},
+    },
+    # Stage tasks are long and uneven; don't let one worker hoard prefetched work
+    worker_prefetch_multiplier=1,
+    task_acks_late=True,
 )
+
+# Each worker process records stage latency, tokens and peak RSS in its own registry
+# and serves it for Prometheus: the worker's main process on WORKER_METRICS_PORT (the
+# threads pool runs its tasks there), prefork child i on WORKER_METRICS_PORT + 1 + i.
+# 0 turns it off.
+WORKER_METRICS_PORT = int(os.getenv("WORKER_METRICS_PORT", "0"))
+
+
+@worker_ready.connect
+def _serve_worker_metrics(**_):
+    if WORKER_METRICS_PORT:
+        from app.core.instrumentation import update_process_gauges
+        from app.core.metrics import serve_metrics
+        serve_metrics(WORKER_METRICS_PORT, before_scrape=update_process_gauges)
+
+
+@worker_process_init.connect
+def _serve_child_metrics(**_):
+    # A prefork child runs one task at a time, so its peak RSS is one document's
+    from app.core.instrumentation import mark_dedicated_process, update_process_gauges
+    mark_dedicated_process()
+    if WORKER_METRICS_PORT:
+        from billiard import current_process
+        from app.core.metrics import serve_metrics
+        serve_metrics(WORKER_METRICS_PORT + 1 + current_process().index, before_scrape=update_process_gauges)
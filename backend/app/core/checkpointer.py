@@ -0,0 +1,294 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from langgraph.checkpoint.base import empty_checkpoint
+from langgraph.checkpoint.memory import MemorySaver
+
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+COPILOT_MAX_THREADS = int(os.getenv("COPILOT_MAX_THREADS", "500"))
+COPILOT_THREAD_TTL = float(os.getenv("COPILOT_THREAD_TTL", str(6 * 3600)))
+# Older checkpoints of a thread are only needed for time travel, which the copilot never uses
+COPILOT_KEEP_CHECKPOINTS = int(os.getenv("COPILOT_KEEP_CHECKPOINTS", "2"))
+# Optional SQLite backing store, e.g. /app/data/copilot_threads.db (empty = memory only)
+COPILOT_CHECKPOINT_DB = os.getenv("COPILOT_CHECKPOINT_DB", "")
+# Expired threads are deleted from the store at most this often, keeping writes off the read path
+COPILOT_STORE_SWEEP_SECONDS = float(os.getenv("COPILOT_STORE_SWEEP_SECONDS", "300"))
+
+_threads_gauge = metrics.gauge("copilot_checkpoint_threads", "Copilot threads held in memory")
+_bytes_gauge = metrics.gauge("copilot_checkpoint_bytes", "Serialized bytes of checkpoints held in memory")
+_evictions = metrics.counter("copilot_checkpoint_evictions_total", "Copilot threads evicted from memory by reason")
+
+
+class SQLiteThreadStore:
+    """
+    Durable store for the latest checkpoint of each thread. Threads evicted from
+    memory (or lost on restart) are rehydrated from here on their next turn.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS copilot_threads (
+                thread_id TEXT PRIMARY KEY,
+                checkpoint_ns TEXT NOT NULL,
+                checkpoint_type TEXT NOT NULL,
+                checkpoint BLOB NOT NULL,
+                metadata_type TEXT NOT NULL,
+                metadata BLOB NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_copilot_threads_updated ON copilot_threads(updated_at)")
+        self._lock = threading.Lock()
+
+    def save(self, thread_id: str, checkpoint_ns: str, checkpoint: tuple, metadata: tuple):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO copilot_threads VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (thread_id, checkpoint_ns, checkpoint[0], checkpoint[1], metadata[0], metadata[1], time.time()),
+            )
+
+    def load(self, thread_id: str) -> Optional[tuple]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT checkpoint_ns, checkpoint_type, checkpoint, metadata_type, metadata, updated_at "
+                "FROM copilot_threads WHERE thread_id = ?",
+                (thread_id,),
+            ).fetchone()
+        return row
+
+    def delete(self, thread_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM copilot_threads WHERE thread_id = ?", (thread_id,))
+
+    def delete_older_than(self, cutoff: float) -> int:
+        with self._lock:
+            return self._conn.execute("DELETE FROM copilot_threads WHERE updated_at < ?", (cutoff,)).rowcount
+
+
+class BoundedMemorySaver(MemorySaver):
+    """
+    MemorySaver with bounded memory for long-running API processes:
+      - keeps only the newest `keep_checkpoints` checkpoints per thread
+      - evicts least-recently-used threads beyond `max_threads`
+      - expires threads idle for longer than `ttl_seconds`
+      - optionally writes the latest checkpoint through to SQLite so evicted
+        threads are restored transparently on their next turn
+    """
+
+    def __init__(
+        self,
+        *,
+        max_threads: int = COPILOT_MAX_THREADS,
+        ttl_seconds: float = COPILOT_THREAD_TTL,
+        keep_checkpoints: int = COPILOT_KEEP_CHECKPOINTS,
+        store: Optional[SQLiteThreadStore] = None,
+        store_sweep_seconds: float = COPILOT_STORE_SWEEP_SECONDS,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self.max_threads = max_threads
+        self.ttl_seconds = ttl_seconds
+        self.keep_checkpoints = max(1, keep_checkpoints)
+        self.store = store
+        self.store_sweep_seconds = store_sweep_seconds
+        self._next_store_sweep = 0.0
+        self._last_access: "OrderedDict[str, float]" = OrderedDict()
+        self._thread_bytes: Dict[str, int] = {}
+        self._lock = threading.RLock()
+        self._check_memory_layout()
+
+    def _check_memory_layout(self):
+        """
+        Pruning, eviction and size accounting read MemorySaver's internal dicts
+        (storage, blobs, writes) directly. Round-trip a probe thread through them
+        so a langgraph-checkpoint release that changes their layout fails here,
+        at startup, rather than corrupting or mis-measuring live threads.
+        """
+        probe = f"__layout_probe_{id(self)}"
+        config = {"configurable": {"thread_id": probe, "checkpoint_ns": ""}}
+        checkpoint = empty_checkpoint()
+        checkpoint["channel_values"] = {"probe": 1}
+        checkpoint["channel_versions"] = {"probe": 1}
+        try:
+            saved = super().put(config, checkpoint, {}, {"probe": 1})
+            self.put_writes(saved, [("probe", 2)], task_id="probe")
+            checkpoint_id = saved["configurable"]["checkpoint_id"]
+            entry = self.storage[probe][""][checkpoint_id]
+            writes = self.writes.get((probe, "", checkpoint_id))
+            ok = (
+                len(entry) == 3
+                and all(isinstance(part, tuple) and isinstance(part[1], bytes) for part in entry[:2])
+                and isinstance(self.blobs[(probe, "", "probe", 1)][1], bytes)
+                and bool(writes)
+                and all(isinstance(w[2][1], bytes) for w in writes.values())
+            )
+        except (AttributeError, KeyError, TypeError, IndexError, ValueError) as e:
+            ok = False
+            logger.error(f"MemorySaver layout probe failed: {e!r}")
+        finally:
+            super().delete_thread(probe)
+        if not ok:
+            raise RuntimeError(
+                "Unsupported langgraph-checkpoint version: MemorySaver's storage/blobs/writes layout "
+                "changed, so BoundedMemorySaver cannot prune or measure threads. Pin a compatible "
+                "langgraph-checkpoint (see requirements.txt) or update app/core/checkpointer.py."
+            )
+
+    # ── BaseCheckpointSaver overrides ────────────────────────────────────────
+
+    def get_tuple(self, config):
+        thread_id = config["configurable"]["thread_id"]
+        with self._lock:
+            self._expire_idle()
+            if thread_id not in self.storage and self.store is not None:
+                self._rehydrate(thread_id)
+            if thread_id in self.storage:
+                self._touch(thread_id)
+            result = super().get_tuple(config)
+            # MemorySaver's defaultdict materializes empty entries for unknown threads
+            if thread_id not in self._last_access and not any(self.storage.get(thread_id, {}).values()):
+                self.storage.pop(thread_id, None)
+            return result
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        with self._lock:
+            result = super().put(config, checkpoint, metadata, new_versions)
+            if self.store is not None:
+                self.store.save(
+                    thread_id,
+                    checkpoint_ns,
+                    self.serde.dumps_typed(checkpoint),
+                    self.serde.dumps_typed(metadata),
+                )
+            self._prune_thread(thread_id)
+            self._touch(thread_id)
+            self._evict_over_limit()
+            return result
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            self._drop_from_memory(thread_id)
+            if self.store is not None:
+                self.store.delete(thread_id)
+
+    # ── Bookkeeping ──────────────────────────────────────────────────────────
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "threads": len(self._last_access),
+                "checkpoint_bytes": sum(self._thread_bytes.values()),
+                "max_threads": self.max_threads,
+                "ttl_seconds": self.ttl_seconds,
+                "persistent": self.store is not None,
+            }
+
+    def _touch(self, thread_id: str):
+        self._last_access[thread_id] = time.monotonic()
+        self._last_access.move_to_end(thread_id)
+        self._thread_bytes[thread_id] = self._measure(thread_id)
+        self._publish_gauges()
+
+    def _publish_gauges(self):
+        _threads_gauge.set(len(self._last_access))
+        _bytes_gauge.set(sum(self._thread_bytes.values()))
+
+    def _measure(self, thread_id: str) -> int:
+        total = 0
+        for checkpoints in self.storage.get(thread_id, {}).values():
+            for checkpoint, meta, _parent in checkpoints.values():
+                total += len(checkpoint[1]) + len(meta[1])
+        for key, value in self.blobs.items():
+            if key[0] == thread_id:
+                total += len(value[1])
+        for key, writes in self.writes.items():
+            if key[0] == thread_id:
+                total += sum(len(w[2][1]) for w in writes.values())
+        return total
+
+    def _drop_from_memory(self, thread_id: str):
+        super().delete_thread(thread_id)
+        self._last_access.pop(thread_id, None)
+        self._thread_bytes.pop(thread_id, None)
+        self._publish_gauges()
+
+    def _evict_over_limit(self):
+        while len(self._last_access) > self.max_threads:
+            thread_id = next(iter(self._last_access))
+            # With a backing store the thread survives on disk; memory is just a cache
+            self._drop_from_memory(thread_id)
+            _evictions.inc(reason="lru")
+
+    def _expire_idle(self):
+        cutoff = time.monotonic() - self.ttl_seconds
+        while self._last_access:
+            thread_id, last = next(iter(self._last_access.items()))
+            if last >= cutoff:
+                break
+            self._drop_from_memory(thread_id)
+            _evictions.inc(reason="ttl")
+        # Expired rows the sweep hasn't reached yet are never served: _rehydrate checks their age
+        if self.store is not None and time.monotonic() >= self._next_store_sweep:
+            self._next_store_sweep = time.monotonic() + self.store_sweep_seconds
+            self.store.delete_older_than(time.time() - self.ttl_seconds)
+
+    def _prune_thread(self, thread_id: str):
+        """Keep the newest checkpoints per namespace and drop the writes and blobs only they referenced."""
+        namespaces = self.storage.get(thread_id, {})
+        for checkpoint_ns, checkpoints in namespaces.items():
+            if len(checkpoints) <= self.keep_checkpoints:
+                continue
+            # Checkpoint ids are monotonic UUIDv6 strings, so lexical order is creation order
+            ordered = sorted(checkpoints)
+            for checkpoint_id in ordered[:-self.keep_checkpoints]:
+                del checkpoints[checkpoint_id]
+                self.writes.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+
+            live_versions = set()
+            for checkpoint, _meta, _parent in checkpoints.values():
+                saved = self.serde.loads_typed(checkpoint)
+                live_versions.update(saved.get("channel_versions", {}).items())
+            for key in [k for k in self.blobs if k[0] == thread_id and k[1] == checkpoint_ns]:
+                if (key[2], key[3]) not in live_versions:
+                    del self.blobs[key]
+
+    def _rehydrate(self, thread_id: str):
+        row = self.store.load(thread_id)
+        if row is None:
+            return
+        checkpoint_ns, checkpoint_type, checkpoint_blob, metadata_type, metadata_blob, updated_at = row
+        if time.time() - updated_at > self.ttl_seconds:
+            self.store.delete(thread_id)
+            return
+        checkpoint = self.serde.loads_typed((checkpoint_type, checkpoint_blob))
+        metadata = self.serde.loads_typed((metadata_type, metadata_blob))
+        config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns}}
+        super().put(config, checkpoint, metadata, checkpoint.get("channel_versions", {}))
+        logger.info(f"Rehydrated copilot thread {thread_id} from SQLite store")
+
+
+def build_checkpointer() -> BoundedMemorySaver:
+    """Checkpointer for the CopilotKit graph, with SQLite persistence when COPILOT_CHECKPOINT_DB is set."""
+    store = None
+    if COPILOT_CHECKPOINT_DB:
+        try:
+            store = SQLiteThreadStore(COPILOT_CHECKPOINT_DB)
+        except Exception as e:
+            logger.warning(f"Copilot checkpoint DB unavailable, using memory only: {e}")
+    return BoundedMemorySaver(store=store)
@@ -1,6 +1,8 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.orm import declarative_base, sessionmaker
+import logging
 import os
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -15,16 +17,57 @@ SQLALCHEMY_DATABASE_URL = os.getenv(
 # Initialize the synchronous engine 
 # (For a purely async architecture we would use AsyncEngine and asyncpg, 
 # but for Phase 4 prototyping, standard psycopg2 is robust)
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+try:
+    engine = create_engine(SQLALCHEMY_DATABASE_URL)
+except ImportError as e:
+    # DB driver not installed (local runs without Postgres); database_available() reports False
+    logging.getLogger(__name__).warning(f"Database driver unavailable: {e}")
+    engine = None
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+# A failed probe is trusted for this long before Postgres is tried again
+DB_RETRY_SECONDS = float(os.getenv("DB_RETRY_SECONDS", "30"))
+_db_available = None
+_db_checked_at = 0.0
+
+def database_available() -> bool:
+    """
+    Cached connectivity probe, so local runs without Postgres skip task-row
+    writes instead of paying a connection timeout (and an error log) per call.
+    """
+    global _db_available, _db_checked_at
+    if engine is None:
+        return False
+    if _db_available or (_db_available is False and time.monotonic() - _db_checked_at < DB_RETRY_SECONDS):
+        return _db_available
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        _db_available = True
+    except Exception:
+        _db_available = False
+    _db_checked_at = time.monotonic()
+    return _db_available
+
 def init_db():
     """Create all tables stored in the Base metadata."""
     from app.models.task import ExtractionTask # Import models to ensure they are registered
+    if engine is None:
+        raise RuntimeError("no database driver installed")
     Base.metadata.create_all(bind=engine)
+    _add_missing_columns(ExtractionTask.__table__)
+
+def _add_missing_columns(table):
+    """create_all never alters existing tables; add nullable columns introduced since they were created."""
+    existing = {c["name"] for c in inspect(engine).get_columns(table.name)}
+    with engine.begin() as conn:
+        for column in table.columns:
+            if column.name not in existing and column.nullable:
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
 
 def get_db():
     """
@@ -0,0 +1,106 @@
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+# ─── Time budgets ────────────────────────────────────────────────────────────
+# Every analysis carries a deadline from admission (synchronous upload) or
+# dispatch (background job) through every stage. When the remaining time can't
+# cover a stage at full quality, the stage degrades in one of the defined ways
+# below instead of overrunning, and the result lists what was given up.
+
+UPLOAD_BUDGET_SECONDS = float(os.getenv("UPLOAD_BUDGET_SECONDS", "180"))
+JOB_BUDGET_SECONDS = float(os.getenv("JOB_BUDGET_SECONDS", "900"))
+# Clients may ask for a different budget, up to this
+MAX_BUDGET_SECONDS = float(os.getenv("MAX_BUDGET_SECONDS", "1800"))
+
+# Time the stages after layout need; layout stops sending pages to YOLO once only this much is left
+EXTRACT_RESERVE_SECONDS = float(os.getenv("DEADLINE_EXTRACT_RESERVE_SECONDS", "60"))
+# Below this, extraction uses the faster model
+FULL_EXTRACTION_MIN_SECONDS = float(os.getenv("DEADLINE_FULL_EXTRACTION_MIN_SECONDS", "45"))
+# Below this, the optional knowledge graph stage is skipped
+GRAPH_MIN_SECONDS = float(os.getenv("DEADLINE_GRAPH_MIN_SECONDS", "20"))
+
+# The ways a pipeline degrades, as reported in `degraded`
+DEGRADED_LAYOUT_PAGES = "layout_pages"        # later pages got plain text extraction, no YOLO
+DEGRADED_FAST_EXTRACTION = "fast_extraction"  # extraction ran on the faster model
+DEGRADED_GRAPH = "graph"                      # knowledge graph stage skipped
+
+
+class DeadlineExceeded(Exception):
+    """No time left for a stage the result can't do without."""
+
+
+class Deadline:
+    """
+    Absolute wall-clock deadline (epoch seconds, so it survives pickling into the
+    layout process pool and JSON into Celery stage contexts) plus the list of
+    degradations applied so far.
+    """
+
+    def __init__(self, expires_at: float, budget_seconds: float, degraded: Optional[List[str]] = None):
+        self.expires_at = expires_at
+        self.budget_seconds = budget_seconds
+        self.degraded = list(degraded or [])
+
+    @classmethod
+    def after(cls, budget_seconds: float) -> "Deadline":
+        return cls(time.time() + budget_seconds, budget_seconds)
+
+    def remaining(self) -> float:
+        return self.expires_at - time.time()
+
+    def check(self, stage: str):
+        """
+        Raises:
+            DeadlineExceeded: The budget is spent.
+        """
+        if self.remaining() <= 0:
+            raise DeadlineExceeded(f"Time budget of {self.budget_seconds:g}s exhausted before {stage}")
+
+    def degrade(self, what: str):
+        if what not in self.degraded:
+            self.degraded.append(what)
+
+    # ── Stage policies ───────────────────────────────────────────────────────
+
+    def allows_layout_page(self) -> bool:
+        """Whether the next page can still go through YOLO without eating into extraction's time."""
+        return self.remaining() > EXTRACT_RESERVE_SECONDS
+
+    def note_layout(self, pdf_info: Optional[Dict[str, Any]]):
+        """Record the layout degradation the (possibly out-of-process) extractor applied."""
+        pdf_info = pdf_info or {}
+        if pdf_info.get("yolo_pages", 0) < pdf_info.get("pages_processed", 0):
+            self.degrade(DEGRADED_LAYOUT_PAGES)
+
+    def use_fast_extraction(self) -> bool:
+        fast = self.remaining() < FULL_EXTRACTION_MIN_SECONDS
+        if fast:
+            self.degrade(DEGRADED_FAST_EXTRACTION)
+        return fast
+
+    def allows_graph(self) -> bool:
+        allowed = self.remaining() >= GRAPH_MIN_SECONDS
+        if not allowed:
+            self.degrade(DEGRADED_GRAPH)
+        return allowed
+
+    def llm_timeout(self) -> float:
+        """Per-call timeout that keeps an LLM round-trip inside the budget (at least 1s)."""
+        return max(1.0, self.remaining())
+
+    # ── Transport ────────────────────────────────────────────────────────────
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"expires_at": self.expires_at, "budget_seconds": self.budget_seconds, "degraded": list(self.degraded)}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Deadline":
+        return cls(data["expires_at"], data["budget_seconds"], data.get("degraded"))
+
+
+def clamp_budget(requested: Optional[float], default: float) -> float:
+    """A client-requested budget within (0, MAX_BUDGET_SECONDS], or the default."""
+    if requested is None or requested <= 0:
+        return default
+    return min(requested, MAX_BUDGET_SECONDS)
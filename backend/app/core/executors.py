@@ -0,0 +1,239 @@
+import asyncio
+import contextvars
+import logging
+import math
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional
+
+from app.core.instrumentation import mark_dedicated_process
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Layout detection (rasterize + YOLO) is CPU-bound and holds the GIL for long
+# stretches, so it runs in worker processes; the LLM stages mostly wait on the
+# network and run on threads.
+DLA_PROCESSES = int(os.getenv("DLA_PROCESSES", str(max(1, (os.cpu_count() or 2) // 2))))
+# "process" or "thread"; threads skip the per-process model load (handy when debugging)
+DLA_EXECUTOR = os.getenv("DLA_EXECUTOR", "process").lower()
+LLM_THREADS = int(os.getenv("LLM_THREADS", "8"))
+# Synchronous uploads admitted at once; the next one gets 429 + Retry-After
+PIPELINE_MAX_INFLIGHT = int(os.getenv("PIPELINE_MAX_INFLIGHT", str(DLA_PROCESSES * 2)))
+# Retry-After guess before any pipeline has finished
+_DEFAULT_PIPELINE_SECONDS = 30.0
+
+_inflight_gauge = metrics.gauge("pipeline_inflight", "Synchronous upload pipelines currently admitted")
+_rejected = metrics.counter("pipeline_rejected_total", "Synchronous uploads turned away with 429")
+_pipeline_seconds = metrics.histogram("pipeline_upload_seconds", "Wall time of admitted synchronous upload pipelines")
+
+
+class PipelineSaturated(Exception):
+    """Every pipeline slot is taken; retry_after is a best guess in whole seconds."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Pipeline saturated, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+# ── DLA worker process side ──────────────────────────────────────────────────
+# One extractor (and so one loaded YOLO model) per worker process, reused across documents
+_process_extractor = None
+
+
+def extract_layout(file_path: str, deadline=None, cancel=None, profile: bool = False) -> Dict[str, Any]:
+    """
+    MinerUExtractor.extract_document with a per-process extractor; picklable for process pools.
+    With `profile`, this call is profiled where it runs and the result carries it under "profile".
+    """
+    global _process_extractor
+    if _process_extractor is None:
+        from app.services.mineru_extractor import MinerUExtractor
+        _process_extractor = MinerUExtractor()
+    if not profile:
+        return _process_extractor.extract_document(file_path=file_path, deadline=deadline, cancel=cancel)
+
+    from app.core.profiling import SamplingProfiler
+    profiler = SamplingProfiler(thread_ids=[threading.get_ident()]).start()
+    try:
+        result = _process_extractor.extract_document(file_path=file_path, deadline=deadline, cancel=cancel)
+    finally:
+        report = profiler.stop()
+    return {**result, "profile": report}
+
+
+class _Slot:
+    """
+    An admitted pipeline. Stages submitted while it is entered are tracked, and if
+    the request gives up while one is still running (its task was cancelled; the
+    executor cannot stop a started call) the slot stays taken until that stage
+    ends, since it still occupies a DLA worker or LLM thread.
+    """
+
+    def __init__(self, owner: "PipelineExecutors", token: int):
+        self._owner = owner
+        self._token = token
+        self._stages: List[Future] = []
+        self._context_token = None
+
+    def __enter__(self):
+        self._context_token = _current_slot.set(self)
+        return self
+
+    def track(self, future: Future):
+        self._stages.append(future)
+
+    def __exit__(self, exc_type, exc, tb):
+        _current_slot.reset(self._context_token)
+        running = [future for future in self._stages if not future.done()]
+        if not running:
+            self._owner._release(self._token, succeeded=exc_type is None)
+            return
+
+        logger.info(f"Pipeline ended with {len(running)} stage(s) still running; holding its slot until they finish")
+        lock = threading.Lock()
+        remaining = [len(running)]
+
+        def _stage_done(_future):
+            with lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                self._owner._release(self._token, succeeded=False)
+
+        for future in running:
+            future.add_done_callback(_stage_done)
+
+
+# The slot whose pipeline is submitting stages (set while a _Slot is entered)
+_current_slot: "contextvars.ContextVar[Optional[_Slot]]" = contextvars.ContextVar("pipeline_slot", default=None)
+
+
+def _submit(pool: Executor, fn: Callable[[], Any]) -> "asyncio.Future":
+    future = pool.submit(fn)
+    slot = _current_slot.get()
+    if slot is not None:
+        slot.track(future)
+    return asyncio.wrap_future(future)
+
+
+class PipelineExecutors:
+    """
+    Bounded executors for the synchronous /upload pipeline, plus admission control.
+
+    The event loop never runs a pipeline stage itself: layout detection goes to a
+    process pool, LLM calls to a thread pool, so /history, /chat and friends keep
+    answering while uploads are being processed. At most `max_inflight` uploads are
+    admitted; beyond that admit() raises PipelineSaturated instead of queueing
+    unboundedly.
+    """
+
+    def __init__(
+        self,
+        dla_processes: int = DLA_PROCESSES,
+        llm_threads: int = LLM_THREADS,
+        max_inflight: int = PIPELINE_MAX_INFLIGHT,
+        dla_executor: str = DLA_EXECUTOR,
+    ):
+        self.dla_processes = dla_processes
+        self.max_inflight = max_inflight
+        self.dla_executor = dla_executor
+        self._lock = threading.Lock()
+        self._dla: Optional[Executor] = None
+        self._llm = ThreadPoolExecutor(max_workers=llm_threads, thread_name_prefix="pipeline-llm")
+        self._started: Dict[int, float] = {}
+        self._next_token = 0
+        # Exponentially weighted mean of successful pipeline durations, for Retry-After
+        self._avg_seconds: Optional[float] = None
+
+    # ── Admission ────────────────────────────────────────────────────────────
+
+    def admit(self) -> _Slot:
+        """
+        Claim a pipeline slot, released when the returned context manager exits.
+
+        Raises:
+            PipelineSaturated: When max_inflight pipelines are already running.
+        """
+        with self._lock:
+            if len(self._started) >= self.max_inflight:
+                _rejected.inc()
+                raise PipelineSaturated(self._retry_after())
+            token = self._next_token
+            self._next_token += 1
+            self._started[token] = time.monotonic()
+            _inflight_gauge.set(len(self._started))
+        return _Slot(self, token)
+
+    def _release(self, token: int, succeeded: bool):
+        with self._lock:
+            elapsed = time.monotonic() - self._started.pop(token)
+            _inflight_gauge.set(len(self._started))
+            if succeeded:
+                self._avg_seconds = elapsed if self._avg_seconds is None else 0.8 * self._avg_seconds + 0.2 * elapsed
+        if succeeded:
+            _pipeline_seconds.observe(elapsed)
+
+    def _retry_after(self) -> int:
+        """Seconds until the oldest running pipeline should finish. Caller holds the lock."""
+        expected = self._avg_seconds or _DEFAULT_PIPELINE_SECONDS
+        oldest = min(self._started.values(), default=time.monotonic())
+        return max(1, math.ceil(oldest + expected - time.monotonic()))
+
+    @property
+    def inflight(self) -> int:
+        return len(self._started)
+
+    # ── Stage execution ──────────────────────────────────────────────────────
+
+    def _dla_pool(self) -> Executor:
+        with self._lock:
+            if self._dla is None:
+                if self.dla_executor == "thread":
+                    self._dla = ThreadPoolExecutor(max_workers=self.dla_processes, thread_name_prefix="pipeline-dla")
+                else:
+                    # spawn, not fork: the parent has live threads (and possibly torch) that fork would copy mid-state
+                    self._dla = ProcessPoolExecutor(
+                        max_workers=self.dla_processes, mp_context=multiprocessing.get_context("spawn"),
+                        initializer=mark_dedicated_process,
+                    )
+                logger.info(f"DLA executor started: {self.dla_processes} {self.dla_executor} worker(s)")
+            return self._dla
+
+    async def layout(self, file_path: str, deadline=None, cancel=None, profile: bool = False) -> Dict[str, Any]:
+        """
+        MinerUExtractor.extract_document on the DLA pool. With `profile` and a process
+        pool, the worker profiles itself and returns it under "profile" (a thread
+        pool's worker is already visible to a profiler sampling this process).
+        """
+        pool = self._dla_pool()
+        profile = profile and self.dla_executor != "thread"
+        try:
+            return await _submit(pool, partial(extract_layout, file_path, deadline=deadline, cancel=cancel, profile=profile))
+        except BrokenProcessPool:
+            # A worker died (OOM, segfault in a native lib); start a fresh pool for the next upload
+            logger.error("DLA process pool broken; it will be recreated")
+            with self._lock:
+                if self._dla is pool:
+                    self._dla = None
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+
+    async def llm(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run a blocking LLM-bound call on the LLM thread pool."""
+        return await _submit(self._llm, partial(fn, *args, **kwargs))
+
+    def shutdown(self):
+        with self._lock:
+            dla, self._dla = self._dla, None
+        if dla is not None:
+            dla.shutdown(wait=False, cancel_futures=True)
+        self._llm.shutdown(wait=False, cancel_futures=True)
+
+
+pipeline_executors = PipelineExecutors()
@@ -0,0 +1,271 @@
+import heapq
+import re
+import threading
+from collections import Counter
+from itertools import chain
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+# Facets drawn from ExtractedInsights; `year` is numeric and queried by range
+FACETS = ("datasets", "base_models", "metrics", "optimization", "authors", "year")
+TERM_FACETS = FACETS[:-1]
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+
+def normalize_facet_value(value: Any) -> str:
+    """Case- and punctuation-insensitive key, so "ImageNet", "imagenet" and "Image-Net " collide."""
+    return _NON_ALNUM.sub("", str(value).casefold())
+
+
+def extract_facets(extracted_data: Dict[str, Any]) -> List[Tuple[str, str]]:
+    """(facet, display value) pairs for one analysis' ExtractedInsights dump."""
+    pairs: List[Tuple[str, str]] = []
+    meta = extracted_data.get("metadata") or {}
+    for author in meta.get("authors") or []:
+        name = author.get("name") if isinstance(author, dict) else author
+        if name:
+            pairs.append(("authors", str(name).strip()))
+    if meta.get("publication_year"):
+        pairs.append(("year", str(meta["publication_year"])))
+
+    for method in extracted_data.get("methodologies") or []:
+        for facet in ("datasets", "base_models", "metrics"):
+            for value in method.get(facet) or []:
+                if value:
+                    pairs.append((facet, str(value).strip()))
+        if method.get("optimization"):
+            pairs.append(("optimization", str(method["optimization"]).strip()))
+
+    # Drop duplicates (e.g. the same dataset across several methodologies), keep order
+    seen, unique = set(), []
+    for facet, value in pairs:
+        key = (facet, normalize_facet_value(value))
+        if key[1] and key not in seen:
+            seen.add(key)
+            unique.append((facet, value))
+    return unique
+
+
+class FacetIndex:
+    """
+    In-memory inverted index over the structured fields of every analysis.
+
+    Postings are sets of small integer doc ids, so AND/OR filters are C-level
+    set intersections/unions. Facet counts are tallied from a forward index over
+    whichever is smaller, the matching docs or their complement, so both narrow
+    and broad queries stay cheap. Updated incrementally on every save/delete;
+    rebuilt at startup from the facet rows the history store keeps next to each
+    summary.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._doc_ids: Dict[str, int] = {}
+        self._analysis_ids: Dict[int, str] = {}
+        self._sort_keys: Dict[int, Tuple[str, str]] = {}
+        self._years: Dict[int, int] = {}
+        # doc → interned ids of its (facet, key) terms, including ("year", year);
+        # ints hash far faster than tuples when tallying facet counts
+        self._forward: Dict[int, List[int]] = {}
+        self._term_ids: Dict[Tuple[str, Any], int] = {}
+        self._terms: List[Tuple[str, Any]] = []
+        self._postings: Dict[str, Dict[str, Set[int]]] = {f: {} for f in TERM_FACETS}
+        self._year_postings: Dict[int, Set[int]] = {}
+        self._display: Dict[Tuple[str, str], str] = {}
+        self._next_doc = 0
+        # Doc ids are handed out in analyzed_at order as long as analyses arrive in
+        # time order, which lets top-k compare plain ints instead of sort keys
+        self._ids_sorted = True
+        self._last_key: Tuple[str, str] = ("", "")
+        self._totals_cache: Optional[Dict[str, List[Tuple[int, Any]]]] = None
+
+    def __len__(self):
+        return len(self._doc_ids)
+
+    # ── Maintenance ──────────────────────────────────────────────────────────
+
+    def _term_id(self, facet: str, key: Any) -> int:
+        term = (facet, key)
+        term_id = self._term_ids.get(term)
+        if term_id is None:
+            term_id = self._term_ids[term] = len(self._terms)
+            self._terms.append(term)
+        return term_id
+
+    def add(self, analysis_id: str, analyzed_at: str, facets: Iterable[Tuple[str, str]]):
+        """Index (or re-index) one analysis."""
+        with self._lock:
+            self.remove(analysis_id)
+            doc = self._next_doc
+            self._next_doc += 1
+            self._doc_ids[analysis_id] = doc
+            self._analysis_ids[doc] = analysis_id
+            self._sort_keys[doc] = (analyzed_at or "", analysis_id)
+            if self._sort_keys[doc] < self._last_key:
+                self._ids_sorted = False
+            self._last_key = max(self._last_key, self._sort_keys[doc])
+            self._totals_cache = None
+
+            terms = []
+            for facet, value in facets:
+                if facet == "year":
+                    try:
+                        year = int(value)
+                    except (TypeError, ValueError):
+                        continue
+                    self._years[doc] = year
+                    self._year_postings.setdefault(year, set()).add(doc)
+                    terms.append(self._term_id("year", year))
+                    continue
+                if facet not in self._postings:
+                    continue
+                key = normalize_facet_value(value)
+                if not key:
+                    continue
+                self._postings[facet].setdefault(key, set()).add(doc)
+                self._display.setdefault((facet, key), value)
+                terms.append(self._term_id(facet, key))
+            self._forward[doc] = terms
+
+    def remove(self, analysis_id: str):
+        with self._lock:
+            doc = self._doc_ids.pop(analysis_id, None)
+            if doc is None:
+                return
+            self._totals_cache = None
+            del self._analysis_ids[doc]
+            del self._sort_keys[doc]
+            for term_id in self._forward.pop(doc, []):
+                facet, key = self._terms[term_id]
+                if facet == "year":
+                    continue
+                posting = self._postings[facet].get(key)
+                if posting is not None:
+                    posting.discard(doc)
+                    if not posting:
+                        del self._postings[facet][key]
+                        self._display.pop((facet, key), None)
+            year = self._years.pop(doc, None)
+            if year is not None:
+                self._year_postings[year].discard(doc)
+                if not self._year_postings[year]:
+                    del self._year_postings[year]
+
+    # ── Query ────────────────────────────────────────────────────────────────
+
+    def search(
+        self,
+        filters: Optional[Dict[str, List[str]]] = None,
+        op: str = "and",
+        year_from: Optional[int] = None,
+        year_to: Optional[int] = None,
+        limit: int = 50,
+        facet_limit: int = 20,
+    ) -> Dict[str, Any]:
+        """
+        Args:
+            filters: facet → values, e.g. {"datasets": ["ImageNet"], "optimization": ["AdamW"]}.
+            op: "and" requires every listed value to match, "or" requires any of them.
+            year_from / year_to: Inclusive publication year range, always ANDed with the filters.
+            limit: Number of matching analysis ids to return (newest first).
+            facet_limit: Top values reported per facet.
+
+        Returns:
+            {"ids": [...], "total": int, "facets": {facet: [{"value", "count"}]}}
+
+        Raises:
+            ValueError: On an unknown facet or op.
+        """
+        if op not in ("and", "or"):
+            raise ValueError(f"Invalid op '{op}', expected 'and' or 'or'")
+        filters = {f: v for f, v in (filters or {}).items() if v}
+        unknown = [f for f in filters if f not in TERM_FACETS]
+        if unknown:
+            raise ValueError(f"Unknown facet(s): {', '.join(unknown)}")
+
+        with self._lock:
+            postings = [
+                self._postings[facet].get(normalize_facet_value(value), set())
+                for facet, values in filters.items()
+                for value in values
+            ]
+            if not postings:
+                matched = set(self._analysis_ids)
+            elif op == "and":
+                # Intersect smallest-first so the working set shrinks as fast as possible
+                postings.sort(key=len)
+                matched = set(postings[0])
+                for posting in postings[1:]:
+                    matched &= posting
+                    if not matched:
+                        break
+            else:
+                matched = set().union(*postings)
+
+            if year_from is not None or year_to is not None:
+                lo = year_from if year_from is not None else -10**9
+                hi = year_to if year_to is not None else 10**9
+                in_range = set().union(*(docs for year, docs in self._year_postings.items() if lo <= year <= hi))
+                matched &= in_range
+
+            if self._ids_sorted:
+                top = sorted(matched, reverse=True)[:limit]
+            else:
+                top = heapq.nlargest(limit, matched, key=self._sort_keys.__getitem__)
+            return {
+                "ids": [self._analysis_ids[d] for d in top],
+                "total": len(matched),
+                "facets": self._facet_counts(matched, facet_limit),
+            }
+
+    def _totals(self) -> Dict[str, List[Tuple[int, Any]]]:
+        """Per-facet (count, key) over the whole index, largest first; cached until the next add/remove."""
+        if self._totals_cache is None:
+            totals = {
+                facet: sorted(((len(docs), key) for key, docs in postings.items()), reverse=True)
+                for facet, postings in self._postings.items()
+            }
+            totals["year"] = [(len(docs), year) for year, docs in self._year_postings.items()]
+            self._totals_cache = totals
+        return self._totals_cache
+
+    def _tally(self, docs: Iterable[int]) -> Counter:
+        """term id → number of docs carrying it; counted in C via Counter's iterable fast path."""
+        return Counter(chain.from_iterable(map(self._forward.__getitem__, docs)))
+
+    def _facet_counts(self, matched: Set[int], facet_limit: int) -> Dict[str, List[Dict[str, Any]]]:
+        totals = self._totals()
+        top: Dict[str, List[Tuple[int, Any]]] = {}
+        if len(matched) == len(self._doc_ids):
+            top = {facet: totals[facet][:facet_limit] for facet in TERM_FACETS}
+            top["year"] = totals["year"]
+        elif len(matched) <= len(self._doc_ids) // 2:
+            grouped: Dict[str, List[Tuple[int, Any]]] = {facet: [] for facet in FACETS}
+            for term_id, n in self._tally(matched).items():
+                facet, key = self._terms[term_id]
+                grouped[facet].append((n, key))
+            top = {facet: heapq.nlargest(facet_limit, grouped[facet]) for facet in TERM_FACETS}
+            top["year"] = grouped["year"]
+        else:
+            # Broad match: count what was excluded and subtract it from the totals. Walking the
+            # totals largest-first, we can stop once a total can no longer beat the current top-k.
+            excluded = self._tally(self._analysis_ids.keys() - matched)
+            for facet in TERM_FACETS:
+                best: List[Tuple[int, Any]] = []
+                for total, key in totals[facet]:
+                    if len(best) == facet_limit and total <= best[0][0]:
+                        break
+                    item = (total - excluded.get(self._term_ids[(facet, key)], 0), key)
+                    if len(best) < facet_limit:
+                        heapq.heappush(best, item)
+                    elif item > best[0]:
+                        heapq.heapreplace(best, item)
+                top[facet] = sorted(best, reverse=True)
+            top["year"] = [(n - excluded.get(self._term_ids[("year", year)], 0), year) for n, year in totals["year"]]
+
+        result: Dict[str, List[Dict[str, Any]]] = {
+            facet: [{"value": self._display[(facet, key)], "count": n} for n, key in top[facet] if n]
+            for facet in TERM_FACETS
+        }
+        result["year"] = [{"value": year, "count": n} for n, year in sorted(top["year"], key=lambda t: -t[1]) if n]
+        return result
@@ -0,0 +1,356 @@
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from app.core.metrics import metrics
+from app.core.serialization import dumps_str, loads
+
+logger = logging.getLogger(__name__)
+
+# ─── Configuration ───────────────────────────────────────────────────────────
+
+# Interactive uploads get 8x the share of a bulk backfill from the same tenant
+PRIORITY_WEIGHTS_SPEC = os.getenv("SCHED_PRIORITY_WEIGHTS", "interactive=8,bulk=1")
+# Per-tenant share multipliers, e.g. "lab-a=2,lab-b=0.5"; unlisted tenants weigh 1
+TENANT_WEIGHTS_SPEC = os.getenv("SCHED_TENANT_WEIGHTS", "")
+# Jobs one tenant may have running at once, across all workers
+SCHED_TENANT_CAP = int(os.getenv("SCHED_TENANT_CAP", "2"))
+# Jobs handed to the workers at once; the rest wait here, where order is fair, not in the FIFO broker queue
+SCHED_MAX_DISPATCHED = int(os.getenv("SCHED_MAX_DISPATCHED", "8"))
+# A running slot is reclaimed after this long even if its job never reported an end (lost worker)
+SCHED_LEASE_SECONDS = float(os.getenv("SCHED_LEASE_SECONDS", "2400"))
+# An API process whose heartbeat is older than this is presumed gone, and its waiting jobs are recoverable
+SCHED_HEARTBEAT_SECONDS = float(os.getenv("SCHED_HEARTBEAT_SECONDS", "30"))
+
+DEFAULT_PRIORITY = "interactive"
+
+_wait_seconds = metrics.histogram(
+    "job_queue_wait_seconds", "Time from submission to dispatch to a worker, by tenant and priority",
+    buckets=(0.1, 0.5, 1.0, 5.0, 15.0, 30.0, 60.0, 300.0, 900.0, 1800.0, 3600.0, 7200.0),
+)
+_queued = metrics.gauge("job_queue_depth", "Jobs waiting in the fair scheduler, by tenant")
+_running = metrics.gauge("job_running", "Jobs dispatched and not yet finished, by tenant")
+
+
+def parse_weights(spec: str) -> Dict[str, float]:
+    """"a=2,b=0.5" → {"a": 2.0, "b": 0.5}."""
+    weights = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, value = item.partition("=")
+        weights[name.strip()] = float(value)
+    return weights
+
+
+# ─── Tenant slots ────────────────────────────────────────────────────────────
+# Running-job counts per tenant, with leases. The Redis version makes the cap
+# hold across every API replica that dispatches jobs.
+
+class MemoryTenantSlots:
+    def __init__(self, clock: Callable[[], float] = time.time):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._held: Dict[str, Dict[str, float]] = {}
+
+    def acquire(self, tenant: str, job_id: str, cap: int, lease: float) -> bool:
+        now = self._clock()
+        with self._lock:
+            held = self._held.setdefault(tenant, {})
+            for expired in [j for j, expires in held.items() if expires <= now]:
+                del held[expired]
+            if job_id not in held and len(held) >= cap:
+                return False
+            held[job_id] = now + lease
+            return True
+
+    def release(self, tenant: str, job_id: str):
+        with self._lock:
+            self._held.get(tenant, {}).pop(job_id, None)
+
+    def running(self, tenant: str) -> int:
+        now = self._clock()
+        with self._lock:
+            return sum(1 for expires in self._held.get(tenant, {}).values() if expires > now)
+
+
+class RedisTenantSlots:
+    # Sorted set per tenant: member = job id, score = lease expiry
+    _ACQUIRE = """
+    redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+    if redis.call('ZSCORE', KEYS[1], ARGV[3]) or redis.call('ZCARD', KEYS[1]) < tonumber(ARGV[2]) then
+        redis.call('ZADD', KEYS[1], ARGV[4], ARGV[3])
+        redis.call('EXPIRE', KEYS[1], ARGV[5])
+        return 1
+    end
+    return 0
+    """
+
+    def __init__(self, url: str):
+        import redis
+        self._client = redis.Redis.from_url(url, decode_responses=True)
+        self._acquire = self._client.register_script(self._ACQUIRE)
+
+    @staticmethod
+    def _key(tenant: str) -> str:
+        return f"sched:{tenant}:running"
+
+    def acquire(self, tenant: str, job_id: str, cap: int, lease: float) -> bool:
+        now = time.time()
+        return bool(self._acquire(keys=[self._key(tenant)], args=[now, cap, job_id, now + lease, int(lease) + 60]))
+
+    def release(self, tenant: str, job_id: str):
+        self._client.zrem(self._key(tenant), job_id)
+
+    def running(self, tenant: str) -> int:
+        return self._client.zcount(self._key(tenant), time.time(), "+inf")
+
+
+# ─── Queue ownership ─────────────────────────────────────────────────────────
+# The waiting jobs themselves live in the memory of the API process that took
+# them. This registry records which process holds each one and the arguments
+# it was queued with, plus a heartbeat per process, so a restarted API can
+# re-queue the jobs of a process that is gone, exactly as they were submitted,
+# without taking over those still waiting in a live replica.
+
+class RedisQueueRegistry:
+    # Hash field value for a job already handed to the workers
+    DISPATCHED = "-"
+    _KEY = "sched:queued"
+    # Enqueue arguments (file, instructions, forced stages, budget, profile) of each waiting job, as JSON
+    _ARGS_KEY = "sched:args"
+    _CLAIM = """
+    local owner = redis.call('HGET', KEYS[1], ARGV[1])
+    if owner == ARGV[3] then return 0 end
+    if owner and redis.call('EXISTS', 'sched:instance:' .. owner) == 1 then return 0 end
+    redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+    return 1
+    """
+
+    def __init__(self, url: str, instance: Optional[str] = None, ttl: float = SCHED_HEARTBEAT_SECONDS):
+        import redis
+        self.instance = instance or uuid.uuid4().hex
+        self.ttl = ttl
+        self._client = redis.Redis.from_url(url, decode_responses=True)
+        self._claim = self._client.register_script(self._CLAIM)
+
+    def heartbeat(self):
+        self._client.set(f"sched:instance:{self.instance}", 1, ex=max(1, int(self.ttl)))
+
+    def hold(self, job_id: str, payload: Optional[Dict[str, Any]] = None):
+        pipe = self._client.pipeline()
+        pipe.hset(self._KEY, job_id, self.instance)
+        if payload is not None:
+            pipe.hset(self._ARGS_KEY, job_id, dumps_str(payload))
+        pipe.execute()
+
+    def dispatched(self, job_id: str):
+        pipe = self._client.pipeline()
+        pipe.hset(self._KEY, job_id, self.DISPATCHED)
+        pipe.hdel(self._ARGS_KEY, job_id)
+        pipe.execute()
+
+    def forget(self, job_id: str):
+        pipe = self._client.pipeline()
+        pipe.hdel(self._KEY, job_id)
+        pipe.hdel(self._ARGS_KEY, job_id)
+        pipe.execute()
+
+    def payload(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """The arguments a waiting job was queued with, or None if they weren't recorded."""
+        raw = self._client.hget(self._ARGS_KEY, job_id)
+        return loads(raw) if raw else None
+
+    def claim(self, job_id: str) -> bool:
+        """Take over a waiting job unless it was dispatched or a live process still holds it."""
+        return bool(self._claim(keys=[self._KEY], args=[job_id, self.instance, self.DISPATCHED]))
+
+
+# ─── Scheduler ───────────────────────────────────────────────────────────────
+
+@dataclass
+class QueuedJob:
+    job_id: str
+    tenant: str
+    priority: str
+    cost: float
+    payload: Any = None
+    enqueued_at: float = 0.0
+    start_tag: float = 0.0
+    finish_tag: float = 0.0
+
+
+@dataclass
+class _Flow:
+    jobs: Deque[QueuedJob] = field(default_factory=deque)
+    last_finish: float = 0.0
+
+
+class FairScheduler:
+    """
+    Weighted fair queuing of extraction jobs in front of the worker queues.
+
+    Each (tenant, priority class) is a flow with weight tenant_weight ×
+    priority_weight. A job's finish tag is max(virtual time, its flow's last
+    finish tag) + cost / weight (start-time fair queuing), and the dispatcher
+    always sends the queued job with the smallest finish tag whose tenant is
+    under its concurrency cap. A tenant with 500 queued papers therefore gets
+    its weighted share of the workers, not all of them, and a newly arriving
+    tenant's first job is dispatched at the next free slot.
+
+    At most `max_dispatched` jobs are handed to `dispatch` at once; the rest
+    wait here. A job frees its slot through `release` (normally called when
+    the job's terminal status is published) or when its lease expires.
+
+    The queue lives in this process. With several API processes (uvicorn
+    workers or replicas) each runs its own scheduler: fair order holds among
+    the jobs each one accepted, and up to processes × `max_dispatched` jobs
+    reach the workers at once. Only the per-tenant cap is shared, through
+    RedisTenantSlots. Waiting jobs do not survive their process; see
+    RedisQueueRegistry and JobManager.recover_pending.
+    """
+
+    def __init__(
+        self,
+        dispatch: Callable[[QueuedJob], None],
+        slots=None,
+        tenant_cap: int = SCHED_TENANT_CAP,
+        max_dispatched: int = SCHED_MAX_DISPATCHED,
+        tenant_weights: Optional[Dict[str, float]] = None,
+        priority_weights: Optional[Dict[str, float]] = None,
+        lease_seconds: float = SCHED_LEASE_SECONDS,
+        clock: Callable[[], float] = time.time,
+    ):
+        self._dispatch = dispatch
+        self._slots = slots if slots is not None else MemoryTenantSlots(clock)
+        self.tenant_cap = tenant_cap
+        self.max_dispatched = max_dispatched
+        self.tenant_weights = tenant_weights if tenant_weights is not None else parse_weights(TENANT_WEIGHTS_SPEC)
+        self.priority_weights = priority_weights if priority_weights is not None else parse_weights(PRIORITY_WEIGHTS_SPEC)
+        self.lease_seconds = lease_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._flows: Dict[Tuple[str, str], _Flow] = {}
+        self._queued: Dict[str, QueuedJob] = {}
+        self._dispatched: Dict[str, Tuple[QueuedJob, float]] = {}
+        self._virtual_time = 0.0
+
+    # ── Submission ───────────────────────────────────────────────────────────
+
+    def enqueue(self, job_id: str, tenant: str, priority: str = DEFAULT_PRIORITY, cost: float = 1.0, payload: Any = None) -> QueuedJob:
+        """
+        Queue a job and dispatch whatever is now eligible.
+
+        Raises:
+            ValueError: Unknown priority class.
+        """
+        if priority not in self.priority_weights:
+            raise ValueError(f"Unknown priority '{priority}', expected one of {sorted(self.priority_weights)}")
+        weight = self.tenant_weights.get(tenant, 1.0) * self.priority_weights[priority]
+        with self._lock:
+            flow = self._flows.setdefault((tenant, priority), _Flow())
+            start = max(self._virtual_time, flow.last_finish)
+            job = QueuedJob(
+                job_id=job_id, tenant=tenant, priority=priority, cost=cost, payload=payload,
+                enqueued_at=self._clock(), start_tag=start, finish_tag=start + cost / weight,
+            )
+            flow.last_finish = job.finish_tag
+            flow.jobs.append(job)
+            self._queued[job_id] = job
+            _queued.inc(tenant=tenant)
+        self.pump()
+        return job
+
+    def cancel(self, job_id: str) -> Optional[QueuedJob]:
+        """Drop a job that is still waiting; returns it, or None if it was already dispatched or unknown."""
+        with self._lock:
+            job = self._queued.pop(job_id, None)
+            if job is None:
+                return None
+            self._flows[(job.tenant, job.priority)].jobs.remove(job)
+            _queued.dec(tenant=job.tenant)
+            return job
+
+    def release(self, job_id: str):
+        """
+        The job finished (or failed for good): free its slot and dispatch the next one.
+        Jobs this process didn't dispatch have no slot here; for those, and for
+        slots other processes free in the shared tenant caps, call pump().
+        """
+        with self._lock:
+            entry = self._dispatched.pop(job_id, None)
+        if entry is None:
+            return
+        self._slots.release(entry[0].tenant, job_id)
+        _running.dec(tenant=entry[0].tenant)
+        self.pump()
+
+    # ── Dispatch ─────────────────────────────────────────────────────────────
+
+    def pump(self):
+        """Hand eligible jobs to `dispatch`, smallest finish tag first, within the caps."""
+        for job in self._select():
+            try:
+                self._dispatch(job)
+            except Exception as e:
+                logger.error(f"Dispatch of job {job.job_id} failed: {e}", exc_info=True)
+                self.release(job.job_id)
+
+    def _select(self) -> List[QueuedJob]:
+        now = self._clock()
+        selected: List[QueuedJob] = []
+        with self._lock:
+            for job_id in [j for j, (_, since) in self._dispatched.items() if now - since > self.lease_seconds]:
+                job, _ = self._dispatched.pop(job_id)
+                _running.dec(tenant=job.tenant)
+                logger.warning(f"Job {job_id} held its slot past the {self.lease_seconds:g}s lease; reclaiming it")
+
+            blocked = set()
+            while len(self._dispatched) < self.max_dispatched:
+                candidates = [
+                    flow.jobs[0] for (tenant, _), flow in self._flows.items()
+                    if flow.jobs and tenant not in blocked
+                ]
+                if not candidates:
+                    break
+                job = min(candidates, key=lambda j: (j.finish_tag, j.enqueued_at))
+                if not self._slots.acquire(job.tenant, job.job_id, self.tenant_cap, self.lease_seconds):
+                    blocked.add(job.tenant)
+                    continue
+                self._flows[(job.tenant, job.priority)].jobs.popleft()
+                del self._queued[job.job_id]
+                self._virtual_time = max(self._virtual_time, job.start_tag)
+                self._dispatched[job.job_id] = (job, now)
+                _queued.dec(tenant=job.tenant)
+                _running.inc(tenant=job.tenant)
+                _wait_seconds.observe(now - job.enqueued_at, tenant=job.tenant, priority=job.priority)
+                selected.append(job)
+        return selected
+
+    # ── Introspection ────────────────────────────────────────────────────────
+
+    def position(self, job_id: str) -> Optional[int]:
+        """0-based place of a waiting job in dispatch order (ignoring caps), or None."""
+        with self._lock:
+            job = self._queued.get(job_id)
+            if job is None:
+                return None
+            return sum(1 for other in self._queued.values() if (other.finish_tag, other.enqueued_at) < (job.finish_tag, job.enqueued_at))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            tenants: Dict[str, Dict[str, int]] = {}
+            for job in self._queued.values():
+                tenants.setdefault(job.tenant, {"queued": 0, "running": 0})["queued"] += 1
+            for job, _ in self._dispatched.values():
+                tenants.setdefault(job.tenant, {"queued": 0, "running": 0})["running"] += 1
+            return {
+                "queued": len(self._queued),
+                "dispatched": len(self._dispatched),
+                "max_dispatched": self.max_dispatched,
+                "tenant_cap": self.tenant_cap,
+                "tenants": tenants,
+            }
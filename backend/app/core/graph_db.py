@@ -1,22 +1,128 @@
 import logging
+import threading
 import networkx as nx
 import lancedb
 import os
+from typing import Iterable, List, Optional, Tuple
+
+from app.core.graph_layout import GraphLayoutEngine
 
 logger = logging.getLogger(__name__)
 
 LANCEDB_DIR = os.getenv("LANCEDB_DIR", "/app/data/lancedb")
 
+# (subject, predicate, object_target) or (subject, predicate, object_target, context)
+TripletTuple = Tuple
+
+
+class GraphSnapshot:
+    """
+    An immutable, versioned view of the knowledge graph.
+    The wrapped DiGraph is frozen, so readers can iterate it freely while
+    writers build and publish the next version alongside.
+    """
+
+    __slots__ = ("graph", "version", "_serialized", "_lock")
+
+    def __init__(self, graph: nx.DiGraph, version: int):
+        self.graph = nx.freeze(graph)
+        self.version = version
+        self._serialized: Optional[dict] = None
+        self._lock = threading.Lock()
+
+    def serialize(self) -> dict:
+        """Frontend-friendly nodes/edges payload, computed once per snapshot."""
+        if self._serialized is None:
+            with self._lock:
+                if self._serialized is None:
+                    self._serialized = _serialize_graph(self.graph, self.version)
+        return self._serialized
+
+
+def _node_group(predicates: set, total_deg: int) -> str:
+    """Assign color group based on relationship types."""
+    if any(p in predicates for p in ["AUTHORED_BY", "AFFILIATED_WITH"]):
+        return "author"
+    elif any(p in predicates for p in ["USES_MODEL", "OPTIMIZED_WITH"]):
+        return "model"
+    elif any(p in predicates for p in ["EVALUATES_ON"]):
+        return "dataset"
+    elif any(p in predicates for p in ["MEASURES_WITH"]):
+        return "metric"
+    elif any(p in predicates for p in ["HAS_LIMITATION"]):
+        return "limitation"
+    elif any(p in predicates for p in ["CONTRADICTS"]):
+        return "contradiction"
+    elif any(p in predicates for p in ["PUBLISHED_IN"]):
+        return "metadata"
+    elif total_deg >= 3:
+        return "hub"  # Central concept
+    return "concept"
+
+
+def _serialize_graph(graph: nx.DiGraph, version: int) -> dict:
+    # Build node list with metadata for visualization
+    nodes = []
+    for node in graph.nodes():
+        # Compute visual properties based on graph structure
+        in_deg = graph.in_degree(node)
+        out_deg = graph.out_degree(node)
+        total_deg = in_deg + out_deg
+
+        # Determine node group by analyzing edge predicates
+        predicates = set()
+        for _, _, data in graph.in_edges(node, data=True):
+            predicates.add(data.get("relation", ""))
+        for _, _, data in graph.out_edges(node, data=True):
+            predicates.add(data.get("relation", ""))
+
+        nodes.append({
+            "id": node,
+            "label": node[:40] + ("…" if len(node) > 40 else ""),
+            "fullLabel": node,
+            "group": _node_group(predicates, total_deg),
+            "degree": total_deg,
+            "inDegree": in_deg,
+            "outDegree": out_deg,
+        })
+
+    # Build edge list
+    edges = []
+    for u, v, data in graph.edges(data=True):
+        edges.append({
+            "source": u,
+            "target": v,
+            "relation": data.get("relation", "RELATED_TO"),
+        })
+
+    return {
+        "nodes": nodes,
+        "edges": edges,
+        "stats": {
+            "node_count": len(nodes),
+            "edge_count": len(edges),
+        },
+        "version": version,
+    }
+
+
 class GraphMemoryManager:
     """
     Manages the deterministic Dual-Engine Relational Analytics.
     Wraps NetworkX for Graph traversals (Contradiction Engine / Citation Roots)
     and LanceDB for fast semantic vector recall.
+
+    Concurrency model: writers apply batches of triplets to a private copy of the
+    graph under a lock and then atomically publish it as a new frozen snapshot.
+    Readers only ever dereference the current snapshot, so they never block
+    writers, never see a half-applied batch and never iterate a mutating dict.
     """
-    
+
     def __init__(self):
-        self.graph = nx.DiGraph()
-        
+        self._write_lock = threading.Lock()
+        self._snapshot = GraphSnapshot(nx.DiGraph(), version=0)
+        self.layout_engine = GraphLayoutEngine()
+
         # Ensure correct LanceDB data directory exists locally
         os.makedirs(LANCEDB_DIR, exist_ok=True)
         try:
@@ -26,15 +132,56 @@ class GraphMemoryManager:
             logger.error(f"Failed to connect to error-free LanceDB instance: {e}")
             self.vector_db = None
 
+    # ── Reads (lock-free) ────────────────────────────────────────────────────
+
+    def snapshot(self) -> GraphSnapshot:
+        """Returns the latest published immutable snapshot."""
+        return self._snapshot
+
+    @property
+    def graph(self) -> nx.DiGraph:
+        """Frozen view of the latest snapshot (read-only)."""
+        return self._snapshot.graph
+
+    @property
+    def version(self) -> int:
+        """Bumped on every published write so derived data can be cached per version."""
+        return self._snapshot.version
+
+    # ── Writes (serialized, batched) ─────────────────────────────────────────
+
     def add_triplet(self, subject: str, predicate: str, object_target: str, context: dict = None):
         """
         Adds a mathematical edge [Predicate] between two nodes [Subject -> Object].
         """
-        if context is None:
-            context = {}
-            
-        self.graph.add_edge(subject, object_target, relation=predicate, **context)
-        logger.debug(f"Added Edge: ({subject}) -[{predicate}]-> ({object_target})")
+        self.add_triplets([(subject, predicate, object_target)], context=context)
+
+    def add_triplets(self, triplets: Iterable[TripletTuple], context: dict = None) -> int:
+        """
+        Applies a batch of triplets as one atomic write and publishes a new snapshot.
+        Each item is (subject, predicate, object) with an optional 4th per-triplet context dict.
+
+        Returns:
+            The version of the published snapshot.
+        """
+        batch: List[TripletTuple] = list(triplets)
+        if not batch:
+            return self.version
+
+        with self._write_lock:
+            current = self._snapshot
+            # Copy-on-write: readers keep the frozen previous version until we publish
+            working = nx.DiGraph(current.graph)
+            for triplet in batch:
+                subject, predicate, object_target = triplet[:3]
+                edge_context = dict(context or {})
+                if len(triplet) > 3 and triplet[3]:
+                    edge_context.update(triplet[3])
+                working.add_edge(subject, object_target, relation=predicate, **edge_context)
+                logger.debug(f"Added Edge: ({subject}) -[{predicate}]-> ({object_target})")
+
+            self._snapshot = GraphSnapshot(working, version=current.version + len(batch))
+            return self._snapshot.version
 
     def get_contradictions(self, target_concept: str):
         """
@@ -49,12 +196,13 @@ class GraphMemoryManager:
         Returns a summary of the current graph state: node/edge counts and sample edges.
         Useful for verification and later for RAG context injection.
         """
-        node_count = self.graph.number_of_nodes()
-        edge_count = self.graph.number_of_edges()
+        graph = self._snapshot.graph
+        node_count = graph.number_of_nodes()
+        edge_count = graph.number_of_edges()
 
         # Grab a sample of edges for inspection
         sample_edges = []
-        for u, v, data in list(self.graph.edges(data=True))[:10]:
+        for u, v, data in list(graph.edges(data=True))[:10]:
             sample_edges.append({
                 "subject": u,
                 "predicate": data.get("relation", "UNKNOWN"),
@@ -67,74 +215,48 @@ class GraphMemoryManager:
             "sample_edges": sample_edges,
         }
 
-    def get_full_graph(self) -> dict:
+    def get_layout(self, snapshot: Optional[GraphSnapshot] = None) -> dict:
+        """
+        Returns precomputed {node: {x, y}} coordinates for the current graph version.
+        Cached per version; new nodes are warm-started next to already-placed neighbours.
+        """
+        snapshot = snapshot or self._snapshot
+        return self.layout_engine.get_layout(
+            nodes=list(snapshot.graph.nodes()),
+            edges=list(snapshot.graph.edges()),
+            version=snapshot.version,
+        )
+
+    def get_full_graph(self, include_layout: bool = False) -> dict:
         """
         Serializes the full NetworkX graph into a frontend-friendly JSON structure
         for the Knowledge Graph Visualization.
         Returns nodes with degree-based sizing and edges with relation labels.
+        With include_layout=True, nodes also carry server-computed x/y coordinates.
+
+        The payload is built from a single snapshot, so counts, nodes and edges
+        are always mutually consistent even while uploads are adding triplets.
         """
-        # Build node list with metadata for visualization
-        nodes = []
-        for node in self.graph.nodes():
-            # Compute visual properties based on graph structure
-            in_deg = self.graph.in_degree(node)
-            out_deg = self.graph.out_degree(node)
-            total_deg = in_deg + out_deg
-
-            # Determine node group by analyzing edge predicates
-            predicates = set()
-            for _, _, data in self.graph.in_edges(node, data=True):
-                predicates.add(data.get("relation", ""))
-            for _, _, data in self.graph.out_edges(node, data=True):
-                predicates.add(data.get("relation", ""))
-
-            # Assign color group based on relationship types
-            if any(p in predicates for p in ["AUTHORED_BY", "AFFILIATED_WITH"]):
-                group = "author"
-            elif any(p in predicates for p in ["USES_MODEL", "OPTIMIZED_WITH"]):
-                group = "model"
-            elif any(p in predicates for p in ["EVALUATES_ON"]):
-                group = "dataset"
-            elif any(p in predicates for p in ["MEASURES_WITH"]):
-                group = "metric"
-            elif any(p in predicates for p in ["HAS_LIMITATION"]):
-                group = "limitation"
-            elif any(p in predicates for p in ["CONTRADICTS"]):
-                group = "contradiction"
-            elif any(p in predicates for p in ["PUBLISHED_IN"]):
-                group = "metadata"
-            elif total_deg >= 3:
-                group = "hub"  # Central concept
-            else:
-                group = "concept"
-
-            nodes.append({
-                "id": node,
-                "label": node[:40] + ("…" if len(node) > 40 else ""),
-                "fullLabel": node,
-                "group": group,
-                "degree": total_deg,
-                "inDegree": in_deg,
-                "outDegree": out_deg,
-            })
+        snapshot = self._snapshot
+        serialized = snapshot.serialize()
+        result = dict(serialized)
 
-        # Build edge list
-        edges = []
-        for u, v, data in self.graph.edges(data=True):
-            edges.append({
-                "source": u,
-                "target": v,
-                "relation": data.get("relation", "RELATED_TO"),
-            })
+        if include_layout and serialized["nodes"]:
+            coordinates = self.get_layout(snapshot)
+            result["nodes"] = [{**node, **coordinates.get(node["id"], {})} for node in serialized["nodes"]]
+            result["layout"] = {"version": snapshot.version, "precomputed": True}
 
-        return {
-            "nodes": nodes,
-            "edges": edges,
-            "stats": {
-                "node_count": len(nodes),
-                "edge_count": len(edges),
-            }
-        }
+        return result
+
+    def get_paper_graph(self, paper_title: str) -> dict:
+        """
+        The subgraph one paper contributed (edges tagged with its title), in the
+        same shape as get_full_graph. Lets bulk ingestion store each paper's own
+        graph instead of an ever-growing copy of the shared one.
+        """
+        snapshot = self._snapshot
+        edges = [(u, v) for u, v, data in snapshot.graph.edges(data=True) if data.get("paper") == paper_title]
+        return _serialize_graph(snapshot.graph.edge_subgraph(edges), snapshot.version)
 
 # Singleton instance to be used by the Celery worker and the API
 memory_manager = GraphMemoryManager()
@@ -0,0 +1,163 @@
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class GraphLayoutEngine:
+    """
+    Server-side force-directed layout for the Knowledge Graph Visualization.
+    Runs Fruchterman-Reingold iterations as NumPy array operations so the
+    browser receives ready-made coordinates instead of simulating thousands
+    of nodes itself.
+
+    Coordinates are cached for the `cache_versions` most recently requested graph
+    versions. When the graph grows, nodes that were already placed keep their
+    coordinates as a warm start and only a short, low-temperature refinement is
+    run. Random placement is reseeded per computation, so the same graph and
+    warm-start state always give the same coordinates.
+
+    A layout takes seconds for thousands of nodes: call get_layout off the event loop.
+    """
+
+    def __init__(
+        self,
+        iterations: int = 60,
+        warm_iterations: int = 20,
+        scale: float = 1000.0,
+        block_size: int = 512,
+        seed: int = 42,
+        cache_versions: int = 4,
+    ):
+        self.iterations = iterations
+        self.warm_iterations = warm_iterations
+        self.scale = scale
+        # Repulsion is computed in row blocks to keep memory at O(block * n) instead of O(n^2)
+        self.block_size = block_size
+        self.seed = seed
+        self.cache_versions = cache_versions
+        self._rng = np.random.default_rng(seed)
+        self._positions: Dict[str, np.ndarray] = {}
+        self._cache: "OrderedDict[Hashable, Dict[str, Dict[str, float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_layout(self, nodes: List[str], edges: List[tuple], version: Hashable) -> Dict[str, Dict[str, float]]:
+        """
+        Returns {node_id: {"x": .., "y": ..}} for the given graph version,
+        computing (or incrementally refining) the layout if the cache is stale.
+        `version` is any hashable cache key (a graph version counter or a history entry id).
+        """
+        with self._lock:
+            cached = self._cache.get(version)
+            if cached:
+                self._cache.move_to_end(version)
+                return cached
+
+            coordinates = self._compute(nodes, edges)
+            self._cache[version] = coordinates
+            while len(self._cache) > self.cache_versions:
+                self._cache.popitem(last=False)
+            return coordinates
+
+    @property
+    def version(self) -> Optional[Hashable]:
+        """The most recently requested cached version."""
+        return next(reversed(self._cache), None)
+
+    def reset(self):
+        """Drop all cached coordinates so the next layout is computed cold."""
+        with self._lock:
+            self._positions.clear()
+            self._cache.clear()
+
+    def _compute(self, nodes: List[str], edges: List[tuple]) -> Dict[str, Dict[str, float]]:
+        n = len(nodes)
+        if n == 0:
+            self._positions.clear()
+            return {}
+
+        self._rng = np.random.default_rng(self.seed)
+        index = {node: i for i, node in enumerate(nodes)}
+        edge_idx = np.array(
+            [(index[u], index[v]) for u, v in edges if u in index and v in index],
+            dtype=np.int64,
+        ).reshape(-1, 2)
+
+        pos, placed = self._initial_positions(nodes, index, edge_idx)
+        warm = placed.any()
+        iterations = self.warm_iterations if warm and placed.mean() > 0.5 else self.iterations
+
+        # Ideal edge length for a square of side `scale` holding n nodes
+        k = self.scale / np.sqrt(n)
+        # Warm starts begin with a small temperature so existing nodes barely move
+        temperature = self.scale * (0.02 if warm else 0.1)
+        cooling = temperature / (iterations + 1)
+
+        for _ in range(iterations):
+            disp = self._repulsion(pos, k)
+
+            if len(edge_idx):
+                src, dst = edge_idx[:, 0], edge_idx[:, 1]
+                delta = pos[src] - pos[dst]
+                dist = np.maximum(np.linalg.norm(delta, axis=1), 0.01)
+                force = (delta / dist[:, None]) * (dist ** 2 / k)[:, None]
+                np.subtract.at(disp, src, force)
+                np.add.at(disp, dst, force)
+
+            length = np.maximum(np.linalg.norm(disp, axis=1), 0.01)
+            pos += disp / length[:, None] * np.minimum(length, temperature)[:, None]
+            temperature -= cooling
+
+        self._positions = {node: pos[i].copy() for node, i in index.items()}
+        logger.info(
+            f"Graph layout computed for {n} nodes / {len(edge_idx)} edges "
+            f"({iterations} iterations, {'warm' if warm else 'cold'} start)"
+        )
+        return {node: {"x": round(float(pos[i, 0]), 2), "y": round(float(pos[i, 1]), 2)} for node, i in index.items()}
+
+    def _initial_positions(self, nodes: List[str], index: Dict[str, int], edge_idx: np.ndarray):
+        """Reuse cached coordinates; place new nodes next to an already-placed neighbour."""
+        n = len(nodes)
+        pos = np.empty((n, 2), dtype=np.float64)
+        placed = np.zeros(n, dtype=bool)
+
+        for node, i in index.items():
+            cached = self._positions.get(node)
+            if cached is not None:
+                pos[i] = cached
+                placed[i] = True
+
+        missing = np.flatnonzero(~placed)
+        if len(missing) == 0:
+            return pos, placed
+
+        half = self.scale / 2
+        pos[missing] = self._rng.uniform(-half, half, size=(len(missing), 2))
+
+        if placed.any() and len(edge_idx):
+            jitter = self.scale / max(np.sqrt(n), 1.0)
+            for u, v in edge_idx:
+                for new, anchor in ((u, v), (v, u)):
+                    if not placed[new] and placed[anchor]:
+                        pos[new] = pos[anchor] + self._rng.normal(0, jitter, size=2)
+
+        return pos, placed
+
+    def _repulsion(self, pos: np.ndarray, k: float) -> np.ndarray:
+        n = len(pos)
+        disp = np.empty_like(pos)
+        # float32 halves memory traffic; precision is irrelevant at screen scale
+        x, y = pos[:, 0].astype(np.float32), pos[:, 1].astype(np.float32)
+        k2 = k * k
+        for start in range(0, n, self.block_size):
+            stop = min(start + self.block_size, n)
+            dx = x[start:stop, None] - x[None, :]
+            dy = y[start:stop, None] - y[None, :]
+            factor = np.float32(k2) / np.maximum(dx * dx + dy * dy, np.float32(0.01))
+            disp[start:stop, 0] = (dx * factor).sum(axis=1)
+            disp[start:stop, 1] = (dy * factor).sum(axis=1)
+        return disp
@@ -0,0 +1,469 @@
+import base64
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.core.facet_index import extract_facets
+from app.core.payload_codec import decode_payload, encode_payload
+from app.core.serialization import dumps_str, loads
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Columns returned by the history list; everything heavy lives in analysis_blobs
+SUMMARY_FIELDS = ("id", "filename", "title", "authors", "analyzed_at", "pipeline")
+# Summary columns stored as JSON text
+_JSON_FIELDS = {"authors", "pipeline"}
+MAX_PAGE_SIZE = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS analyses (
+    id TEXT PRIMARY KEY,
+    filename TEXT NOT NULL,
+    title TEXT NOT NULL,
+    authors TEXT NOT NULL,
+    analyzed_at TEXT NOT NULL,
+    pipeline TEXT NOT NULL,
+    has_graph INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_analyses_analyzed_at ON analyses(analyzed_at DESC, id DESC);
+
+-- Payloads are app.core.payload_codec blobs; rows written before the codec hold JSON text
+CREATE TABLE IF NOT EXISTS analysis_blobs (
+    id TEXT PRIMARY KEY REFERENCES analyses(id) ON DELETE CASCADE,
+    extracted_data BLOB NOT NULL,
+    graph_data BLOB
+);
+
+-- Structured search terms per analysis (see app.core.facet_index); small enough to
+-- rebuild the in-memory inverted index at startup without touching the blobs
+CREATE TABLE IF NOT EXISTS analysis_facets (
+    id TEXT NOT NULL REFERENCES analyses(id) ON DELETE CASCADE,
+    facet TEXT NOT NULL,
+    value TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_analysis_facets_id ON analysis_facets(id);
+"""
+
+# Bumped when a schema change needs existing rows backfilled (PRAGMA user_version)
+SCHEMA_VERSION = 1
+
+# Writer coalescing: wait up to HISTORY_WRITE_DELAY seconds for more ops, at most HISTORY_WRITE_BATCH per commit
+HISTORY_WRITE_DELAY = float(os.getenv("HISTORY_WRITE_DELAY", "0.05"))
+HISTORY_WRITE_BATCH = int(os.getenv("HISTORY_WRITE_BATCH", "64"))
+
+_queue_depth = metrics.gauge("history_write_queue_depth", "History writes waiting for the single writer")
+_commit_seconds = metrics.histogram(
+    "history_commit_seconds", "Durable commit (WAL fsync) latency per history write batch",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+_batch_size = metrics.histogram(
+    "history_write_batch_size", "History operations coalesced into one commit",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128),
+)
+
+
+def encode_cursor(analyzed_at: str, analysis_id: str) -> str:
+    """Opaque keyset cursor for the (analyzed_at, id) position of the last row on a page."""
+    return base64.urlsafe_b64encode(dumps_str([analyzed_at, analysis_id]).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    try:
+        analyzed_at, analysis_id = loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return str(analyzed_at), str(analysis_id)
+    except Exception:
+        raise ValueError("Invalid history cursor")
+
+
+class HistoryStore:
+    """
+    SQLite-backed analysis history.
+
+    Summaries (what the history list shows) and the heavy per-entry payloads
+    (extracted_data, graph snapshot) are stored in separate tables, so listing
+    never touches the blobs and a lookup by id is a primary-key read instead of
+    a parse of the whole history file.
+
+    The database runs in WAL mode: every commit is atomic and fsynced, a crash
+    mid-write rolls back to the last commit, and readers (one connection per
+    thread) never block on the writer.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = self._connect()
+        self._conn.executescript(_SCHEMA)
+        # Serializes writes on self._conn; HistoryWriter makes this uncontended in the API
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._readers: List[sqlite3.Connection] = []
+        self._readers_lock = threading.Lock()
+        self._upgrade()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        # FULL syncs the WAL on every commit, so an acknowledged write survives power loss
+        conn.execute("PRAGMA synchronous=FULL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+            with self._readers_lock:
+                self._readers.append(conn)
+        return conn
+
+    def _upgrade(self):
+        version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+        if version < 1:
+            # Databases created before facet search: derive facet rows from the stored blobs once
+            rows = self._conn.execute("SELECT id, extracted_data FROM analysis_blobs").fetchall()
+            facet_rows = [(r["id"], f, v) for r in rows for f, v in extract_facets(decode_payload(r["extracted_data"]))]
+            self._conn.execute("BEGIN")
+            self._conn.execute("DELETE FROM analysis_facets")
+            self._conn.executemany("INSERT INTO analysis_facets VALUES (?, ?, ?)", facet_rows)
+            self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            self._conn.execute("COMMIT")
+            if rows:
+                logger.info(f"Backfilled search facets for {len(rows)} history entries")
+
+    # ── Writes ───────────────────────────────────────────────────────────────
+
+    def insert(self, entry: Dict[str, Any]):
+        """Insert (or replace) a full history entry as produced by the upload route."""
+        self.insert_many([entry])
+
+    def insert_many(self, entries: List[Dict[str, Any]]):
+        self.apply([("insert", entry) for entry in entries])
+
+    def delete(self, analysis_id: str) -> bool:
+        """Delete an entry; returns False if it did not exist."""
+        return self.apply([("delete", analysis_id)])[0]
+
+    def apply(self, ops: List[Tuple[str, Any]]) -> List[Any]:
+        """
+        Applies ("insert", entry) / ("delete", analysis_id) ops in order, in one
+        transaction with a single durable commit.
+
+        Returns:
+            Per-op results: None for inserts, True/False (existed) for deletes.
+        """
+        results: List[Any] = []
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for kind, payload in ops:
+                    if kind == "insert":
+                        self._insert_rows(payload)
+                        results.append(None)
+                    elif kind == "delete":
+                        deleted = self._conn.execute("DELETE FROM analyses WHERE id = ?", (payload,)).rowcount
+                        results.append(deleted > 0)
+                    else:
+                        raise ValueError(f"Unknown history op '{kind}'")
+                start = time.perf_counter()
+                self._conn.execute("COMMIT")
+                _commit_seconds.observe(time.perf_counter() - start)
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return results
+
+    def _insert_rows(self, entry: Dict[str, Any]):
+        graph_data = entry.get("graph_data")
+        self._conn.execute(
+            "INSERT OR REPLACE INTO analyses VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                entry["id"],
+                entry.get("filename", "unknown.pdf"),
+                entry.get("title", "Untitled"),
+                dumps_str(entry.get("authors", [])),
+                entry.get("analyzed_at", ""),
+                dumps_str(entry.get("pipeline", {})),
+                1 if graph_data and graph_data.get("nodes") else 0,
+            ),
+        )
+        self._conn.execute(
+            "INSERT OR REPLACE INTO analysis_blobs VALUES (?, ?, ?)",
+            (
+                entry["id"],
+                encode_payload(entry.get("extracted_data", {})),
+                encode_payload(graph_data) if graph_data is not None else None,
+            ),
+        )
+        self._conn.execute("DELETE FROM analysis_facets WHERE id = ?", (entry["id"],))
+        self._conn.executemany(
+            "INSERT INTO analysis_facets VALUES (?, ?, ?)",
+            [(entry["id"], f, v) for f, v in extract_facets(entry.get("extracted_data") or {})],
+        )
+
+    # ── Reads ────────────────────────────────────────────────────────────────
+
+    @staticmethod
+    def _summary(row: sqlite3.Row) -> Dict[str, Any]:
+        return {
+            "id": row["id"],
+            "filename": row["filename"],
+            "title": row["title"],
+            "authors": loads(row["authors"]),
+            "analyzed_at": row["analyzed_at"],
+            "pipeline": loads(row["pipeline"]),
+        }
+
+    def list_summaries(self) -> List[Dict[str, Any]]:
+        """All entries, newest first, without extracted_data or graph_data."""
+        rows = self._reader().execute(
+            "SELECT id, filename, title, authors, analyzed_at, pipeline FROM analyses "
+            "ORDER BY analyzed_at DESC, id DESC"
+        ).fetchall()
+        return [self._summary(r) for r in rows]
+
+    def list_page(
+        self,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        order: str = "desc",
+        fields: Optional[Iterable[str]] = None,
+    ) -> Dict[str, Any]:
+        """
+        One page of summaries using keyset pagination on (analyzed_at, id), so
+        page N costs the same as page 1 regardless of history size.
+
+        Args:
+            limit: Page size (1..MAX_PAGE_SIZE).
+            cursor: `next_cursor` from the previous page, or None for the first page.
+            order: "desc" (newest first) or "asc".
+            fields: Subset of SUMMARY_FIELDS to return; "id" is always included.
+
+        Returns:
+            {"items": [...], "next_cursor": str | None}
+
+        Raises:
+            ValueError: On an unknown field, order or malformed cursor.
+        """
+        if order not in ("asc", "desc"):
+            raise ValueError(f"Invalid order '{order}', expected 'asc' or 'desc'")
+        selected = list(SUMMARY_FIELDS) if not fields else ["id"] + [f for f in dict.fromkeys(fields) if f != "id"]
+        unknown = [f for f in selected if f not in SUMMARY_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown history field(s): {', '.join(unknown)}")
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+
+        columns = list(dict.fromkeys(selected + ["analyzed_at"]))
+        comparison = "<" if order == "desc" else ">"
+        direction = order.upper()
+        sql = f"SELECT {', '.join(columns)} FROM analyses"
+        params: List[Any] = []
+        if cursor:
+            sql += f" WHERE (analyzed_at, id) {comparison} (?, ?)"
+            params.extend(decode_cursor(cursor))
+        # Fetch one extra row to learn whether another page exists
+        sql += f" ORDER BY analyzed_at {direction}, id {direction} LIMIT ?"
+        params.append(limit + 1)
+
+        rows = self._reader().execute(sql, params).fetchall()
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        items = [
+            {f: loads(row[f]) if f in _JSON_FIELDS else row[f] for f in selected}
+            for row in rows
+        ]
+        next_cursor = encode_cursor(rows[-1]["analyzed_at"], rows[-1]["id"]) if has_more else None
+        return {"items": items, "next_cursor": next_cursor}
+
+    def get_summaries(self, analysis_ids: List[str]) -> List[Dict[str, Any]]:
+        """Summaries for the given ids, in the order given (unknown ids are skipped)."""
+        if not analysis_ids:
+            return []
+        placeholders = ", ".join("?" * len(analysis_ids))
+        rows = self._reader().execute(
+            f"SELECT id, filename, title, authors, analyzed_at, pipeline FROM analyses WHERE id IN ({placeholders})",
+            list(analysis_ids),
+        ).fetchall()
+        by_id = {r["id"]: self._summary(r) for r in rows}
+        return [by_id[i] for i in analysis_ids if i in by_id]
+
+    def iter_facets(self) -> Iterator[Tuple[str, str, List[Tuple[str, str]]]]:
+        """(id, analyzed_at, [(facet, value), ...]) for every entry, to build the search index."""
+        rows = self._reader().execute(
+            "SELECT a.id, a.analyzed_at, f.facet, f.value FROM analyses a "
+            "LEFT JOIN analysis_facets f ON a.id = f.id ORDER BY a.id"
+        ).fetchall()
+        current, analyzed_at, facets = None, "", []
+        for row in rows:
+            if row["id"] != current:
+                if current is not None:
+                    yield current, analyzed_at, facets
+                current, analyzed_at, facets = row["id"], row["analyzed_at"], []
+            if row["facet"] is not None:
+                facets.append((row["facet"], row["value"]))
+        if current is not None:
+            yield current, analyzed_at, facets
+
+    def count(self) -> int:
+        return self._reader().execute("SELECT COUNT(*) FROM analyses").fetchone()[0]
+
+    def get(self, analysis_id: str, include_graph: bool = False) -> Optional[Dict[str, Any]]:
+        """Full entry by id (summary fields + extracted_data, and graph_data on request)."""
+        graph_column = "b.graph_data" if include_graph else "NULL AS graph_data"
+        row = self._reader().execute(
+            f"SELECT a.id, a.filename, a.title, a.authors, a.analyzed_at, a.pipeline, "
+            f"b.extracted_data, {graph_column} "
+            f"FROM analyses a JOIN analysis_blobs b ON a.id = b.id WHERE a.id = ?",
+            (analysis_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        entry = self._summary(row)
+        entry["extracted_data"] = decode_payload(row["extracted_data"])
+        if include_graph:
+            entry["graph_data"] = decode_payload(row["graph_data"]) if row["graph_data"] else None
+        return entry
+
+    def latest(self) -> Optional[Dict[str, Any]]:
+        """Most recent entry with its extracted_data (used to restore chat context on startup)."""
+        row = self._reader().execute(
+            "SELECT id FROM analyses ORDER BY analyzed_at DESC, id DESC LIMIT 1"
+        ).fetchone()
+        return self.get(row["id"]) if row else None
+
+    def latest_graph(self) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """(id, graph_data) of the newest entry that has a non-empty knowledge graph."""
+        row = self._reader().execute(
+            "SELECT a.id, b.graph_data FROM analyses a JOIN analysis_blobs b ON a.id = b.id "
+            "WHERE a.has_graph = 1 ORDER BY a.analyzed_at DESC, a.id DESC LIMIT 1"
+        ).fetchone()
+        if row is None:
+            return None
+        return row["id"], decode_payload(row["graph_data"])
+
+    # ── Migration ────────────────────────────────────────────────────────────
+
+    def migrate_from_json(self, json_path: str) -> int:
+        """
+        One-time import of the legacy history.json. The file is renamed to
+        `<name>.migrated` afterwards so the import never runs twice.
+
+        Returns:
+            Number of entries imported.
+        """
+        if not os.path.exists(json_path):
+            return 0
+        try:
+            with open(json_path, "rb") as f:
+                entries = loads(f.read())
+        except (ValueError, IOError) as e:
+            logger.warning(f"Legacy history file unreadable, skipping migration: {e}")
+            return 0
+
+        entries = [e for e in entries if isinstance(e, dict) and e.get("id")]
+        self.insert_many(entries)
+        os.replace(json_path, json_path + ".migrated")
+        logger.info(f"Migrated {len(entries)} history entries from {json_path} to {self.path}")
+        return len(entries)
+
+    def close(self):
+        with self._readers_lock:
+            for conn in self._readers:
+                conn.close()
+            self._readers.clear()
+        with self._lock:
+            self._conn.close()
+
+
+class HistoryWriter:
+    """
+    Single writer thread in front of a HistoryStore.
+
+    Callers enqueue inserts/deletes and get a Future back. The writer takes the
+    first pending op, waits up to `max_delay` for a burst to accumulate, and
+    commits up to `max_batch` ops in one transaction, so N concurrent uploads
+    cost one fsync instead of N while ordering is preserved.
+    """
+
+    _STOP = object()
+
+    def __init__(self, store: HistoryStore, max_delay: float = HISTORY_WRITE_DELAY,
+                 max_batch: int = HISTORY_WRITE_BATCH):
+        self.store = store
+        self.max_delay = max_delay
+        self.max_batch = max(1, max_batch)
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="history-writer", daemon=True)
+        self._thread.start()
+
+    def insert(self, entry: Dict[str, Any]) -> Future:
+        return self._submit("insert", entry)
+
+    def delete(self, analysis_id: str) -> Future:
+        """Future resolves to True if the entry existed."""
+        return self._submit("delete", analysis_id)
+
+    def _submit(self, kind: str, payload: Any) -> Future:
+        future: Future = Future()
+        self._queue.put((kind, payload, future))
+        _queue_depth.set(self._queue.qsize())
+        return future
+
+    def flush(self, timeout: Optional[float] = None):
+        """Block until everything enqueued so far is committed."""
+        self._submit("flush", None).result(timeout)
+
+    def close(self, timeout: float = 10.0):
+        """Drain pending writes and stop the writer thread."""
+        self._queue.put(self._STOP)
+        self._thread.join(timeout)
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is self._STOP:
+                break
+            batch = [first]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is self._STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            _queue_depth.set(self._queue.qsize())
+            self._commit(batch)
+
+    def _commit(self, batch: List[Tuple[str, Any, Future]]):
+        ops = [(kind, payload) for kind, payload, _ in batch if kind != "flush"]
+        _batch_size.observe(len(ops))
+        try:
+            results = self.store.apply(ops) if ops else []
+        except Exception as e:
+            logger.error(f"History write batch of {len(ops)} failed, retrying ops individually: {e}")
+            # Isolate the bad op so one malformed entry doesn't fail the whole burst
+            for kind, payload, future in batch:
+                if kind == "flush":
+                    future.set_result(None)
+                    continue
+                try:
+                    future.set_result(self.store.apply([(kind, payload)])[0])
+                except Exception as op_error:
+                    future.set_exception(op_error)
+            return
+        results_iter = iter(results)
+        for kind, _payload, future in batch:
+            future.set_result(None if kind == "flush" else next(results_iter))
@@ -0,0 +1,200 @@
+import os
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+from app.core.metrics import metrics
+
+# ─── Pipeline instrumentation ────────────────────────────────────────────────
+# Where an analysis spends its time and memory. Stage latencies, pages and LLM
+# tokens go to the process metrics registry (scraped at /metrics); per-document
+# stage timings also travel with the result (the upload response's `timings`
+# block, a job's pipeline["timings"]).
+#
+# Layout detection usually runs in a process pool, whose registries nobody
+# scrapes: extract_document only measures and returns its numbers, and the
+# caller records them here with record_layout().
+
+_stage_seconds = metrics.histogram("pipeline_stage_seconds", "Wall time of each pipeline stage per document, by stage")
+_pages = metrics.counter("pipeline_pages_total", "PDF pages through layout, by mode (yolo or text-only)")
+_tokens = metrics.counter("llm_tokens_total", "Gemini tokens, by call, model and direction")
+_models_loaded = metrics.gauge(
+    "models_loaded", "Live processes holding a loaded model, by model: this one and the layout pool processes it uses",
+)
+_peak_rss = metrics.histogram(
+    "pipeline_document_peak_rss_bytes", "Peak resident memory while one document went through a stage, by stage",
+    buckets=tuple(2 ** n * 1024 * 1024 for n in range(5, 15)),  # 32 MiB … 16 GiB
+)
+_rss = metrics.gauge("process_resident_memory_bytes", "Resident memory of this process")
+
+# model → pids of the processes known to hold it loaded; dead ones are pruned as the gauge is refreshed
+_model_pids: Dict[str, set] = {}
+_model_pids_lock = threading.Lock()
+
+
+class StageTimer:
+    """
+    Per-document stage timings: `with timer.stage("graph"): ...`. Each stage is
+    observed in pipeline_stage_seconds as it ends (unless `observe` is False, for
+    code whose numbers are recorded by its caller) and summed in `seconds`.
+    """
+
+    def __init__(self, observe: bool = True, seconds: Optional[Dict[str, float]] = None):
+        self.observe = observe
+        self.seconds = seconds if seconds is not None else {}
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name: str, seconds: float):
+        self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+        if self.observe:
+            _stage_seconds.observe(seconds, stage=name)
+
+    def merge(self, seconds: Dict[str, float]):
+        for name, value in (seconds or {}).items():
+            self.add(name, value)
+
+    def to_dict(self) -> Dict[str, float]:
+        return {name: round(value, 3) for name, value in self.seconds.items()}
+
+
+def observe_stage(name: str, seconds: float):
+    _stage_seconds.observe(seconds, stage=name)
+
+
+# ── Memory ───────────────────────────────────────────────────────────────────
+# VmHWM is per process. Only where a process runs one document at a time (a DLA
+# pool process, a prefork Celery child) is its peak that document's; in the API
+# process or a thread pool, concurrent documents would reset and read each other's.
+_dedicated_process = False
+
+
+def mark_dedicated_process():
+    """This process runs one document at a time, so per-document peak RSS can be measured here."""
+    global _dedicated_process
+    _dedicated_process = True
+
+
+def reset_peak_rss() -> bool:
+    """
+    Restart this process's peak-RSS watermark (Linux: clear_refs 5 resets VmHWM),
+    so peak_rss_bytes() measures from here. False where that isn't possible, or
+    the process isn't dedicated to one document (see mark_dedicated_process).
+    """
+    if not _dedicated_process:
+        return False
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """Peak resident memory since the last reset_peak_rss() (process lifetime where it can't be reset)."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    except (AttributeError, OSError):
+        return None
+    # kB on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def current_rss_bytes() -> Optional[int]:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def update_process_gauges():
+    """Refresh gauges that are read rather than pushed; called on each /metrics scrape."""
+    rss = current_rss_bytes()
+    if rss is not None:
+        _rss.set(rss)
+    _refresh_models_loaded()
+
+
+# ── Models and work units ────────────────────────────────────────────────────
+
+def note_model_loaded(model: str):
+    """A model finished loading in this process."""
+    _note_model_process(model, os.getpid())
+
+
+def _note_model_process(model: str, pid: int):
+    with _model_pids_lock:
+        _model_pids.setdefault(model, set()).add(pid)
+    _refresh_models_loaded()
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # exists, owned by someone else
+    return True
+
+
+def _refresh_models_loaded():
+    """Drop processes that have exited (recycled pool workers) and publish one count per model."""
+    with _model_pids_lock:
+        for model, pids in _model_pids.items():
+            pids.difference_update([pid for pid in pids if not _pid_alive(pid)])
+            _models_loaded.set(len(pids), model=model)
+
+
+def record_layout(pdf_info: Optional[Dict[str, Any]], timer: Optional[StageTimer] = None):
+    """
+    Record what MinerUExtractor.extract_document measured (possibly in another
+    process): its sub-stage timings, pages by mode, peak RSS, and which worker
+    process holds the layout model.
+    """
+    pdf_info = pdf_info or {}
+    (timer or StageTimer()).merge(pdf_info.get("timings"))
+    pages = pdf_info.get("pages_processed", 0)
+    yolo_pages = pdf_info.get("yolo_pages", pages)
+    _pages.inc(yolo_pages, mode="yolo")
+    if pages > yolo_pages:
+        _pages.inc(pages - yolo_pages, mode="text")
+    if pdf_info.get("peak_rss_bytes"):
+        _peak_rss.observe(pdf_info["peak_rss_bytes"], stage="layout")
+    if pdf_info.get("model") and pdf_info.get("pid"):
+        _note_model_process(pdf_info["model"], pdf_info["pid"])
+
+
+def record_llm_usage(call: str, usage_metadata: Optional[Dict[str, Dict[str, Any]]]) -> Dict[str, int]:
+    """
+    Count the tokens of one LLM call from LangChain's per-model usage metadata
+    (UsageMetadataCallbackHandler.usage_metadata).
+
+    Returns:
+        {"input_tokens", "output_tokens"} summed over models.
+    """
+    totals = {"input_tokens": 0, "output_tokens": 0}
+    for model, usage in (usage_metadata or {}).items():
+        for direction in ("input", "output"):
+            count = usage.get(f"{direction}_tokens") or 0
+            _tokens.inc(count, call=call, model=model, direction=direction)
+            totals[f"{direction}_tokens"] += count
+    return totals
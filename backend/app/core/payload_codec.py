@@ -0,0 +1,92 @@
+import logging
+import os
+import threading
+from typing import Any, Optional, Union
+
+from app.core.serialization import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+try:
+    import ormsgpack
+    import zstandard
+    _BINARY_AVAILABLE = True
+except ImportError:  # pragma: no cover - both are in requirements.txt
+    _BINARY_AVAILABLE = False
+    logger.warning("ormsgpack/zstandard unavailable; analysis payloads will be stored as JSON.")
+
+# ── Wire format ─────────────────────────────────────────────────────────────
+#   MAGIC (4 bytes) | schema version (1 byte) | flags (1 byte) | body
+# Version 1 body: MessagePack, zstd-compressed when FLAG_ZSTD is set.
+# Anything without the magic prefix is a legacy JSON payload (text or bytes).
+MAGIC = b"RPA\x00"
+PAYLOAD_VERSION = 1
+FLAG_ZSTD = 0x01
+_HEADER_SIZE = len(MAGIC) + 2
+
+PAYLOAD_ZSTD_LEVEL = int(os.getenv("PAYLOAD_ZSTD_LEVEL", "3"))
+# Below this, zstd framing overhead outweighs the savings
+_COMPRESS_MIN_BYTES = 256
+
+# zstd (de)compressor objects are not thread-safe; keep one pair per thread
+_local = threading.local()
+
+
+def _compressor():
+    c = getattr(_local, "compressor", None)
+    if c is None:
+        c = _local.compressor = zstandard.ZstdCompressor(level=PAYLOAD_ZSTD_LEVEL)
+    return c
+
+
+def _decompressor():
+    d = getattr(_local, "decompressor", None)
+    if d is None:
+        d = _local.decompressor = zstandard.ZstdDecompressor()
+    return d
+
+
+def _default(obj: Any):
+    return str(obj)
+
+
+def encode_payload(obj: Any) -> bytes:
+    """Serialize an analysis payload (extracted_data, graph data, task results) for storage."""
+    if not _BINARY_AVAILABLE:
+        return dumps(obj)
+    body = ormsgpack.packb(obj, default=_default, option=ormsgpack.OPT_NON_STR_KEYS | ormsgpack.OPT_SERIALIZE_NUMPY)
+    flags = 0
+    if len(body) >= _COMPRESS_MIN_BYTES:
+        body = _compressor().compress(body)
+        flags |= FLAG_ZSTD
+    return MAGIC + bytes((PAYLOAD_VERSION, flags)) + body
+
+
+def decode_payload(data: Union[bytes, bytearray, memoryview, str, dict, list, None]) -> Optional[Any]:
+    """
+    Inverse of encode_payload, and transparently reads every older format:
+    JSON text (history.json-era rows), JSON bytes, or values a JSON column
+    already deserialized.
+    """
+    if data is None or isinstance(data, (dict, list)):
+        return data
+    if isinstance(data, str):
+        return loads(data)
+    data = bytes(data)
+    if not data.startswith(MAGIC):
+        return loads(data)
+
+    version, flags = data[len(MAGIC)], data[len(MAGIC) + 1]
+    if version > PAYLOAD_VERSION:
+        raise ValueError(f"Payload schema version {version} is newer than supported ({PAYLOAD_VERSION})")
+    if not _BINARY_AVAILABLE:
+        raise RuntimeError("Binary payload found but ormsgpack/zstandard are not installed")
+    body = data[_HEADER_SIZE:]
+    if flags & FLAG_ZSTD:
+        body = _decompressor().decompress(body)
+    return ormsgpack.unpackb(body)
+
+
+def is_encoded(data: Any) -> bool:
+    """True if `data` is already in the current binary format."""
+    return isinstance(data, (bytes, bytearray, memoryview)) and bytes(data[:len(MAGIC)]) == MAGIC
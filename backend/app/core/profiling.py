@@ -0,0 +1,193 @@
+import hmac
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Any, Dict, Iterable, Optional
+
+from app.core.serialization import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+# ─── On-demand profiling ─────────────────────────────────────────────────────
+# Opt-in, admin-only profiling of single pipeline runs: a sampling profiler
+# producing folded stacks (flamegraph.pl, speedscope, inferno) plus tracemalloc's
+# top allocation sites. Nothing here runs unless a run asks for it, so the
+# disabled cost is one header / flag check per request.
+
+# Requests must present this in PROFILE_HEADER; profiling is off when it is unset
+PROFILING_ADMIN_TOKEN = os.getenv("PROFILING_ADMIN_TOKEN", "")
+PROFILE_HEADER = "X-Profile-Token"
+PROFILE_SAMPLE_INTERVAL_SECONDS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "5")) / 1000
+PROFILE_TOP_ALLOCATIONS = int(os.getenv("PROFILE_TOP_ALLOCATIONS", "50"))
+
+# Artifacts saved per profiled run, under the analysis/job id in the artifact store
+PROFILE_STACKS = "stacks.folded"
+PROFILE_ALLOCATIONS = "allocations.json"
+PROFILE_FILES = (PROFILE_STACKS, PROFILE_ALLOCATIONS)
+
+# A thread whose innermost frame is in one of these is parked (idle pool worker, event loop select)
+_IDLE_MODULES = ("threading.py", "queue.py", "selectors.py")
+
+# tracemalloc is process-wide: it stays on while any profiled run in this process needs it
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+_tracing_ours = False
+
+
+def profiling_authorized(token: Optional[str]) -> bool:
+    return bool(PROFILING_ADMIN_TOKEN) and bool(token) and hmac.compare_digest(token, PROFILING_ADMIN_TOKEN)
+
+
+def _start_tracing():
+    global _tracing_users, _tracing_ours
+    with _tracing_lock:
+        if _tracing_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracing_ours = True
+        _tracing_users += 1
+
+
+def _stop_tracing():
+    global _tracing_users, _tracing_ours
+    with _tracing_lock:
+        _tracing_users -= 1
+        if _tracing_users == 0 and _tracing_ours:
+            tracemalloc.stop()
+            _tracing_ours = False
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ":")
+
+
+def _fold(frame) -> str:
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+class SamplingProfiler:
+    """
+    Samples the Python stacks of this process's threads every `interval` seconds
+    from a background thread, and traces allocations with tracemalloc while
+    running. With `thread_ids`, only those threads are sampled; otherwise every
+    thread that isn't parked, so idle pool workers don't drown out the run.
+
+    stop() returns {"stacks": {folded stack: samples}, "samples", "duration_seconds",
+    "interval_seconds", "allocations": {"current_bytes", "peak_bytes", "top": [...]}}.
+    """
+
+    def __init__(
+        self,
+        thread_ids: Optional[Iterable[int]] = None,
+        interval: float = PROFILE_SAMPLE_INTERVAL_SECONDS,
+        top_allocations: int = PROFILE_TOP_ALLOCATIONS,
+    ):
+        self.thread_ids = set(thread_ids) if thread_ids is not None else None
+        self.interval = interval
+        self.top_allocations = top_allocations
+        self._stacks: Counter = Counter()
+        self._samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._started = 0.0
+
+    def start(self) -> "SamplingProfiler":
+        _start_tracing()
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        own = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            if len(names) != threading.active_count():
+                names = {t.ident: t.name for t in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own or (self.thread_ids is not None and thread_id not in self.thread_ids):
+                    continue
+                if self.thread_ids is None and os.path.basename(frame.f_code.co_filename) in _IDLE_MODULES:
+                    continue
+                self._stacks[f"{names.get(thread_id, thread_id)};{_fold(frame)}"] += 1
+            self._samples += 1
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and not self._stop.is_set()
+
+    def stop(self) -> Dict[str, Any]:
+        self._stop.set()
+        self._thread.join()
+        duration = time.perf_counter() - self._started
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ))
+        _stop_tracing()
+        top = [
+            {
+                "site": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                "size_bytes": stat.size,
+                "count": stat.count,
+            }
+            for stat in snapshot.statistics("lineno")[:self.top_allocations]
+        ]
+        return {
+            "stacks": dict(self._stacks),
+            "samples": self._samples,
+            "duration_seconds": round(duration, 3),
+            "interval_seconds": self.interval,
+            "allocations": {"current_bytes": current, "peak_bytes": peak, "top": top},
+        }
+
+
+def merge_profile(into: Dict[str, Any], other: Optional[Dict[str, Any]], prefix: str):
+    """Fold another profile (e.g. from a layout worker process) into `into`, its stacks under `prefix`."""
+    if not other:
+        return
+    for stack, count in other["stacks"].items():
+        key = f"{prefix};{stack}"
+        into["stacks"][key] = into["stacks"].get(key, 0) + count
+    into.setdefault("parts", {})[prefix] = {k: v for k, v in other.items() if k != "stacks"}
+
+
+def save_profile(store, analysis_id: str, profile: Dict[str, Any], part: Optional[str] = None) -> Dict[str, str]:
+    """
+    Write a profile's folded stacks and allocation report to the artifact store.
+    With `part` (a pipeline stage), stacks are appended under that root frame and
+    the allocations added under that key, so a staged job builds up one profile.
+
+    Returns:
+        Links to both artifacts, for the job/history record.
+    """
+    stacks = "".join(
+        f"{part + ';' if part else ''}{stack} {count}\n"
+        for stack, count in sorted(profile["stacks"].items(), key=lambda item: -item[1])
+    )
+    report = {k: v for k, v in profile.items() if k != "stacks"}
+    if part:
+        previous = store.read_file(analysis_id, PROFILE_STACKS)
+        stacks = (previous or b"").decode("utf-8") + stacks
+        existing = store.read_file(analysis_id, PROFILE_ALLOCATIONS)
+        report = {**(loads(existing) if existing else {}), part: report}
+    store.put_file(analysis_id, PROFILE_STACKS, stacks.encode("utf-8"))
+    store.put_file(analysis_id, PROFILE_ALLOCATIONS, dumps(report, pretty=True))
+    logger.info(f"Saved profile of {analysis_id}" + (f" ({part})" if part else "") + f": {profile['samples']} samples")
+    return profile_links(analysis_id)
+
+
+def profile_links(analysis_id: str) -> Dict[str, str]:
+    return {
+        "stacks": f"/api/v1/profiles/{analysis_id}/{PROFILE_STACKS}",
+        "allocations": f"/api/v1/profiles/{analysis_id}/{PROFILE_ALLOCATIONS}",
+    }
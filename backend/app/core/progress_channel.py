@@ -0,0 +1,208 @@
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.core.celery_app import redis_url
+from app.core.metrics import metrics
+from app.core.serialization import dumps_str, loads
+
+logger = logging.getLogger(__name__)
+
+# "redis" shares progress between the API and every worker, "memory" keeps it in this
+# process (eager jobs, tests), "auto" picks redis when it answers a ping at startup.
+PROGRESS_BACKEND = os.getenv("PROGRESS_BACKEND", "auto").lower()
+# Live job state outlives the job by this long; afterwards the ExtractionTask row answers
+PROGRESS_TTL_SECONDS = int(os.getenv("PROGRESS_TTL_SECONDS", "86400"))
+PROGRESS_CHANNEL = "jobs:progress"
+
+TERMINAL_STATUSES = ("COMPLETE", "FAILED", "CANCELLED")
+
+_published = metrics.counter("job_progress_published_total", "Job progress transitions published, by status")
+
+
+def redis_reachable(url: str = redis_url, timeout: float = 0.5) -> bool:
+    try:
+        import redis
+        return bool(redis.Redis.from_url(url, socket_connect_timeout=timeout, socket_timeout=timeout).ping())
+    except Exception:
+        return False
+
+
+def _key(job_id: str) -> str:
+    return f"job:{job_id}:progress"
+
+
+# ─── Backends ────────────────────────────────────────────────────────────────
+# Both store one flat hash per job (JSON-encoded values) and fan transitions out
+# on a single pub/sub channel. subscribe() returns (get(timeout) -> raw message or None, close).
+
+class MemoryProgressBackend:
+    """In-process stand-in for Redis: eager mode without a broker, and tests."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hashes: Dict[str, Dict[str, str]] = {}
+        self._expires: Dict[str, float] = {}
+        self._subscribers: List["queue.Queue"] = []
+
+    def update(self, key: str, fields: Dict[str, str], ttl: int, channel: str, message: str):
+        with self._lock:
+            self._hashes.setdefault(key, {}).update(fields)
+            self._expires[key] = time.monotonic() + ttl
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            subscriber.put(message)
+
+    def read_many(self, keys: List[str]) -> List[Dict[str, str]]:
+        now = time.monotonic()
+        with self._lock:
+            for key in keys:
+                if self._expires.get(key, now) < now:
+                    self._hashes.pop(key, None)
+                    self._expires.pop(key, None)
+            return [dict(self._hashes.get(key, {})) for key in keys]
+
+    def subscribe(self, channel: str) -> Tuple[Callable[[float], Optional[str]], Callable[[], None]]:
+        messages: "queue.Queue" = queue.Queue()
+        with self._lock:
+            self._subscribers.append(messages)
+
+        def get(timeout: float) -> Optional[str]:
+            try:
+                return messages.get(timeout=timeout)
+            except queue.Empty:
+                return None
+
+        def close():
+            with self._lock:
+                if messages in self._subscribers:
+                    self._subscribers.remove(messages)
+
+        return get, close
+
+
+class RedisProgressBackend:
+    """Job hashes and the transition channel in Redis; one round-trip per update."""
+
+    def __init__(self, url: str = redis_url):
+        import redis
+        self._client = redis.Redis.from_url(url, decode_responses=True)
+
+    def update(self, key: str, fields: Dict[str, str], ttl: int, channel: str, message: str):
+        pipe = self._client.pipeline(transaction=False)
+        pipe.hset(key, mapping=fields)
+        pipe.expire(key, ttl)
+        pipe.publish(channel, message)
+        pipe.execute()
+
+    def read_many(self, keys: List[str]) -> List[Dict[str, str]]:
+        pipe = self._client.pipeline(transaction=False)
+        for key in keys:
+            pipe.hgetall(key)
+        return pipe.execute()
+
+    def subscribe(self, channel: str) -> Tuple[Callable[[float], Optional[str]], Callable[[], None]]:
+        pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(channel)
+
+        def get(timeout: float) -> Optional[str]:
+            # get_message() also returns None after swallowing a subscribe confirmation
+            deadline = time.monotonic() + timeout
+            while True:
+                message = pubsub.get_message(timeout=max(0.0, deadline - time.monotonic()))
+                if message is not None:
+                    return message["data"]
+                if time.monotonic() >= deadline:
+                    return None
+
+        return get, pubsub.close
+
+
+class ProgressSubscription:
+    """Stream of published transitions; `get` returns the next one or None on timeout."""
+
+    def __init__(self, get: Callable[[float], Optional[str]], close: Callable[[], None], job_ids: Optional[Iterable[str]] = None):
+        self._get = get
+        self._close = close
+        self.job_ids = set(job_ids) if job_ids else None
+
+    def get(self, timeout: float = 1.0) -> Optional[Dict[str, Any]]:
+        deadline = time.monotonic() + timeout
+        while True:
+            raw = self._get(max(0.0, deadline - time.monotonic()))
+            if raw is None:
+                return None
+            event = loads(raw)
+            if self.job_ids is None or event.get("id") in self.job_ids:
+                return event
+            if time.monotonic() >= deadline:
+                return None
+
+    def close(self):
+        self._close()
+
+
+# ─── Channel ─────────────────────────────────────────────────────────────────
+
+class ProgressChannel:
+    """
+    Live job progress. Every stage transition is one hash write plus one publish
+    to a fast store, so status reads (GET /jobs, SSE streams, bulk polling)
+    never touch Postgres. The ExtractionTask row is brought up to date in
+    batches by app.services.task_progress.
+    """
+
+    def __init__(self, backend: str = PROGRESS_BACKEND, ttl: int = PROGRESS_TTL_SECONDS):
+        if backend == "auto":
+            backend = "redis" if redis_reachable() else "memory"
+        if backend not in ("redis", "memory"):
+            raise ValueError(f"Invalid PROGRESS_BACKEND '{backend}', expected 'redis', 'memory' or 'auto'")
+        self.backend_name = backend
+        self._backend = RedisProgressBackend() if backend == "redis" else MemoryProgressBackend()
+        self.ttl = ttl
+
+    def publish(self, job_id: str, status: str, progress: float, **fields) -> Dict[str, Any]:
+        """Record a transition; None-valued fields leave the stored value untouched. Returns the published event."""
+        state = {"status": status, "progress": progress, "updated_at": datetime.now(timezone.utc).isoformat()}
+        state.update({name: value for name, value in fields.items() if value is not None})
+        event = {"id": job_id, **state}
+        try:
+            self._backend.update(
+                _key(job_id), {name: dumps_str(value) for name, value in state.items()},
+                self.ttl, PROGRESS_CHANNEL, dumps_str(event),
+            )
+            _published.inc(status=status)
+        except Exception as e:
+            # Progress is advisory; the terminal write to the task row still happens
+            logger.warning(f"Failed to publish progress for job {job_id}: {e}")
+        return event
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self.get_many([job_id]).get(job_id)
+
+    def get_many(self, job_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Live state of every known job among `job_ids` (one round-trip)."""
+        job_ids = list(dict.fromkeys(job_ids))
+        if not job_ids:
+            return {}
+        try:
+            hashes = self._backend.read_many([_key(job_id) for job_id in job_ids])
+        except Exception as e:
+            logger.warning(f"Failed to read job progress: {e}")
+            return {}
+        return {
+            job_id: {"id": job_id, **{name: loads(value) for name, value in raw.items()}}
+            for job_id, raw in zip(job_ids, hashes) if raw
+        }
+
+    def subscribe(self, job_ids: Optional[Iterable[str]] = None) -> ProgressSubscription:
+        """Transitions published from now on, optionally only for some jobs. Close when done."""
+        get, close = self._backend.subscribe(PROGRESS_CHANNEL)
+        return ProgressSubscription(get, close, job_ids)
+
+
+progress_channel = ProgressChannel()
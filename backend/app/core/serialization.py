@@ -0,0 +1,68 @@
+import datetime
+import json
+import logging
+from pathlib import Path
+from typing import Any, Union
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+except ImportError:  # pragma: no cover - orjson is in requirements.txt
+    orjson = None
+    logger.warning("orjson unavailable; falling back to stdlib json serialization.")
+
+
+def _default(obj: Any) -> Any:
+    """Types neither orjson nor the stdlib handle natively."""
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    if isinstance(obj, (datetime.date, datetime.datetime)):
+        return obj.isoformat()
+    if isinstance(obj, Path):
+        return str(obj)
+    if hasattr(obj, "tolist"):  # NumPy scalars/arrays on the stdlib path
+        return obj.tolist()
+    return str(obj)
+
+
+def dumps(obj: Any, *, pretty: bool = False) -> bytes:
+    """
+    Serialize to UTF-8 JSON bytes. The one JSON encoder for API responses,
+    persistence and prompts; Pydantic models are dumped directly via
+    model_dump_json instead of going through an intermediate dict.
+    """
+    if isinstance(obj, BaseModel) and not pretty:
+        return obj.model_dump_json().encode("utf-8")
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS | (orjson.OPT_INDENT_2 if pretty else 0))
+    return json.dumps(
+        obj, default=_default, ensure_ascii=False, indent=2 if pretty else None,
+        separators=None if pretty else (",", ":"),
+    ).encode("utf-8")
+
+
+def dumps_str(obj: Any, *, pretty: bool = False) -> str:
+    return dumps(obj, pretty=pretty).decode("utf-8")
+
+
+def loads(data: Union[bytes, bytearray, memoryview, str]) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(bytes(data) if isinstance(data, memoryview) else data)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    Default response class. Renders with orjson; returning it directly from a
+    route also skips FastAPI's jsonable_encoder pass over large payloads.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
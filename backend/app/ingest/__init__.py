@@ -0,0 +1,4 @@
+"""Bulk ingestion of PDF directories into the analysis history (`python -m app.ingest <dir>`)."""
+from app.ingest.pipeline import BulkIngester, IngestReport, Manifest, format_report
+
+__all__ = ["BulkIngester", "IngestReport", "Manifest", "format_report"]
@@ -0,0 +1,63 @@
+"""
+Bulk-ingest a directory of PDFs into the analysis history.
+
+Usage:
+    python -m app.ingest <dir> [--llm-concurrency 8] [--layout-workers N] [--manifest PATH]
+
+Interrupted runs resume from the manifest (default: <dir>/.ingest_manifest.jsonl).
+The API builds its search index at startup, so restart it to see newly ingested papers in /search.
+"""
+import argparse
+import logging
+import os
+import sys
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+from app.core.serialization import dumps
+from app.ingest.pipeline import BulkIngester, format_report
+
+DEFAULT_DATA_DIR = os.getenv("DATA_DIR", "/app/data/" if os.path.exists("/app/data") else "./data/")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.ingest", description="Pipelined bulk PDF ingestion")
+    parser.add_argument("directory", help="Directory to scan for *.pdf")
+    parser.add_argument("--manifest", help="Resume manifest (default: <directory>/.ingest_manifest.jsonl)")
+    parser.add_argument("--history-db", default=os.path.join(DEFAULT_DATA_DIR, "history.db"))
+    parser.add_argument("--layout-workers", type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help="Processes for validation + YOLO layout detection")
+    parser.add_argument("--layout-executor", choices=("process", "thread"), default="process")
+    parser.add_argument("--llm-concurrency", type=int, default=8, help="Concurrent LLM extraction/graph calls")
+    parser.add_argument("--buffer", type=int, default=4, help="Documents queued between stages")
+    parser.add_argument("--limit", type=int, help="Process at most this many new documents")
+    parser.add_argument("--no-recursive", action="store_true", help="Only scan the top-level directory")
+    parser.add_argument("--report-json", help="Also write the run report to this file")
+    args = parser.parse_args(argv)
+
+    load_dotenv(os.path.join(os.path.dirname(__file__), "..", "..", ".env"))
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    root = Path(args.directory)
+    if not root.is_dir():
+        parser.error(f"not a directory: {root}")
+    os.makedirs(os.path.dirname(os.path.abspath(args.history_db)), exist_ok=True)
+
+    ingester = BulkIngester(
+        history_db=args.history_db,
+        manifest_path=args.manifest or str(root / ".ingest_manifest.jsonl"),
+        layout_workers=args.layout_workers,
+        llm_concurrency=args.llm_concurrency,
+        buffer=args.buffer,
+        layout_executor=args.layout_executor,
+    )
+    report = ingester.run(str(root), recursive=not args.no_recursive, limit=args.limit)
+    print(format_report(report))
+    if args.report_json:
+        Path(args.report_json).write_bytes(dumps(report.to_dict(), pretty=True))
+    return 1 if report.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,358 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+import uuid
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.core.history_store import HistoryStore, HistoryWriter
+from app.core.serialization import dumps_str, loads
+
+logger = logging.getLogger(__name__)
+
+def _fingerprint(path: Path) -> str:
+    """Cheap change detector for resume: a file whose size or mtime moved is ingested again."""
+    stat = path.stat()
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+# ── Stage functions ──────────────────────────────────────────────────────────
+
+def prepare_document(file_path: str) -> Dict[str, Any]:
+    """
+    CPU stage: Safety Shield validation, then YOLO layout detection. Module-level so
+    process pools can pickle it; each worker process keeps one loaded model.
+
+    Raises:
+        ValueError: When the PDF fails validation.
+    """
+    from app.core.executors import extract_layout
+    from app.core.security.pdf_validator import validate_pdf
+
+    with open(file_path, "rb") as f:
+        is_valid, validation_msg = validate_pdf(f.read())
+    if not is_valid:
+        raise ValueError(validation_msg)
+    result = extract_layout(file_path)
+    return {"markdown": result["markdown"], "pages": result.get("pdf_info", {}).get("pages_processed", 0)}
+
+
+def analyze_document(analysis_id: str, markdown: str) -> Dict[str, Any]:
+    """I/O stage: LangExtract, the pandas matrix, the graph LLM call and chunk indexing."""
+    from app.core.graph_db import memory_manager
+    from app.services.embedding_index import chunk_index
+    from app.services.lang_extract_engine import run_lang_extract_pipeline
+    from app.services.relational_engine import relational_builder
+    from app.services.statistical_engine import statistical_compute
+
+    structured_data = run_lang_extract_pipeline(clean_text=markdown)
+    paper_title = structured_data.metadata.title
+    raw_json = structured_data.model_dump()
+    df = statistical_compute.format_matrix(raw_json)
+
+    # Graph and chunk index failures don't fail the document, same as /upload
+    graph_result = {"success": False}
+    graph_data = None
+    try:
+        graph_result = relational_builder.build_knowledge_graph(structured_data=raw_json)
+        graph_data = memory_manager.get_paper_graph(paper_title)
+    except Exception as graph_err:
+        logger.warning(f"Knowledge graph skipped for {analysis_id}: {graph_err}")
+    chunks_indexed = 0
+    try:
+        chunks_indexed = chunk_index.index_paper(analysis_id, markdown, title=paper_title)
+    except Exception as index_err:
+        logger.warning(f"Chunk indexing skipped for {analysis_id}: {index_err}")
+
+    return {
+        "title": paper_title,
+        "extracted_data": raw_json,
+        "graph_data": graph_data,
+        "pipeline": {
+            "chars_extracted": len(markdown),
+            "matrix_shape": list(df.shape) if not df.empty else [0, 0],
+            "cognee_success": graph_result.get("success", False),
+            "graph_triplets": graph_result.get("triplet_count", 0),
+            "graph_nodes": graph_result.get("node_count", 0),
+            "graph_edges": graph_result.get("edge_count", 0),
+            "chunks_indexed": chunks_indexed,
+        },
+    }
+
+
+# ── Manifest ─────────────────────────────────────────────────────────────────
+
+class Manifest:
+    """
+    Append-only JSONL record of every finished document, so an interrupted run
+    resumes where it stopped. The last line for a path wins; only "done" entries
+    whose fingerprint still matches are skipped, so failures are retried.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        if path.exists():
+            with open(path, "rb") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        entry = loads(line)
+                    except ValueError:
+                        # A run killed mid-append leaves a torn last line
+                        continue
+                    self._entries[entry["path"]] = entry
+        self._file = open(path, "a", encoding="utf-8")
+
+    def is_done(self, key: str, fingerprint: str) -> bool:
+        entry = self._entries.get(key)
+        return entry is not None and entry.get("status") == "done" and entry.get("fingerprint") == fingerprint
+
+    def record(self, key: str, fingerprint: str, status: str, **fields):
+        entry = {"path": key, "fingerprint": fingerprint, "status": status,
+                 "at": datetime.now(timezone.utc).isoformat(), **fields}
+        self._entries[key] = entry
+        self._file.write(dumps_str(entry) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+# ── Stats ────────────────────────────────────────────────────────────────────
+
+@dataclass
+class StageStats:
+    workers: int
+    busy_seconds: float = 0.0
+    completed: int = 0
+    failed: int = 0
+
+    def utilization(self, wall_seconds: float) -> float:
+        """Fraction of the stage's worker-time spent working rather than starved or blocked."""
+        return self.busy_seconds / (wall_seconds * self.workers) if wall_seconds > 0 else 0.0
+
+
+@dataclass
+class IngestReport:
+    discovered: int = 0
+    skipped: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    wall_seconds: float = 0.0
+    stages: Dict[str, StageStats] = field(default_factory=dict)
+
+    @property
+    def docs_per_minute(self) -> float:
+        return 60.0 * self.succeeded / self.wall_seconds if self.wall_seconds > 0 else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "discovered": self.discovered,
+            "skipped": self.skipped,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "wall_seconds": round(self.wall_seconds, 2),
+            "docs_per_minute": round(self.docs_per_minute, 2),
+            "stages": {
+                name: {
+                    "workers": s.workers,
+                    "completed": s.completed,
+                    "failed": s.failed,
+                    "busy_seconds": round(s.busy_seconds, 2),
+                    "mean_seconds": round(s.busy_seconds / max(1, s.completed + s.failed), 3),
+                    "utilization": round(s.utilization(self.wall_seconds), 3),
+                }
+                for name, s in self.stages.items()
+            },
+        }
+
+
+# ── Pipeline ─────────────────────────────────────────────────────────────────
+
+_DONE = object()
+
+
+class BulkIngester:
+    """
+    Pipelined bulk ingestion of a directory of PDFs into the history store.
+
+    Three stages connected by bounded queues:
+      layout:  `layout_workers` processes validate and run YOLO layout detection
+      analyze: `llm_concurrency` threads run the LLM extraction and graph calls
+      persist: one writer (HistoryWriter) commits entries and appends the manifest
+    While document N waits on the LLM, documents N+1.. are already being laid
+    out; queue bounds keep a slow stage from piling up unbounded work in memory.
+    """
+
+    def __init__(
+        self,
+        history_db: str,
+        manifest_path: str,
+        layout_workers: int = max(1, (os.cpu_count() or 2) // 2),
+        llm_concurrency: int = 8,
+        buffer: int = 4,
+        layout_executor: str = "process",
+    ):
+        self.history_db = history_db
+        self.manifest_path = Path(manifest_path)
+        self.layout_workers = layout_workers
+        self.llm_concurrency = llm_concurrency
+        self.buffer = buffer
+        self.layout_executor = layout_executor
+
+    def _layout_pool(self) -> Executor:
+        if self.layout_executor == "thread":
+            return ThreadPoolExecutor(max_workers=self.layout_workers, thread_name_prefix="ingest-layout")
+        return ProcessPoolExecutor(max_workers=self.layout_workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def discover(self, root: Path, recursive: bool = True) -> List[Path]:
+        pattern = "**/*.pdf" if recursive else "*.pdf"
+        return sorted(p for p in root.glob(pattern) if p.is_file())
+
+    def run(self, root: str, recursive: bool = True, limit: Optional[int] = None) -> IngestReport:
+        return asyncio.run(self._run(Path(root), recursive, limit))
+
+    async def _run(self, root: Path, recursive: bool, limit: Optional[int]) -> IngestReport:
+        report = IngestReport(stages={
+            "layout": StageStats(self.layout_workers),
+            "analyze": StageStats(self.llm_concurrency),
+            "persist": StageStats(1),
+        })
+        manifest = Manifest(self.manifest_path)
+        pending = []
+        for path in self.discover(root, recursive):
+            report.discovered += 1
+            key, fingerprint = str(path.relative_to(root)), _fingerprint(path)
+            if manifest.is_done(key, fingerprint):
+                report.skipped += 1
+            else:
+                pending.append((path, key, fingerprint))
+        if limit is not None:
+            pending = pending[:limit]
+        logger.info(f"Ingest: {report.discovered} PDFs found, {report.skipped} already done, {len(pending)} to process")
+
+        loop = asyncio.get_running_loop()
+        layout_pool = self._layout_pool()
+        llm_pool = ThreadPoolExecutor(max_workers=self.llm_concurrency, thread_name_prefix="ingest-llm")
+        store = HistoryStore(self.history_db)
+        writer = HistoryWriter(store)
+
+        sources: asyncio.Queue = asyncio.Queue()
+        for item in pending:
+            sources.put_nowait(item)
+        laid_out: asyncio.Queue = asyncio.Queue(maxsize=self.buffer)
+        analyzed: asyncio.Queue = asyncio.Queue(maxsize=self.buffer)
+        started = time.monotonic()
+
+        def fail(stage: str, key: str, fingerprint: str, err: Exception):
+            report.stages[stage].failed += 1
+            report.failed += 1
+            manifest.record(key, fingerprint, "failed", stage=stage, error=str(err))
+            logger.error(f"Ingest: {key} failed in {stage}: {err}")
+
+        async def layout_worker():
+            while not sources.empty():
+                path, key, fingerprint = sources.get_nowait()
+                t0 = time.monotonic()
+                try:
+                    prepared = await loop.run_in_executor(layout_pool, prepare_document, str(path))
+                except Exception as e:
+                    report.stages["layout"].busy_seconds += time.monotonic() - t0
+                    fail("layout", key, fingerprint, e)
+                    continue
+                report.stages["layout"].busy_seconds += time.monotonic() - t0
+                report.stages["layout"].completed += 1
+                await laid_out.put((path, key, fingerprint, prepared))
+
+        async def analyze_worker():
+            while True:
+                item = await laid_out.get()
+                if item is _DONE:
+                    return
+                path, key, fingerprint, prepared = item
+                analysis_id = str(uuid.uuid4())
+                t0 = time.monotonic()
+                try:
+                    analysis = await loop.run_in_executor(llm_pool, analyze_document, analysis_id, prepared["markdown"])
+                except Exception as e:
+                    report.stages["analyze"].busy_seconds += time.monotonic() - t0
+                    fail("analyze", key, fingerprint, e)
+                    continue
+                report.stages["analyze"].busy_seconds += time.monotonic() - t0
+                report.stages["analyze"].completed += 1
+                analysis["pipeline"]["pages"] = prepared["pages"]
+                await analyzed.put((path, key, fingerprint, analysis_id, analysis))
+
+        async def persist_worker():
+            while True:
+                item = await analyzed.get()
+                if item is _DONE:
+                    return
+                path, key, fingerprint, analysis_id, analysis = item
+                extracted = analysis["extracted_data"]
+                entry = {
+                    "id": analysis_id,
+                    "filename": path.name,
+                    "title": analysis["title"] or "Untitled",
+                    "authors": [a.get("name", "") for a in extracted.get("metadata", {}).get("authors", [])],
+                    "analyzed_at": datetime.now(timezone.utc).isoformat(),
+                    "pipeline": analysis["pipeline"],
+                    "extracted_data": extracted,
+                    "graph_data": analysis["graph_data"],
+                }
+                t0 = time.monotonic()
+                try:
+                    await asyncio.wrap_future(writer.insert(entry))
+                except Exception as e:
+                    report.stages["persist"].busy_seconds += time.monotonic() - t0
+                    fail("persist", key, fingerprint, e)
+                    continue
+                report.stages["persist"].busy_seconds += time.monotonic() - t0
+                report.stages["persist"].completed += 1
+                report.succeeded += 1
+                manifest.record(key, fingerprint, "done", analysis_id=analysis_id, title=entry["title"])
+                elapsed = time.monotonic() - started
+                logger.info(
+                    f"Ingest: [{report.succeeded + report.failed}/{len(pending)}] {key} → {analysis_id} "
+                    f"({60.0 * report.succeeded / elapsed:.1f} docs/min)"
+                )
+
+        try:
+            analyzers = [asyncio.create_task(analyze_worker()) for _ in range(self.llm_concurrency)]
+            persister = asyncio.create_task(persist_worker())
+            await asyncio.gather(*(layout_worker() for _ in range(self.layout_workers)))
+            for _ in analyzers:
+                await laid_out.put(_DONE)
+            await asyncio.gather(*analyzers)
+            await analyzed.put(_DONE)
+            await persister
+        finally:
+            report.wall_seconds = time.monotonic() - started
+            layout_pool.shutdown(wait=True, cancel_futures=True)
+            llm_pool.shutdown(wait=True)
+            writer.close()
+            store.close()
+            manifest.close()
+        return report
+
+
+def format_report(report: IngestReport) -> str:
+    lines = [
+        f"Ingested {report.succeeded} / failed {report.failed} / skipped {report.skipped} "
+        f"of {report.discovered} PDFs in {report.wall_seconds:.1f}s ({report.docs_per_minute:.1f} docs/min)",
+        f"{'stage':<10}{'workers':>8}{'done':>7}{'failed':>8}{'mean s':>9}{'util':>8}",
+    ]
+    for name, s in report.stages.items():
+        mean = s.busy_seconds / max(1, s.completed + s.failed)
+        lines.append(
+            f"{name:<10}{s.workers:>8}{s.completed:>7}{s.failed:>8}{mean:>9.2f}{s.utilization(report.wall_seconds):>8.0%}"
+        )
+    return "\n".join(lines)
@@ -1,10 +1,12 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, status, BackgroundTasks
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, status, BackgroundTasks, Request, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import PlainTextResponse, JSONResponse
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import Dict, Any, Optional, List
+import asyncio
 import logging
-import json
+import time
 from datetime import datetime, timezone
 from dotenv import load_dotenv
 import uuid
@@ -14,11 +16,28 @@ import os
 load_dotenv(os.path.join(os.path.dirname(__file__), "..", ".env"))
 
 from app.core.security.pdf_validator import validate_pdf
-from app.services.mineru_extractor import MinerUExtractor
 from app.services.lang_extract_engine import run_lang_extract_pipeline
 from app.services.statistical_engine import statistical_compute
 from app.services.relational_engine import relational_builder
 from app.core.graph_db import memory_manager
+from app.core.graph_layout import GraphLayoutEngine
+from app.core.metrics import metrics
+from app.core.executors import pipeline_executors, PipelineSaturated
+from app.core.deadline import Deadline, DeadlineExceeded, UPLOAD_BUDGET_SECONDS, JOB_BUDGET_SECONDS, clamp_budget
+from app.core.cancellation import CancelToken, Cancelled
+from app.core.instrumentation import StageTimer, observe_stage, record_layout, update_process_gauges
+from app.core.profiling import (
+    PROFILE_FILES, PROFILE_HEADER, SamplingProfiler, merge_profile, profiling_authorized, save_profile,
+)
+from app.core.artifact_store import artifact_store
+from app.core.serialization import FastJSONResponse, dumps_str
+from app.core.history_store import HistoryStore, HistoryWriter, MAX_PAGE_SIZE
+from app.core.facet_index import FacetIndex, extract_facets
+from app.services.embedding_index import chunk_index, format_retrieved_chunks
+from app.services.chat_context import chat_context_cache
+from app.core.fair_scheduler import DEFAULT_PRIORITY
+from app.services.jobs import job_manager, JOBS_BULK_MAX, JOBS_POLL_SECONDS, TERMINAL_STATUSES
+from app.services.pipeline_tasks import CACHED_STAGES
 
 # Configure logging for global exception routing
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
@@ -36,7 +55,8 @@ app = FastAPI(
     title="AI-Powered Research Paper Analyzer",
     description="Deterministic GraphRAG LLM Pipeline API",
     version="1.0.0",
-    docs_url="/swagger"
+    docs_url="/swagger",
+    default_response_class=FastJSONResponse,
 )
 
 # CORS Configuration for the React Frontend
@@ -63,52 +83,49 @@ try:
 except Exception as e:
     logger.warning(f"Analytics router unavailable: {e}")
 
-TEMP_DIR = "/app/data/temp_files/"
-DATA_DIR = "/app/data/"
-if not os.path.exists("/app/data"):
-    TEMP_DIR = "./data/temp_files/"
-    DATA_DIR = "./data/"
+# How often a synchronous upload checks whether its client is still connected
+UPLOAD_DISCONNECT_POLL_SECONDS = float(os.getenv("UPLOAD_DISCONNECT_POLL_SECONDS", "0.5"))
+# History DB and spooled uploads; the Docker volume is /app/data
+DATA_DIR = os.getenv("DATA_DIR", "/app/data/" if os.path.exists("/app/data") else "./data/")
+TEMP_DIR = os.path.join(DATA_DIR, "temp_files", "")
 os.makedirs(TEMP_DIR, exist_ok=True)
 os.makedirs(DATA_DIR, exist_ok=True)
 
-HISTORY_FILE = os.path.join(DATA_DIR, "history.json")
-
-# ─── In-memory store for the last analysis (local dev) ───────────────────────
-_last_analysis: Dict[str, Any] = {}
+HISTORY_FILE = os.path.join(DATA_DIR, "history.json")  # legacy, migrated on first start
+HISTORY_DB = os.path.join(DATA_DIR, "history.db")
 
-# Restore last analysis from history on startup (survives server restarts)
+# ─── SQLite History Store ────────────────────────────────────────────────────
+history_store = HistoryStore(HISTORY_DB)
 try:
-    _startup_history = _load_history()
-    if _startup_history:
-        _latest = _startup_history[0]
-        _extracted = _latest.get("extracted_data", {})
-        _last_analysis = {
-            "extracted_text": json.dumps(_extracted)[:8000],
-            "paper_title": _latest.get("title", "Unknown"),
-            "raw_json": _extracted,
-        }
-        logging.getLogger(__name__).info(f"Restored context from history: '{_latest.get('title', 'Unknown')}'")
-except Exception:
-    pass
+    history_store.migrate_from_json(HISTORY_FILE)
+except Exception as e:
+    logger.error(f"History migration failed, legacy file left in place: {e}")
 
+# All history writes go through one writer thread that coalesces bursts into a single commit
+history_writer = HistoryWriter(history_store)
 
-# ─── JSON File-Based History Store ───────────────────────────────────────────
-def _load_history() -> List[Dict[str, Any]]:
-    """Load all history entries from the JSON file."""
-    if not os.path.exists(HISTORY_FILE):
-        return []
+
+@app.on_event("startup")
+def _recover_queued_jobs():
+    # Jobs a stopped API process was still holding in its fair scheduler would otherwise stay PENDING
     try:
-        with open(HISTORY_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except (json.JSONDecodeError, IOError):
-        logger.warning("History file corrupted, starting fresh.")
-        return []
+        job_manager.recover_pending()
+    except Exception as e:
+        logger.error(f"Recovering queued jobs failed: {e}")
 
 
-def _save_history(entries: List[Dict[str, Any]]):
-    """Persist the full history list to disk."""
-    with open(HISTORY_FILE, "w", encoding="utf-8") as f:
-        json.dump(entries, f, indent=2, default=str)
+@app.on_event("shutdown")
+def _close_history_writer():
+    job_manager.shutdown()
+    pipeline_executors.shutdown()
+    history_writer.close()
+
+
+# Structured search over every saved analysis, kept in sync by _save_to_history / delete
+facet_index = FacetIndex()
+for _analysis_id, _analyzed_at, _facets in history_store.iter_facets():
+    facet_index.add(_analysis_id, _analyzed_at, _facets)
+logger.info(f"Search index loaded: {len(facet_index)} analyses")
 
 
 def _save_to_history(analysis_id: str, filename: str, result: Dict[str, Any], graph_data: Dict[str, Any] = None):
@@ -123,25 +140,42 @@ def _save_to_history(analysis_id: str, filename: str, result: Dict[str, Any], gr
         "extracted_data": result.get("extracted_data", {}),
         "graph_data": graph_data,  # Store the full knowledge graph
     }
-    history = _load_history()
-    history.insert(0, entry)  # newest first
-    _save_history(history)
-    logger.info(f"Saved analysis '{entry['title']}' to history (ID: {analysis_id})")
+    facets = extract_facets(entry["extracted_data"])
+    started = time.perf_counter()
 
-# ═════════════════════════════════════════════════════════════════════════════
-# ROUTE 1: Upload & Analyze (Synchronous — local dev)
-# ═════════════════════════════════════════════════════════════════════════════
-@app.post("/api/v1/upload", status_code=status.HTTP_200_OK)
-async def upload_and_analyze(
-    file: UploadFile = File(...),
-    background_tasks: BackgroundTasks = None
-) -> Dict[str, Any]:
-    """
-    Full synchronous pipeline: Upload PDF → YOLO DLA → LangExtract → Pandas → Cognee.
-    Returns the complete ExtractedInsights JSON for the frontend dashboard.
-    """
-    global _last_analysis
+    def _on_committed(future):
+        # Queue wait plus the writer's batched commit
+        observe_stage("history", time.perf_counter() - started)
+        if future.exception() is not None:
+            logger.error(f"Failed to save analysis {analysis_id} to history: {future.exception()}")
+            return
+        facet_index.add(analysis_id, entry["analyzed_at"], facets)
+        logger.info(f"Saved analysis '{entry['title']}' to history (ID: {analysis_id})")
+
+    future = history_writer.insert(entry)
+    future.add_done_callback(_on_committed)
+    return future
+
+
+# ─── In-memory store for the last analysis (local dev) ───────────────────────
+_last_analysis: Dict[str, Any] = {}
+
+# Restore last analysis from history on startup (survives server restarts)
+try:
+    _latest = history_store.latest()
+    if _latest:
+        _last_analysis = {
+            "analysis_id": _latest.get("id"),
+            "paper_title": _latest.get("title", "Unknown"),
+            "raw_json": _latest.get("extracted_data", {}),
+        }
+        logger.info(f"Restored context from history: '{_latest.get('title', 'Unknown')}'")
+except Exception as e:
+    logger.warning(f"Could not restore last analysis from history: {e}")
 
+
+async def _read_pdf_upload(file: UploadFile) -> bytes:
+    """Read an uploaded PDF and run it through the Safety Shield; raises the HTTP error to return."""
     if file.content_type != "application/pdf":
         raise HTTPException(
             status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
@@ -166,18 +200,96 @@ async def upload_and_analyze(
         )
 
     # Safety Shield
-    is_valid, validation_msg = validate_pdf(file_bytes)
+    is_valid, validation_msg = await run_in_threadpool(validate_pdf, file_bytes)
     if not is_valid:
         raise HTTPException(
             status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
             detail={"error": "validation_failed", "message": validation_msg}
         )
 
+    return file_bytes
+
+
+def _write_spool(path: str, data: bytes):
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# ROUTE 1: Upload & Analyze (Synchronous — local dev)
+# ═════════════════════════════════════════════════════════════════════════════
+@app.post("/api/v1/upload", status_code=status.HTTP_200_OK)
+async def upload_and_analyze(
+    request: Request,
+    file: UploadFile = File(...),
+    background_tasks: BackgroundTasks = None,
+    budget_seconds: Optional[float] = Form(None),
+) -> Dict[str, Any]:
+    """
+    Full synchronous pipeline: Upload PDF → YOLO DLA → LangExtract → Pandas → Cognee.
+    Returns the complete ExtractedInsights JSON for the frontend dashboard.
+
+    Stages run on bounded executors (layout detection in a process pool, LLM calls
+    on threads), so the event loop stays free for other requests. When every
+    pipeline slot is busy the upload is refused with 429 and a Retry-After header.
+
+    The analysis runs against a time budget (UPLOAD_BUDGET_SECONDS, or `budget_seconds`)
+    counted from admission. When it runs low the pipeline degrades instead of overrunning,
+    and the response's `degraded` field lists what was given up.
+
+    If the client disconnects, the analysis stops at the next page or before the next
+    LLM call, frees its pipeline slot and writes no history.
+
+    Admins can profile a run by sending PROFILE_HEADER with the profiling token; the
+    response's `pipeline.profile` links the folded stacks and top allocation sites.
+    """
+    profile_token = request.headers.get(PROFILE_HEADER)
+    if profile_token is not None and not profiling_authorized(profile_token):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Profiling is restricted to admins")
+
+    try:
+        slot = pipeline_executors.admit()
+    except PipelineSaturated as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail={"error": "pipeline_busy", "message": f"All analysis slots are busy, retry in {e.retry_after}s"},
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    with slot:
+        deadline = Deadline.after(clamp_budget(budget_seconds, UPLOAD_BUDGET_SECONDS))
+        cancel = CancelToken(f"upload-{uuid.uuid4()}")
+        watcher = asyncio.create_task(_cancel_on_disconnect(request, cancel))
+        profiler = SamplingProfiler().start() if profile_token else None
+        try:
+            return await _run_upload_pipeline(file, background_tasks, deadline, cancel, profiler)
+        finally:
+            watcher.cancel()
+            cancel.clear()
+            if profiler is not None and profiler.running:
+                profiler.stop()
+
+
+async def _cancel_on_disconnect(request: Request, cancel: CancelToken):
+    while not await request.is_disconnected():
+        await asyncio.sleep(UPLOAD_DISCONNECT_POLL_SECONDS)
+    logger.info("Upload client disconnected; cancelling its analysis")
+    cancel.cancel("client disconnected")
+
+
+async def _run_upload_pipeline(
+    file: UploadFile, background_tasks: Optional[BackgroundTasks], deadline: Deadline, cancel: CancelToken,
+    profiler: Optional[SamplingProfiler] = None,
+):
+    global _last_analysis
+
+    file_bytes = await _read_pdf_upload(file)
+    timer = StageTimer()
+    started = time.perf_counter()
+
     import tempfile
     temp_file_path = os.path.join(tempfile.gettempdir(), f"paper_analyzer_{uuid.uuid4()}.pdf")
     try:
-        with open(temp_file_path, "wb") as f:
-            f.write(file_bytes)
+        await run_in_threadpool(_write_spool, temp_file_path, file_bytes)
     except Exception as e:
         logger.error(f"Failed to write file to temp dir: {e}")
         raise HTTPException(
@@ -185,46 +297,88 @@ async def upload_and_analyze(
             detail={"error": "write_failure", "message": "Failed to persist file to disk"}
         )
 
+    analysis_id = None
+    chunks_indexed = 0
     try:
         # 1. Custom YOLO DLA Extraction
         logger.info(f"Starting YOLO DLA extraction for {temp_file_path}")
-        extractor = MinerUExtractor()
-        mineru_result = extractor.extract_document(file_path=temp_file_path)
+        with timer.stage("layout"):
+            mineru_result = await pipeline_executors.layout(
+                temp_file_path, deadline=deadline, cancel=cancel, profile=profiler is not None,
+            )
+        layout_profile = mineru_result.pop("profile", None)
+        record_layout(mineru_result.get("pdf_info"), timer)
         extracted_text = mineru_result["markdown"]
+        deadline.note_layout(mineru_result.get("pdf_info"))
 
         # 2. LangExtract Pydantic Schema Enforcement
         logger.info("Executing LangExtract pipeline...")
-        structured_data = run_lang_extract_pipeline(clean_text=extracted_text)
+        cancel.check("extraction")
+        deadline.check("extraction")
+        with timer.stage("extraction"):
+            structured_data = await pipeline_executors.llm(
+                run_lang_extract_pipeline, clean_text=extracted_text,
+                fast=deadline.use_fast_extraction(), timeout=deadline.llm_timeout(),
+            )
         paper_title = structured_data.metadata.title
         raw_json = structured_data.model_dump()
 
         # 3. Statistical Engine (Pandas)
         logger.info("Computing matrix trends...")
-        df = statistical_compute.format_matrix(raw_json)
+        with timer.stage("statistics"):
+            df = await run_in_threadpool(statistical_compute.format_matrix, raw_json)
         matrix_shape = list(df.shape) if not df.empty else [0, 0]
 
         # 4. Knowledge Graph (single LLM call — non-blocking, failure doesn't crash pipeline)
         logger.info("Extracting knowledge graph triplets...")
         graph_result = {"success": False}
-        try:
-            graph_result = relational_builder.build_knowledge_graph(
-                structured_data=raw_json
-            )
-        except Exception as graph_err:
-            logger.warning(f"Knowledge graph skipped: {graph_err}")
+        cancel.check("knowledge graph")
+        if deadline.allows_graph():
+            try:
+                with timer.stage("graph"):
+                    # The cancel check inside runs after the LLM call, before the shared graph is touched
+                    graph_result = await pipeline_executors.llm(
+                        relational_builder.build_knowledge_graph, structured_data=raw_json,
+                        timeout=deadline.llm_timeout(), cancel=cancel,
+                    )
+            except Cancelled:
+                raise
+            except Exception as graph_err:
+                logger.warning(f"Knowledge graph skipped: {graph_err}")
+        else:
+            logger.warning(f"Knowledge graph skipped: {deadline.remaining():.0f}s left of the time budget")
 
         # Capture full graph data for persistence
-        graph_visualization_data = memory_manager.get_full_graph()
+        graph_visualization_data = await run_in_threadpool(memory_manager.get_full_graph)
+
+        analysis_id = str(uuid.uuid4())
+
+        # 5. Chunk + embed the full Markdown into LanceDB for MathBot retrieval
+        cancel.check("indexing")
+        try:
+            with timer.stage("indexing"):
+                chunks_indexed = await run_in_threadpool(chunk_index.index_paper, analysis_id, extracted_text, title=paper_title)
+        except Exception as index_err:
+            logger.warning(f"Chunk indexing skipped: {index_err}")
+
+        # Nobody is waiting for this result any more: don't keep it
+        cancel.check("saving results")
+
+        profile_links = None
+        if profiler is not None:
+            report = profiler.stop()
+            merge_profile(report, layout_profile, "layout-worker")
+            profile_links = await run_in_threadpool(save_profile, artifact_store, analysis_id, report)
 
         # Store in memory for MathBot chat context + graph visualization
         _last_analysis = {
-            "extracted_text": extracted_text[:8000],
+            "analysis_id": analysis_id,
             "paper_title": paper_title,
             "raw_json": raw_json,
             "graph_data": graph_visualization_data,
         }
+        chat_context_cache.put_context(analysis_id, paper_title, raw_json)
 
-        analysis_id = str(uuid.uuid4())
         response_payload = {
             "status": "success",
             "message": "Pipeline executed successfully",
@@ -236,7 +390,14 @@ async def upload_and_analyze(
                 "graph_triplets": graph_result.get("triplet_count", 0),
                 "graph_nodes": graph_result.get("node_count", 0),
                 "graph_edges": graph_result.get("edge_count", 0),
+                "chunks_indexed": chunks_indexed,
+                "degraded": deadline.degraded,
+                "layout_peak_rss_bytes": (mineru_result.get("pdf_info") or {}).get("peak_rss_bytes"),
+                **({"profile": profile_links} if profile_links else {}),
             },
+            "degraded": deadline.degraded,
+            # Seconds per stage (layout.* are parts of layout); history is saved after the response
+            "timings": {**timer.to_dict(), "total": round(time.perf_counter() - started, 3)},
             "extracted_data": raw_json
         }
 
@@ -253,7 +414,23 @@ async def upload_and_analyze(
         else:
             _save_to_history(analysis_id, file.filename or "unknown.pdf", response_payload, graph_visualization_data)
 
-        return response_payload
+        return FastJSONResponse(response_payload)
+    except Cancelled as e:
+        logger.info(f"Pipeline stopped: {e}")
+        if chunks_indexed:
+            # Cancelled while indexing: drop the chunks of an analysis that will never be saved
+            try:
+                await run_in_threadpool(chunk_index.delete_paper, analysis_id)
+            except Exception as cleanup_err:
+                logger.warning(f"Failed to drop indexed chunks for {analysis_id}: {cleanup_err}")
+        # 499 (client closed request): only logs and proxies will ever see it
+        raise HTTPException(status_code=499, detail={"error": "cancelled", "message": str(e)})
+    except DeadlineExceeded as e:
+        logger.error(f"Pipeline out of time: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail={"error": "deadline_exceeded", "message": str(e), "degraded": deadline.degraded}
+        )
     except Exception as e:
         logger.error(f"Pipeline failed: {e}", exc_info=True)
         raise HTTPException(
@@ -269,104 +446,464 @@ async def upload_and_analyze(
                 logger.error(f"Cleanup failed: {cleanup_error}")
 
 
+# ═════════════════════════════════════════════════════════════════════════════
+# ROUTE 1b: Background Jobs (202 Accepted + SSE progress)
+# ═════════════════════════════════════════════════════════════════════════════
+def _on_job_complete(job: Dict[str, Any], outcome: Dict[str, Any]):
+    """Eager-mode jobs finish inside this process: publish them like a synchronous upload."""
+    global _last_analysis
+    _last_analysis = {
+        "analysis_id": job["id"],
+        "paper_title": outcome["paper_title"],
+        "raw_json": outcome["extracted_data"],
+        "graph_data": outcome["graph_data"],
+    }
+    # A re-analysis replaces the extraction: answers built on the old one must go with it
+    chat_context_cache.invalidate(job["id"])
+    chat_context_cache.put_context(job["id"], outcome["paper_title"], outcome["extracted_data"])
+    result = {"pipeline": outcome["pipeline"], "extracted_data": outcome["extracted_data"]}
+    # Wait for the commit so the "complete" event never points at a row that isn't there yet
+    _save_to_history(job["id"], job.get("filename") or "unknown.pdf", result, outcome["graph_data"]).result(timeout=30)
+
+
+job_manager.on_complete(_on_job_complete)
+
+
+def _job_accepted(job_id: str, job: Dict[str, Any]) -> FastJSONResponse:
+    """202 response pointing at the job's status, event stream and result."""
+    status_url = f"/api/v1/jobs/{job_id}"
+    return FastJSONResponse(
+        {
+            "job_id": job_id,
+            "status": job["status"],
+            "mode": job_manager.mode,
+            "status_url": status_url,
+            "events_url": f"{status_url}/events",
+            "result_url": f"{status_url}/result",
+        },
+        status_code=status.HTTP_202_ACCEPTED,
+        headers={"Location": status_url},
+    )
+
+
+@app.post("/api/v1/jobs", status_code=status.HTTP_202_ACCEPTED)
+async def submit_job(
+    request: Request,
+    file: UploadFile = File(...),
+    user_id: str = Form("anonymous"),
+    priority: str = Form(DEFAULT_PRIORITY),
+    budget_seconds: Optional[float] = Form(None),
+    profile: bool = Form(False),
+):
+    """
+    Asynchronous pipeline: validates and spools the PDF, creates the task row and
+    queues it in the per-tenant fair scheduler, then returns 202 immediately.
+    `priority` is "interactive" (default) or "bulk" for backfills. `budget_seconds` (default
+    JOB_BUDGET_SECONDS, counted from dispatch) bounds the run; the finished job's `degraded`
+    lists what was cut to meet it. Follow progress on `events_url`. `profile` (admins only,
+    with PROFILE_HEADER) profiles every stage; the finished job links the artifacts.
+    """
+    if priority not in job_manager.scheduler.priority_weights:
+        raise HTTPException(status_code=400, detail=f"Unknown priority '{priority}'")
+    if profile and not profiling_authorized(request.headers.get(PROFILE_HEADER)):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Profiling is restricted to admins")
+    file_bytes = await _read_pdf_upload(file)
+
+    job_id = str(uuid.uuid4())
+    # TEMP_DIR sits on the volume shared with the Celery worker
+    spool_path = os.path.abspath(os.path.join(TEMP_DIR, f"{job_id}.pdf"))
+    try:
+        await run_in_threadpool(_write_spool, spool_path, file_bytes)
+    except Exception as e:
+        logger.error(f"Failed to spool job file: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail={"error": "write_failure", "message": "Failed to persist file to disk"}
+        )
+
+    try:
+        job = await run_in_threadpool(
+            job_manager.submit, job_id, spool_path, file.filename or "unknown.pdf", user_id, priority,
+            clamp_budget(budget_seconds, JOB_BUDGET_SECONDS), profile,
+        )
+    except Exception as e:
+        logger.error(f"Failed to enqueue job {job_id}: {e}")
+        if os.path.exists(spool_path):
+            os.remove(spool_path)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail={"error": "jobs_unavailable", "message": f"Could not enqueue job: {e}"}
+        )
+
+    return _job_accepted(job_id, job)
+
+
+@app.get("/api/v1/jobs")
+async def get_jobs(ids: List[str] = Query(..., description="Job ids, comma-separated or repeated")):
+    """Bulk status for a dashboard polling many jobs: one read from the live progress store."""
+    job_ids = list(dict.fromkeys(job_id for value in ids for job_id in value.split(",") if job_id))
+    if len(job_ids) > JOBS_BULK_MAX:
+        raise HTTPException(status_code=400, detail=f"At most {JOBS_BULK_MAX} job ids per request")
+    found = await run_in_threadpool(job_manager.get_many, job_ids)
+    return {
+        "jobs": [found[job_id] for job_id in job_ids if job_id in found],
+        "missing": [job_id for job_id in job_ids if job_id not in found],
+    }
+
+
+@app.get("/api/v1/scheduler")
+async def get_scheduler_stats():
+    """Fair scheduler state: queued and running jobs per tenant, plus queue-wait percentiles."""
+    stats = job_manager.scheduler.stats()
+    wait = metrics.histogram("job_queue_wait_seconds")
+    for tenant, counts in stats["tenants"].items():
+        counts["wait_p50_seconds"] = {p: wait.quantile(0.5, tenant=tenant, priority=p) for p in job_manager.scheduler.priority_weights}
+        counts["wait_p95_seconds"] = {p: wait.quantile(0.95, tenant=tenant, priority=p) for p in job_manager.scheduler.priority_weights}
+    return stats
+
+
+@app.get("/api/v1/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = await run_in_threadpool(job_manager.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@app.delete("/api/v1/jobs/{job_id}", status_code=status.HTTP_202_ACCEPTED)
+async def cancel_job(job_id: str):
+    """
+    Cancel a job. A queued job is CANCELLED at once; a running one is CANCELLING
+    until it stops at its next page or LLM call and frees its worker slot.
+    """
+    try:
+        return await run_in_threadpool(job_manager.cancel, job_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Job not found")
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+class ReanalyzeRequest(BaseModel):
+    # Extra extraction guidance, appended to the system prompt
+    instructions: Optional[str] = None
+    # Stages to recompute even if their inputs are unchanged: layout, extract, stats, graph
+    force: List[str] = []
+
+
+@app.post("/api/v1/jobs/{job_id}/reanalyze", status_code=status.HTTP_202_ACCEPTED)
+async def reanalyze_job(job_id: str, req: ReanalyzeRequest):
+    """
+    Re-run a finished job from its kept PDF. Stages whose inputs didn't change
+    reuse their stored outputs; the job's `skipped_stages` lists them once done.
+    """
+    unknown = sorted(set(req.force) - set(CACHED_STAGES))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown stages: {', '.join(unknown)}")
+    job = await run_in_threadpool(job_manager.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["status"] not in TERMINAL_STATUSES:
+        raise HTTPException(status_code=409, detail=f"Job is still running. Current status: {job['status']}")
+    try:
+        job = await run_in_threadpool(job_manager.reanalyze, job_id, req.instructions, req.force)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=409, detail={"error": "source_expired", "message": str(e)})
+    except RuntimeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail={"error": "jobs_unavailable", "message": f"Could not enqueue job: {e}"}
+        )
+
+    return _job_accepted(job_id, job)
+
+
+@app.get("/api/v1/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    """The finished analysis: the history entry in eager mode, the task row's result otherwise."""
+    job = await run_in_threadpool(job_manager.get, job_id)
+    # A job being re-analyzed still has its previous history entry; don't serve that as the result
+    if job is not None and job["status"] != "COMPLETE":
+        raise HTTPException(status_code=409, detail=f"Job is not complete. Current status: {job['status']}")
+    entry = await run_in_threadpool(history_store.get, job_id)
+    if entry is not None:
+        return FastJSONResponse(entry)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    result = await run_in_threadpool(job_manager.get_result, job_id)
+    return FastJSONResponse({"id": job_id, "title": job.get("paper_title"), "extracted_data": result or {}})
+
+
+@app.get("/api/v1/jobs/{job_id}/events")
+async def stream_job_events(job_id: str, request: Request):
+    """
+    Server-Sent Events for one job.
+
+    Events:
+      - progress: {"status", "progress", "paper_title"} on every stage transition
+      - complete: {"status", "progress", "paper_title", "result_url"}, then the stream ends
+      - failed:   {"status", "error_message"}, then the stream ends
+      - cancelled: {"status"}, then the stream ends
+    A comment line is sent every 15s while nothing changes to keep proxies from timing out.
+    """
+    job = await run_in_threadpool(job_manager.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def event_stream():
+        current = job
+        last_seen = None
+        last_sent = time.monotonic()
+        while True:
+            seen = (current["status"], current["progress"], current.get("paper_title"))
+            if seen != last_seen:
+                last_seen = seen
+                last_sent = time.monotonic()
+                payload = {"status": seen[0], "progress": seen[1], "paper_title": seen[2]}
+                if seen[0] == "COMPLETE":
+                    yield _sse("complete", {**payload, "result_url": f"/api/v1/jobs/{job_id}/result"})
+                    return
+                if seen[0] == "FAILED":
+                    yield _sse("failed", {"status": "FAILED", "error_message": current.get("error_message")})
+                    return
+                if seen[0] == "CANCELLED":
+                    yield _sse("cancelled", {"status": "CANCELLED"})
+                    return
+                yield _sse("progress", payload)
+            elif time.monotonic() - last_sent >= 15:
+                last_sent = time.monotonic()
+                yield ": keep-alive\n\n"
+
+            await asyncio.sleep(JOBS_POLL_SECONDS)
+            if await request.is_disconnected():
+                return
+            current = await run_in_threadpool(job_manager.get, job_id) or current
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 # ═════════════════════════════════════════════════════════════════════════════
 # ROUTE 2: MathBot Chat (Gemini-powered research assistant)
 # ═════════════════════════════════════════════════════════════════════════════
 class ChatRequest(BaseModel):
     message: str
     context: Optional[str] = None
+    # Chat about a specific analysis, or several at once; defaults to the most recent upload
+    analysis_id: Optional[str] = None
+    analysis_ids: Optional[List[str]] = None
 
 class ChatResponse(BaseModel):
     reply: str
+    cached: bool = False
+    analysis_ids: List[str] = []
 
-@app.post("/api/v1/chat", response_model=ChatResponse)
-async def chat_with_mathbot(req: ChatRequest):
-    """
-    MathBot AI assistant — answers research questions using paper context.
-    Uses Gemini via LangChain for grounded, deterministic responses.
-    """
-    from langchain_google_genai import ChatGoogleGenerativeAI
-    from langchain_core.messages import SystemMessage, HumanMessage
+_chat_ttft = metrics.histogram("mathbot_time_to_first_token_seconds", "Time from request to first streamed token")
+_chat_duration = metrics.histogram("mathbot_response_seconds", "Total MathBot generation time")
+_chat_streams = metrics.counter("mathbot_streams_total", "Streaming chat requests by outcome")
+
+# Total ANALYSIS DATA budget, split evenly across papers in a multi-paper session
+CHAT_CONTEXT_BUDGET = 8000
+
+
+def _load_analysis_for_chat(analysis_id: str):
+    """Loader for the context cache: analysis_id → (title, raw_json), or None if unknown."""
+    if _last_analysis.get("analysis_id") == analysis_id:
+        return _last_analysis.get("paper_title", "Unknown"), _last_analysis.get("raw_json", {})
+    entry = history_store.get(analysis_id)
+    if entry is None:
+        return None
+    return entry.get("title", "Unknown"), entry.get("extracted_data", {})
 
-    api_key = os.environ.get("GEMINI_API_KEY") or os.environ.get("GOOGLE_API_KEY")
-    if not api_key:
-        raise HTTPException(status_code=500, detail="GEMINI_API_KEY not set")
 
-    # Build rich context from last analysis — include structured data
+def _resolve_chat_analysis_ids(req: ChatRequest) -> List[str]:
+    if req.analysis_ids:
+        return list(dict.fromkeys(req.analysis_ids))
+    if req.analysis_id:
+        return [req.analysis_id]
+    if _last_analysis.get("analysis_id"):
+        return [_last_analysis["analysis_id"]]
+    return []
+
+
+def _build_mathbot_messages(req: ChatRequest, analysis_ids: List[str]) -> list:
+    """Assemble the system + user messages shared by the blocking and streaming chat routes."""
+    from langchain_core.messages import SystemMessage, HumanMessage
+
     paper_context = req.context or ""
-    if not paper_context and _last_analysis:
-        raw_json = _last_analysis.get('raw_json', {})
-        title = _last_analysis.get('paper_title', 'Unknown')
-        
-        # Build structured context sections
-        ctx_parts = [f"Paper: {title}"]
-        
-        # Metadata
-        meta = raw_json.get('metadata', {})
-        if meta:
-            authors = ', '.join(a.get('name', '') for a in meta.get('authors', []))
-            ctx_parts.append(f"Authors: {authors}")
-            ctx_parts.append(f"Year: {meta.get('publication_year', 'N/A')}")
-            ctx_parts.append(f"Abstract: {meta.get('abstract', 'N/A')}")
-        
-        # Methodologies
-        methods = raw_json.get('methodologies', [])
-        if methods:
-            ctx_parts.append("\nMETHODOLOGIES:")
-            for i, m in enumerate(methods, 1):
-                ctx_parts.append(f"  {i}. Datasets: {', '.join(m.get('datasets', []))}")
-                ctx_parts.append(f"     Models: {', '.join(m.get('base_models', []))}")
-                ctx_parts.append(f"     Metrics: {', '.join(m.get('metrics', []))}")
-                ctx_parts.append(f"     Optimization: {m.get('optimization', 'N/A')}")
-        
-        # Limitations
-        lims = raw_json.get('limitations', [])
-        if lims:
-            ctx_parts.append("\nLIMITATIONS:")
-            for i, l in enumerate(lims, 1):
-                ctx_parts.append(f"  {i}. {l.get('description', '')}")
-        
-        # Contradictions
-        contras = raw_json.get('contradictions', [])
-        if contras:
-            ctx_parts.append("\nCONTRADICTIONS:")
-            for i, c in enumerate(contras, 1):
-                ctx_parts.append(f"  {i}. Claim: {c.get('claim', '')}")
-                ctx_parts.append(f"     Opposing: {c.get('opposing_claim', '')}")
-                ctx_parts.append(f"     Confidence: {c.get('confidence_score', 0):.0%}")
-        
-        paper_context = '\n'.join(ctx_parts)
+    if not paper_context and analysis_ids:
+        per_paper_budget = CHAT_CONTEXT_BUDGET // len(analysis_ids)
+        blocks = []
+        for analysis_id in analysis_ids:
+            block = chat_context_cache.get_context(analysis_id, _load_analysis_for_chat)
+            if block is None:
+                raise HTTPException(status_code=404, detail=f"Analysis {analysis_id} not found")
+            blocks.append(block[:per_paper_budget])
+        paper_context = "\n\n".join(blocks)
+
+    # Retrieve the passages most relevant to this question from the full paper text(s)
+    retrieved_context = ""
+    if analysis_ids:
+        try:
+            chunks = chunk_index.search(req.message, analysis_ids=analysis_ids)
+            retrieved_context = format_retrieved_chunks(chunks)
+        except Exception as e:
+            logger.warning(f"Chunk retrieval failed: {e}")
 
     system_prompt = f"""You are MathBot, the Researcher Co-Pilot AI assistant for the AI-Powered Research Paper Analyzer.
-You answer questions about uploaded research papers using the STRUCTURED ANALYSIS DATA below.
+You answer questions about uploaded research papers using the STRUCTURED ANALYSIS DATA and the
+RELEVANT PASSAGES retrieved from the full paper text below.
 Be precise, cite specific methodologies, datasets, metrics, limitations, and contradictions.
+When several papers are loaded, say which paper each point comes from.
 Format your answers with bullet points and clear structure.
 If the question is beyond the paper's scope, say so honestly.
 
 ANALYSIS DATA:
-{paper_context[:8000]}
+{paper_context[:CHAT_CONTEXT_BUDGET]}
+
+RELEVANT PASSAGES:
+{retrieved_context or "N/A"}
 """
+    return [
+        SystemMessage(content=system_prompt),
+        HumanMessage(content=req.message),
+    ]
 
-    try:
-        llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-flash",
-            google_api_key=api_key,
-            temperature=0.3,
-        )
 
-        messages = [
-            SystemMessage(content=system_prompt),
-            HumanMessage(content=req.message),
-        ]
+def _answer_cacheable(req: ChatRequest, analysis_ids: List[str]) -> bool:
+    # Client-supplied context can differ per call, so only server-side contexts are cached
+    return bool(analysis_ids) and not req.context
 
-        response = llm.invoke(messages)
-        return ChatResponse(reply=response.content)
+
+def _get_mathbot_llm():
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    api_key = os.environ.get("GEMINI_API_KEY") or os.environ.get("GOOGLE_API_KEY")
+    if not api_key:
+        raise HTTPException(status_code=500, detail="GEMINI_API_KEY not set")
+    return ChatGoogleGenerativeAI(
+        model="gemini-2.5-flash",
+        google_api_key=api_key,
+        temperature=0.3,
+    )
+
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {dumps_str(data)}\n\n"
+
+
+@app.post("/api/v1/chat", response_model=ChatResponse)
+async def chat_with_mathbot(req: ChatRequest):
+    """
+    MathBot AI assistant — answers research questions using paper context.
+    Uses Gemini via LangChain for grounded, deterministic responses.
+    Kept for compatibility; /api/v1/chat/stream streams the same answer token by token.
+    """
+    analysis_ids = _resolve_chat_analysis_ids(req)
+    cacheable = _answer_cacheable(req, analysis_ids)
+    if cacheable:
+        cached_answer = chat_context_cache.get_answer(analysis_ids, req.message)
+        if cached_answer is not None:
+            return ChatResponse(reply=cached_answer, cached=True, analysis_ids=analysis_ids)
+
+    llm = _get_mathbot_llm()
+    messages = await run_in_threadpool(_build_mathbot_messages, req, analysis_ids)
+
+    try:
+        started = time.perf_counter()
+        # Async call so the event loop keeps serving other requests during generation
+        response = await llm.ainvoke(messages)
+        _chat_duration.observe(time.perf_counter() - started, mode="blocking")
+        if cacheable:
+            chat_context_cache.put_answer(analysis_ids, req.message, response.content)
+        return ChatResponse(reply=response.content, analysis_ids=analysis_ids)
 
     except Exception as e:
         logger.error(f"MathBot error: {e}")
         raise HTTPException(status_code=500, detail=f"MathBot failed: {str(e)}")
 
 
+@app.post("/api/v1/chat/stream")
+async def chat_with_mathbot_stream(req: ChatRequest, request: Request):
+    """
+    Streaming MathBot: sends tokens as Server-Sent Events while Gemini generates.
+
+    Events:
+      - token: {"delta": "..."} for each streamed chunk
+      - done:  {"ttft_ms", "total_ms", "chunks", "cached"} once generation completes
+      - error: {"message"} if generation fails mid-stream
+    Generation is cancelled as soon as the client disconnects.
+    """
+    analysis_ids = _resolve_chat_analysis_ids(req)
+    cacheable = _answer_cacheable(req, analysis_ids)
+    cached_answer = chat_context_cache.get_answer(analysis_ids, req.message) if cacheable else None
+
+    if cached_answer is not None:
+        async def cached_stream():
+            _chat_streams.inc(outcome="cached")
+            yield _sse("token", {"delta": cached_answer})
+            yield _sse("done", {"ttft_ms": 0.0, "total_ms": 0.0, "chunks": 1, "cached": True})
+
+        return StreamingResponse(cached_stream(), media_type="text/event-stream",
+                                 headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+    llm = _get_mathbot_llm()
+    messages = await run_in_threadpool(_build_mathbot_messages, req, analysis_ids)
+
+    async def event_stream():
+        started = time.perf_counter()
+        ttft = None
+        chunk_count = 0
+        reply_parts: List[str] = []
+        try:
+            async for chunk in llm.astream(messages):
+                if await request.is_disconnected():
+                    _chat_streams.inc(outcome="client_disconnected")
+                    logger.info("MathBot stream cancelled: client disconnected")
+                    return
+                text = chunk.content if isinstance(chunk.content, str) else "".join(
+                    part.get("text", "") if isinstance(part, dict) else str(part) for part in chunk.content
+                )
+                if not text:
+                    continue
+                if ttft is None:
+                    ttft = time.perf_counter() - started
+                    _chat_ttft.observe(ttft)
+                chunk_count += 1
+                reply_parts.append(text)
+                yield _sse("token", {"delta": text})
+
+            total = time.perf_counter() - started
+            _chat_duration.observe(total, mode="stream")
+            _chat_streams.inc(outcome="completed")
+            if cacheable:
+                chat_context_cache.put_answer(analysis_ids, req.message, "".join(reply_parts))
+            yield _sse("done", {
+                "ttft_ms": round((ttft or total) * 1000, 1),
+                "total_ms": round(total * 1000, 1),
+                "chunks": chunk_count,
+                "cached": False,
+            })
+        except asyncio.CancelledError:
+            # Starlette cancels the generator when the connection drops; closing astream aborts the upstream call
+            _chat_streams.inc(outcome="client_disconnected")
+            logger.info("MathBot stream cancelled by server shutdown or disconnect")
+            raise
+        except Exception as e:
+            _chat_streams.inc(outcome="error")
+            logger.error(f"MathBot stream error: {e}")
+            yield _sse("error", {"message": f"MathBot failed: {str(e)}"})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 # ═════════════════════════════════════════════════════════════════════════════
 # ROUTE 3: Export to LaTeX / Markdown
 # ═════════════════════════════════════════════════════════════════════════════
@@ -548,79 +1085,144 @@ async def export_bibtex(req: BibTeXRequest):
 # ROUTE 4: Analysis History
 # ═════════════════════════════════════════════════════════════════════════════
 @app.get("/api/v1/history")
-async def list_history():
-    """Return all past analyses (newest first), with lightweight summaries."""
-    history = _load_history()
-    # Return summaries without the full extracted_data to keep responses fast
-    summaries = []
-    for entry in history:
-        summaries.append({
-            "id": entry["id"],
-            "filename": entry.get("filename", "unknown.pdf"),
-            "title": entry.get("title", "Untitled"),
-            "authors": entry.get("authors", []),
-            "analyzed_at": entry.get("analyzed_at", ""),
-            "pipeline": entry.get("pipeline", {}),
-        })
-    return {"history": summaries, "total": len(summaries)}
+async def list_history(
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    fields: Optional[str] = Query(None, description="Comma-separated subset of summary fields"),
+):
+    """
+    Return past analyses as lightweight summaries, one page at a time.
+    Pass the returned `next_cursor` to fetch the following page. `total` is
+    counted on the first page only (null on later ones), so paging on stays
+    a keyset lookup rather than a full COUNT per page.
+    """
+    # Served from the summary table only; extracted_data and graphs are never loaded here
+    field_list = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+    try:
+        page = await run_in_threadpool(history_store.list_page, limit, cursor, order, field_list)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    total = await run_in_threadpool(history_store.count) if cursor is None else None
+    return FastJSONResponse({"history": page["items"], "total": total, "next_cursor": page["next_cursor"]})
 
 
 @app.get("/api/v1/history/{analysis_id}")
 async def get_history_entry(analysis_id: str):
     """Retrieve the full analysis data for a specific history entry."""
-    history = _load_history()
-    for entry in history:
-        if entry["id"] == analysis_id:
-            return {
-                "status": "success",
-                "id": entry["id"],
-                "filename": entry.get("filename", "unknown.pdf"),
-                "analyzed_at": entry.get("analyzed_at", ""),
-                "pipeline": entry.get("pipeline", {}),
-                "extracted_data": entry.get("extracted_data", {}),
-            }
-    raise HTTPException(status_code=404, detail="Analysis not found")
+    entry = await run_in_threadpool(history_store.get, analysis_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Analysis not found")
+    return FastJSONResponse({
+        "status": "success",
+        "id": entry["id"],
+        "filename": entry.get("filename", "unknown.pdf"),
+        "analyzed_at": entry.get("analyzed_at", ""),
+        "pipeline": entry.get("pipeline", {}),
+        "extracted_data": entry.get("extracted_data", {}),
+    })
 
 
 @app.delete("/api/v1/history/{analysis_id}")
 async def delete_history_entry(analysis_id: str):
     """Delete a specific history entry."""
-    history = _load_history()
-    new_history = [e for e in history if e["id"] != analysis_id]
-    if len(new_history) == len(history):
+    if not await asyncio.wrap_future(history_writer.delete(analysis_id)):
         raise HTTPException(status_code=404, detail="Analysis not found")
-    _save_history(new_history)
+    facet_index.remove(analysis_id)
+    chat_context_cache.invalidate(analysis_id)
+    try:
+        await run_in_threadpool(chunk_index.delete_paper, analysis_id)
+    except Exception as e:
+        logger.warning(f"Failed to drop indexed chunks for {analysis_id}: {e}")
     return {"status": "deleted", "id": analysis_id}
 
 
+# ═════════════════════════════════════════════════════════════════════════════
+# ROUTE 5: Faceted Search
+# ═════════════════════════════════════════════════════════════════════════════
+@app.get("/api/v1/search")
+async def search_analyses(
+    datasets: List[str] = Query([]),
+    base_models: List[str] = Query([]),
+    metric_names: List[str] = Query([], alias="metrics"),
+    optimization: List[str] = Query([]),
+    authors: List[str] = Query([]),
+    op: str = Query("and", pattern="^(and|or)$", description="Combine value filters with AND or OR"),
+    year_from: Optional[int] = None,
+    year_to: Optional[int] = None,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+):
+    """
+    Structured search over every analyzed paper, e.g.
+    `?datasets=ImageNet&optimization=AdamW&year_from=2020&year_to=2023`.
+    Repeat a parameter to filter on several values. Facet counts describe the matching set.
+    """
+    filters = {
+        "datasets": datasets,
+        "base_models": base_models,
+        "metrics": metric_names,
+        "optimization": optimization,
+        "authors": authors,
+    }
+    result = await run_in_threadpool(
+        facet_index.search, filters, op=op, year_from=year_from, year_to=year_to, limit=limit
+    )
+    summaries = await run_in_threadpool(history_store.get_summaries, result["ids"])
+    return FastJSONResponse({"results": summaries, "total": result["total"], "facets": result["facets"]})
+
+
 # ═════════════════════════════════════════════════════════════════════════════
 # ROUTE: Knowledge Graph Visualization Data
 # ═════════════════════════════════════════════════════════════════════════════
+# Separate layout cache for persisted graphs served when the live graph is empty
+# (keyed "last:<version>" / "history:<id>", a few of each kept)
+_snapshot_layout_engine = GraphLayoutEngine(cache_versions=8)
+
+
+def _with_snapshot_layout(graph_data: Dict[str, Any], cache_key: str) -> Dict[str, Any]:
+    """Attach precomputed coordinates to a persisted graph snapshot."""
+    coordinates = _snapshot_layout_engine.get_layout(
+        nodes=[n["id"] for n in graph_data["nodes"]],
+        edges=[(e["source"], e["target"]) for e in graph_data.get("edges", [])],
+        version=cache_key,
+    )
+    nodes = [{**n, **coordinates.get(n["id"], {})} for n in graph_data["nodes"]]
+    return {**graph_data, "nodes": nodes, "layout": {"version": cache_key, "precomputed": True}}
+
+
 @app.get("/api/v1/graph")
-async def get_graph_data():
+async def get_graph_data(layout: bool = False):
     """
     Returns the full knowledge graph (nodes + edges) for visualization.
+    With ?layout=true, nodes carry server-computed x/y coordinates so the
+    client can render large graphs without running its own simulation; the layout
+    takes seconds on large graphs, so it runs on the threadpool, not the event loop.
     Tries:
     1. In-memory graph (from current session's NetworkX)
     2. In-memory _last_analysis cache (has graph_data from latest upload)
     3. Latest history entry (persisted graph_data)
     """
     # 1. Try live NetworkX graph
-    live_graph = memory_manager.get_full_graph()
+    live_graph = await run_in_threadpool(memory_manager.get_full_graph, layout)
     if live_graph["nodes"]:
-        return {"status": "success", "graph": live_graph}
+        return FastJSONResponse({"status": "success", "graph": live_graph})
 
     # 2. Try in-memory cache
     if _last_analysis.get("graph_data") and _last_analysis["graph_data"].get("nodes"):
-        return {"status": "success", "graph": _last_analysis["graph_data"]}
+        graph_data = _last_analysis["graph_data"]
+        if layout:
+            graph_data = await run_in_threadpool(
+                _with_snapshot_layout, graph_data, f"last:{graph_data.get('version', 0)}"
+            )
+        return FastJSONResponse({"status": "success", "graph": graph_data})
 
     # 3. Try latest history entry
-    history = _load_history()
-    if history:
-        for entry in history:
-            graph_data = entry.get("graph_data")
-            if graph_data and graph_data.get("nodes"):
-                return {"status": "success", "graph": graph_data}
+    latest = await run_in_threadpool(history_store.latest_graph)
+    if latest:
+        entry_id, graph_data = latest
+        if layout:
+            graph_data = await run_in_threadpool(_with_snapshot_layout, graph_data, f"history:{entry_id}")
+        return FastJSONResponse({"status": "success", "graph": graph_data})
 
     # No graph data available
     return {
@@ -630,6 +1232,43 @@ async def get_graph_data():
     }
 
 
+# ═════════════════════════════════════════════════════════════════════════════
+# ROUTE: Profiles
+# ═════════════════════════════════════════════════════════════════════════════
+@app.get("/api/v1/profiles/{analysis_id}/{name}", include_in_schema=False)
+async def get_profile(analysis_id: str, name: str, request: Request):
+    """
+    A profiled run's artifact (admins only): `stacks.folded` for flamegraph tools,
+    `allocations.json` for tracemalloc's top allocation sites.
+    """
+    if not profiling_authorized(request.headers.get(PROFILE_HEADER)):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Profiling is restricted to admins")
+    if name not in PROFILE_FILES:
+        raise HTTPException(status_code=404, detail="Unknown profile artifact")
+    try:
+        data = await run_in_threadpool(artifact_store.read_file, analysis_id, name)
+    except ValueError:
+        data = None
+    if data is None:
+        raise HTTPException(status_code=404, detail="No profile for this analysis")
+    media_type = "application/json" if name.endswith(".json") else "text/plain; charset=utf-8"
+    return Response(content=data, media_type=media_type)
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# ROUTE: Prometheus Metrics
+# ═════════════════════════════════════════════════════════════════════════════
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """
+    This API process's metrics in the Prometheus text format: per-stage latency
+    (pipeline_stage_seconds), pages, LLM tokens, queue depths, loaded models and
+    memory. Celery workers serve their own registries (WORKER_METRICS_PORT).
+    """
+    update_process_gauges()
+    return PlainTextResponse(metrics.exposition(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 # ═════════════════════════════════════════════════════════════════════════════
 # Global Exception Handler
 # ═════════════════════════════════════════════════════════════════════════════
@@ -637,7 +1276,7 @@ async def get_graph_data():
 async def global_exception_handler(request, exc):
     """Fallback handler to prevent unstructured server crashes."""
     logger.error(f"Unhandled system error: {exc}", exc_info=True)
-    return JSONResponse(
+    return FastJSONResponse(
         status_code=500,
         content={"error": "internal_error", "message": "An unexpected server error occurred."}
     )
@@ -1,6 +1,7 @@
-from sqlalchemy import Column, String, Integer, DateTime, JSON, Float
+from sqlalchemy import Column, String, Integer, DateTime, JSON, Float, LargeBinary
 from sqlalchemy.sql import func
 from app.core.database import Base
+from app.core.payload_codec import decode_payload, encode_payload
 
 class ExtractionTask(Base):
     __tablename__ = "extraction_tasks"
@@ -8,7 +9,7 @@ class ExtractionTask(Base):
     id = Column(String, primary_key=True, index=True) # This will be our task_id (UUID)
     user_id = Column(String, index=True)
     file_path = Column(String)
-    status = Column(String, default="PENDING") # PENDING, EXTRACTING_LAYOUT, ANALYZING, CRUNCHING_MATRIX, BUILDING_GRAPH, COMPLETE, FAILED
+    status = Column(String, default="PENDING") # PENDING, VALIDATING, EXTRACTING_LAYOUT, ANALYZING, CRUNCHING_MATRIX, BUILDING_GRAPH, RETRYING, CANCELLING, COMPLETE, FAILED, CANCELLED
     progress = Column(Float, default=0.0)
     
     # Metadata extracted
@@ -18,6 +19,26 @@ class ExtractionTask(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
-    # Result storage (optional, could also be in a separate table)
+    # Result storage (optional, could also be in a separate table).
+    # New results go to result_blob (app.core.payload_codec); result_data holds rows written before it.
     result_data = Column(JSON, nullable=True)
+    result_blob = Column(LargeBinary, nullable=True)
     error_message = Column(String, nullable=True)
+    # Pipeline stages whose stored outputs were reused on the last run (retry / re-analysis)
+    skipped_stages = Column(JSON, nullable=True)
+    # Degradations applied to stay inside the job's time budget (app.core.deadline)
+    degraded = Column(JSON, nullable=True)
+    # Links to the run's profile artifacts when it was profiled (app.core.profiling)
+    profile = Column(JSON, nullable=True)
+
+    @property
+    def result(self):
+        """The task's ExtractedInsights dump, whichever column it was stored in."""
+        if self.result_blob is not None:
+            return decode_payload(self.result_blob)
+        return self.result_data
+
+    @result.setter
+    def result(self, value):
+        self.result_blob = encode_payload(value) if value is not None else None
+        self.result_data = None
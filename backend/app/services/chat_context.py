@@ -0,0 +1,176 @@
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+CONTEXT_CACHE_SIZE = int(os.getenv("CHAT_CONTEXT_CACHE_SIZE", "256"))
+ANSWER_CACHE_SIZE = int(os.getenv("CHAT_ANSWER_CACHE_SIZE", "2048"))
+ANSWER_CACHE_TTL = float(os.getenv("CHAT_ANSWER_CACHE_TTL", "86400"))
+
+_cache_lookups = metrics.counter("mathbot_cache_lookups_total", "MathBot context/answer cache lookups by cache and result")
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def render_analysis_context(title: str, raw_json: Dict[str, Any]) -> str:
+    """Render the structured ExtractedInsights dump into MathBot's ANALYSIS DATA block."""
+    # Build structured context sections
+    ctx_parts = [f"Paper: {title}"]
+
+    # Metadata
+    meta = raw_json.get('metadata', {})
+    if meta:
+        authors = ', '.join(a.get('name', '') for a in meta.get('authors', []))
+        ctx_parts.append(f"Authors: {authors}")
+        ctx_parts.append(f"Year: {meta.get('publication_year', 'N/A')}")
+        ctx_parts.append(f"Abstract: {meta.get('abstract', 'N/A')}")
+
+    # Methodologies
+    methods = raw_json.get('methodologies', [])
+    if methods:
+        ctx_parts.append("\nMETHODOLOGIES:")
+        for i, m in enumerate(methods, 1):
+            ctx_parts.append(f"  {i}. Datasets: {', '.join(m.get('datasets', []))}")
+            ctx_parts.append(f"     Models: {', '.join(m.get('base_models', []))}")
+            ctx_parts.append(f"     Metrics: {', '.join(m.get('metrics', []))}")
+            ctx_parts.append(f"     Optimization: {m.get('optimization', 'N/A')}")
+
+    # Limitations
+    lims = raw_json.get('limitations', [])
+    if lims:
+        ctx_parts.append("\nLIMITATIONS:")
+        for i, l in enumerate(lims, 1):
+            ctx_parts.append(f"  {i}. {l.get('description', '')}")
+
+    # Contradictions
+    contras = raw_json.get('contradictions', [])
+    if contras:
+        ctx_parts.append("\nCONTRADICTIONS:")
+        for i, c in enumerate(contras, 1):
+            ctx_parts.append(f"  {i}. Claim: {c.get('claim', '')}")
+            ctx_parts.append(f"     Opposing: {c.get('opposing_claim', '')}")
+            ctx_parts.append(f"     Confidence: {c.get('confidence_score', 0):.0%}")
+
+    return '\n'.join(ctx_parts)
+
+
+def normalize_question(question: str) -> str:
+    """
+    Lowercase and strip punctuation and extra whitespace so trivially different
+    spellings of one question ("What datasets?" / "what  datasets") hit one cache
+    key. Every word is kept: dropping filler words made unrelated short questions
+    ("What does it do?" / "Can it do this?") collide on the same answer.
+    """
+    words = _WORD.findall(question.lower())
+    # Cheap plural folding ("datasets" == "dataset")
+    words = [w[:-1] if len(w) > 3 and w.endswith("s") and not w.endswith("ss") else w for w in words]
+    return " ".join(words)
+
+
+class _LRU:
+    """Thread-safe LRU with optional TTL, shared by both MathBot caches."""
+
+    def __init__(self, max_size: int, ttl: Optional[float] = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: "OrderedDict[Any, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            stored_at, value = item
+            if self.ttl is not None and time.monotonic() - stored_at > self.ttl:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def discard_where(self, predicate: Callable[[Any], bool]):
+        with self._lock:
+            for key in [k for k in self._data if predicate(k)]:
+                del self._data[key]
+
+    def __len__(self):
+        return len(self._data)
+
+
+class ChatContextCache:
+    """
+    Per-analysis MathBot caches:
+      - rendered ANALYSIS DATA blocks, so chat never re-walks raw_json per request
+      - normalized question → answer, so repeated questions skip the LLM entirely
+    Answers are keyed by the exact set of analyses in the session.
+    """
+
+    def __init__(self, context_size: int = CONTEXT_CACHE_SIZE, answer_size: int = ANSWER_CACHE_SIZE,
+                 answer_ttl: float = ANSWER_CACHE_TTL):
+        self._contexts = _LRU(context_size)
+        self._answers = _LRU(answer_size, ttl=answer_ttl)
+
+    # ── Context blocks ───────────────────────────────────────────────────────
+
+    def put_context(self, analysis_id: str, title: str, raw_json: Dict[str, Any]) -> str:
+        block = render_analysis_context(title, raw_json)
+        self._contexts.put(analysis_id, block)
+        return block
+
+    def get_context(self, analysis_id: str, loader: Callable[[str], Optional[Tuple[str, Dict[str, Any]]]]) -> Optional[str]:
+        """
+        Returns the pre-rendered block for an analysis, rendering it via `loader`
+        (analysis_id → (title, raw_json) or None) on a miss.
+        """
+        block = self._contexts.get(analysis_id)
+        if block is not None:
+            _cache_lookups.inc(cache="context", result="hit")
+            return block
+        _cache_lookups.inc(cache="context", result="miss")
+        loaded = loader(analysis_id)
+        if loaded is None:
+            return None
+        title, raw_json = loaded
+        return self.put_context(analysis_id, title, raw_json)
+
+    # ── Answers ──────────────────────────────────────────────────────────────
+
+    @staticmethod
+    def _answer_key(analysis_ids: Iterable[str], question: str) -> Tuple[Tuple[str, ...], str]:
+        return tuple(sorted(set(analysis_ids))), normalize_question(question)
+
+    def get_answer(self, analysis_ids: Iterable[str], question: str) -> Optional[str]:
+        key = self._answer_key(analysis_ids, question)
+        if not key[1]:
+            return None
+        answer = self._answers.get(key)
+        _cache_lookups.inc(cache="answer", result="hit" if answer is not None else "miss")
+        return answer
+
+    def put_answer(self, analysis_ids: Iterable[str], question: str, answer: str):
+        key = self._answer_key(analysis_ids, question)
+        if key[1] and answer:
+            self._answers.put(key, answer)
+
+    def invalidate(self, analysis_id: str):
+        """Drop everything derived from an analysis (e.g. when it is deleted or re-analyzed)."""
+        self._contexts.discard_where(lambda k: k == analysis_id)
+        self._answers.discard_where(lambda k: analysis_id in k[0])
+
+
+# Singleton instance
+chat_context_cache = ChatContextCache()
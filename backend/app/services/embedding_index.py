@@ -0,0 +1,319 @@
+import hashlib
+import logging
+import os
+import re
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from lancedb.index import IvfPq
+
+from app.core.graph_db import memory_manager
+from app.core.instrumentation import note_model_loaded
+
+logger = logging.getLogger(__name__)
+
+# "fastembed" (CPU-local ONNX model) or "hashing" (dependency-free, deterministic — used in tests)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "fastembed")
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "BAAI/bge-small-en-v1.5")
+# Prefix of the chunk tables; each embedder gets its own (see chunks_table_for)
+CHUNKS_TABLE = "paper_chunks"
+
+# LanceDB needs enough rows to train IVF_PQ centroids; below this a flat scan is faster anyway
+ANN_INDEX_MIN_ROWS = 4096
+
+_IMAGE_LINK = re.compile(r"!\[[^\]]*\]\([^)]*\)")
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+# ─── Chunking ────────────────────────────────────────────────────────────────
+
+def chunk_markdown(markdown: str, chunk_size: int = 1200, overlap: int = 200) -> List[str]:
+    """
+    Splits the DLA Markdown into overlapping, paragraph-aligned chunks.
+    Image links to local crops carry no retrievable text and are dropped.
+    """
+    text = _IMAGE_LINK.sub("", markdown)
+    paragraphs = [p.strip() for p in re.split(r"\n\s*\n|\n---\n", text) if p.strip() and p.strip() != "---"]
+
+    chunks: List[str] = []
+    current = ""
+    for para in paragraphs:
+        # Hard-split paragraphs that alone exceed the chunk size
+        while len(para) > chunk_size:
+            head, para = para[:chunk_size], para[chunk_size - overlap:]
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(head)
+
+        if current and len(current) + len(para) + 2 > chunk_size:
+            chunks.append(current)
+            # Carry the tail of the previous chunk forward so answers spanning a boundary survive
+            current = current[-overlap:] + "\n\n" + para if overlap else para
+        else:
+            current = f"{current}\n\n{para}" if current else para
+
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+# ─── Embedders ───────────────────────────────────────────────────────────────
+
+class HashingEmbedder:
+    """
+    Deterministic hashing-vectorizer fallback: signed feature hashing of word
+    unigrams and bigrams with sublinear term frequency, L2-normalized. No model
+    download, so it is suitable for tests and offline runs while still giving
+    useful lexical recall.
+    """
+
+    name = "hashing"
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+        self.id = f"hashing-{dim}"
+
+    def _embed_one(self, text: str) -> np.ndarray:
+        vec = np.zeros(self.dim, dtype=np.float32)
+        tokens = _TOKEN.findall(text.lower())
+        counts = Counter(tokens + [f"{a}_{b}" for a, b in zip(tokens, tokens[1:])])
+        for feature, count in counts.items():
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            h = int.from_bytes(digest, "little")
+            # Sublinear tf so boilerplate repeated across a chunk doesn't drown out rare terms
+            weight = 1.0 + np.log(count)
+            vec[h % self.dim] += weight if (h >> 63) & 1 else -weight
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm > 0 else vec
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        return np.vstack([self._embed_one(t) for t in texts]) if texts else np.zeros((0, self.dim), dtype=np.float32)
+
+
+class FastEmbedEmbedder:
+    """CPU-local sentence embeddings via fastembed (ONNX Runtime, no GPU or API key required)."""
+
+    name = "fastembed"
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL):
+        from fastembed import TextEmbedding
+
+        logger.info(f"Loading local embedding model {model_name}...")
+        self.model = TextEmbedding(model_name=model_name)
+        self.id = f"fastembed-{model_name}"
+        self.dim = len(next(iter(self.model.embed(["dimension probe"]))))
+        note_model_loaded(model_name)
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return np.asarray(list(self.model.embed(texts)), dtype=np.float32)
+
+
+_embedder = None
+_embedder_lock = threading.Lock()
+
+
+def get_embedder():
+    """Lazy-load the configured embedder, falling back to hashing if the model is unavailable."""
+    global _embedder
+    if _embedder is None:
+        with _embedder_lock:
+            if _embedder is None:
+                if EMBEDDING_BACKEND == "fastembed":
+                    try:
+                        _embedder = FastEmbedEmbedder()
+                    except Exception as e:
+                        _embedder = HashingEmbedder()
+                        logger.warning(
+                            f"Local embedding model {EMBEDDING_MODEL} unavailable, using the hashing vectorizer: {e}. "
+                            f"Chunks go to {chunks_table_for(_embedder)}; papers indexed with the model "
+                            f"are not retrievable from this process."
+                        )
+                else:
+                    _embedder = HashingEmbedder()
+    return _embedder
+
+
+# ─── LanceDB chunk index ─────────────────────────────────────────────────────
+
+def _quote(value: str) -> str:
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def chunks_table_for(embedder) -> str:
+    """
+    The chunk table for an embedder's vector space. Vectors from different
+    embedders (or dimensions) are not comparable, so they never share a table.
+    """
+    return f"{CHUNKS_TABLE}_{re.sub(r'[^a-z0-9]+', '_', embedder.id.lower()).strip('_')}"
+
+
+class PaperChunkIndex:
+    """
+    Retrieval store for MathBot: one row per Markdown chunk in LanceDB, keyed by
+    analysis_id. Replaces the fixed 8000-character context truncation — the chat
+    prompt receives the top-k chunks most relevant to the question instead, so
+    prompt size stays constant while recall covers the whole paper.
+    """
+
+    def __init__(self, db=None, embedder=None, table_name: Optional[str] = None):
+        self._db = db
+        self._embedder = embedder
+        self._table_name = table_name
+        self._lock = threading.Lock()
+
+    @property
+    def db(self):
+        return self._db if self._db is not None else memory_manager.vector_db
+
+    @property
+    def embedder(self):
+        return self._embedder or get_embedder()
+
+    @property
+    def table_name(self) -> str:
+        return self._table_name or chunks_table_for(self.embedder)
+
+    def _open_table(self):
+        try:
+            return self.db.open_table(self.table_name)
+        except Exception:
+            return None
+
+    def index_paper(self, analysis_id: str, markdown: str, title: str = "") -> int:
+        """
+        Chunks, embeds and stores a paper's Markdown. Re-indexing an analysis replaces its rows.
+
+        Returns:
+            Number of chunks written.
+        """
+        if self.db is None:
+            logger.warning("LanceDB unavailable; skipping chunk indexing.")
+            return 0
+
+        chunks = chunk_markdown(markdown)
+        if not chunks:
+            return 0
+
+        vectors = self.embedder.embed(chunks)
+        rows = [
+            {
+                "analysis_id": analysis_id,
+                "chunk_id": i,
+                "title": title,
+                "text": chunk,
+                "vector": vectors[i].tolist(),
+            }
+            for i, chunk in enumerate(chunks)
+        ]
+
+        with self._lock:
+            table = self._open_table()
+            if table is None:
+                try:
+                    self.db.create_table(self.table_name, data=rows)
+                except ValueError:
+                    # Another worker created the table first; fall through to a normal add
+                    table = self._open_table()
+                    if table is None:
+                        raise
+            if table is not None:
+                table.delete(f"analysis_id = {_quote(analysis_id)}")
+                table.add(rows)
+                self._maybe_build_ann_index(table)
+
+        logger.info(f"Indexed {len(chunks)} chunks for analysis {analysis_id} ({self.embedder.name} embeddings)")
+        return len(chunks)
+
+    @staticmethod
+    def _indexed_rows(table) -> int:
+        """
+        Rows covered by the table's vector index when it was last built, read from
+        the index statistics so every process (and a restarted one) agrees on it.
+        Rows added since then are reported as unindexed and do not count.
+        """
+        try:
+            for index in table.list_indices():
+                if "vector" in index.columns:
+                    stats = table.index_stats(index.name)
+                    return int(stats.num_indexed_rows) if stats else 0
+        except Exception as e:
+            logger.debug(f"Could not read chunk index statistics: {e}")
+        return 0
+
+    def _maybe_build_ann_index(self, table):
+        """(Re)build the IVF_PQ index once the table is large enough, and again each time it doubles."""
+        row_count = table.count_rows()
+        if row_count < ANN_INDEX_MIN_ROWS or row_count < 2 * self._indexed_rows(table):
+            return
+        try:
+            table.create_index(
+                "vector",
+                config=IvfPq(
+                    distance_type="cosine",
+                    num_partitions=max(1, int(np.sqrt(row_count))),
+                    num_sub_vectors=max(1, self.embedder.dim // 16),
+                ),
+                replace=True,
+            )
+            logger.info(f"Built ANN index over {row_count} chunks.")
+        except Exception as e:
+            logger.warning(f"ANN index build failed, falling back to flat search: {e}")
+
+    def search(self, query: str, analysis_ids: Optional[List[str]] = None, k: int = 6) -> List[Dict[str, Any]]:
+        """Returns the top-k chunks most similar to the query, optionally restricted to some analyses."""
+        if self.db is None or not query.strip():
+            return []
+        table = self._open_table()
+        if table is None:
+            return []
+
+        vector = self.embedder.embed([query])[0].tolist()
+        search = table.search(vector, vector_column_name="vector").metric("cosine").limit(k)
+        if analysis_ids:
+            search = search.where(
+                f"analysis_id IN ({', '.join(_quote(a) for a in analysis_ids)})", prefilter=True
+            )
+        try:
+            results = search.to_list()
+        except Exception as e:
+            logger.warning(f"Chunk search failed: {e}")
+            return []
+
+        return [
+            {
+                "analysis_id": r["analysis_id"],
+                "chunk_id": r["chunk_id"],
+                "title": r.get("title", ""),
+                "text": r["text"],
+                "score": round(1.0 - float(r.get("_distance", 0.0)), 4),
+            }
+            for r in results
+        ]
+
+    def delete_paper(self, analysis_id: str):
+        table = self._open_table()
+        if table is not None:
+            with self._lock:
+                table.delete(f"analysis_id = {_quote(analysis_id)}")
+
+
+def format_retrieved_chunks(chunks: List[Dict[str, Any]], max_chars: int = 6000) -> str:
+    """Render retrieved chunks as a prompt section with a fixed character budget."""
+    parts: List[str] = []
+    used = 0
+    for c in chunks:
+        block = f"[{c.get('title') or c['analysis_id']} · chunk {c['chunk_id']}]\n{c['text']}"
+        if used + len(block) > max_chars:
+            break
+        parts.append(block)
+        used += len(block)
+    return "\n\n".join(parts)
+
+
+# Singleton instance
+chunk_index = PaperChunkIndex()
@@ -1,32 +1,101 @@
 import logging
 import os
+from typing import Any, Callable, Dict
 from app.core.celery_app import celery_app
+from app.core.graph_db import memory_manager
 from app.services.mineru_extractor import MinerUExtractor
 from app.services.lang_extract_engine import run_lang_extract_pipeline
 from app.services.statistical_engine import statistical_compute
 from app.services.relational_engine import relational_builder
-from app.core.database import SessionLocal
-from app.models.task import ExtractionTask
+from app.services.embedding_index import chunk_index
+from app.services.task_progress import task_progress
 
 logger = logging.getLogger(__name__)
 
-def update_db_task(task_id: str, status: str, progress: float, error_message: str = None, paper_title: str = None, result_data: dict = None):
-    """Helper to update the PostgreSQL tracking table."""
+# report(status, progress, **fields) — fields may carry paper_title
+ProgressReporter = Callable[..., None]
+
+
+def update_db_task(task_id: str, status: str, progress: float, error_message: str = None, paper_title: str = None, result_data: dict = None, skipped_stages: list = None, degraded: list = None,
+                   profile: dict = None, restart: bool = False):
+    """
+    Report a task transition. Goes to the live progress channel right away; the
+    PostgreSQL tracking row gets terminal states and results immediately and
+    everything else in periodic batched snapshots (see app.services.task_progress).
+    `restart` (a re-analysis) writes straight away, even over a finished row.
+    """
+    task_progress.record(
+        task_id, status, progress, error_message=error_message, paper_title=paper_title,
+        result_data=result_data, skipped_stages=skipped_stages, degraded=degraded, profile=profile,
+        restart=restart,
+    )
+
+
+def run_extraction_job(task_id: str, file_path: str, report: ProgressReporter) -> Dict[str, Any]:
+    """
+    The Stage 3 & 4 pipeline (Vision Parsers & Analytics) for one spooled PDF.
+    Shared by the Celery task and the in-process eager job runner; `report`
+    receives every stage transition.
+
+    Returns:
+        {"paper_title", "extracted_data", "pipeline", "graph_data"}
+    """
+    # 1. Multi-Modal Vision Parsing (MinerU)
+    logger.info(f"[{task_id}] Initializing Vision Parser (MinerU)...")
+    report("EXTRACTING_LAYOUT", 10.0)
+
+    extractor = MinerUExtractor()
+    mineru_result = extractor.extract_document(file_path=file_path)
+    extracted_text = mineru_result["markdown"]
+
+    # 2. Strict Pydantic Execution Pipeline
+    logger.info(f"[{task_id}] Executing LangExtract Schema Validation...")
+    report("ANALYZING", 50.0)
+
+    structured_data = run_lang_extract_pipeline(clean_text=extracted_text)
+    paper_title = structured_data.metadata.title
+    logger.info(f"[{task_id}] LLM Extraction successful. Found Title: {paper_title}")
+    report("ANALYZING", 60.0, paper_title=paper_title)
+
+    # Index the full Markdown for retrieval-augmented chat (failure doesn't crash pipeline)
+    chunks_indexed = 0
     try:
-        with SessionLocal() as db:
-            task = db.query(ExtractionTask).filter(ExtractionTask.id == task_id).first()
-            if task:
-                task.status = status
-                task.progress = progress
-                if error_message:
-                    task.error_message = error_message
-                if paper_title:
-                    task.paper_title = paper_title
-                if result_data:
-                    task.result_data = result_data
-                db.commit()
-    except Exception as e:
-        logger.error(f"Failed to update task {task_id} in DB: {e}")
+        chunks_indexed = chunk_index.index_paper(task_id, extracted_text, title=paper_title)
+    except Exception as index_err:
+        logger.warning(f"[{task_id}] Chunk indexing skipped: {index_err}")
+
+    # 2b. Statistical Engine (Path A - Pandas)
+    logger.info(f"[{task_id}] Computing Matrix Trends with Statistical Engine...")
+    report("CRUNCHING_MATRIX", 65.0)
+
+    raw_json = structured_data.model_dump()
+    df = statistical_compute.format_matrix(raw_json)
+    logger.info(f"[{task_id}] Pandas Matrix Created: {df.shape if not df.empty else 'Empty'}")
+
+    # 3. Relational Path (Direct LLM Triplet Extraction → NetworkX)
+    logger.info(f"[{task_id}] Extracting knowledge graph triplets...")
+    report("BUILDING_GRAPH", 80.0)
+
+    # Single LLM call to extract triplets from structured data
+    graph_result = relational_builder.build_knowledge_graph(structured_data=raw_json)
+    logger.info(f"[{task_id}] Knowledge Graph: {graph_result.get('triplet_count', 0)} triplets, "
+                 f"{graph_result.get('node_count', 0)} nodes, {graph_result.get('edge_count', 0)} edges.")
+
+    return {
+        "paper_title": paper_title,
+        "extracted_data": raw_json,
+        "pipeline": {
+            "chars_extracted": len(extracted_text),
+            "matrix_shape": list(df.shape) if not df.empty else [0, 0],
+            "cognee_success": graph_result.get("success", False),
+            "graph_triplets": graph_result.get("triplet_count", 0),
+            "graph_nodes": graph_result.get("node_count", 0),
+            "graph_edges": graph_result.get("edge_count", 0),
+            "chunks_indexed": chunks_indexed,
+        },
+        "graph_data": memory_manager.get_full_graph(),
+    }
+
 
 @celery_app.task(bind=True, name="process_pdf_extraction")
 def process_pdf_extraction(self, task_id: str, file_path: str, user_id: str):
@@ -35,59 +104,24 @@ def process_pdf_extraction(self, task_id: str, file_path: str, user_id: str):
     Runs entirely decoupled from the FastAPI request thread.
     """
     logger.info(f"Worker picked up job {task_id} for {file_path}")
-    
-    try:
-        # 1. Multi-Modal Vision Parsing (MinerU)
-        logger.info(f"[{task_id}] Initializing Vision Parser (MinerU)...")
-        if self:
-            self.update_state(state="PROGRESS", meta={"status": "EXTRACTING_LAYOUT", "progress": 10})
-        update_db_task(task_id, "EXTRACTING_LAYOUT", 10.0)
-        
-        extractor = MinerUExtractor()
-        mineru_result = extractor.extract_document(file_path=file_path)
-        extracted_text = mineru_result["markdown"]
-        
-        # 2. Strict Pydantic Execution Pipeline
-        logger.info(f"[{task_id}] Executing LangExtract Schema Validation...")
-        if self:
-            self.update_state(state="PROGRESS", meta={"status": "ANALYZING", "progress": 50})
-        update_db_task(task_id, "ANALYZING", 50.0)
-        
-        structured_data = run_lang_extract_pipeline(clean_text=extracted_text)
-        paper_title = structured_data.metadata.title
-        logger.info(f"[{task_id}] LLM Extraction successful. Found Title: {paper_title}")
-        update_db_task(task_id, "ANALYZING", 60.0, paper_title=paper_title)
 
-        # 2b. Statistical Engine (Path A - Pandas)
-        logger.info(f"[{task_id}] Computing Matrix Trends with Statistical Engine...")
+    def report(status: str, progress: float, paper_title: str = None):
         if self:
-            self.update_state(state="PROGRESS", meta={"status": "CRUNCHING_MATRIX", "progress": 65})
-        update_db_task(task_id, "CRUNCHING_MATRIX", 65.0)
-        
-        raw_json = structured_data.model_dump()
-        df = statistical_compute.format_matrix(raw_json)
-        logger.info(f"[{task_id}] Pandas Matrix Created: {df.shape if not df.empty else 'Empty'}")
-        
-        # 3. Relational Path (Direct LLM Triplet Extraction → NetworkX)
-        logger.info(f"[{task_id}] Extracting knowledge graph triplets...")
-        if self:
-            self.update_state(state="PROGRESS", meta={"status": "BUILDING_GRAPH", "progress": 80})
-        update_db_task(task_id, "BUILDING_GRAPH", 80.0)
-        
-        # Single LLM call to extract triplets from structured data
-        graph_result = relational_builder.build_knowledge_graph(structured_data=raw_json)
-        logger.info(f"[{task_id}] Knowledge Graph: {graph_result.get('triplet_count', 0)} triplets, "
-                     f"{graph_result.get('node_count', 0)} nodes, {graph_result.get('edge_count', 0)} edges.")
-        
+            self.update_state(state="PROGRESS", meta={"status": status, "progress": progress})
+        update_db_task(task_id, status, progress, paper_title=paper_title)
+
+    try:
+        outcome = run_extraction_job(task_id, file_path, report)
+
         if self:
             self.update_state(state="SUCCESS", meta={"status": "COMPLETE", "progress": 100})
-        update_db_task(task_id, "COMPLETE", 100.0, result_data=raw_json)
+        update_db_task(task_id, "COMPLETE", 100.0, result_data=outcome["extracted_data"])
             
         logger.info(f"Job {task_id} completed successfully. Cleaning up temp file.")
         if os.path.exists(file_path):
             os.remove(file_path)
 
-        return {"status": "COMPLETE", "task_id": task_id}
+        return {"status": "COMPLETE", "task_id": task_id, "pipeline": outcome["pipeline"]}
 
     except Exception as e:
         logger.error(f"Failed to process document {task_id}: {e}", exc_info=True)
@@ -0,0 +1,482 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from app.core.cancellation import CancelToken, Cancelled
+from app.core.celery_app import redis_url
+from app.core.database import SessionLocal, database_available
+from app.core.fair_scheduler import (
+    DEFAULT_PRIORITY, SCHED_MAX_DISPATCHED, FairScheduler, MemoryTenantSlots, QueuedJob, RedisQueueRegistry,
+    RedisTenantSlots,
+)
+from app.core.progress_channel import TERMINAL_STATUSES, progress_channel, redis_reachable
+from app.models.task import ExtractionTask
+
+logger = logging.getLogger(__name__)
+
+# "celery" enqueues on the broker, "eager" runs jobs on a thread in this process,
+# "auto" picks celery when Redis answers a ping at startup and eager otherwise.
+JOBS_MODE = os.getenv("JOBS_MODE", "auto").lower()
+JOBS_EAGER_CONCURRENCY = int(os.getenv("JOBS_EAGER_CONCURRENCY", "1"))
+# Finished jobs stay queryable in eager mode for this long
+JOBS_RETENTION_SECONDS = float(os.getenv("JOBS_RETENTION_SECONDS", "3600"))
+# How often job event streams re-read status
+JOBS_POLL_SECONDS = float(os.getenv("JOBS_POLL_SECONDS", "0.5"))
+
+# Most job ids a single bulk status request may ask about
+JOBS_BULK_MAX = int(os.getenv("JOBS_BULK_MAX", "200"))
+# PENDING rows younger than this are left alone at startup: their API process may not have registered them yet
+JOBS_RECOVER_MIN_AGE_SECONDS = float(os.getenv("JOBS_RECOVER_MIN_AGE_SECONDS", "60"))
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _as_utc(moment: datetime) -> datetime:
+    return moment if moment.tzinfo is not None else moment.replace(tzinfo=timezone.utc)
+
+
+class JobManager:
+    """
+    Submits extraction jobs and answers "where is job X?".
+
+    In celery mode the workers own progress: they publish every transition to the
+    progress channel (Redis), which status reads hit first, and the ExtractionTask
+    row is the durable record. In eager mode jobs run on a small thread pool inside
+    the API process, progress also lives in an in-memory table, and completion
+    hooks run here so results can be saved to history like a synchronous upload.
+    """
+
+    def __init__(self, mode: str = JOBS_MODE, eager_concurrency: int = JOBS_EAGER_CONCURRENCY):
+        if mode == "auto":
+            mode = "celery" if redis_reachable() else "eager"
+        if mode not in ("celery", "eager"):
+            raise ValueError(f"Invalid JOBS_MODE '{mode}', expected 'celery', 'eager' or 'auto'")
+        self.mode = mode
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._on_complete: List[Callable[[Dict[str, Any], Dict[str, Any]], None]] = []
+        self._executor = (
+            ThreadPoolExecutor(max_workers=eager_concurrency, thread_name_prefix="eager-job")
+            if mode == "eager" else None
+        )
+        if mode == "eager":
+            from app.services.pipeline_tasks import add_progress_listener
+            add_progress_listener(self._on_progress)
+        # Fair order across tenants lives here; the broker only ever sees what the workers can start now
+        self.scheduler = FairScheduler(
+            self._dispatch,
+            slots=RedisTenantSlots(redis_url) if mode == "celery" else MemoryTenantSlots(),
+            max_dispatched=SCHED_MAX_DISPATCHED if mode == "celery" else eager_concurrency,
+        )
+        # Which API process holds each waiting job, so another can pick them up if it dies
+        self.registry = RedisQueueRegistry(redis_url) if mode == "celery" else None
+        self._watcher: Optional[threading.Thread] = None
+        self._heartbeat_at = 0.0
+        logger.info(f"Job manager running in {mode} mode")
+
+    def on_complete(self, hook: Callable[[Dict[str, Any], Dict[str, Any]], None]):
+        """Register hook(job, outcome), called after an eager job finishes successfully."""
+        self._on_complete.append(hook)
+
+    # ── Submission ───────────────────────────────────────────────────────────
+
+    def submit(
+        self, job_id: str, file_path: str, filename: str, user_id: str,
+        priority: str = DEFAULT_PRIORITY, budget_seconds: Optional[float] = None, profile: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Create the task row and queue the spooled file in the fair scheduler.
+        The job's time budget (`budget_seconds`, default JOB_BUDGET_SECONDS) starts at dispatch.
+        With `profile` (admin only; checked by the route), every stage is profiled.
+
+        Raises:
+            ValueError: Unknown priority class.
+            RuntimeError: In celery mode when the task row can't be written, since
+                the API would then have no way to report the job's progress.
+        """
+        if priority not in self.scheduler.priority_weights:
+            raise ValueError(f"Unknown priority '{priority}', expected one of {sorted(self.scheduler.priority_weights)}")
+        job = {
+            "id": job_id,
+            "user_id": user_id,
+            "filename": filename,
+            "priority": priority,
+            "status": "PENDING",
+            "progress": 0.0,
+            "paper_title": None,
+            "error_message": None,
+            "created_at": _now(),
+            "updated_at": _now(),
+        }
+        snapshot = dict(job)
+        progress_channel.publish(
+            job_id, "PENDING", 0.0, user_id=user_id, filename=filename, priority=priority, created_at=job["created_at"],
+        )
+        row_written = self._create_task_row(job_id, user_id, file_path)
+        if self.mode == "celery" and not row_written:
+            raise RuntimeError("Task database unavailable")
+        if self.mode == "eager":
+            with self._lock:
+                self._prune()
+                self._jobs[job_id] = job
+        self._enqueue(job_id, user_id, priority, {
+            "file_path": file_path, "filename": filename, "budget_seconds": budget_seconds, "profile": profile,
+        })
+        logger.info(f"Job {job_id} queued ({self.mode}, {priority}) for {filename}")
+        return snapshot
+
+    def _create_task_row(self, job_id: str, user_id: str, file_path: str) -> bool:
+        if not database_available():
+            return False
+        try:
+            with SessionLocal() as db:
+                db.add(ExtractionTask(id=job_id, user_id=user_id, file_path=file_path, status="PENDING", progress=0.0))
+                db.commit()
+            return True
+        except Exception as e:
+            logger.error(f"Failed to create task row for job {job_id}: {e}")
+            return False
+
+    # ── Scheduling ───────────────────────────────────────────────────────────
+
+    def _enqueue(self, job_id: str, user_id: str, priority: str, payload: Dict[str, Any]):
+        self._ensure_watcher()
+        if self.registry is not None:
+            self._heartbeat()
+            self.registry.hold(job_id, payload)
+        self.scheduler.enqueue(job_id, user_id, priority, payload=payload)
+
+    def _heartbeat(self):
+        """Tell other API processes this one is alive and still holds its waiting jobs."""
+        now = time.monotonic()
+        if self.registry is not None and (not self._heartbeat_at or now - self._heartbeat_at >= self.registry.ttl / 3):
+            self.registry.heartbeat()
+            self._heartbeat_at = now
+
+    def _dispatch(self, queued: QueuedJob):
+        """Called by the scheduler when a job's turn comes: hand it to a worker."""
+        args = queued.payload
+        try:
+            if self.mode == "celery":
+                from app.services.pipeline_tasks import start_pipeline
+                # Marked first so no other process claims it once the workers have it
+                self.registry.dispatched(queued.job_id)
+                start_pipeline(
+                    queued.job_id, args["file_path"], queued.tenant,
+                    args.get("instructions"), args.get("force", ()), args.get("budget_seconds"),
+                    args.get("profile", False),
+                )
+            else:
+                self._executor.submit(
+                    self._run_eager, queued.job_id, args["file_path"], args["filename"],
+                    args.get("instructions"), args.get("force", ()), args.get("budget_seconds"),
+                    args.get("profile", False),
+                )
+        except Exception as e:
+            from app.services.extraction_worker import update_db_task
+            if self.registry is not None:
+                self.registry.forget(queued.job_id)
+            self._update(queued.job_id, status="FAILED", error_message=f"dispatch: {e}")
+            update_db_task(queued.job_id, "FAILED", 0.0, error_message=f"dispatch: {e}")
+            raise
+
+    def _ensure_watcher(self):
+        """Free a job's scheduler slot when any worker publishes its terminal status."""
+        with self._lock:
+            if self._watcher is not None:
+                return
+            subscription = progress_channel.subscribe()
+            self._watcher = threading.Thread(target=self._watch, args=(subscription,), name="job-slot-watcher", daemon=True)
+            self._watcher.start()
+
+    def _watch(self, subscription):
+        while True:
+            try:
+                self._heartbeat()
+                event = subscription.get(timeout=5.0)
+            except Exception as e:
+                logger.warning(f"Job progress subscription failed, retrying: {e}")
+                time.sleep(1.0)
+                continue
+            terminal = event is not None and event.get("status") in TERMINAL_STATUSES
+            if terminal:
+                self.scheduler.release(event["id"])
+                if self.registry is not None:
+                    self.registry.forget(event["id"])
+            if terminal or event is None:
+                # A job another replica dispatched may have freed a tenant slot (RedisTenantSlots is
+                # shared), which release() can't see; a quiet spell also reclaims expired leases
+                self.scheduler.pump()
+
+    # ── Recovery ─────────────────────────────────────────────────────────────
+
+    def recover_pending(self, min_age_seconds: float = JOBS_RECOVER_MIN_AGE_SECONDS) -> int:
+        """
+        Re-queue jobs that were still waiting in the fair scheduler of an API
+        process that has since stopped (a restart or a crashed replica); their
+        task rows would otherwise stay PENDING forever. Jobs held by a live
+        process or already handed to the workers are left alone. A job whose
+        spooled file is gone is marked FAILED. Celery mode only: in eager mode
+        waiting jobs die with their process.
+
+        Returns:
+            Number of jobs re-queued.
+        """
+        from app.core.artifact_store import artifact_store
+        from app.services.extraction_worker import update_db_task
+
+        if self.registry is None or not database_available():
+            return 0
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=min_age_seconds)
+        rows = []
+        with SessionLocal() as db:
+            for task in db.query(ExtractionTask).filter(ExtractionTask.status == "PENDING"):
+                touched = task.updated_at or task.created_at
+                if touched is None or _as_utc(touched) < cutoff:
+                    rows.append((task.id, task.user_id, task.file_path))
+
+        recovered = 0
+        for job_id, user_id, file_path in rows:
+            if not self.registry.claim(job_id):
+                continue
+            known = progress_channel.get_many([job_id]).get(job_id, {})
+            # Instructions, forced stages, budget and profile flag as submitted
+            payload = self.registry.payload(job_id) or {}
+            file_path = payload.get("file_path") or file_path
+            # A re-analysis reads the kept source; a fresh upload its spooled file
+            source = artifact_store.source_path(job_id)
+            if not (file_path and os.path.exists(file_path)) and os.path.exists(source):
+                file_path = source
+            if not (file_path and os.path.exists(file_path)):
+                self.registry.forget(job_id)
+                update_db_task(job_id, "FAILED", 0.0, error_message="lost while queued: the uploaded file is gone")
+                logger.warning(f"Queued job {job_id} could not be recovered: its file is gone")
+                continue
+            self._enqueue(job_id, user_id or "anonymous", known.get("priority") or DEFAULT_PRIORITY, {
+                **payload, "file_path": file_path,
+                "filename": payload.get("filename") or known.get("filename") or os.path.basename(file_path),
+            })
+            recovered += 1
+        if recovered:
+            logger.info(f"Recovered {recovered} queued job(s) from a stopped API process")
+        return recovered
+
+    # ── Eager execution ──────────────────────────────────────────────────────
+
+    def _update(self, job_id: str, **fields):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.update(fields, updated_at=_now())
+
+    def _on_progress(self, job_id: str, status: str, progress: float, fields: Dict[str, Any]):
+        """Stage progress from pipeline tasks running in this process."""
+        update = {"status": status, "progress": progress}
+        if fields.get("paper_title"):
+            update["paper_title"] = fields["paper_title"]
+        self._update(job_id, **update)
+
+    def _run_eager(
+        self, job_id: str, file_path: str, filename: str,
+        instructions: Optional[str] = None, force: Iterable[str] = (), budget_seconds: Optional[float] = None,
+        profile: bool = False,
+    ):
+        from app.core.artifact_store import artifact_store
+        from app.core.graph_db import memory_manager
+        from app.services.extraction_worker import update_db_task
+        from app.services.pipeline_tasks import build_pipeline
+
+        user_id = (self.get(job_id) or {}).get("user_id", "anonymous")
+        try:
+            # The same staged chain the workers run, applied in this thread
+            result = build_pipeline(
+                job_id, file_path, user_id, instructions, force, budget_seconds, profile,
+            ).apply().get()
+            extracted_data = artifact_store.get(result["artifacts"]["insights"])
+        except Cancelled as e:
+            # The stage already recorded CANCELLED
+            self._update(job_id, status="CANCELLED", progress=0.0, error_message=str(e))
+            return
+        except Exception as e:
+            logger.error(f"Eager job {job_id} failed: {e}", exc_info=True)
+            self._update(job_id, status="FAILED", progress=0.0, error_message=str(e))
+            update_db_task(job_id, "FAILED", 0.0, error_message=str(e))
+            return
+
+        outcome = {
+            "paper_title": result["paper_title"],
+            "extracted_data": extracted_data,
+            "pipeline": result["pipeline"],
+            "skipped_stages": result["skipped_stages"],
+            "degraded": result["degraded"],
+            "graph_data": memory_manager.get_full_graph(),
+        }
+        job = self.get(job_id) or {"id": job_id, "filename": filename}
+        for hook in self._on_complete:
+            try:
+                hook(job, outcome)
+            except Exception as hook_err:
+                logger.error(f"Completion hook failed for job {job_id}: {hook_err}")
+        self._update(
+            job_id, status="COMPLETE", progress=100.0, error_message=None,
+            pipeline=result["pipeline"], skipped_stages=result["skipped_stages"], degraded=result["degraded"],
+            profile=result["pipeline"].get("profile"),
+        )
+        logger.info(f"Job {job_id} completed (eager)")
+
+    # ── Cancellation ─────────────────────────────────────────────────────────
+
+    def cancel(self, job_id: str) -> Dict[str, Any]:
+        """
+        Stop a job. One still waiting in the fair scheduler is dropped before it
+        reaches a worker. A running one is signalled through its CancelToken and
+        stops at its next layout page or before its next stage or LLM call,
+        which frees its worker and scheduler slot; until then it is CANCELLING.
+
+        Raises:
+            KeyError: The job is unknown.
+            ValueError: The job has already finished.
+        """
+        from app.core.artifact_store import artifact_store
+        from app.services.extraction_worker import update_db_task
+
+        job = self.get(job_id)
+        if job is None:
+            raise KeyError(job_id)
+        if job["status"] in TERMINAL_STATUSES:
+            raise ValueError(f"Job already finished with status {job['status']}")
+
+        queued = self.scheduler.cancel(job_id)
+        if queued is not None:
+            if self.registry is not None:
+                self.registry.forget(job_id)
+            self._update(job_id, status="CANCELLED", error_message="cancelled before it started")
+            update_db_task(job_id, "CANCELLED", job["progress"], error_message="cancelled before it started")
+            # A fresh upload's spooled file; a re-analysis reads the kept source, which stays
+            file_path = queued.payload["file_path"]
+            if file_path != artifact_store.source_path(job_id) and os.path.exists(file_path):
+                os.remove(file_path)
+            logger.info(f"Job {job_id} cancelled while queued")
+        else:
+            CancelToken(job_id).cancel("cancelled by request")
+            self._update(job_id, status="CANCELLING")
+            update_db_task(job_id, "CANCELLING", job["progress"])
+            logger.info(f"Job {job_id} cancellation requested")
+        return self.get(job_id) or job
+
+    # ── Re-analysis ──────────────────────────────────────────────────────────
+
+    def reanalyze(self, job_id: str, instructions: Optional[str] = None, force: Iterable[str] = ()) -> Dict[str, Any]:
+        """
+        Run a finished job's pipeline again from its kept source PDF. Stages whose
+        inputs are unchanged reuse their stored outputs, so new extraction
+        instructions re-run extraction onwards but not layout detection.
+
+        Raises:
+            KeyError: The job is unknown.
+            FileNotFoundError: The job's source PDF is no longer in the artifact store.
+            RuntimeError: In celery mode when the task row can't be updated.
+        """
+        from app.core.artifact_store import artifact_store
+        from app.services.extraction_worker import update_db_task
+
+        job = self.get(job_id)
+        if job is None:
+            raise KeyError(job_id)
+        source = artifact_store.source_path(job_id)
+        if not os.path.exists(source):
+            raise FileNotFoundError(f"Source PDF for job {job_id} has expired")
+
+        force = list(force)
+        # A cancel that arrived after the previous run ended must not stop this one
+        CancelToken(job_id).clear()
+        job.update(status="PENDING", progress=0.0, error_message=None, updated_at=_now())
+        update_db_task(job_id, "PENDING", 0.0, error_message="", restart=True)
+        if self.mode == "celery" and not database_available():
+            raise RuntimeError("Task database unavailable")
+        if self.mode == "eager":
+            job.setdefault("filename", None)
+            with self._lock:
+                self._jobs[job_id] = job
+        self._enqueue(
+            job_id, job.get("user_id") or "anonymous", job.get("priority") or DEFAULT_PRIORITY,
+            {"file_path": source, "filename": job.get("filename"), "instructions": instructions, "force": force},
+        )
+        logger.info(f"Job {job_id} re-analysis queued ({self.mode})" + (f", forcing {force}" if force else ""))
+        return dict(job)
+
+    def _prune(self):
+        """Forget finished eager jobs past their retention window. Caller holds the lock."""
+        cutoff = time.time() - JOBS_RETENTION_SECONDS
+        stale = [
+            job_id for job_id, job in self._jobs.items()
+            if job["status"] in TERMINAL_STATUSES
+            and datetime.fromisoformat(job["updated_at"]).timestamp() < cutoff
+        ]
+        for job_id in stale:
+            del self._jobs[job_id]
+
+    # ── Status ───────────────────────────────────────────────────────────────
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Current status of a job, or None if it is unknown."""
+        return self.get_many([job_id]).get(job_id)
+
+    def get_many(self, job_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Status of every known job among `job_ids`. Looks in the eager registry,
+        then the live progress channel, and only asks the task table (in one
+        query) about jobs the channel has already forgotten.
+        """
+        job_ids = list(dict.fromkeys(job_ids))
+        found: Dict[str, Dict[str, Any]] = {}
+        with self._lock:
+            for job_id in job_ids:
+                if job_id in self._jobs:
+                    found[job_id] = dict(self._jobs[job_id])
+        missing = [job_id for job_id in job_ids if job_id not in found]
+        if missing:
+            found.update(progress_channel.get_many(missing))
+            missing = [job_id for job_id in missing if job_id not in found]
+        if missing and database_available():
+            with SessionLocal() as db:
+                for task in db.query(ExtractionTask).filter(ExtractionTask.id.in_(missing)):
+                    found[task.id] = {
+                        "id": task.id,
+                        "user_id": task.user_id,
+                        "status": task.status,
+                        "progress": task.progress,
+                        "paper_title": task.paper_title,
+                        "error_message": task.error_message,
+                        "skipped_stages": task.skipped_stages,
+                        "degraded": task.degraded,
+                        "profile": task.profile,
+                        "created_at": task.created_at.isoformat() if task.created_at else None,
+                        "updated_at": task.updated_at.isoformat() if task.updated_at else None,
+                    }
+        for job_id, job in found.items():
+            position = self.scheduler.position(job_id) if job.get("status") == "PENDING" else None
+            if position is not None:
+                job["queue_position"] = position
+        return found
+
+    def get_result(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """The finished job's ExtractedInsights dump from the task table, if it has one."""
+        if not database_available():
+            return None
+        with SessionLocal() as db:
+            task = db.query(ExtractionTask).filter(ExtractionTask.id == job_id).first()
+            return task.result if task is not None else None
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+job_manager = JobManager()
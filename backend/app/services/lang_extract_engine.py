@@ -1,9 +1,11 @@
 import logging
 import os
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from app.models.extraction import ExtractedInsights
 from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain_core.callbacks import UsageMetadataCallbackHandler
 from langchain_core.messages import SystemMessage, HumanMessage
+from app.core.instrumentation import record_llm_usage
 
 logger = logging.getLogger(__name__)
 
@@ -20,7 +22,19 @@ CRITICAL DIRECTIVES:
 5. Missing Data: If a specific field is not present in the text, leave it empty or use an appropriate default rather than guessing.
 """
 
-def run_lang_extract_pipeline(clean_text: str) -> ExtractedInsights:
+EXTRACTION_MODEL = "gemini-2.5-flash"
+# Used when a job's time budget runs low: noticeably faster, somewhat less thorough
+FAST_EXTRACTION_MODEL = os.getenv("FAST_EXTRACTION_MODEL", "gemini-2.5-flash-lite")
+
+def build_system_prompt(instructions: Optional[str] = None) -> str:
+    """SYSTEM_PROMPT, plus any per-request instructions from a re-analysis."""
+    if not instructions:
+        return SYSTEM_PROMPT
+    return f"{SYSTEM_PROMPT}\nADDITIONAL INSTRUCTIONS FOR THIS DOCUMENT:\n{instructions.strip()}\n"
+
+def run_lang_extract_pipeline(
+    clean_text: str, instructions: Optional[str] = None, fast: bool = False, timeout: Optional[float] = None,
+) -> ExtractedInsights:
     """
     Forces the LLM to map unstructured academic text into our strict Pydantic V2 schemas.
     To maintain 100% Deterministic execution per the Researcher Pivot standard,
@@ -28,6 +42,9 @@ def run_lang_extract_pipeline(clean_text: str) -> ExtractedInsights:
     
     Args:
         clean_text (str): The structured string output from the Vision Parser.
+        instructions (str, optional): Extra guidance appended to the system prompt.
+        fast (bool): Use FAST_EXTRACTION_MODEL (deadline degradation).
+        timeout (float, optional): Seconds before the Gemini call is abandoned.
         
     Returns:
         ExtractedInsights: The validated, type-safe data payload.
@@ -43,9 +60,10 @@ def run_lang_extract_pipeline(clean_text: str) -> ExtractedInsights:
         # Initialize the Gemini model via LangChain
         # We use gemini-2.5-flash for speed and cost-effectiveness in extraction tasks
         llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-flash",
+            model=FAST_EXTRACTION_MODEL if fast else EXTRACTION_MODEL,
             google_api_key=api_key,
             temperature=0.0, # Zero temperature for deterministic extraction
+            timeout=timeout,
         )
         
         # Enforce the Pydantic schema
@@ -55,11 +73,14 @@ def run_lang_extract_pipeline(clean_text: str) -> ExtractedInsights:
         
         # We pass the system prompt and the raw text
         messages = [
-            SystemMessage(content=SYSTEM_PROMPT),
+            SystemMessage(content=build_system_prompt(instructions)),
             HumanMessage(content=f"EXTRACT THE FOLLOWING DOCUMENT:\n\n{clean_text}")
         ]
         
-        validated_insights: ExtractedInsights = structured_llm.invoke(messages)
+        usage = UsageMetadataCallbackHandler()
+        validated_insights: ExtractedInsights = structured_llm.invoke(messages, config={"callbacks": [usage]})
+        tokens = record_llm_usage("extraction", usage.usage_metadata)
+        logger.info(f"Extraction used {tokens['input_tokens']} input / {tokens['output_tokens']} output tokens")
         
         logger.info(f"Successfully bound LLM extraction to Pydantic constraints. Title: {validated_insights.metadata.title}")
         return validated_insights
@@ -1,13 +1,24 @@
 import os
 import io
-import json
 import logging
+import time
 from pathlib import Path
 from typing import Any
 from PIL import Image
 
+from app.core.cancellation import Cancelled
+from app.core.instrumentation import StageTimer, note_model_loaded, peak_rss_bytes, reset_peak_rss
+from app.core.serialization import dumps
+
 logger = logging.getLogger(__name__)
 
+LAYOUT_MODEL_REPO = "vaivTA/yolov8n_doclaynet"
+LAYOUT_MODEL_FILE = "weights/best.pt"
+# Use 150 DPI for good image crops and YOLO detection
+LAYOUT_DPI = 150
+# Changes whenever the layout output for the same PDF can change; bump the suffix on logic changes
+LAYOUT_VERSION = f"{LAYOUT_MODEL_REPO}/{LAYOUT_MODEL_FILE}@{LAYOUT_DPI}dpi/v1"
+
 class MinerUExtractor:
     def __init__(self, output_dir: str = None):
         import tempfile
@@ -22,19 +33,28 @@ class MinerUExtractor:
             from ultralytics import YOLO
             
             logger.info("Downloading/Loading YOLOv8 DocLayNet model...")
-            model_path = hf_hub_download('vaivTA/yolov8n_doclaynet', 'weights/best.pt')
+            model_path = hf_hub_download(LAYOUT_MODEL_REPO, LAYOUT_MODEL_FILE)
             self.model = YOLO(model_path)
+            note_model_loaded(LAYOUT_MODEL_REPO)
             logger.info("YOLO model loaded.")
         return self.model
 
-    def extract_document(self, file_path: str) -> dict:
+    def extract_document(self, file_path: str, deadline=None, cancel=None) -> dict:
         """
         Extracts document structure (text, equations, tables) using YOLOv8 DocLayNet + PyMuPDF.
         Replaces MinerU completely.
 
+        Args:
+            deadline (Deadline, optional): When its layout time runs out, the remaining
+                pages get plain PyMuPDF text (no YOLO crops); pdf_info["yolo_pages"] says how many didn't.
+            cancel (CancelToken, optional): Checked before each page; raises Cancelled once it fires.
+
         Returns a dict with keys:
             - markdown: The full linearized Markdown string
-            - pdf_info: Metdata
+            - pdf_info: Metdata, including sub-stage `timings` (seconds), `peak_rss_bytes`
+              of this process while it worked on the document (None unless the process is
+              dedicated to it: see instrumentation.mark_dedicated_process), and its `pid`. They are
+              measured, not recorded: the caller passes pdf_info to instrumentation.record_layout.
             - images_dir: Path to the directory containing extracted images
         """
         import fitz  # PyMuPDF
@@ -51,27 +71,45 @@ class MinerUExtractor:
 
         logger.info(f"Custom DLA: Beginning PDF extraction for {file_name}")
 
+        timer = StageTimer(observe=False)
+        measure_rss = reset_peak_rss()
         try:
-            model = self._load_model()
+            with timer.stage("layout.load_model"):
+                model = self._load_model()
             doc = fitz.open(file_path_obj)
             
             markdown_body = []
             
-            # Use 150 DPI for good image crops and YOLO detection
-            DPI = 150
+            DPI = LAYOUT_DPI
             zoom = DPI / 72.0 
             mat = fitz.Matrix(zoom, zoom)
             
+            yolo_pages = len(doc)
             for page_num in range(len(doc)):
                 page = doc[page_num]
-                
+                if cancel is not None:
+                    cancel.check(f"page {page_num + 1} of {file_name}")
+
+                # Out of layout time: keep the remaining pages' text, skip rasterizing and YOLO
+                if yolo_pages == len(doc) and page_num > 0 and deadline is not None and not deadline.allows_layout_page():
+                    yolo_pages = page_num
+                    logger.warning(f"Custom DLA: time budget low, pages {page_num + 1}-{len(doc)} of {file_name} get text only")
+                if page_num >= yolo_pages:
+                    with timer.stage("layout.text_only"):
+                        markdown_body.extend(b[4].strip() for b in page.get_text("blocks") if b[4].strip())
+                    markdown_body.append("\n---\n")
+                    continue
+
                 # 1. Rasterize Page for YOLO and Cropping
-                pix = page.get_pixmap(matrix=mat)
-                img_bytes = pix.tobytes("png")
-                img = Image.open(io.BytesIO(img_bytes))
+                with timer.stage("layout.rasterize"):
+                    pix = page.get_pixmap(matrix=mat)
+                    img_bytes = pix.tobytes("png")
+                    img = Image.open(io.BytesIO(img_bytes))
                 
                 # 2. YOLO Inference
-                results = model(img, verbose=False)[0]
+                with timer.stage("layout.detect"):
+                    results = model(img, verbose=False)[0]
+                compose_started = time.perf_counter()
                 
                 crops_on_page = []
                 # Target classes for cropping
@@ -138,10 +176,16 @@ class MinerUExtractor:
                         markdown_body.append(f"\n![{item['type']}]({item['path']})\n")
                 
                 markdown_body.append("\n---\n") # Page separator
+                # Crops, text blocks and the top-to-bottom splice
+                timer.add("layout.compose", time.perf_counter() - compose_started)
 
             final_markdown = "\n\n".join(markdown_body)
             
-            pdf_info_dict = {"yolo_custom_pipeline": True, "pages_processed": len(doc)}
+            pdf_info_dict = {
+                "yolo_custom_pipeline": True, "pages_processed": len(doc), "yolo_pages": yolo_pages,
+                "timings": timer.to_dict(), "peak_rss_bytes": peak_rss_bytes() if measure_rss else None,
+                "model": LAYOUT_MODEL_REPO, "pid": os.getpid(),
+            }
             self._save_outputs(doc_output_dir, doc_name, final_markdown, pdf_info_dict)
             
             logger.info(f"Custom DLA: Feature extraction successful for {file_name}")
@@ -153,6 +197,9 @@ class MinerUExtractor:
                 "source": "yolo_doclaynet",
             }
 
+        except Cancelled:
+            logger.info(f"Custom DLA: Extraction of {file_name} cancelled")
+            raise
         except Exception as e:
             logger.error(f"Custom DLA: Processing failed: {str(e)}", exc_info=True)
             raise
@@ -164,7 +211,4 @@ class MinerUExtractor:
         md_path.write_text(markdown, encoding="utf-8")
 
         json_path = doc_output_dir / f"{doc_name}_info.json"
-        json_path.write_text(
-            json.dumps(pdf_info, indent=2, ensure_ascii=False, default=str),
-            encoding="utf-8",
-        )
+        json_path.write_bytes(dumps(pdf_info, pretty=True))
@@ -0,0 +1,409 @@
+import functools
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from celery import chain
+from celery.exceptions import Retry
+
+from app.core.artifact_store import artifact_store, content_hash, file_hash
+from app.core.celery_app import celery_app, CPU_QUEUE, IO_QUEUE
+from app.core.cancellation import CancelToken, Cancelled
+from app.core.deadline import DEGRADED_LAYOUT_PAGES, JOB_BUDGET_SECONDS, Deadline, DeadlineExceeded
+from app.core.instrumentation import StageTimer, record_layout
+from app.core.profiling import PROFILE_FILES, SamplingProfiler, profile_links, save_profile
+from app.services.extraction_worker import update_db_task
+
+logger = logging.getLogger(__name__)
+
+# ─── Staged Pipeline ─────────────────────────────────────────────────────────
+# validate → layout → extract → stats → graph → persist, as a Celery chain.
+#
+# Each stage is a small task routed to the pool that suits it: validation and
+# YOLO layout detection go to the prefork CPU queue, everything that waits on
+# Gemini (or is cheap) goes to the high-concurrency IO queue, so a CPU slot is
+# never held across an LLM round-trip. Stages hand each other a small context
+# dict; bulky outputs (Markdown, ExtractedInsights, triplets) stay in the
+# artifact store and travel as references.
+#
+# Every stage output is keyed by a hash of its inputs (see stage_key). A stage
+# whose key already has an artifact is skipped, so a retry after a failed graph
+# call, or a re-analysis with new extraction instructions, starts at the first
+# stage whose inputs actually changed. Skipped stages are recorded on the task.
+#
+# Context: {"task_id", "file_path", "user_id", "instructions", "force",
+#           "keys": {stage: key}, "artifacts": {name: ref}, "skipped": [stage], "pipeline": {...},
+#           "deadline": Deadline.to_dict(), "profile": bool}
+#
+# The deadline is set when the job is dispatched and travels with the context;
+# stages degrade (app.core.deadline) rather than overrun it. Each stage checks
+# the job's CancelToken before starting and before LLM calls, and layout checks
+# it between pages, so DELETE /api/v1/jobs/{id} stops a job within one page.
+
+CACHED_STAGES = ("layout", "extract", "stats", "graph")
+
+# In-process progress subscribers, e.g. the eager job manager: fn(task_id, status, progress, fields)
+_progress_listeners: List[Callable[[str, str, float, Dict[str, Any]], None]] = []
+
+
+def add_progress_listener(listener: Callable[[str, str, float, Dict[str, Any]], None]):
+    _progress_listeners.append(listener)
+
+
+def _stage_version(stage: str, ctx: Dict[str, Any]) -> str:
+    """Everything besides the input that determines a stage's output."""
+    if stage == "layout":
+        from app.services.mineru_extractor import LAYOUT_VERSION
+        return LAYOUT_VERSION
+    if stage == "extract":
+        from app.services.lang_extract_engine import EXTRACTION_MODEL, FAST_EXTRACTION_MODEL, build_system_prompt
+        model = FAST_EXTRACTION_MODEL if ctx.get("fast_extraction") else EXTRACTION_MODEL
+        return content_hash(model, build_system_prompt(ctx.get("instructions")))
+    if stage == "graph":
+        from app.services.relational_engine import GRAPH_MODEL, TRIPLET_EXTRACTION_PROMPT
+        return content_hash(GRAPH_MODEL, TRIPLET_EXTRACTION_PROMPT)
+    return "v1"
+
+
+def stage_key(stage: str, input_key: str, ctx: Dict[str, Any]) -> str:
+    return content_hash(stage, _stage_version(stage, ctx), input_key)
+
+
+def _cached(ctx: Dict[str, Any], stage: str, input_key: str) -> Optional[str]:
+    """Record this stage's key and return the reference of its existing output, if any."""
+    key = ctx["keys"][stage] = stage_key(stage, input_key, ctx)
+    if stage in ctx.get("force", ()):
+        return None
+    ref = artifact_store.lookup(ctx["task_id"], stage, key)
+    if ref is not None:
+        ctx["skipped"].append(stage)
+        logger.info(f"[{ctx['task_id']}] Stage '{stage}' unchanged, reusing {ref}")
+    return ref
+
+
+def _store(ctx: Dict[str, Any], stage: str, obj: Any) -> str:
+    return artifact_store.put(ctx["task_id"], stage, ctx["keys"][stage], obj)
+
+
+def _timer(ctx: Dict[str, Any]) -> StageTimer:
+    """Stage timings kept in the job's pipeline["timings"] (stages reused from the store take no time)."""
+    return StageTimer(seconds=ctx["pipeline"].setdefault("timings", {}))
+
+
+@contextmanager
+def _measured(ctx: Dict[str, Any], stage: str):
+    """Time a stage's work and, for jobs submitted with the admin profile flag, profile it."""
+    if not ctx.get("profile"):
+        with _timer(ctx).stage(stage):
+            yield
+        return
+    profiler = SamplingProfiler(thread_ids=[threading.get_ident()]).start()
+    try:
+        with _timer(ctx).stage(stage):
+            yield
+    finally:
+        save_profile(artifact_store, ctx["task_id"], profiler.stop(), part=stage)
+
+
+def _report(task, ctx: Dict[str, Any], status: str, progress: float, **fields):
+    if not task.request.is_eager:
+        task.update_state(state="PROGRESS", meta={"status": status, "progress": progress, "job_id": ctx["task_id"]})
+    update_db_task(ctx["task_id"], status, progress, **fields)
+    for listener in _progress_listeners:
+        listener(ctx["task_id"], status, progress, fields)
+
+
+def _recorded(exc: Exception) -> Exception:
+    """Mark an exception whose outcome is already on the task row, so _guarded lets it through."""
+    exc._stage_recorded = True
+    return exc
+
+
+def _fail(task, ctx: Dict[str, Any], stage: str, exc: Exception):
+    """Record the failure and retry just this stage; earlier stages' artifacts are reused."""
+    _recorded(exc)
+    if isinstance(exc, Cancelled):
+        logger.info(f"[{ctx['task_id']}] Cancelled at stage '{stage}'")
+        update_db_task(ctx["task_id"], "CANCELLED", 0.0, error_message=f"{stage}: {exc}")
+        # The flag has done its job; a later re-analysis of this task must not see it
+        CancelToken(ctx["task_id"]).clear()
+        raise exc
+    logger.error(f"[{ctx['task_id']}] Stage '{stage}' failed: {exc}", exc_info=True)
+    # Eager retries would re-run immediately in the caller's thread; let the caller decide.
+    # A spent time budget won't come back on retry either.
+    final = task.request.is_eager or task.request.retries >= task.max_retries or isinstance(exc, DeadlineExceeded)
+    # RETRYING is not terminal, so the job keeps its scheduler slot until the retry settles
+    update_db_task(ctx["task_id"], "FAILED" if final else "RETRYING", 0.0, error_message=f"{stage}: {exc}")
+    if final:
+        raise exc
+    raise task.retry(exc=exc, countdown=60)
+
+
+def _guarded(stage: str):
+    """
+    Send whatever a stage raises outside its own _fail calls (artifact reads, file
+    I/O, bookkeeping) through _fail as well, so the job retries and then ends
+    FAILED instead of staying non-terminal until its scheduler lease runs out.
+    """
+    def decorate(fn):
+        @functools.wraps(fn)
+        def run(self, first, *args, **kwargs):
+            try:
+                return fn(self, first, *args, **kwargs)
+            except Retry:
+                raise
+            except Exception as e:
+                if getattr(e, "_stage_recorded", False):
+                    raise
+                # validate_stage receives the task id; later stages the ctx
+                _fail(self, first if isinstance(first, dict) else {"task_id": first}, stage, e)
+        return run
+    return decorate
+
+
+def _check_cancelled(task, ctx: Dict[str, Any], stage: str):
+    try:
+        CancelToken(ctx["task_id"]).check(stage)
+    except Cancelled as e:
+        _fail(task, ctx, stage, e)
+
+
+@celery_app.task(bind=True, name="pipeline.validate", max_retries=3)
+@_guarded("validate")
+def validate_stage(
+    self, task_id: str, file_path: str, user_id: str,
+    instructions: Optional[str] = None, force: Iterable[str] = (), deadline: Optional[Dict[str, Any]] = None,
+    profile: bool = False,
+) -> Dict[str, Any]:
+    from app.core.security.pdf_validator import validate_pdf
+
+    artifact_store.prune()
+    ctx = {
+        "task_id": task_id, "file_path": file_path, "user_id": user_id,
+        "instructions": instructions, "force": list(force),
+        "keys": {}, "artifacts": {}, "skipped": [], "pipeline": {},
+        "deadline": deadline or Deadline.after(JOB_BUDGET_SECONDS).to_dict(),
+        "profile": profile,
+    }
+    if profile:
+        # Stages append to the task's profile; start from an empty one
+        for name in PROFILE_FILES:
+            artifact_store.delete_file(task_id, name)
+    _check_cancelled(self, ctx, "validate")
+    _report(self, ctx, "VALIDATING", 5.0)
+    with open(file_path, "rb") as f:
+        is_valid, validation_msg = validate_pdf(f.read())
+    if not is_valid:
+        # Retrying can't fix a bad file: fail the job and stop the chain
+        update_db_task(task_id, "FAILED", 0.0, error_message=validation_msg)
+        artifact_store.delete_task(task_id)
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        raise _recorded(ValueError(validation_msg))
+    # Keep the PDF with the task's artifacts so a later re-analysis can start from it
+    ctx["file_path"] = artifact_store.adopt_source(task_id, file_path)
+    ctx["keys"]["source"] = file_hash(ctx["file_path"])
+    return ctx
+
+
+@celery_app.task(bind=True, name="pipeline.layout", max_retries=3)
+@_guarded("layout")
+def layout_stage(self, ctx: Dict[str, Any]) -> Dict[str, Any]:
+    from app.core.executors import extract_layout
+
+    _check_cancelled(self, ctx, "layout")
+    _report(self, ctx, "EXTRACTING_LAYOUT", 10.0)
+    deadline = Deadline.from_dict(ctx["deadline"])
+    ref = _cached(ctx, "layout", ctx["keys"]["source"])
+    if ref is None:
+        try:
+            deadline.check("layout")
+            with _measured(ctx, "layout"):
+                result = extract_layout(ctx["file_path"], deadline=deadline, cancel=CancelToken(ctx["task_id"]))
+        except Exception as e:
+            _fail(self, ctx, "layout", e)
+        record_layout(result.get("pdf_info"), _timer(ctx))
+        deadline.note_layout(result.get("pdf_info"))
+        if DEGRADED_LAYOUT_PAGES in deadline.degraded:
+            # A partial layout must never be reused as the full one
+            ctx["keys"]["layout"] = content_hash(ctx["keys"]["layout"], "yolo_pages", result["pdf_info"]["yolo_pages"])
+        ref = _store(ctx, "layout", result["markdown"])
+    ctx["artifacts"]["markdown"] = ref
+    ctx["deadline"] = deadline.to_dict()
+    return ctx
+
+
+@celery_app.task(bind=True, name="pipeline.extract", max_retries=3)
+@_guarded("extract")
+def extract_stage(self, ctx: Dict[str, Any]) -> Dict[str, Any]:
+    from app.services.embedding_index import chunk_index
+    from app.services.lang_extract_engine import run_lang_extract_pipeline
+
+    _check_cancelled(self, ctx, "extract")
+    _report(self, ctx, "ANALYZING", 50.0)
+    markdown = artifact_store.get(ctx["artifacts"]["markdown"])
+    ctx["pipeline"]["chars_extracted"] = len(markdown)
+    deadline = Deadline.from_dict(ctx["deadline"])
+    ref = _cached(ctx, "extract", ctx["keys"]["layout"])
+    if ref is None and deadline.use_fast_extraction():
+        # The faster model's output is keyed separately, so it never stands in for a full extraction
+        ctx["fast_extraction"] = True
+        ref = _cached(ctx, "extract", ctx["keys"]["layout"])
+    if ref is None:
+        try:
+            deadline.check("extraction")
+            with _measured(ctx, "extraction"):
+                structured_data = run_lang_extract_pipeline(
+                    clean_text=markdown, instructions=ctx.get("instructions"),
+                    fast=ctx.get("fast_extraction", False), timeout=deadline.llm_timeout(),
+                )
+        except Exception as e:
+            _fail(self, ctx, "extract", e)
+        ref = _store(ctx, "extract", structured_data.model_dump())
+    ctx["deadline"] = deadline.to_dict()
+    ctx["artifacts"]["insights"] = ref
+    paper_title = (artifact_store.get(ref).get("metadata") or {}).get("title")
+    ctx["paper_title"] = paper_title
+    _report(self, ctx, "ANALYZING", 60.0, paper_title=paper_title)
+
+    # Index the full Markdown for retrieval-augmented chat (failure doesn't crash pipeline)
+    ctx["pipeline"]["chunks_indexed"] = 0
+    try:
+        with _measured(ctx, "indexing"):
+            ctx["pipeline"]["chunks_indexed"] = chunk_index.index_paper(ctx["task_id"], markdown, title=paper_title)
+    except Exception as index_err:
+        logger.warning(f"[{ctx['task_id']}] Chunk indexing skipped: {index_err}")
+    return ctx
+
+
+@celery_app.task(bind=True, name="pipeline.stats", max_retries=3)
+@_guarded("stats")
+def stats_stage(self, ctx: Dict[str, Any]) -> Dict[str, Any]:
+    from app.services.statistical_engine import statistical_compute
+
+    _check_cancelled(self, ctx, "stats")
+    _report(self, ctx, "CRUNCHING_MATRIX", 65.0)
+    ref = _cached(ctx, "stats", ctx["keys"]["extract"])
+    if ref is None:
+        try:
+            with _measured(ctx, "statistics"):
+                df = statistical_compute.format_matrix(artifact_store.get(ctx["artifacts"]["insights"]))
+        except Exception as e:
+            _fail(self, ctx, "stats", e)
+        ref = _store(ctx, "stats", {"matrix_shape": list(df.shape) if not df.empty else [0, 0]})
+    ctx["pipeline"].update(artifact_store.get(ref))
+    return ctx
+
+
+@celery_app.task(bind=True, name="pipeline.graph", max_retries=3)
+@_guarded("graph")
+def graph_stage(self, ctx: Dict[str, Any]) -> Dict[str, Any]:
+    from app.core.graph_db import memory_manager
+    from app.services.relational_engine import relational_builder
+
+    _check_cancelled(self, ctx, "graph")
+    _report(self, ctx, "BUILDING_GRAPH", 80.0)
+    raw_json = artifact_store.get(ctx["artifacts"]["insights"])
+    paper_title = (raw_json.get("metadata") or {}).get("title", "")
+    deadline = Deadline.from_dict(ctx["deadline"])
+    ref = _cached(ctx, "graph", ctx["keys"]["extract"])
+    if ref is None and not deadline.allows_graph():
+        logger.warning(f"[{ctx['task_id']}] Knowledge graph skipped: {deadline.remaining():.0f}s left of the time budget")
+        graph = {"success": False}
+    elif ref is None:
+        try:
+            with _measured(ctx, "graph"):
+                # A cancel during the LLM call stops the merge into the shared graph
+                graph = relational_builder.build_knowledge_graph(
+                    structured_data=raw_json, timeout=deadline.llm_timeout(), cancel=CancelToken(ctx["task_id"]),
+                )
+        except Cancelled as e:
+            _fail(self, ctx, "graph", e)
+        # build_knowledge_graph reports failures instead of raising; only successes are kept for reuse
+        if graph.get("success"):
+            ctx["artifacts"]["triplets"] = _store(ctx, "graph", graph)
+    else:
+        graph = artifact_store.get(ref)
+        ctx["artifacts"]["triplets"] = ref
+        # This worker may not have seen the paper yet: load the stored triplets into its graph
+        memory_manager.add_triplets([tuple(t) for t in graph.get("triplets", [])], context={"paper": paper_title})
+    ctx["pipeline"].update({
+        "cognee_success": graph.get("success", False),
+        "graph_triplets": graph.get("triplet_count", 0),
+        "graph_nodes": graph.get("node_count", 0),
+        "graph_edges": graph.get("edge_count", 0),
+    })
+    ctx["deadline"] = deadline.to_dict()
+    return ctx
+
+
+@celery_app.task(bind=True, name="pipeline.persist", max_retries=3)
+@_guarded("persist")
+def persist_stage(self, ctx: Dict[str, Any]) -> Dict[str, Any]:
+    _check_cancelled(self, ctx, "persist")
+    raw_json = artifact_store.get(ctx["artifacts"]["insights"])
+    degraded = ctx["deadline"]["degraded"]
+    ctx["pipeline"]["degraded"] = degraded
+    profile = profile_links(ctx["task_id"]) if ctx.get("profile") else None
+    if profile:
+        ctx["pipeline"]["profile"] = profile
+    with _measured(ctx, "persist"):
+        update_db_task(
+            ctx["task_id"], "COMPLETE", 100.0, result_data=raw_json,
+            skipped_stages=ctx["skipped"], degraded=degraded, profile=profile,
+        )
+    ctx["pipeline"]["timings"] = _timer(ctx).to_dict()
+    if not self.request.is_eager:
+        self.update_state(state="SUCCESS", meta={"status": "COMPLETE", "progress": 100, "job_id": ctx["task_id"]})
+    logger.info(
+        f"Job {ctx['task_id']} completed successfully"
+        + (f" (reused: {', '.join(ctx['skipped'])})" if ctx["skipped"] else "")
+        + (f" (degraded: {', '.join(degraded)})" if degraded else "")
+    )
+    return {
+        "status": "COMPLETE",
+        "task_id": ctx["task_id"],
+        "paper_title": ctx.get("paper_title"),
+        "pipeline": ctx["pipeline"],
+        "skipped_stages": ctx["skipped"],
+        "degraded": degraded,
+        "artifacts": ctx["artifacts"],
+    }
+
+
+def build_pipeline(
+    task_id: str, file_path: str, user_id: str,
+    instructions: Optional[str] = None, force: Iterable[str] = (), budget_seconds: Optional[float] = None,
+    profile: bool = False,
+):
+    """
+    The full staged pipeline as one Celery chain (not yet sent).
+
+    Args:
+        instructions: Extra extraction guidance (re-analysis); changes the extract key.
+        force: Stages to recompute even if their inputs are unchanged.
+        budget_seconds: Time budget from now (JOB_BUDGET_SECONDS by default).
+        profile: Profile every stage (admin flag); linked from pipeline["profile"] and the task row.
+    """
+    deadline = Deadline.after(budget_seconds or JOB_BUDGET_SECONDS)
+    return chain(
+        validate_stage.si(
+            task_id, file_path, user_id, instructions, list(force), deadline.to_dict(), profile,
+        ).set(queue=CPU_QUEUE),
+        layout_stage.s().set(queue=CPU_QUEUE),
+        extract_stage.s().set(queue=IO_QUEUE),
+        stats_stage.s().set(queue=IO_QUEUE),
+        graph_stage.s().set(queue=IO_QUEUE),
+        persist_stage.s().set(queue=IO_QUEUE),
+    )
+
+
+def start_pipeline(
+    task_id: str, file_path: str, user_id: str,
+    instructions: Optional[str] = None, force: Iterable[str] = (), budget_seconds: Optional[float] = None,
+    profile: bool = False,
+):
+    """Enqueue the staged pipeline for one spooled PDF (or a task's kept source, when re-analyzing)."""
+    return build_pipeline(task_id, file_path, user_id, instructions, force, budget_seconds, profile).apply_async()
@@ -1,13 +1,17 @@
 import os
 import logging
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from pydantic import BaseModel, Field
 from dotenv import load_dotenv
 
 from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain_core.callbacks import UsageMetadataCallbackHandler
 from langchain_core.messages import SystemMessage, HumanMessage
 
+from app.core.cancellation import Cancelled
 from app.core.graph_db import memory_manager
+from app.core.instrumentation import record_llm_usage
+from app.core.serialization import dumps_str
 
 logger = logging.getLogger(__name__)
 
@@ -53,6 +57,9 @@ RULES:
 """
 
 
+GRAPH_MODEL = "gemini-2.5-flash"
+
+
 class RelationalEngine:
     """
     Path B of the Dual-Engine Analytics.
@@ -73,16 +80,22 @@ class RelationalEngine:
                 raise ValueError("GEMINI_API_KEY or GOOGLE_API_KEY not found in environment.")
         return self._api_key
 
-    def build_knowledge_graph(self, structured_data: Dict[str, Any]) -> Dict[str, Any]:
+    def build_knowledge_graph(self, structured_data: Dict[str, Any], timeout: Optional[float] = None,
+                              cancel=None) -> Dict[str, Any]:
         """
         Extracts triplets from the already-structured LangExtract JSON using a
         single Gemini LLM call, then loads them into the NetworkX graph.
 
         Args:
             structured_data: The raw dict from ExtractedInsights.model_dump()
+            timeout: Seconds before the Gemini call is abandoned (job deadline)
+            cancel: Optional CancelToken, checked before the triplets are merged into the shared graph
 
         Returns:
             Dict with graph stats: {success, node_count, edge_count, triplet_count}
+
+        Raises:
+            Cancelled: The analysis was cancelled during the LLM call; nothing was merged.
         """
         try:
             api_key = self._get_api_key()
@@ -92,15 +105,15 @@ class RelationalEngine:
 
             # Initialize Gemini with structured output
             llm = ChatGoogleGenerativeAI(
-                model="gemini-2.5-flash",
+                model=GRAPH_MODEL,
                 google_api_key=api_key,
+                timeout=timeout,
                 temperature=0.0,  # Deterministic extraction
             )
             structured_llm = llm.with_structured_output(KnowledgeGraph)
 
             # Build the prompt with the structured data
-            import json
-            data_str = json.dumps(structured_data, indent=2, default=str)
+            data_str = dumps_str(structured_data, pretty=True)
 
             messages = [
                 SystemMessage(content=TRIPLET_EXTRACTION_PROMPT),
@@ -108,16 +121,17 @@ class RelationalEngine:
             ]
 
             # Single LLM call → structured triplets
-            kg: KnowledgeGraph = structured_llm.invoke(messages)
-
-            # Load triplets into NetworkX graph
-            for triplet in kg.triplets:
-                memory_manager.add_triplet(
-                    subject=triplet.subject,
-                    predicate=triplet.predicate,
-                    object_target=triplet.object,
-                    context={"paper": paper_title}
-                )
+            usage = UsageMetadataCallbackHandler()
+            kg: KnowledgeGraph = structured_llm.invoke(messages, config={"callbacks": [usage]})
+            record_llm_usage("graph", usage.usage_metadata)
+            if cancel is not None:
+                cancel.check("graph merge")
+
+            # Load triplets into NetworkX graph as one atomic batch (one snapshot per paper)
+            memory_manager.add_triplets(
+                [(t.subject, t.predicate, t.object) for t in kg.triplets],
+                context={"paper": paper_title},
+            )
 
             graph_stats = memory_manager.get_graph_summary()
             logger.info(
@@ -135,8 +149,11 @@ class RelationalEngine:
                     {"subject": t.subject, "predicate": t.predicate, "object": t.object}
                     for t in kg.triplets[:5]
                 ],
+                "triplets": [[t.subject, t.predicate, t.object] for t in kg.triplets],
             }
 
+        except Cancelled:
+            raise
         except Exception as e:
             logger.error(f"Knowledge graph extraction failed for paper: {e}", exc_info=True)
             return {"success": False, "error": str(e), "triplet_count": 0, "node_count": 0, "edge_count": 0}
@@ -0,0 +1,144 @@
+import atexit
+import logging
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import update
+
+from app.core.database import SessionLocal, database_available
+from app.core.metrics import metrics
+from app.core.payload_codec import encode_payload
+from app.core.progress_channel import TERMINAL_STATUSES, progress_channel
+from app.models.task import ExtractionTask
+
+logger = logging.getLogger(__name__)
+
+# Non-terminal progress reaches the ExtractionTask row at most this often (per process)
+PROGRESS_SNAPSHOT_SECONDS = float(os.getenv("PROGRESS_SNAPSHOT_SECONDS", "5"))
+
+_rows_written = metrics.counter("job_progress_rows_written_total", "ExtractionTask rows updated from job progress, by kind")
+_flush_size = metrics.histogram(
+    "job_progress_flush_rows", "ExtractionTask rows per batched progress UPDATE",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+
+
+class TaskProgressRecorder:
+    """
+    Front door for job progress from pipeline stages.
+
+    Every transition goes to the progress channel (one Redis round-trip). The
+    ExtractionTask row only gets terminal states, results and skipped stages
+    right away; other transitions mark the job dirty, and a background thread
+    writes the latest state of all dirty jobs every `snapshot_interval` seconds
+    in one batched UPDATE. Snapshots never overwrite a terminal row, whichever
+    process wrote it; only a `restart` (a re-analysis) takes a finished row
+    back to a running state.
+    """
+
+    def __init__(self, snapshot_interval: float = PROGRESS_SNAPSHOT_SECONDS):
+        self.snapshot_interval = snapshot_interval
+        self._lock = threading.Lock()
+        self._dirty: set = set()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        atexit.register(self.flush)
+
+    def record(
+        self, task_id: str, status: str, progress: float, error_message: str = None,
+        paper_title: str = None, result_data: dict = None, skipped_stages: list = None, degraded: list = None,
+        profile: dict = None, restart: bool = False,
+    ):
+        event = progress_channel.publish(
+            task_id, status, progress,
+            error_message=error_message, paper_title=paper_title, skipped_stages=skipped_stages, degraded=degraded,
+            profile=profile,
+        )
+        if status in TERMINAL_STATUSES or result_data is not None or restart:
+            row = {"id": task_id, "status": status, "progress": progress}
+            for name in ("error_message", "paper_title", "skipped_stages", "degraded", "profile"):
+                if event.get(name) is not None:
+                    row[name] = event[name]
+            if result_data:
+                row["result_blob"] = encode_payload(result_data)
+                row["result_data"] = None
+            self.flush(immediate=[row])
+            return
+        with self._lock:
+            self._dirty.add(task_id)
+        self._ensure_thread()
+
+    # ── Flushing ─────────────────────────────────────────────────────────────
+
+    def _ensure_thread(self):
+        # Started lazily and per process: prefork workers don't inherit the parent's thread
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="task-progress-flusher", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.snapshot_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def flush(self, immediate: Optional[List[Dict[str, Any]]] = None):
+        """
+        Write every dirty job's latest live state, plus `immediate` rows (terminal
+        states, results, restarts), in one transaction.
+        """
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+        immediate = immediate or []
+        dirty -= {row["id"] for row in immediate}
+        if not (dirty or immediate) or not database_available():
+            return
+
+        snapshots = []
+        for task_id, state in progress_channel.get_many(dirty).items():
+            # The job has finished; its terminal write owns the row
+            if state["status"] in TERMINAL_STATUSES:
+                continue
+            row = {"id": task_id, "status": state["status"], "progress": state["progress"]}
+            for name in ("error_message", "paper_title"):
+                if state.get(name) is not None:
+                    row[name] = state[name]
+            snapshots.append(row)
+
+        # The job may still finish (here or in another worker) between get_many and the
+        # commit, so snapshots only apply to rows that are not terminal by then
+        live_only = (
+            update(ExtractionTask)
+            .where(ExtractionTask.status.notin_(TERMINAL_STATUSES))
+            .execution_options(synchronize_session=None)
+        )
+        try:
+            with SessionLocal() as db:
+                # Rows with the same columns go out as one executemany UPDATE ... WHERE id = ?
+                for rows in _group_by_columns(snapshots):
+                    db.execute(live_only, rows)
+                for rows in _group_by_columns(immediate):
+                    db.execute(update(ExtractionTask), rows)
+                db.commit()
+            _flush_size.observe(len(snapshots) + len(immediate))
+            _rows_written.inc(len(snapshots), kind="snapshot")
+            _rows_written.inc(len(immediate), kind="terminal")
+        except Exception as e:
+            logger.error(f"Failed to write progress for {len(snapshots) + len(immediate)} task(s): {e}")
+
+
+def _group_by_columns(rows: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+    groups: Dict[tuple, List[Dict[str, Any]]] = {}
+    for row in rows:
+        groups.setdefault(tuple(sorted(row)), []).append(row)
+    return list(groups.values())
+
+
+task_progress = TaskProgressRecorder()
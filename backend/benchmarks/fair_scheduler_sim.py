@@ -0,0 +1,156 @@
+"""
+Fair scheduler simulation: per-tenant queue wait under skewed load, one FIFO
+queue (the old single Celery queue) vs. the weighted fair scheduler.
+
+Default scenario: one tenant bulk-uploads 500 papers at t=0 while five other
+tenants submit single interactive uploads every few minutes. Runs on a virtual
+clock, so a simulated day takes well under a second.
+
+    cd backend && python -m benchmarks.fair_scheduler_sim --bulk-jobs 500 --workers 8
+"""
+import argparse
+import heapq
+import json
+import random
+import statistics
+from collections import deque
+from typing import Dict, List, Tuple
+
+from app.core.fair_scheduler import FairScheduler, MemoryTenantSlots
+
+
+def make_workload(rng: random.Random, bulk_jobs: int, light_tenants: int, light_jobs: int,
+                  light_interval: float, service_mean: float) -> List[Tuple[float, str, str, float]]:
+    """(arrival time, tenant, priority, service seconds), sorted by arrival."""
+    jobs = [(0.0, "bulk-tenant", "bulk", rng.expovariate(1 / service_mean)) for _ in range(bulk_jobs)]
+    for t in range(light_tenants):
+        arrival = rng.uniform(0, light_interval)
+        for _ in range(light_jobs):
+            jobs.append((arrival, f"tenant-{t}", "interactive", rng.expovariate(1 / service_mean)))
+            arrival += rng.expovariate(1 / light_interval)
+    return sorted(jobs, key=lambda job: job[0])
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def simulate(workload, workers: int, policy: str, tenant_cap: int) -> Tuple[Dict[str, List[float]], float]:
+    """Run the workload; returns the queue waits (seconds) observed per tenant and the makespan."""
+    clock = Clock()
+    waits: Dict[str, List[float]] = {}
+    completions: List[Tuple[float, str]] = []  # heap of (finish time, job id)
+    service: Dict[str, float] = {}
+    arrived_at: Dict[str, float] = {}
+
+    def start(job_id: str, tenant: str):
+        waits.setdefault(tenant, []).append(clock.now - arrived_at[job_id])
+        heapq.heappush(completions, (clock.now + service[job_id], job_id))
+
+    if policy == "fifo":
+        fifo = deque()
+        running = 0
+
+        def submit(job_id, tenant, priority):
+            fifo.append((job_id, tenant))
+
+        def release(job_id):
+            nonlocal running
+            running -= 1
+
+        def pump():
+            nonlocal running
+            while fifo and running < workers:
+                job_id, tenant = fifo.popleft()
+                running += 1
+                start(job_id, tenant)
+    else:
+        scheduler = FairScheduler(
+            lambda job: start(job.job_id, job.tenant),
+            slots=MemoryTenantSlots(clock), tenant_cap=tenant_cap, max_dispatched=workers,
+            tenant_weights={}, priority_weights={"interactive": 8.0, "bulk": 1.0}, clock=clock,
+        )
+
+        def submit(job_id, tenant, priority):
+            scheduler.enqueue(job_id, tenant, priority)
+
+        release = scheduler.release
+        pump = scheduler.pump
+
+    pending = deque(workload)
+    next_id = 0
+    while pending or completions:
+        next_arrival = pending[0][0] if pending else float("inf")
+        next_completion = completions[0][0] if completions else float("inf")
+        if next_arrival <= next_completion:
+            clock.now, tenant, priority, seconds = pending.popleft()
+            job_id = f"job-{next_id}"
+            next_id += 1
+            service[job_id] = seconds
+            arrived_at[job_id] = clock.now
+            submit(job_id, tenant, priority)
+        else:
+            clock.now, job_id = heapq.heappop(completions)
+            release(job_id)
+        pump()
+    return waits, clock.now
+
+
+def summarize(waits: Dict[str, List[float]]) -> Dict[str, Dict[str, float]]:
+    summary = {}
+    for tenant, values in sorted(waits.items()):
+        values = sorted(values)
+        summary[tenant] = {
+            "jobs": len(values),
+            "mean_wait_s": round(statistics.fmean(values), 1),
+            "p95_wait_s": round(values[min(len(values) - 1, int(0.95 * len(values)))], 1),
+            "max_wait_s": round(values[-1], 1),
+        }
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bulk-jobs", type=int, default=500)
+    parser.add_argument("--light-tenants", type=int, default=5)
+    parser.add_argument("--light-jobs", type=int, default=10, help="Interactive uploads per light tenant")
+    parser.add_argument("--light-interval", type=float, default=300.0, help="Mean seconds between a light tenant's uploads")
+    parser.add_argument("--service-mean", type=float, default=90.0, help="Mean seconds of worker time per paper")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--tenant-cap", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    workload = make_workload(
+        random.Random(args.seed), args.bulk_jobs, args.light_tenants, args.light_jobs,
+        args.light_interval, args.service_mean,
+    )
+    busy_seconds = sum(job[3] for job in workload)
+    results = {}
+    for policy in ("fifo", "fair"):
+        waits, makespan = simulate(workload, args.workers, policy, args.tenant_cap)
+        results[policy] = {
+            "makespan_s": round(makespan, 1),
+            # The tenant cap trades some utilization for isolation when only one tenant has work
+            "worker_utilization": round(busy_seconds / (args.workers * makespan), 3),
+            "tenants": summarize(waits),
+        }
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{len(workload)} jobs, {args.workers} workers, tenant cap {args.tenant_cap}")
+    for policy, result in results.items():
+        print(f"\n{policy.upper()}  makespan {result['makespan_s']:.0f}s, worker utilization {result['worker_utilization']:.0%}")
+        print(f"  {'tenant':<14}{'jobs':>6}{'mean wait':>12}{'p95 wait':>12}{'max wait':>12}")
+        for tenant, row in result["tenants"].items():
+            print(f"  {tenant:<14}{row['jobs']:>6}{row['mean_wait_s']:>11.1f}s{row['p95_wait_s']:>11.1f}s{row['max_wait_s']:>11.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+History store benchmark: list / get / insert latency at N entries, SQLite store
+vs. the legacy rewrite-the-whole-file history.json.
+
+    cd backend && python -m benchmarks.history_store_bench --entries 10000
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import threading
+
+from app.core.history_store import HistoryStore, HistoryWriter, encode_cursor
+from app.core.metrics import metrics
+
+
+def make_entry(i: int) -> dict:
+    """A history entry shaped like a real upload: ~10 KB of extracted_data plus a small graph."""
+    analyzed_at = datetime(2024, 1, 1, tzinfo=timezone.utc) + timedelta(minutes=i)
+    return {
+        "id": str(uuid.UUID(int=i)),
+        "filename": f"paper_{i}.pdf",
+        "title": f"Synthetic Paper {i}",
+        "authors": [f"Author {i % 97}", f"Author {i % 89}"],
+        "analyzed_at": analyzed_at.isoformat(),
+        "pipeline": {"dla_engine": "MinerU", "pages": 12, "chunks_indexed": 24},
+        "extracted_data": {
+            "metadata": {"title": f"Synthetic Paper {i}", "abstract": "lorem ipsum " * 200,
+                         "authors": [{"name": f"Author {i % 97}"}], "publication_year": 2000 + i % 25},
+            "methodologies": [{"datasets": [f"DS{i % 50}"], "base_models": [f"M{i % 30}"],
+                               "metrics": ["accuracy", "f1"], "optimization": "AdamW"}] * 4,
+            "limitations": [{"description": "limited evaluation " * 10}] * 5,
+            "contradictions": [],
+        },
+        "graph_data": {
+            "nodes": [{"id": f"n{j}", "label": f"n{j}", "group": 1} for j in range(30)],
+            "edges": [{"source": f"n{j}", "target": f"n{j + 1}", "label": "uses"} for j in range(29)],
+        },
+    }
+
+
+def timed(fn, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return {"p50_ms": round(statistics.median(samples), 3), "max_ms": round(max(samples), 3)}
+
+
+def bench_sqlite(entries, workdir: str, repeat: int) -> dict:
+    store = HistoryStore(os.path.join(workdir, "history.db"))
+    start = time.perf_counter()
+    store.insert_many(entries)
+    bulk_ms = (time.perf_counter() - start) * 1000
+
+    probe = entries[len(entries) // 2]["id"]
+    # Cursor pointing ~90% of the way down the newest-first listing
+    deep = entries[len(entries) // 10]
+    deep_cursor = encode_cursor(deep["analyzed_at"], deep["id"])
+    extra = iter(make_entry(len(entries) + k) for k in range(repeat))
+    results = {
+        "bulk_load_ms": round(bulk_ms, 1),
+        "list_all": timed(store.list_summaries, repeat),
+        "list_page": timed(lambda: store.list_page(limit=50), repeat),
+        "list_page_deep": timed(lambda: store.list_page(limit=50, cursor=deep_cursor), repeat),
+        "list_page_projected": timed(lambda: store.list_page(limit=50, fields=["title", "analyzed_at"]), repeat),
+        "get": timed(lambda: store.get(probe), repeat),
+        "latest_graph": timed(store.latest_graph, repeat),
+        "insert": timed(lambda: store.insert(next(extra)), repeat),
+    }
+    store.close()
+    return results
+
+
+def bench_concurrent_writes(workdir: str, writers: int = 8, per_writer: int = 50) -> dict:
+    """Concurrent uploads finishing together: one commit per insert vs. the coalescing writer."""
+    report = {}
+    for mode in ("direct", "coalesced"):
+        store = HistoryStore(os.path.join(workdir, f"concurrent_{mode}.db"))
+        writer = HistoryWriter(store) if mode == "coalesced" else None
+        commits = metrics.histogram("history_commit_seconds")
+        before = sum(s["count"] for s in commits.snapshot().values())
+
+        def work(w: int):
+            futures = []
+            for i in range(per_writer):
+                entry = make_entry(w * per_writer + i)
+                if writer is None:
+                    store.insert(entry)
+                else:
+                    futures.append(writer.insert(entry))
+            for f in futures:
+                f.result()
+
+        start = time.perf_counter()
+        threads = [threading.Thread(target=work, args=(w,)) for w in range(writers)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+        if writer is not None:
+            writer.close()
+        report[mode] = {
+            "inserts": store.count(),
+            "commits": sum(s["count"] for s in commits.snapshot().values()) - before,
+            "inserts_per_s": round(writers * per_writer / elapsed, 1),
+        }
+        store.close()
+    return report
+
+
+def bench_json(entries, workdir: str, repeat: int) -> dict:
+    """Replicates the old _load_history/_save_history behaviour."""
+    path = os.path.join(workdir, "history.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(entries, f, indent=2, default=str)
+
+    def load():
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def insert():
+        history = load()
+        history.insert(0, make_entry(len(history)))
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(history, f, indent=2, default=str)
+
+    probe = entries[len(entries) // 2]["id"]
+    return {
+        "file_mb": round(os.path.getsize(path) / 1e6, 1),
+        "list": timed(load, repeat),
+        "get": timed(lambda: next(e for e in load() if e["id"] == probe), repeat),
+        "insert": timed(insert, repeat),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--skip-json", action="store_true", help="skip the (slow) legacy JSON baseline")
+    args = parser.parse_args()
+
+    entries = [make_entry(i) for i in range(args.entries)]
+    with tempfile.TemporaryDirectory() as workdir:
+        report = {"entries": args.entries, "sqlite": bench_sqlite(entries, workdir, args.repeat),
+                  "concurrent_writes": bench_concurrent_writes(workdir)}
+        if not args.skip_json:
+            report["json"] = bench_json(entries, workdir, max(1, args.repeat // 10))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
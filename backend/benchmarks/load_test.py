@@ -0,0 +1,399 @@
+"""
+HTTP load test: replays a weighted mix of API routes at a series of target
+rates (open loop, Poisson arrivals) and reports latency percentiles,
+throughput and errors per route at each rate, i.e. a scaling curve, plus the
+rate at which each route first saturates.
+
+The server is the real app with offline models (benchmarks.offline_app), run
+in this process on a uvicorn thread, as a `uvicorn --workers N` subprocess
+(like the api-gateway container), or an already running deployment via --url:
+
+    cd backend && python -m benchmarks.load_test --rates 2,5,10,20 --duration 30
+    cd backend && python -m benchmarks.load_test --server uvicorn --workers 2 --mix upload=1,chat=2,history=10,graph=5
+    cd backend && python -m benchmarks.load_test --url http://localhost:8000 --mix history=1 --rates 50,100,200
+
+Uploads and jobs are real analyses: they land in the server's history and are
+deleted again at the end (unless --keep). A server this script starts keeps its
+history, artifacts and LanceDB tables in a temporary data directory, never the
+real one; --keep leaves that directory in place.
+"""
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+
+from app.core.serialization import dumps_str
+from benchmarks.pipeline_bench import environment
+from benchmarks.synthetic_papers import DATASETS, make_paper
+
+ROUTES = ("upload", "job_submit", "job_status", "chat", "chat_stream", "history", "history_entry", "graph", "search")
+DEFAULT_MIX = "upload=1,job_submit=1,job_status=4,chat=2,chat_stream=2,history=10,history_entry=5,graph=5,search=3"
+QUESTIONS = [
+    "What datasets does the paper evaluate on?",
+    "Which base models are compared?",
+    "What are the main limitations?",
+    "Which optimizer is used and why?",
+    "Summarize the methodology in two sentences.",
+    "Which metrics improve the most?",
+]
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ROUTES:
+            raise SystemExit(f"Unknown route '{name}', expected one of {', '.join(ROUTES)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def percentile(sorted_values: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, int(round(q / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+# ── Server ───────────────────────────────────────────────────────────────────
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class Server:
+    """The API under test: in this process (uvicorn on a thread), a uvicorn subprocess, or an external URL."""
+
+    def __init__(self, mode: str, workers: int, url: Optional[str], llm_ms: float, detect_ms: float,
+                 keep: bool = False):
+        self.mode = "external" if url else mode
+        self.workers = workers
+        self.url = url
+        self.keep = keep
+        self.env = {"LOADTEST_LLM_MS": str(llm_ms), "LOADTEST_DETECT_MS": str(detect_ms)}
+        self.data_dir: Optional[str] = None
+        if self.mode != "external":
+            # Everything the server writes goes here rather than into the developer's data directory
+            self.data_dir = tempfile.mkdtemp(prefix="paper-analyzer-loadtest-")
+            self.env.update({
+                "DATA_DIR": self.data_dir,
+                "ARTIFACT_DIR": os.path.join(self.data_dir, "artifacts"),
+                "CANCEL_DIR": os.path.join(self.data_dir, "cancel"),
+                "LANCEDB_DIR": os.path.join(self.data_dir, "lancedb"),
+            })
+        self._process: Optional[subprocess.Popen] = None
+        self._uvicorn = None
+
+    def start(self) -> str:
+        if self.mode == "external":
+            return self.url.rstrip("/")
+        port = _free_port()
+        self.url = f"http://127.0.0.1:{port}"
+        if self.mode == "inprocess":
+            import uvicorn
+
+            os.environ.update(self.env)
+            from benchmarks.offline_app import app
+
+            self._uvicorn = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+            threading.Thread(target=self._uvicorn.run, name="loadtest-server", daemon=True).start()
+        else:
+            self._process = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "benchmarks.offline_app:app", "--host", "127.0.0.1",
+                 "--port", str(port), "--workers", str(self.workers), "--log-level", "warning"],
+                cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))), env={**os.environ, **self.env},
+            )
+        self._wait_ready()
+        return self.url
+
+    def _wait_ready(self, timeout: float = 120.0):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self._process is not None and self._process.poll() is not None:
+                raise SystemExit(f"Server exited with code {self._process.returncode}")
+            try:
+                if httpx.get(f"{self.url}/metrics", timeout=2).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.25)
+        raise SystemExit(f"Server at {self.url} not ready after {timeout:.0f}s")
+
+    def describe(self) -> Dict[str, Any]:
+        return {"mode": self.mode, "url": self.url, "workers": self.workers if self.mode == "uvicorn" else 1, **self.env}
+
+    def stop(self):
+        if self._uvicorn is not None:
+            self._uvicorn.should_exit = True
+        if self._process is not None:
+            self._process.terminate()
+            try:
+                self._process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+        if self.data_dir and not self.keep:
+            shutil.rmtree(self.data_dir, ignore_errors=True)
+
+
+# ── Workload ─────────────────────────────────────────────────────────────────
+
+class Workload:
+    """Builds one request per route and remembers what it created (for reads and cleanup)."""
+
+    def __init__(self, client: httpx.AsyncClient, rng: random.Random, upload_pages: int):
+        self.client = client
+        self.rng = rng
+        self.papers = [make_paper(upload_pages, seed=seed).pdf_bytes for seed in range(4)]
+        self.analysis_ids: List[str] = []
+        self.job_ids: List[str] = []
+
+    def _pdf(self):
+        return {"file": ("loadtest.pdf", self.rng.choice(self.papers), "application/pdf")}
+
+    def _analysis_id(self) -> Optional[str]:
+        return self.rng.choice(self.analysis_ids) if self.analysis_ids else None
+
+    async def upload(self) -> httpx.Response:
+        response = await self.client.post("/api/v1/upload", files=self._pdf())
+        if response.status_code == 200:
+            self.analysis_ids.append(response.json()["id"])
+        return response
+
+    async def job_submit(self) -> httpx.Response:
+        response = await self.client.post("/api/v1/jobs", files=self._pdf(), data={"user_id": f"tenant-{self.rng.randrange(5)}"})
+        if response.status_code == 202:
+            self.job_ids.append(response.json()["job_id"])
+        return response
+
+    async def job_status(self) -> httpx.Response:
+        job_id = self.rng.choice(self.job_ids) if self.job_ids else "unknown"
+        return await self.client.get(f"/api/v1/jobs/{job_id}")
+
+    def _chat_body(self) -> Dict[str, Any]:
+        return {"message": self.rng.choice(QUESTIONS), "analysis_id": self._analysis_id()}
+
+    async def chat(self) -> httpx.Response:
+        return await self.client.post("/api/v1/chat", json=self._chat_body())
+
+    async def chat_stream(self) -> httpx.Response:
+        async with self.client.stream("POST", "/api/v1/chat/stream", json=self._chat_body()) as response:
+            body = b"".join([chunk async for chunk in response.aiter_bytes()])
+        if b"event: error" in body:
+            # The stream started fine but generation failed: count it like a server error
+            response.status_code = 502
+        return response
+
+    async def history(self) -> httpx.Response:
+        return await self.client.get("/api/v1/history", params={"limit": 50})
+
+    async def history_entry(self) -> httpx.Response:
+        return await self.client.get(f"/api/v1/history/{self._analysis_id() or 'unknown'}")
+
+    async def graph(self) -> httpx.Response:
+        return await self.client.get("/api/v1/graph")
+
+    async def search(self) -> httpx.Response:
+        return await self.client.get("/api/v1/search", params={"datasets": self.rng.choice(DATASETS)})
+
+    async def seed(self, papers: int):
+        """Analyses (and a job) for the read routes to find before measuring starts."""
+        for _ in range(papers):
+            response = await self.upload()
+            if response.status_code != 200:
+                raise SystemExit(f"Seeding upload failed: {response.status_code} {response.text[:200]}")
+        await self.job_submit()
+
+    async def drain_jobs(self, timeout: float):
+        """Wait for submitted jobs to finish so their history entries exist before cleanup."""
+        pending = list(self.job_ids)
+        deadline = time.monotonic() + timeout
+        while pending and time.monotonic() < deadline:
+            response = await self.client.get("/api/v1/jobs", params={"ids": ",".join(pending[:100])})
+            done = {job["id"] for job in response.json().get("jobs", [])
+                    if job["status"] in ("COMPLETE", "FAILED", "CANCELLED")} if response.status_code == 200 else set()
+            pending = [job_id for job_id in pending if job_id not in done]
+            if pending:
+                await asyncio.sleep(1)
+
+    async def cleanup(self):
+        for analysis_id in dict.fromkeys(self.analysis_ids + self.job_ids):
+            try:
+                await self.client.delete(f"/api/v1/history/{analysis_id}")
+            except httpx.HTTPError:
+                pass
+
+
+class RouteStats:
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.statuses: Counter = Counter()
+        self.sent = 0
+        self.dropped = 0
+
+    def record(self, seconds: float, outcome: str):
+        self.latencies.append(seconds)
+        self.statuses[outcome] += 1
+
+    def summary(self, duration: float) -> Dict[str, Any]:
+        latencies = sorted(self.latencies)
+        completed = len(latencies)
+        errors = sum(count for outcome, count in self.statuses.items() if not outcome.startswith(("2", "3")))
+        ms = lambda value: round(value * 1000, 1) if value is not None else None  # noqa: E731
+        return {
+            "sent": self.sent,
+            "completed": completed,
+            "dropped": self.dropped,
+            "errors": errors,
+            "error_rate": round(errors / completed, 4) if completed else None,
+            "throughput_rps": round((completed - errors) / duration, 2),
+            "p50_ms": ms(percentile(latencies, 50)),
+            "p95_ms": ms(percentile(latencies, 95)),
+            "p99_ms": ms(percentile(latencies, 99)),
+            "statuses": dict(self.statuses),
+        }
+
+
+async def run_step(workload: Workload, mix: Dict[str, float], rate: float, duration: float,
+                   max_inflight: int, rng: random.Random) -> Dict[str, Any]:
+    """Open loop: requests start on a Poisson schedule whether or not earlier ones have finished."""
+    stats = {route: RouteStats() for route in mix}
+    routes, weights = list(mix), list(mix.values())
+    inflight: set = set()
+
+    async def fire(route: str, send: Callable):
+        started = time.perf_counter()
+        try:
+            response = await send()
+            outcome = str(response.status_code)
+        except httpx.TimeoutException:
+            outcome = "timeout"
+        except httpx.HTTPError as e:
+            outcome = type(e).__name__
+        stats[route].record(time.perf_counter() - started, outcome)
+
+    started = time.perf_counter()
+    next_at = started
+    while True:
+        next_at += rng.expovariate(rate)
+        if next_at - started >= duration:
+            break
+        await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+        route = rng.choices(routes, weights)[0]
+        stats[route].sent += 1
+        if len(inflight) >= max_inflight:
+            # The client itself is saturated; past this point latencies would understate the backlog
+            stats[route].dropped += 1
+            continue
+        task = asyncio.create_task(fire(route, getattr(workload, route)))
+        inflight.add(task)
+        task.add_done_callback(inflight.discard)
+    if inflight:
+        await asyncio.wait(list(inflight))
+    elapsed = time.perf_counter() - started
+    routes_report = {route: route_stats.summary(elapsed) for route, route_stats in stats.items()}
+    return {
+        "target_rps": rate,
+        "achieved_rps": round(sum(s["completed"] for s in routes_report.values()) / elapsed, 2),
+        "elapsed_s": round(elapsed, 1),
+        "routes": routes_report,
+    }
+
+
+def saturation(steps: List[Dict[str, Any]], slo_ms: float, max_error_rate: float) -> Dict[str, Optional[float]]:
+    """Per route, the first target rate at which p95 exceeded the SLO, errors exceeded the limit or requests were dropped."""
+    first: Dict[str, Optional[float]] = {}
+    for step in steps:
+        for route, result in step["routes"].items():
+            first.setdefault(route, None)
+            if first[route] is not None or not result["sent"]:
+                continue
+            if (result["dropped"] or (result["p95_ms"] or 0) > slo_ms
+                    or (result["error_rate"] or 0) > max_error_rate):
+                first[route] = step["target_rps"]
+    return first
+
+
+async def run(args, base_url: str) -> Dict[str, Any]:
+    rng = random.Random(args.seed)
+    mix = parse_mix(args.mix)
+    limits = httpx.Limits(max_connections=args.max_inflight, max_keepalive_connections=args.max_inflight)
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        workload = Workload(client, rng, args.upload_pages)
+        await workload.seed(args.seed_papers)
+        steps = []
+        for rate in (float(r) for r in args.rates.split(",") if r.strip()):
+            step = await run_step(workload, mix, rate, args.duration, args.max_inflight, rng)
+            steps.append(step)
+            print(f"{rate:g} req/s: achieved {step['achieved_rps']:g} req/s, "
+                  + ", ".join(f"{route} p95 {r['p95_ms']} ms" for route, r in step["routes"].items() if r["completed"]),
+                  file=sys.stderr)
+        if not args.keep:
+            await workload.drain_jobs(args.timeout)
+            await workload.cleanup()
+    saturated = saturation(steps, args.slo_ms, args.max_error_rate)
+    ordered = sorted((rate, route) for route, rate in saturated.items() if rate is not None)
+    return {
+        "mix": mix,
+        "settings": {
+            "duration_s": args.duration, "max_inflight": args.max_inflight, "timeout_s": args.timeout,
+            "slo_p95_ms": args.slo_ms, "max_error_rate": args.max_error_rate, "upload_pages": args.upload_pages,
+        },
+        "steps": steps,
+        "saturated_at_rps": saturated,
+        "first_saturated": ordered[0][1] if ordered else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--server", choices=("inprocess", "uvicorn"), default="inprocess")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes (--server uvicorn)")
+    parser.add_argument("--url", help="load an already running server instead (no offline stand-ins)")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="route=weight,... from: " + ", ".join(ROUTES))
+    parser.add_argument("--rates", default="2,5,10,20", help="target request rates (req/s), one step each")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds per step")
+    parser.add_argument("--max-inflight", type=int, default=256)
+    parser.add_argument("--timeout", type=float, default=120.0, help="per-request timeout (s)")
+    parser.add_argument("--slo-ms", type=float, default=2000.0, help="p95 beyond which a route counts as saturated")
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--llm-ms", type=float, default=500.0, help="offline LLM call time")
+    parser.add_argument("--detect-ms", type=float, default=50.0, help="offline layout inference time per page")
+    parser.add_argument("--upload-pages", type=int, default=4)
+    parser.add_argument("--seed-papers", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--keep", action="store_true", help="keep the analyses the run created (and a started server's data directory)")
+    parser.add_argument("--output", help="write the JSON report here (default: stdout)")
+    args = parser.parse_args()
+
+    server = Server(args.server, args.workers, args.url, args.llm_ms, args.detect_ms, keep=args.keep)
+    base_url = server.start()
+    try:
+        report = {"environment": environment(), "server": server.describe(), **asyncio.run(run(args, base_url))}
+    finally:
+        server.stop()
+
+    output = dumps_str(report, pretty=True)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
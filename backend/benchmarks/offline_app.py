@@ -0,0 +1,103 @@
+"""
+The API (app.main) with its models swapped for offline stand-ins, for load tests
+(benchmarks.load_test): the stub layout detector (benchmarks.offline_layout) and deterministic Gemini
+stand-ins for extraction, the knowledge graph and MathBot, each taking a
+configurable time. Everything else (routes, executors, history, graph,
+search, scheduler) is the real code.
+
+    cd backend && LOADTEST_LLM_MS=800 python -m uvicorn benchmarks.offline_app:app --port 8000 --workers 2
+
+LOADTEST_LLM_MS: time of each extraction / graph call and of a whole chat answer (default 500)
+LOADTEST_DETECT_MS: layout inference time per page (default 50)
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Dict, Optional
+
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+from benchmarks import offline_layout
+from benchmarks.synthetic_papers import offline_insights, offline_triplets, paper_from_markdown
+
+logger = logging.getLogger(__name__)
+
+LLM_SECONDS = float(os.getenv("LOADTEST_LLM_MS", "500")) / 1000
+# Chunks in a streamed chat answer; the first arrives after a quarter of LLM_SECONDS
+CHAT_CHUNKS = 20
+
+
+def offline_extraction(clean_text: str, instructions: Optional[str] = None, fast: bool = False,
+                       timeout: Optional[float] = None):
+    """Stands in for run_lang_extract_pipeline; the fast model takes half the time."""
+    from app.models.extraction import ExtractedInsights
+
+    time.sleep(LLM_SECONDS / 2 if fast else LLM_SECONDS)
+    return ExtractedInsights.model_validate(offline_insights(paper_from_markdown(clean_text)))
+
+
+def offline_knowledge_graph(structured_data: Dict[str, Any], timeout: Optional[float] = None,
+                            cancel=None) -> Dict[str, Any]:
+    """Stands in for RelationalEngine.build_knowledge_graph, loading the triplets into the live graph like it."""
+    from app.core.graph_db import memory_manager
+
+    time.sleep(LLM_SECONDS)
+    if cancel is not None:
+        cancel.check("graph merge")
+    triplets = offline_triplets(structured_data)
+    memory_manager.add_triplets(triplets, context={"paper": structured_data["metadata"]["title"]})
+    summary = memory_manager.get_graph_summary()
+    return {
+        "success": True,
+        "triplet_count": len(triplets),
+        "node_count": summary["node_count"],
+        "edge_count": summary["edge_count"],
+        "triplets": [list(triplet) for triplet in triplets],
+    }
+
+
+class OfflineChatModel:
+    """The two ChatGoogleGenerativeAI methods the MathBot routes call, answering after LLM_SECONDS."""
+
+    def __init__(self, seconds: float = LLM_SECONDS, chunks: int = CHAT_CHUNKS):
+        self.seconds = seconds
+        self.chunks = chunks
+
+    def _reply(self, messages) -> str:
+        question = messages[-1].content if messages else ""
+        return f"Offline answer to: {question} " + " ".join(f"token{i}" for i in range(self.chunks))
+
+    async def ainvoke(self, messages):
+        await asyncio.sleep(self.seconds)
+        return AIMessage(content=self._reply(messages))
+
+    async def astream(self, messages):
+        words = self._reply(messages).split(" ")
+        per_chunk = len(words) // self.chunks + 1
+        await asyncio.sleep(self.seconds / 4)
+        for start in range(0, len(words), per_chunk):
+            yield AIMessageChunk(content=" ".join(words[start:start + per_chunk]) + " ")
+            await asyncio.sleep(self.seconds * 3 / 4 / self.chunks)
+
+
+def install():
+    """Swap the stand-ins into this process and return the FastAPI app."""
+    import app.main as api
+    import app.services.lang_extract_engine as lang_extract_engine
+    from app.core import executors
+    from app.services.relational_engine import relational_builder
+
+    executors.extract_layout = offline_layout.extract_layout
+    api.run_lang_extract_pipeline = offline_extraction
+    # Staged jobs look the stage functions up on their modules
+    lang_extract_engine.run_lang_extract_pipeline = offline_extraction
+    relational_builder.build_knowledge_graph = offline_knowledge_graph
+    api._get_mathbot_llm = OfflineChatModel
+    logger.info(
+        f"Offline stand-ins installed (LLM {LLM_SECONDS * 1000:.0f} ms, layout {offline_layout.DETECT_SECONDS * 1000:.0f} ms/page)"
+    )
+    return api.app
+
+
+app = install()
@@ -0,0 +1,31 @@
+"""
+Layout stand-in for load tests (benchmarks.offline_app): the real
+app.core.executors.extract_layout with the YOLO model replaced by the stub
+detector. A module of its own, and light, because the API's layout process
+pool spawns its workers: they unpickle this function by reference and import
+only this module, not the whole offline app.
+
+LOADTEST_DETECT_MS: layout inference time per page (default 50)
+"""
+import os
+
+from app.core import executors
+from benchmarks.synthetic_papers import StubDetector
+
+DETECT_SECONDS = float(os.getenv("LOADTEST_DETECT_MS", "50")) / 1000
+
+# Bound before offline_app swaps this module's function into app.core.executors
+_extract_layout = executors.extract_layout
+
+
+def _load_stub_model(extractor):
+    if extractor.model is None:
+        extractor.model = StubDetector(seconds=DETECT_SECONDS)
+    return extractor.model
+
+
+def extract_layout(file_path: str, deadline=None, cancel=None, profile: bool = False):
+    from app.services.mineru_extractor import MinerUExtractor
+
+    MinerUExtractor._load_model = _load_stub_model
+    return _extract_layout(file_path, deadline=deadline, cancel=cancel, profile=profile)
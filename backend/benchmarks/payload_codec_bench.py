@@ -0,0 +1,99 @@
+"""
+Payload codec benchmark: encode/decode time and stored bytes for analysis
+payloads in the legacy formats (pretty JSON in history.json, compact JSON in
+the task JSON column) vs. the versioned MessagePack+zstd codec.
+
+    cd backend && python -m benchmarks.payload_codec_bench
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+
+from app.core.payload_codec import decode_payload, encode_payload
+
+WORDS = ("model dataset training accuracy baseline transformer attention loss gradient benchmark "
+         "ablation robustness evaluation convergence regularization pretraining").split()
+
+
+def sentence(rng: random.Random, n: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(n))
+
+
+def synthetic_payload(rng: random.Random, graph_nodes: int) -> dict:
+    """An upload's extracted_data plus its knowledge graph, sized like a real paper."""
+    extracted = {
+        "metadata": {
+            "title": sentence(rng, 10),
+            "authors": [{"name": f"Author {rng.randrange(5000)}", "affiliation": sentence(rng, 4)} for _ in range(6)],
+            "publication_year": rng.randint(2010, 2025),
+            "abstract": sentence(rng, 250),
+        },
+        "methodologies": [
+            {"datasets": [f"Dataset-{rng.randrange(300)}" for _ in range(3)],
+             "base_models": [f"Model-{rng.randrange(200)}" for _ in range(2)],
+             "metrics": ["accuracy", "F1", "BLEU"], "optimization": rng.choice(["AdamW", "SGD", "LAMB"])}
+            for _ in range(5)
+        ],
+        "limitations": [{"description": sentence(rng, 40), "severity": rng.random()} for _ in range(8)],
+        "contradictions": [{"claim": sentence(rng, 25), "opposing_claim": sentence(rng, 25),
+                            "confidence_score": rng.random()} for _ in range(4)],
+        "equations": [{"latex": "\\frac{\\partial L}{\\partial \\theta} = " + sentence(rng, 6)} for _ in range(20)],
+    }
+    graph = {
+        "nodes": [{"id": f"node-{i}", "label": sentence(rng, 2), "group": rng.randrange(6), "degree": rng.randrange(20)}
+                  for i in range(graph_nodes)],
+        "edges": [{"source": f"node-{rng.randrange(graph_nodes)}", "target": f"node-{rng.randrange(graph_nodes)}",
+                   "label": rng.choice(["uses", "evaluates_on", "outperforms", "extends"])}
+                  for _ in range(graph_nodes * 2)],
+    }
+    return {"extracted_data": extracted, "graph_data": graph}
+
+
+FORMATS = {
+    "json_pretty (history.json)": (
+        lambda obj: json.dumps(obj, indent=2, default=str).encode("utf-8"),
+        lambda data: json.loads(data),
+    ),
+    "json_compact (JSON column)": (
+        lambda obj: json.dumps(obj, separators=(",", ":"), default=str).encode("utf-8"),
+        lambda data: json.loads(data),
+    ),
+    "codec_v1 (msgpack+zstd)": (encode_payload, decode_payload),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--payloads", type=int, default=50)
+    parser.add_argument("--graph-nodes", type=int, default=300)
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    payloads = [synthetic_payload(rng, args.graph_nodes) for _ in range(args.payloads)]
+
+    report = {"payloads": args.payloads, "graph_nodes": args.graph_nodes, "formats": {}}
+    for name, (encode, decode) in FORMATS.items():
+        enc_ms, dec_ms, sizes = [], [], []
+        for payload in payloads:
+            start = time.perf_counter()
+            data = encode(payload)
+            enc_ms.append((time.perf_counter() - start) * 1000)
+            start = time.perf_counter()
+            assert decode(data) == payload
+            dec_ms.append((time.perf_counter() - start) * 1000)
+            sizes.append(len(data))
+        report["formats"][name] = {
+            "encode_p50_ms": round(statistics.median(enc_ms), 3),
+            "decode_p50_ms": round(statistics.median(dec_ms), 3),
+            "mean_bytes": int(statistics.mean(sizes)),
+        }
+    baseline = report["formats"]["json_pretty (history.json)"]["mean_bytes"]
+    for stats in report["formats"].values():
+        stats["size_vs_pretty_json"] = round(stats["mean_bytes"] / baseline, 3)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""
+Pipeline benchmark: throughput and memory of each offline pipeline stage over
+synthetic papers of increasing length (see benchmarks.synthetic_papers). The
+layout model is replaced by a stub detector and the Gemini calls by offline
+stand-ins, so the numbers cover this repo's code (plus PyMuPDF, pandas,
+NetworkX and SQLite) and are reproducible without GPUs or API keys.
+
+Writes a JSON report; pass a previous one to --compare to flag regressions:
+
+    cd backend && python -m benchmarks.pipeline_bench --pages 1,10,50,200 --output bench.json
+    cd backend && python -m benchmarks.pipeline_bench --compare bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List
+
+from benchmarks.synthetic_papers import StubDetector, make_paper, offline_insights, offline_triplets
+
+
+def measure(fn: Callable[[], Any], repeat: int, pages: int = 0) -> Dict[str, Any]:
+    """Wall time over `repeat` runs, then one more under tracemalloc for the peak Python allocation."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    p50 = statistics.median(samples)
+    result = {
+        "p50_ms": round(p50 * 1000, 3),
+        "min_ms": round(min(samples) * 1000, 3),
+        "max_ms": round(max(samples) * 1000, 3),
+        "peak_alloc_bytes": peak,
+    }
+    if pages:
+        result["pages_per_s"] = round(pages / p50, 1) if p50 else None
+    return result
+
+
+def background_triplets(papers: int) -> List[tuple]:
+    """Triplets of `papers` earlier analyses, so graph writes hit a populated graph."""
+    template = offline_triplets(offline_insights(make_paper(8)))
+    title = template[0][2]
+    return [
+        tuple(f"Background paper {i}" if part == title else part for part in triplet)
+        for i in range(papers) for triplet in template
+    ]
+
+
+def bench_size(pages: int, workdir: str, repeat: int, graph_background: int) -> Dict[str, Any]:
+    from app.core.graph_db import GraphMemoryManager
+    from app.core.history_store import HistoryStore
+    from app.core.security.pdf_validator import validate_pdf
+    from app.services.markdown_generator import MarkdownGenerator
+    from app.services.mineru_extractor import LAYOUT_DPI, MinerUExtractor
+    from app.services.pdf_parser import parse_pdf_document
+    from app.services.statistical_engine import StatisticalEngine
+
+    paper = make_paper(pages)
+    pdf_path = os.path.join(workdir, f"paper_{pages}.pdf")
+    with open(pdf_path, "wb") as f:
+        f.write(paper.pdf_bytes)
+
+    extractor = MinerUExtractor(output_dir=os.path.join(workdir, "layout"))
+    extractor.model = StubDetector(paper, LAYOUT_DPI)
+    insights = offline_insights(paper)
+    triplets = offline_triplets(insights)
+    engine = StatisticalEngine()
+
+    def statistics_stage():
+        engine.format_matrix(insights)
+        engine.calculate_trend_saturation([m for method in insights["methodologies"] for m in method["base_models"]])
+        engine.build_dynamic_gap_radar(insights["limitations"])
+
+    background = background_triplets(graph_background)
+    graph = GraphMemoryManager()
+    graph.add_triplets(background)
+
+    def graph_stage():
+        graph.add_triplets(triplets, context={"paper": paper.title})
+        return graph.get_full_graph()
+
+    store = HistoryStore(os.path.join(workdir, f"history_{pages}.db"))
+    entry = {
+        "filename": os.path.basename(pdf_path),
+        "title": paper.title,
+        "authors": [author["name"] for author in insights["metadata"]["authors"]],
+        "analyzed_at": datetime(2024, 1, 1, tzinfo=timezone.utc).isoformat(),
+        "pipeline": {"dla_engine": "MinerU", "pages": pages},
+        "extracted_data": insights,
+        "graph_data": graph_stage(),
+    }
+    counter = iter(range(10 ** 9))
+
+    def history_insert():
+        store.insert({**entry, "id": f"{pages}-{next(counter)}"})
+
+    layout = measure(lambda: extractor.extract_document(pdf_path), repeat, pages)
+    markdown = extractor.extract_document(pdf_path)["markdown"]
+    report = {
+        "pages": pages,
+        "pdf_bytes": len(paper.pdf_bytes),
+        "markdown_chars": len(markdown),
+        "triplets": len(triplets),
+        "ops": {
+            "validate_pdf": measure(lambda: validate_pdf(paper.pdf_bytes), repeat, pages),
+            "parse_pdf_document": measure(lambda: parse_pdf_document(pdf_path), repeat, pages),
+            "extract_document": layout,
+            "markdown_generate": measure(lambda: MarkdownGenerator().generate(paper.pdf_info), repeat, pages),
+            "statistics": measure(statistics_stage, repeat),
+            "graph_add_and_serialize": measure(graph_stage, repeat),
+            "history_insert": measure(history_insert, repeat),
+            "history_get": measure(lambda: store.get(f"{pages}-0"), repeat),
+        },
+    }
+    store.close()
+    return report
+
+
+def environment() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Ops whose p50 grew by more than `threshold` (a fraction) against the baseline, per page count."""
+    previous = {size["pages"]: size["ops"] for size in baseline.get("sizes", [])}
+    regressions = []
+    for size in report["sizes"]:
+        for op, result in size["ops"].items():
+            before = previous.get(size["pages"], {}).get(op)
+            if before and before["p50_ms"] > 0 and result["p50_ms"] > before["p50_ms"] * (1 + threshold):
+                regressions.append(
+                    f"{op} @ {size['pages']} pages: {before['p50_ms']:.1f} -> {result['p50_ms']:.1f} ms "
+                    f"(+{(result['p50_ms'] / before['p50_ms'] - 1) * 100:.0f}%)"
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", default="1,10,50,200", help="comma-separated paper lengths")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--graph-background", type=int, default=200, help="papers already in the graph")
+    parser.add_argument("--output", help="write the JSON report here (default: stdout)")
+    parser.add_argument("--compare", help="baseline JSON report from an earlier commit")
+    parser.add_argument("--threshold", type=float, default=0.2, help="p50 slowdown that counts as a regression")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        # Keep the graph manager's vector store out of the data volume
+        os.environ.setdefault("LANCEDB_DIR", os.path.join(workdir, "lancedb"))
+        report = {
+            "environment": environment(),
+            "settings": {"repeat": args.repeat, "graph_background": args.graph_background},
+            "sizes": [
+                bench_size(int(pages), workdir, args.repeat, args.graph_background)
+                for pages in args.pages.split(",") if pages.strip()
+            ],
+        }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
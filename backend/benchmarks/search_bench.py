@@ -0,0 +1,82 @@
+"""
+Faceted search benchmark: index build and query latency over N synthetic papers.
+
+    cd backend && python -m benchmarks.search_bench --papers 30000
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+
+from app.core.facet_index import FacetIndex, extract_facets
+
+DATASETS = [f"Dataset-{i}" for i in range(400)] + ["ImageNet", "CIFAR-10", "COCO", "SQuAD", "GLUE"]
+MODELS = [f"Model-{i}" for i in range(300)] + ["ResNet-50", "BERT-base", "ViT-B/16"]
+METRICS = ["accuracy", "F1", "BLEU", "mAP", "perplexity", "Top-1", "ROUGE-L"]
+OPTIMIZERS = ["AdamW", "Adam", "SGD", "LAMB", "Adafactor", "RMSprop"]
+
+
+def synthetic_insights(rng: random.Random) -> dict:
+    return {
+        "metadata": {
+            "authors": [{"name": f"Author {rng.randrange(20000)}"} for _ in range(rng.randint(1, 6))],
+            "publication_year": rng.randint(2010, 2025),
+        },
+        "methodologies": [
+            {
+                "datasets": rng.sample(DATASETS[-5:], 1) + rng.sample(DATASETS, rng.randint(0, 2)),
+                "base_models": rng.sample(MODELS, rng.randint(1, 2)),
+                "metrics": rng.sample(METRICS, rng.randint(1, 3)),
+                "optimization": rng.choice(OPTIMIZERS),
+            }
+            for _ in range(rng.randint(1, 3))
+        ],
+    }
+
+
+def timed(fn, repeat: int) -> dict:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {"p50_ms": round(statistics.median(samples), 3), "p95_ms": round(samples[int(0.95 * (len(samples) - 1))], 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--papers", type=int, default=30000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    facets = [extract_facets(synthetic_insights(rng)) for _ in range(args.papers)]
+
+    index = FacetIndex()
+    start = time.perf_counter()
+    for i, paper_facets in enumerate(facets):
+        index.add(f"paper-{i}", f"2024-01-01T00:00:{i:08d}", paper_facets)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    queries = {
+        "no_filter": dict(),
+        "imagenet_and_adamw_2020_2023": dict(filters={"datasets": ["ImageNet"], "optimization": ["AdamW"]},
+                                            year_from=2020, year_to=2023),
+        "or_three_datasets": dict(filters={"datasets": ["ImageNet", "COCO", "GLUE"]}, op="or"),
+        "rare_model": dict(filters={"base_models": ["Model-17"]}),
+    }
+    report = {
+        "papers": args.papers,
+        "build_ms": round(build_ms, 1),
+        "queries": {
+            name: {"total": index.search(**q)["total"], **timed(lambda q=q: index.search(**q), args.repeat)}
+            for name, q in queries.items()
+        },
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
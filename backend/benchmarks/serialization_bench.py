@@ -0,0 +1,77 @@
+"""
+Serialization microbenchmark for the largest API payloads: the previous path
+(FastAPI jsonable_encoder + stdlib JSONResponse, model_dump() → json.dumps)
+vs. app.core.serialization (orjson FastJSONResponse, model_dump_json).
+
+    cd backend && python -m benchmarks.serialization_bench
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.core.serialization import FastJSONResponse, dumps
+from app.models.extraction import ExtractedInsights
+from benchmarks.payload_codec_bench import synthetic_payload
+
+
+def timed(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return round(statistics.median(samples), 3)
+
+
+def insights_model(extracted: dict) -> ExtractedInsights:
+    data = dict(extracted)
+    data.pop("equations", None)
+    data["limitations"] = [{**l, "source_context": l["description"]} for l in data["limitations"]]
+    return ExtractedInsights.model_validate(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--graph-nodes", type=int, default=3000)
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+
+    rng = random.Random(5)
+    payload = synthetic_payload(rng, args.graph_nodes)
+    graph = payload["graph_data"]
+    for node in graph["nodes"]:  # /graph?layout=true carries coordinates
+        node["x"], node["y"] = rng.uniform(-1000, 1000), rng.uniform(-1000, 1000)
+
+    responses = {
+        "/history/{id}": {"status": "success", "id": "x", "pipeline": {"pages": 12},
+                          "extracted_data": payload["extracted_data"]},
+        "/graph?layout=true": {"status": "success", "graph": graph},
+        "/upload": {"status": "success", "pipeline": {"pages": 12}, "extracted_data": payload["extracted_data"],
+                    "graph": graph},
+    }
+    report = {"graph_nodes": args.graph_nodes, "responses": {}}
+    for route, body in responses.items():
+        before = timed(lambda: JSONResponse(jsonable_encoder(body)), args.repeat)
+        after = timed(lambda: FastJSONResponse(body), args.repeat)
+        report["responses"][route] = {
+            "bytes": len(dumps(body)),
+            "stdlib_ms": before,
+            "orjson_ms": after,
+            "speedup": round(before / after, 1) if after else None,
+        }
+
+    model = insights_model(payload["extracted_data"])
+    before = timed(lambda: json.dumps(model.model_dump(), default=str), args.repeat)
+    after = timed(lambda: dumps(model), args.repeat)
+    report["ExtractedInsights"] = {"model_dump+json.dumps_ms": before, "model_dump_json_ms": after,
+                                   "speedup": round(before / after, 1) if after else None}
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+"""
+Synthetic research papers for benchmarks: PyMuPDF-generated PDFs (two-column
+text, embedded figures, ruled tables, display formulas) together with what the
+real pipeline would derive from them, so the layout, Markdown, statistics and
+graph stages can be measured offline:
+
+- StubDetector stands in for the YOLO DocLayNet model and "detects" exactly the
+  figures, tables and formulas the generator placed.
+- SyntheticPaper.pdf_info is the MinerU-style page/block dict MarkdownGenerator consumes.
+- offline_insights / offline_triplets stand in for the Gemini extraction and
+  knowledge graph calls, with output sized like the real calls' for the paper.
+"""
+import io
+import random
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from PIL import Image
+
+PAGE_WIDTH, PAGE_HEIGHT = 612, 792  # US Letter, points
+MARGIN, GUTTER = 54, 18
+COLUMN_WIDTH = (PAGE_WIDTH - 2 * MARGIN - GUTTER) / 2
+
+WORDS = ("model dataset training accuracy baseline transformer attention loss gradient benchmark ablation "
+         "robustness evaluation convergence regularization pretraining encoder decoder latent variance "
+         "sampling inference calibration distribution objective").split()
+DATASETS = ["ImageNet", "CIFAR-10", "COCO", "SQuAD", "GLUE", "MNIST", "WikiText-103", "LibriSpeech"]
+MODELS = ["ResNet-50", "BERT-base", "ViT-B/16", "GPT-2", "T5-small", "LSTM", "U-Net"]
+METRICS = ["accuracy", "F1", "BLEU", "mAP", "perplexity", "ROUGE-L"]
+OPTIMIZERS = ["AdamW", "Adam", "SGD", "LAMB"]
+FORMULAS = [
+    "L(w) = - sum_i y_i log p(y_i | x_i; w) + lambda ||w||^2",
+    "a_ij = exp(q_i . k_j / sqrt(d)) / sum_k exp(q_i . k_k / sqrt(d))",
+    "w_{t+1} = w_t - eta * m_t / (sqrt(v_t) + eps)",
+]
+
+# DocLayNet class ids of the regions the layout stage crops
+CLASS_NAMES = {0: "Caption", 1: "Footnote", 2: "Formula", 3: "List-item", 4: "Page-footer", 5: "Page-header",
+               6: "Picture", 7: "Section-header", 8: "Table", 9: "Text", 10: "Title"}
+_CLASS_IDS = {name: class_id for class_id, name in CLASS_NAMES.items()}
+
+
+@dataclass
+class SyntheticPaper:
+    title: str
+    pages: int
+    pdf_bytes: bytes
+    # Per page: (class name, (x0, y0, x1, y1) in PDF points) of every figure, table and formula
+    regions: List[List[Tuple[str, Tuple[float, float, float, float]]]]
+    # MinerU-style {"pdf_info": [page, ...]} for MarkdownGenerator
+    pdf_info: Dict[str, Any]
+    datasets: List[str] = field(default_factory=list)
+    models: List[str] = field(default_factory=list)
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def _paragraph(rng: random.Random, sentences: int) -> str:
+    return " ".join(_sentence(rng, rng.randint(8, 16)) for _ in range(sentences))
+
+
+def _figure_png(rng: random.Random, size: int = 160) -> bytes:
+    image = Image.effect_noise((size, size), rng.uniform(30, 90)).convert("RGB")
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def _text_block(text: str, spans_type: str = "text", block_type: str = "text") -> Dict[str, Any]:
+    return {"type": block_type, "lines": [{"spans": [{"type": spans_type, "content": text}]}]}
+
+
+def make_paper(pages: int, seed: int = 0) -> SyntheticPaper:
+    """
+    A `pages`-page paper: title, authors and abstract on page 1, then two text
+    columns per page, with a figure every 3rd page, a table every 4th and a
+    display formula every 2nd.
+    """
+    import fitz
+
+    rng = random.Random(seed * 1000 + pages)
+    title = f"Synthetic Study {seed}-{pages}: {_sentence(rng, 5)[:-1]}"
+    datasets = rng.sample(DATASETS, 3)
+    models = rng.sample(MODELS, 2)
+    doc = fitz.open()
+    regions: List[List[Tuple[str, Tuple[float, float, float, float]]]] = []
+    pdf_info = []
+
+    for page_num in range(pages):
+        page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+        page_regions = []
+        blocks = []
+        top = MARGIN
+        if page_num == 0:
+            page.insert_textbox(fitz.Rect(MARGIN, top, PAGE_WIDTH - MARGIN, top + 50), title, fontsize=15, fontname="hebo")
+            authors = ", ".join(f"Author {rng.randrange(500)}" for _ in range(3))
+            page.insert_textbox(fitz.Rect(MARGIN, top + 54, PAGE_WIDTH - MARGIN, top + 70), authors, fontsize=10)
+            abstract = f"Abstract. We evaluate {', '.join(models)} on {', '.join(datasets)}. " + _paragraph(rng, 4)
+            page.insert_textbox(fitz.Rect(MARGIN, top + 76, PAGE_WIDTH - MARGIN, top + 170), abstract, fontsize=9)
+            blocks += [_text_block(title, block_type="title"), _text_block(authors), _text_block(abstract)]
+            top += 180
+
+        # Floats span both columns at the top of the text area
+        if page_num % 3 == 1:
+            rect = fitz.Rect(MARGIN + 120, top, PAGE_WIDTH - MARGIN - 120, top + 150)
+            page.insert_image(rect, stream=_figure_png(rng))
+            caption = f"Figure {page_num // 3 + 1}: {_sentence(rng, 10)}"
+            page.insert_textbox(fitz.Rect(MARGIN, rect.y1 + 4, PAGE_WIDTH - MARGIN, rect.y1 + 20), caption, fontsize=8)
+            page_regions.append(("Picture", tuple(rect)))
+            blocks.append({"type": "image", "blocks": [
+                {"type": "image_body", "lines": [{"spans": [{"type": "image", "image_path": f"images/p{page_num}_fig.png"}]}]},
+                {"type": "image_caption", "lines": [{"spans": [{"type": "text", "content": caption}]}]},
+            ]})
+            top = rect.y1 + 28
+        if page_num % 4 == 2:
+            rect = fitz.Rect(MARGIN + 60, top, PAGE_WIDTH - MARGIN - 60, top + 100)
+            rows, cols = 5, 4
+            for r in range(rows + 1):
+                y = rect.y0 + r * rect.height / rows
+                page.draw_line((rect.x0, y), (rect.x1, y), width=0.5)
+            for c in range(cols + 1):
+                x = rect.x0 + c * rect.width / cols
+                page.draw_line((x, rect.y0), (x, rect.y1), width=0.5)
+            for r in range(rows):
+                for c in range(cols):
+                    cell = "Model" if (r, c) == (0, 0) else (rng.choice(METRICS) if r == 0 else f"{rng.uniform(20, 99):.1f}")
+                    page.insert_text((rect.x0 + c * rect.width / cols + 4, rect.y0 + r * rect.height / rows + 13), cell, fontsize=8)
+            page_regions.append(("Table", tuple(rect)))
+            blocks.append({"type": "table", "blocks": [
+                {"type": "table_body", "lines": [{"spans": [{"type": "table", "image_path": f"images/p{page_num}_table.png"}]}]},
+                {"type": "table_caption", "lines": [{"spans": [{"type": "text", "content": f"Table {page_num // 4 + 1}"}]}]},
+            ]})
+            top = rect.y1 + 12
+
+        # Two columns of body text, a display formula in the left one on every 2nd page
+        for column in range(2):
+            x0 = MARGIN + column * (COLUMN_WIDTH + GUTTER)
+            y = top
+            for paragraph_num in range(3):
+                if column == 0 and paragraph_num == 1 and page_num % 2 == 0:
+                    formula = rng.choice(FORMULAS)
+                    rect = fitz.Rect(x0, y, x0 + COLUMN_WIDTH, y + 24)
+                    page.insert_textbox(rect, formula, fontsize=8, fontname="cour", align=fitz.TEXT_ALIGN_CENTER)
+                    page_regions.append(("Formula", tuple(rect)))
+                    blocks.append(_text_block(formula, spans_type="interline_equation"))
+                    y = rect.y1 + 6
+                text = _paragraph(rng, rng.randint(4, 7))
+                if paragraph_num == 0 and column == 0 and page_num > 0:
+                    text = f"We train {rng.choice(models)} on {rng.choice(datasets)}. " + text
+                rect = fitz.Rect(x0, y, x0 + COLUMN_WIDTH, min(y + (PAGE_HEIGHT - MARGIN - top) / 3, PAGE_HEIGHT - MARGIN))
+                page.insert_textbox(rect, text, fontsize=9)
+                blocks.append(_text_block(text))
+                y = rect.y1 + 6
+        regions.append(page_regions)
+        pdf_info.append({"page_idx": page_num, "para_blocks": blocks})
+
+    pdf_bytes = doc.tobytes(garbage=3, deflate=True)
+    doc.close()
+    return SyntheticPaper(title, pages, pdf_bytes, regions, {"pdf_info": pdf_info}, datasets, models)
+
+
+# ── Stub layout detector ─────────────────────────────────────────────────────
+
+class _Scalar:
+    def __init__(self, value):
+        self.value = value
+
+    def item(self):
+        return self.value
+
+
+class _Coords:
+    def __init__(self, values):
+        self.values = values
+
+    def tolist(self):
+        return list(self.values)
+
+
+class _Box:
+    def __init__(self, class_id: int, xyxy):
+        self.cls = [_Scalar(class_id)]
+        self.xyxy = [_Coords(xyxy)]
+
+
+class _Result:
+    def __init__(self, boxes):
+        self.boxes = boxes
+
+
+class StubDetector:
+    """
+    Callable like the ultralytics YOLO model MinerUExtractor uses: each call
+    returns the next page's ground-truth regions, scaled to the raster's DPI.
+    Without a paper (documents it didn't generate) it detects nothing; `seconds`
+    adds a per-page inference time.
+    """
+
+    names = CLASS_NAMES
+
+    def __init__(self, paper: Optional[SyntheticPaper] = None, dpi: int = 150, seconds: float = 0.0):
+        self.paper = paper
+        self.zoom = dpi / 72.0
+        self.seconds = seconds
+        self.calls = 0
+
+    def __call__(self, image, verbose: bool = False):
+        if self.seconds:
+            time.sleep(self.seconds)
+        page_regions = self.paper.regions[self.calls % self.paper.pages] if self.paper else []
+        self.calls += 1
+        return [_Result([
+            _Box(_CLASS_IDS[name], [coord * self.zoom for coord in rect]) for name, rect in page_regions
+        ])]
+
+
+# ── Offline LLM stand-ins ────────────────────────────────────────────────────
+
+def offline_insights(paper: SyntheticPaper) -> Dict[str, Any]:
+    """ExtractedInsights.model_dump() as the extraction call would return it for the paper."""
+    from app.models.extraction import ExtractedInsights
+
+    rng = random.Random(paper.pages)
+    insights = ExtractedInsights.model_validate({
+        "metadata": {
+            "title": paper.title,
+            "authors": [{"name": f"Author {i}", "affiliation": "Synthetic University"} for i in range(3)],
+            "publication_year": 2024,
+            "abstract": _paragraph(rng, 4),
+        },
+        "methodologies": [
+            {
+                "datasets": [paper.datasets[i % len(paper.datasets)]],
+                "base_models": [paper.models[i % len(paper.models)]],
+                "metrics": rng.sample(METRICS, 2),
+                "optimization": rng.choice(OPTIMIZERS),
+            }
+            for i in range(max(1, paper.pages // 4))
+        ],
+        "limitations": [
+            {"description": _sentence(rng, 12), "source_context": _sentence(rng, 20), "page_number": page + 1}
+            for page in range(0, paper.pages, 5)
+        ],
+        "contradictions": [],
+    })
+    return insights.model_dump()
+
+
+def paper_from_markdown(markdown: str) -> SyntheticPaper:
+    """What offline_insights needs, read back from a synthetic paper's layout Markdown (no PDF or regions)."""
+    title = re.search(r"Synthetic Study [^\n]*", markdown)
+    return SyntheticPaper(
+        title=title.group(0).strip() if title else markdown.strip().split("\n", 1)[0][:120] or "Untitled",
+        pages=markdown.count("\n---\n") or 1,
+        pdf_bytes=b"",
+        regions=[],
+        pdf_info={},
+        datasets=[name for name in DATASETS if name in markdown] or DATASETS[:1],
+        models=[name for name in MODELS if name in markdown] or MODELS[:1],
+    )
+
+
+def offline_triplets(insights: Dict[str, Any]) -> List[Tuple[str, str, str]]:
+    """The (subject, predicate, object) triplets the graph call would extract from the insights."""
+    title = insights["metadata"]["title"]
+    triplets = [(author["name"], "AUTHORED", title) for author in insights["metadata"]["authors"]]
+    for method in insights["methodologies"]:
+        for model in method["base_models"]:
+            triplets.append((title, "USES_MODEL", model))
+            triplets += [(model, "EVALUATED_ON", dataset) for dataset in method["datasets"]]
+            triplets += [(model, "MEASURED_BY", metric) for metric in method["metrics"]]
+        if method.get("optimization"):
+            triplets.append((title, "OPTIMIZED_WITH", method["optimization"]))
+    triplets += [(title, "HAS_LIMITATION", limitation["description"][:60]) for limitation in insights["limitations"]]
+    return list(dict.fromkeys(triplets))
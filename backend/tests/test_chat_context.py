@@ -0,0 +1,90 @@
+"""
+MathBot cache tests: question normalization, the LRU/TTL store, the context
+and answer caches, and the per-paper split of the context budget.
+
+Usage:
+    python -m pytest tests/test_chat_context.py -q
+"""
+import sys
+from pathlib import Path
+
+backend_dir = Path(__file__).parent.parent
+sys.path.append(str(backend_dir))
+
+from app.services import chat_context
+from app.services.chat_context import ChatContextCache, _LRU, normalize_question
+
+
+def test_normalize_question_keeps_every_word():
+    assert normalize_question("What  datasets?") == normalize_question("what dataset")
+    assert normalize_question("What does it do?") != normalize_question("Can it do this?")
+    assert normalize_question("?!") == ""
+
+
+def test_lru_evicts_least_recently_used_and_expires(monkeypatch):
+    lru = _LRU(max_size=2)
+    lru.put("a", 1)
+    lru.put("b", 2)
+    assert lru.get("a") == 1
+    lru.put("c", 3)
+    assert lru.get("b") is None and lru.get("a") == 1 and len(lru) == 2
+
+    now = [100.0]
+    monkeypatch.setattr(chat_context.time, "monotonic", lambda: now[0])
+    timed = _LRU(max_size=4, ttl=10)
+    timed.put("k", "v")
+    now[0] += 9
+    assert timed.get("k") == "v"
+    now[0] += 2
+    assert timed.get("k") is None and len(timed) == 0
+
+
+def test_context_cache_loads_once_and_invalidates():
+    cache = ChatContextCache()
+    loads = []
+
+    def loader(analysis_id):
+        loads.append(analysis_id)
+        return None if analysis_id == "missing" else ("Paper", {"limitations": [{"description": "Small n"}]})
+
+    block = cache.get_context("a1", loader)
+    assert "Paper: Paper" in block and "Small n" in block
+    assert cache.get_context("a1", loader) == block
+    assert cache.get_context("missing", loader) is None
+    assert loads == ["a1", "missing"]
+
+    cache.invalidate("a1")
+    cache.get_context("a1", loader)
+    assert loads == ["a1", "missing", "a1"]
+
+
+def test_answer_cache_is_keyed_by_paper_set_and_question():
+    cache = ChatContextCache()
+    cache.put_answer(["b", "a"], "Which datasets?", "CIFAR-10")
+
+    assert cache.get_answer(["a", "b", "a"], "which   dataset") == "CIFAR-10"
+    assert cache.get_answer(["a"], "Which datasets?") is None
+    assert cache.get_answer(["a", "b"], "Which metrics?") is None
+    # Questions with no words are never cached
+    cache.put_answer(["a"], "??", "anything")
+    assert cache.get_answer(["a"], "??") is None
+
+    cache.invalidate("b")
+    assert cache.get_answer(["a", "b"], "Which datasets?") is None
+
+
+def test_multi_paper_context_budget_is_split_evenly(monkeypatch):
+    import app.main as api
+
+    abstract = "x" * api.CHAT_CONTEXT_BUDGET
+    papers = {f"budget-{i}": (f"Paper {i}", {"metadata": {"abstract": abstract}}) for i in range(3)}
+    monkeypatch.setattr(api, "_load_analysis_for_chat", papers.get)
+    monkeypatch.setattr(api.chunk_index, "search", lambda *args, **kwargs: [])
+
+    req = api.ChatRequest(message="Compare them", analysis_ids=list(papers))
+    system = api._build_mathbot_messages(req, list(papers))[0].content
+    analysis_data = system.split("ANALYSIS DATA:\n", 1)[1].split("\n\nRELEVANT PASSAGES:", 1)[0]
+
+    # Each paper keeps its own share instead of the first one filling the budget
+    assert all(f"Paper: Paper {i}" in analysis_data for i in range(3))
+    assert len(analysis_data) <= api.CHAT_CONTEXT_BUDGET
@@ -0,0 +1,128 @@
+"""
+MathBot streaming route tests: SSE event framing, replay of cached answers (and
+dropping them when the paper is re-analyzed) and the per-outcome stream counter,
+with a stub model in place of Gemini.
+
+Usage:
+    python -m pytest tests/test_chat_stream.py -q
+"""
+import sys
+from concurrent.futures import Future
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+from langchain_core.messages import AIMessageChunk
+
+backend_dir = Path(__file__).parent.parent
+sys.path.append(str(backend_dir))
+
+import app.main as api
+from app.core.serialization import loads
+
+
+class StubChatModel:
+    def __init__(self, chunks, fail_after=None):
+        self.chunks = chunks
+        self.fail_after = fail_after
+        self.calls = 0
+
+    async def astream(self, messages):
+        self.calls += 1
+        for i, chunk in enumerate(self.chunks):
+            if i == self.fail_after:
+                raise RuntimeError("quota exceeded")
+            yield AIMessageChunk(content=chunk)
+
+
+def _events(body: str):
+    """Parse an SSE body into (event, data) pairs, checking each frame's shape."""
+    events = []
+    for frame in body.split("\n\n"):
+        if not frame:
+            continue
+        event_line, data_line = frame.split("\n")
+        assert event_line.startswith("event: ") and data_line.startswith("data: ")
+        events.append((event_line[len("event: "):], loads(data_line[len("data: "):])))
+    return events
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(api, "_load_analysis_for_chat", lambda analysis_id: ("Stub paper", {"metadata": {}}))
+    monkeypatch.setattr(api.chunk_index, "search", lambda *args, **kwargs: [])
+    return TestClient(api.app)
+
+
+def _stream(client, model, monkeypatch, **body):
+    monkeypatch.setattr(api, "_get_mathbot_llm", lambda: model)
+    response = client.post("/api/v1/chat/stream", json=body)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    return _events(response.text)
+
+
+def test_stream_then_replay_from_answer_cache(client, monkeypatch):
+    model = StubChatModel(["The paper ", "", "uses ", "ResNet."])
+    completed = api._chat_streams.value(outcome="completed")
+    cached = api._chat_streams.value(outcome="cached")
+
+    events = _stream(client, model, monkeypatch, message="Which backbone?", analysis_id="stream-a1")
+    # Empty chunks are skipped; the done event closes the stream
+    assert [e for e, _ in events] == ["token", "token", "token", "done"]
+    assert "".join(data["delta"] for e, data in events if e == "token") == "The paper uses ResNet."
+    done = events[-1][1]
+    assert done["chunks"] == 3 and done["cached"] is False
+    assert done["ttft_ms"] <= done["total_ms"]
+    assert api._chat_streams.value(outcome="completed") == completed + 1
+
+    # The same question about the same paper replays the stored answer without calling the model
+    replay = _stream(client, model, monkeypatch, message="Which backbone?", analysis_id="stream-a1")
+    assert replay == [
+        ("token", {"delta": "The paper uses ResNet."}),
+        ("done", {"ttft_ms": 0.0, "total_ms": 0.0, "chunks": 1, "cached": True}),
+    ]
+    assert model.calls == 1
+    assert api._chat_streams.value(outcome="cached") == cached + 1
+
+
+def test_client_context_is_never_cached(client, monkeypatch):
+    model = StubChatModel(["Answer."])
+    for _ in range(2):
+        events = _stream(client, model, monkeypatch, message="Summarise", analysis_id="stream-b2", context="pasted")
+        assert events[-1][0] == "done" and events[-1][1]["cached"] is False
+    assert model.calls == 2
+
+
+def test_error_mid_stream(client, monkeypatch):
+    model = StubChatModel(["Partial ", "answer"], fail_after=1)
+    errors = api._chat_streams.value(outcome="error")
+
+    events = _stream(client, model, monkeypatch, message="Limitations?", analysis_id="stream-c3")
+    assert events == [
+        ("token", {"delta": "Partial "}),
+        ("error", {"message": "MathBot failed: quota exceeded"}),
+    ]
+    assert api._chat_streams.value(outcome="error") == errors + 1
+
+    # A failed answer is not cached, so the next request reaches the model again
+    _stream(client, StubChatModel(["Retry."]), monkeypatch, message="Limitations?", analysis_id="stream-c3")
+    assert api.chat_context_cache.get_answer(["stream-c3"], "Limitations?") == "Retry."
+
+
+def test_reanalysis_drops_cached_answers(client, monkeypatch):
+    _stream(client, StubChatModel(["Old answer."]), monkeypatch, message="Which dataset?", analysis_id="stream-d4")
+    assert api.chat_context_cache.get_answer(["stream-d4"], "Which dataset?") == "Old answer."
+
+    saved = Future()
+    saved.set_result(None)
+    monkeypatch.setattr(api, "_save_to_history", lambda *args, **kwargs: saved)
+    monkeypatch.setattr(api, "_last_analysis", api._last_analysis)  # restored after the test
+    api._on_job_complete({"id": "stream-d4", "filename": "paper.pdf"}, {
+        "paper_title": "Stub paper", "extracted_data": {"metadata": {"title": "Stub paper"}},
+        "graph_data": {"nodes": [], "edges": []}, "pipeline": {},
+    })
+
+    model = StubChatModel(["New answer."])
+    events = _stream(client, model, monkeypatch, message="Which dataset?", analysis_id="stream-d4")
+    assert events[-1][1]["cached"] is False and model.calls == 1
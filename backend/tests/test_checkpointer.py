@@ -0,0 +1,182 @@
+"""
+Copilot checkpointer tests: LRU and TTL eviction, checkpoint pruning, restoring
+an evicted thread from SQLite, and the copilot graph's history windowing and
+resent-message dedup.
+
+Usage:
+    python -m pytest tests/test_checkpointer.py -q
+"""
+import asyncio
+import sys
+from pathlib import Path
+from typing import Annotated, Sequence, TypedDict
+
+import pytest
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langgraph.graph import END, StateGraph
+from langgraph.graph.message import add_messages
+
+backend_dir = Path(__file__).parent.parent
+sys.path.append(str(backend_dir))
+
+from app.core import checkpointer as checkpointer_module
+from app.core.checkpointer import BoundedMemorySaver, SQLiteThreadStore
+
+
+class _State(TypedDict):
+    messages: Annotated[Sequence[BaseMessage], add_messages]
+
+
+def _echo_graph(saver):
+    def reply(state):
+        return {"messages": [AIMessage(content=f"echo: {state['messages'][-1].content}")]}
+
+    builder = StateGraph(_State)
+    builder.add_node("reply", reply)
+    builder.set_entry_point("reply")
+    builder.add_edge("reply", END)
+    return builder.compile(checkpointer=saver)
+
+
+def _turn(graph, thread_id, text):
+    return graph.invoke({"messages": [HumanMessage(content=text)]}, {"configurable": {"thread_id": thread_id}})
+
+
+def _messages(graph, thread_id):
+    state = graph.get_state({"configurable": {"thread_id": thread_id}})
+    return [m.content for m in state.values.get("messages", [])] if state.values else []
+
+
+def test_lru_eviction_and_checkpoint_pruning():
+    saver = BoundedMemorySaver(max_threads=2, keep_checkpoints=1)
+    graph = _echo_graph(saver)
+    for thread_id in ("a", "b"):
+        _turn(graph, thread_id, "hi")
+        _turn(graph, thread_id, "again")
+    assert all(len(ns) == 1 for ns in saver.storage["a"].values())
+
+    _messages(graph, "a")  # touch "a" so "b" is least recently used
+    _turn(graph, "c", "hi")
+    assert set(saver.storage) == {"a", "c"}
+    assert _messages(graph, "a") == ["hi", "echo: hi", "again", "echo: again"]
+    assert _messages(graph, "b") == []
+    assert saver.stats()["threads"] == 2 and saver.stats()["checkpoint_bytes"] > 0
+
+
+def test_idle_threads_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(checkpointer_module.time, "monotonic", lambda: now[0])
+    saver = BoundedMemorySaver(ttl_seconds=60)
+    graph = _echo_graph(saver)
+    _turn(graph, "old", "hi")
+    now[0] += 30
+    _turn(graph, "new", "hi")
+
+    now[0] += 45
+    assert _messages(graph, "new") == ["hi", "echo: hi"]
+    assert "old" not in saver.storage
+    assert saver.stats()["threads"] == 1
+
+
+def test_evicted_thread_is_restored_from_sqlite(tmp_path):
+    store = SQLiteThreadStore(str(tmp_path / "threads.db"))
+    saver = BoundedMemorySaver(max_threads=1, store=store)
+    graph = _echo_graph(saver)
+    _turn(graph, "a", "first question")
+    _turn(graph, "b", "other thread")
+    assert "a" not in saver.storage
+
+    # The next turn on "a" continues from the stored checkpoint
+    _turn(graph, "a", "follow-up")
+    assert _messages(graph, "a") == ["first question", "echo: first question", "follow-up", "echo: follow-up"]
+
+    # A fresh process reads the same file
+    restarted = _echo_graph(BoundedMemorySaver(store=SQLiteThreadStore(str(tmp_path / "threads.db"))))
+    assert _messages(restarted, "b") == ["other thread", "echo: other thread"]
+
+    saver.delete_thread("a")
+    assert store.load("a") is None
+
+
+def test_store_sweep_is_throttled(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(checkpointer_module.time, "monotonic", lambda: now[0])
+    store = SQLiteThreadStore(str(tmp_path / "threads.db"))
+    sweeps = []
+    original = store.delete_older_than
+    store.delete_older_than = lambda cutoff: sweeps.append(cutoff) or original(cutoff)
+    graph = _echo_graph(BoundedMemorySaver(store=store, store_sweep_seconds=60))
+
+    for _ in range(3):
+        _messages(graph, "reader")
+    assert len(sweeps) == 1
+    now[0] += 61
+    _messages(graph, "reader")
+    assert len(sweeps) == 2
+
+
+def test_layout_probe_fails_loudly(monkeypatch):
+    monkeypatch.setattr(BoundedMemorySaver, "put_writes", lambda self, *args, **kwargs: None)
+    with pytest.raises(RuntimeError, match="langgraph-checkpoint"):
+        BoundedMemorySaver()
+
+
+# ── copilot_router graph ─────────────────────────────────────────────────────
+
+class _FakeLLM:
+    def __init__(self):
+        self.prompts = []
+
+    async def ainvoke(self, messages):
+        self.prompts.append(messages)
+        return AIMessage(content=f"reply {len(self.prompts)}")
+
+
+@pytest.fixture
+def copilot(monkeypatch):
+    router = pytest.importorskip("app.api.v1.copilot_router", exc_type=ImportError)
+    llm = _FakeLLM()
+    monkeypatch.setattr(router, "_get_llm", lambda: llm)
+    monkeypatch.setattr(router, "HISTORY_WINDOW", 4)
+    return router, llm
+
+
+def test_history_window_folds_old_turns_into_summary(copilot):
+    router, llm = copilot
+    config = {"configurable": {"thread_id": "window-test"}}
+
+    async def conversation():
+        for i in range(5):
+            await router._graph.ainvoke({"messages": [HumanMessage(content=f"question {i}")]}, config)
+        return await router._graph.aget_state(config)
+
+    state = asyncio.run(conversation())
+    assert len(state.values["messages"]) == 4
+    assert "User: question 0" in state.values["summary"]
+    # The prompt carries the summary plus at most the window
+    assert len(llm.prompts[-1]) <= 1 + 4
+    assert "question 0" in llm.prompts[-1][0].content
+
+
+def test_resent_conversation_is_not_duplicated(copilot):
+    router, _ = copilot
+    agent = router.GeminiResearchAgent()
+
+    async def turn(messages):
+        async for _ in agent._stream_response(messages, thread_id="dedup-test"):
+            pass
+
+    async def conversation():
+        await turn([{"role": "user", "content": "hello"}])
+        state = await router._graph.aget_state({"configurable": {"thread_id": "dedup-test"}})
+        reply = state.values["messages"][-1].content
+        # The client resends the whole conversation plus the new question
+        await turn([
+            {"role": "user", "content": "hello"},
+            {"role": "assistant", "content": reply},
+            {"role": "user", "content": "and then?"},
+        ])
+        return await router._graph.aget_state({"configurable": {"thread_id": "dedup-test"}})
+
+    state = asyncio.run(conversation())
+    assert [m.content for m in state.values["messages"]] == ["hello", "reply 1", "and then?", "reply 2"]
@@ -0,0 +1,127 @@
+"""
+Chunk index tests: Markdown chunking, indexing/search/delete against a scratch
+LanceDB, one table per embedder, and when the ANN index gets (re)built.
+
+Usage:
+    python -m pytest tests/test_embedding_index.py -q
+"""
+import sys
+from pathlib import Path
+
+import lancedb
+import pytest
+
+backend_dir = Path(__file__).parent.parent
+sys.path.append(str(backend_dir))
+
+from app.services import embedding_index
+from app.services.embedding_index import HashingEmbedder, PaperChunkIndex, chunk_markdown
+
+
+def _paper(topic: str, paragraphs: int = 3) -> str:
+    return "\n\n".join(
+        f"Paragraph {i} about {topic}. " + " ".join(f"{topic}{j}" for j in range(20)) for i in range(paragraphs)
+    )
+
+
+@pytest.fixture
+def index(tmp_path):
+    return PaperChunkIndex(db=lancedb.connect(str(tmp_path)), embedder=HashingEmbedder(dim=64))
+
+
+def test_chunk_markdown_drops_images_and_overlaps():
+    markdown = "![fig](crops/fig1.png)\n\n" + "\n\n".join(f"Paragraph {i} " + "word " * 60 for i in range(10))
+    chunks = chunk_markdown(markdown, chunk_size=600, overlap=100)
+
+    assert len(chunks) > 1
+    assert not any("crops/fig1.png" in c for c in chunks)
+    # A carried-over tail can push a chunk past the size by at most the overlap
+    assert all(len(c) <= 600 + 100 + 2 for c in chunks)
+    # Consecutive chunks share their boundary text
+    assert chunks[0][-50:] in chunks[1]
+    assert chunk_markdown("") == []
+
+
+def test_index_search_and_delete(index):
+    assert index.index_paper("a1", _paper("transformer"), title="Attention") > 0
+    assert index.index_paper("b2", _paper("diffusion"), title="Diffusion") > 0
+
+    hits = index.search("transformer transformer3", k=3)
+    assert hits and hits[0]["analysis_id"] == "a1"
+    assert hits[0]["title"] == "Attention"
+    assert {h["analysis_id"] for h in index.search("transformer", analysis_ids=["b2"])} == {"b2"}
+
+    # Re-indexing replaces the analysis' rows instead of duplicating them
+    rows = index._open_table().count_rows()
+    index.index_paper("a1", _paper("transformer"), title="Attention")
+    assert index._open_table().count_rows() == rows
+
+    index.delete_paper("a1")
+    assert {h["analysis_id"] for h in index.search("transformer", k=10)} == {"b2"}
+
+
+def test_embedders_never_share_a_table(tmp_path):
+    db = lancedb.connect(str(tmp_path))
+    small = PaperChunkIndex(db=db, embedder=HashingEmbedder(dim=64))
+    # What a process whose model failed to load would write
+    fallback = PaperChunkIndex(db=db, embedder=HashingEmbedder(dim=32))
+    small.index_paper("a1", _paper("transformer"))
+    fallback.index_paper("b2", _paper("transformer"))
+
+    assert small.table_name != fallback.table_name
+    assert {h["analysis_id"] for h in small.search("transformer", k=10)} == {"a1"}
+    assert {h["analysis_id"] for h in fallback.search("transformer", k=10)} == {"b2"}
+
+
+def test_concurrent_first_index_opens_existing_table(index, tmp_path):
+    # Another process created the table between our open and create
+    other = PaperChunkIndex(db=lancedb.connect(str(tmp_path)), embedder=HashingEmbedder(dim=64))
+    opened = []
+    original = index._open_table
+
+    def open_late():
+        opened.append(True)
+        if len(opened) == 1:
+            other.index_paper("first", _paper("graph"))
+            return None
+        return original()
+
+    index._open_table = open_late
+    index.index_paper("second", _paper("physics"))
+    assert {h["analysis_id"] for h in other.search("graph physics", k=20)} == {"first", "second"}
+
+
+def test_ann_index_threshold_survives_restart(tmp_path, monkeypatch):
+    # IVF_PQ needs a few hundred rows to train on; index once the table passes 256
+    monkeypatch.setattr(embedding_index, "ANN_INDEX_MIN_ROWS", 256)
+    db = lancedb.connect(str(tmp_path))
+    big = _paper("survey", paragraphs=1500)
+    big_chunks = len(chunk_markdown(big))
+    assert big_chunks >= 256
+
+    def new_index():
+        idx = PaperChunkIndex(db=db, embedder=HashingEmbedder(dim=32))
+        idx.builds = []
+        original = idx._maybe_build_ann_index
+
+        def spy(table):
+            before = idx._indexed_rows(table)
+            original(table)
+            if idx._indexed_rows(table) != before:
+                idx.builds.append(table.count_rows())
+
+        idx._maybe_build_ann_index = spy
+        return idx
+
+    first = new_index()
+    first.index_paper("big", big)
+    first.index_paper("p1", _paper("topic1", paragraphs=1))
+    assert first.builds == [big_chunks + 1]
+
+    # A fresh process reads the indexed row count from the table instead of rebuilding
+    restarted = new_index()
+    restarted.index_paper("p2", _paper("topic2", paragraphs=1))
+    assert restarted.builds == []
+    # ...and rebuilds once the table has doubled since the last build
+    restarted.index_paper("big2", big)
+    assert restarted.builds == [2 * big_chunks + 2]
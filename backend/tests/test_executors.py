@@ -0,0 +1,76 @@
+"""
+Pipeline executor tests: admission control and Retry-After estimates.
+
+Usage:
+    python -m pytest tests/test_executors.py -q
+"""
+import asyncio
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+backend_dir = Path(__file__).parent.parent
+sys.path.append(str(backend_dir))
+
+from app.core.executors import PipelineExecutors, PipelineSaturated
+
+
+def test_admission_caps_inflight_pipelines():
+    executors = PipelineExecutors(max_inflight=2, llm_threads=1, dla_executor="thread")
+    first, second = executors.admit(), executors.admit()
+    with pytest.raises(PipelineSaturated) as saturated:
+        executors.admit()
+    assert saturated.value.retry_after >= 1
+
+    with first:
+        pass
+    assert executors.inflight == 1
+    with executors.admit():
+        assert executors.inflight == 2
+    with second:
+        pass
+    assert executors.inflight == 0
+    executors.shutdown()
+
+
+def test_llm_calls_run_off_the_event_loop():
+    executors = PipelineExecutors(max_inflight=1, llm_threads=2, dla_executor="thread")
+
+    async def main():
+        return threading.get_ident(), await executors.llm(threading.get_ident)
+
+    caller, worker = asyncio.run(main())
+    assert caller != worker
+    executors.shutdown()
+
+
+def test_slot_held_until_an_abandoned_stage_finishes():
+    executors = PipelineExecutors(max_inflight=1, llm_threads=1, dla_executor="thread")
+    release = threading.Event()
+
+    async def request():
+        with executors.admit():
+            await executors.llm(release.wait, 5.0)
+
+    async def main():
+        task = asyncio.create_task(request())
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+    # The request is gone but its LLM call still runs on the pool: no new upload may take its place
+    assert executors.inflight == 1
+    with pytest.raises(PipelineSaturated):
+        executors.admit()
+    release.set()
+    for _ in range(100):
+        if executors.inflight == 0:
+            break
+        time.sleep(0.01)
+    assert executors.inflight == 0
+    executors.shutdown()
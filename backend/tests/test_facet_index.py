@@ -0,0 +1,59 @@
+"""
+FacetIndex tests: AND/OR filters, year ranges, facet counts and incremental updates.
+
+Usage:
+    python -m pytest tests/test_facet_index.py -q
+"""
+import sys
+from pathlib import Path
+
+backend_dir = Path(__file__).parent.parent
+sys.path.append(str(backend_dir))
+
+from app.core.facet_index import FacetIndex, extract_facets
+
+
+def _insights(datasets, optimization, year, authors=("A. Author",)):
+    return {
+        "metadata": {"authors": [{"name": a} for a in authors], "publication_year": year},
+        "methodologies": [{"datasets": list(datasets), "base_models": ["ResNet-50"], "metrics": ["Top-1"],
+                           "optimization": optimization}],
+    }
+
+
+def _index():
+    index = FacetIndex()
+    papers = {
+        "p1": _insights(["ImageNet"], "AdamW", 2021),
+        "p2": _insights(["ImageNet", "CIFAR-10"], "SGD", 2019),
+        "p3": _insights(["imagenet"], "adamw", 2023),
+        "p4": _insights(["COCO"], "AdamW", 2022),
+    }
+    for i, (pid, data) in enumerate(papers.items()):
+        index.add(pid, f"2024-01-0{i + 1}", extract_facets(data))
+    return index
+
+
+def test_and_or_filters_with_year_range():
+    index = _index()
+    both = index.search({"datasets": ["ImageNet"], "optimization": ["AdamW"]}, year_from=2020, year_to=2023)
+    assert both["ids"] == ["p3", "p1"]  # newest first; value matching is case-insensitive
+    assert both["total"] == 2
+
+    either = index.search({"datasets": ["COCO", "CIFAR-10"]}, op="or")
+    assert sorted(either["ids"]) == ["p2", "p4"]
+
+    assert index.search({"datasets": ["ImageNet"]}, year_to=2018)["total"] == 0
+
+
+def test_facet_counts_follow_matches_and_updates():
+    index = _index()
+    counts = {f["value"]: f["count"] for f in index.search({"optimization": ["AdamW"]})["facets"]["datasets"]}
+    assert counts == {"ImageNet": 2, "COCO": 1}
+
+    index.remove("p1")
+    index.add("p4", "2024-01-09", extract_facets(_insights(["ImageNet"], "SGD", 2022)))
+    result = index.search({"datasets": ["ImageNet"]})
+    assert result["ids"] == ["p4", "p3", "p2"]
+    assert {f["value"]: f["count"] for f in result["facets"]["optimization"]} == {"SGD": 2, "AdamW": 1}
+    assert "COCO" not in {f["value"] for f in index.search()["facets"]["datasets"]}
@@ -0,0 +1,97 @@
+"""
+Concurrency stress test for the GraphMemoryManager snapshot model.
+
+Usage:
+    python -m pytest tests/test_graph_db.py -q
+
+Many writer threads add triplet batches while reader threads serialize the
+graph. Readers must never crash, never see a torn payload (stats that disagree
+with the node/edge lists, edges pointing at missing nodes) and must observe
+monotonically increasing versions.
+"""
+import os
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+import networkx as nx
+import pytest
+
+os.environ.setdefault("LANCEDB_DIR", os.path.join(tempfile.gettempdir(), "paper_analyzer_test_lancedb"))
+
+backend_dir = Path(__file__).parent.parent
+sys.path.append(str(backend_dir))
+
+from app.core.graph_db import GraphMemoryManager
+
+WRITERS = 8
+READERS = 8
+BATCHES_PER_WRITER = 40
+TRIPLETS_PER_BATCH = 5
+
+
+def test_concurrent_writers_and_readers():
+    manager = GraphMemoryManager()
+    errors = []
+    start = threading.Barrier(WRITERS + READERS)
+    writers_done = threading.Event()
+
+    def writer(writer_id: int):
+        start.wait()
+        try:
+            for b in range(BATCHES_PER_WRITER):
+                batch = [
+                    (f"paper-{writer_id}", "USES_MODEL", f"model-{writer_id}-{b}-{t}")
+                    for t in range(TRIPLETS_PER_BATCH)
+                ]
+                manager.add_triplets(batch, context={"paper": f"paper-{writer_id}"})
+        except Exception as e:  # pragma: no cover - surfaced via assertion below
+            errors.append(e)
+
+    def reader():
+        start.wait()
+        last_version = -1
+        try:
+            while not writers_done.is_set():
+                payload = manager.get_full_graph()
+                node_ids = {n["id"] for n in payload["nodes"]}
+                assert payload["stats"]["node_count"] == len(payload["nodes"])
+                assert payload["stats"]["edge_count"] == len(payload["edges"])
+                assert all(e["source"] in node_ids and e["target"] in node_ids for e in payload["edges"])
+                # Every batch is published atomically: edge count is a whole number of batches
+                assert payload["stats"]["edge_count"] % TRIPLETS_PER_BATCH == 0
+                assert payload["version"] >= last_version
+                last_version = payload["version"]
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(WRITERS)]
+    readers = [threading.Thread(target=reader) for _ in range(READERS)]
+    for t in threads + readers:
+        t.start()
+    for t in threads:
+        t.join()
+    writers_done.set()
+    for t in readers:
+        t.join()
+
+    assert not errors, errors
+    expected_edges = WRITERS * BATCHES_PER_WRITER * TRIPLETS_PER_BATCH
+    summary = manager.get_graph_summary()
+    assert summary["edge_count"] == expected_edges
+    assert summary["node_count"] == expected_edges + WRITERS
+    assert manager.version == expected_edges
+
+
+def test_snapshot_is_immutable():
+    manager = GraphMemoryManager()
+    manager.add_triplet("A", "CITES", "B")
+    snapshot = manager.snapshot()
+    manager.add_triplet("B", "CITES", "C")
+
+    assert snapshot.graph.number_of_edges() == 1
+    assert manager.graph.number_of_edges() == 2
+    # Published snapshots are frozen
+    with pytest.raises(nx.NetworkXError):
+        snapshot.graph.add_edge("X", "Y")
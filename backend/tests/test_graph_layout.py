@@ -0,0 +1,57 @@
+"""
+Graph layout tests: deterministic coordinates, the per-version cache and warm starts.
+
+Usage:
+    python -m pytest tests/test_graph_layout.py -q
+"""
+import sys
+from pathlib import Path
+
+backend_dir = Path(__file__).parent.parent
+sys.path.append(str(backend_dir))
+
+from app.core.graph_layout import GraphLayoutEngine
+
+NODES = [f"n{i}" for i in range(40)]
+EDGES = [(f"n{i}", f"n{(i * 7 + 3) % 40}") for i in range(40)]
+
+
+def test_layout_is_deterministic():
+    first = GraphLayoutEngine().get_layout(NODES, EDGES, version=1)
+    second = GraphLayoutEngine().get_layout(NODES, EDGES, version=1)
+    assert set(first) == set(NODES)
+    assert first == second
+
+
+def test_cached_per_version(monkeypatch):
+    engine = GraphLayoutEngine(cache_versions=2)
+    computed = []
+    original = engine._compute
+    monkeypatch.setattr(engine, "_compute", lambda nodes, edges: computed.append(len(nodes)) or original(nodes, edges))
+
+    a = engine.get_layout(NODES, EDGES, version="a")
+    b = engine.get_layout(NODES[:20], EDGES[:10], version="b")
+    # Alternating between two cached versions computes nothing new
+    assert engine.get_layout(NODES, EDGES, version="a") is a
+    assert engine.get_layout(NODES[:20], EDGES[:10], version="b") is b
+    assert computed == [40, 20]
+
+    engine.get_layout(NODES[:10], [], version="c")
+    engine.get_layout(NODES, EDGES, version="a")
+    # "a" was the least recently used of two slots when "c" arrived
+    assert computed == [40, 20, 10, 40]
+    assert engine.version == "a"
+
+
+def test_warm_start_keeps_placed_nodes():
+    engine = GraphLayoutEngine()
+    before = engine.get_layout(NODES, EDGES, version=1)
+    grown = NODES + ["new"]
+    after = engine.get_layout(grown, EDGES + [("new", "n0")], version=2)
+
+    # Existing nodes only get a low-temperature refinement from their old spots
+    cold = GraphLayoutEngine().get_layout(grown, EDGES + [("new", "n0")], version=2)
+    drift = max(abs(after[n]["x"] - before[n]["x"]) + abs(after[n]["y"] - before[n]["y"]) for n in NODES)
+    cold_drift = max(abs(cold[n]["x"] - before[n]["x"]) + abs(cold[n]["y"] - before[n]["y"]) for n in NODES)
+    assert drift < cold_drift
+    assert drift < engine.scale * 0.02 * engine.warm_iterations * 2
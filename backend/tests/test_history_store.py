@@ -0,0 +1,164 @@
+"""
+HistoryStore tests: legacy history.json migration, id lookups, pagination and
+the history route's total.
+
+Usage:
+    python -m pytest tests/test_history_store.py -q
+"""
+import json
+import os
+import threading
+import sys
+from pathlib import Path
+
+backend_dir = Path(__file__).parent.parent
+sys.path.append(str(backend_dir))
+
+from app.core.history_store import HistoryStore, HistoryWriter
+
+
+def _entry(i: int, with_graph: bool = True) -> dict:
+    return {
+        "id": f"id-{i}",
+        "filename": f"paper_{i}.pdf",
+        "title": f"Paper {i}",
+        "authors": [f"Author {i}"],
+        "analyzed_at": f"2024-01-0{i}T00:00:00+00:00",
+        "pipeline": {"dla_engine": "MinerU"},
+        "extracted_data": {"metadata": {"title": f"Paper {i}"}},
+        "graph_data": {"nodes": [{"id": "a"}], "edges": []} if with_graph else None,
+    }
+
+
+def test_migrates_legacy_json_once(tmp_path):
+    legacy = tmp_path / "history.json"
+    legacy.write_text(json.dumps([_entry(3, with_graph=False), _entry(2), _entry(1)]), encoding="utf-8")
+
+    store = HistoryStore(str(tmp_path / "history.db"))
+    assert store.migrate_from_json(str(legacy)) == 3
+    assert not legacy.exists() and (tmp_path / "history.json.migrated").exists()
+    assert store.migrate_from_json(str(legacy)) == 0
+
+    summaries = store.list_summaries()
+    assert [s["id"] for s in summaries] == ["id-3", "id-2", "id-1"]
+    assert "extracted_data" not in summaries[0]
+
+    # Newest entry has no graph, so the graph fallback skips to the next one
+    assert store.latest_graph()[0] == "id-2"
+    assert store.latest()["id"] == "id-3"
+
+
+def test_get_and_delete(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.db"))
+    store.insert(_entry(1))
+
+    entry = store.get("id-1", include_graph=True)
+    assert entry["extracted_data"]["metadata"]["title"] == "Paper 1"
+    assert entry["graph_data"]["nodes"] == [{"id": "a"}]
+    assert "graph_data" not in store.get("id-1")
+
+    assert store.delete("id-1") is True
+    assert store.delete("id-1") is False
+    assert store.get("id-1") is None
+    assert store.count() == 0
+
+
+def test_cursor_pagination_and_projection(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.db"))
+    store.insert_many([_entry(i) for i in range(1, 8)])
+
+    seen, cursor = [], None
+    while True:
+        page = store.list_page(limit=3, cursor=cursor, fields=["title"])
+        seen += page["items"]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert [e["id"] for e in seen] == [f"id-{i}" for i in range(7, 0, -1)]
+    assert set(seen[0]) == {"id", "title"}
+
+    ascending = store.list_page(limit=2, order="asc")
+    assert [e["id"] for e in ascending["items"]] == ["id-1", "id-2"]
+
+    for bad in ({"fields": ["extracted_data"]}, {"order": "sideways"}, {"cursor": "not-a-cursor"}):
+        try:
+            store.list_page(**bad)
+        except ValueError:
+            continue
+        raise AssertionError(f"expected ValueError for {bad}")
+
+
+def test_history_route_counts_on_first_page_only(tmp_path, monkeypatch):
+    from fastapi.testclient import TestClient
+    import app.main as api
+
+    store = HistoryStore(str(tmp_path / "history.db"))
+    store.insert_many([_entry(i) for i in range(1, 6)])
+    monkeypatch.setattr(api, "history_store", store)
+    counts = []
+    original_count = store.count
+    store.count = lambda: counts.append(1) or original_count()
+
+    client = TestClient(api.app)
+    first = client.get("/api/v1/history", params={"limit": 2}).json()
+    assert first["total"] == 5 and len(first["history"]) == 2
+    second = client.get("/api/v1/history", params={"limit": 2, "cursor": first["next_cursor"]}).json()
+    assert second["total"] is None and [e["id"] for e in second["history"]] == ["id-3", "id-2"]
+    assert counts == [1]
+
+
+def test_facet_rows_follow_inserts_and_deletes(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.db"))
+    entry = _entry(1)
+    entry["extracted_data"] = {
+        "metadata": {"authors": [{"name": "Ada"}], "publication_year": 2021},
+        "methodologies": [{"datasets": ["ImageNet"], "optimization": "AdamW"}],
+    }
+    store.insert(entry)
+    store.insert(_entry(2))
+
+    facets = {analysis_id: sorted(f) for analysis_id, _, f in store.iter_facets()}
+    assert facets["id-1"] == [("authors", "Ada"), ("datasets", "ImageNet"), ("optimization", "AdamW"), ("year", "2021")]
+    assert facets["id-2"] == []
+
+    store.delete("id-1")
+    assert [analysis_id for analysis_id, _, _ in store.iter_facets()] == ["id-2"]
+
+
+def test_writer_coalesces_concurrent_inserts(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.db"))
+    writer = HistoryWriter(store, max_delay=0.05)
+    commits = []
+    original_apply = store.apply
+    store.apply = lambda ops: commits.append(len(ops)) or original_apply(ops)
+
+    futures = []
+    def submit(worker):
+        for i in range(25):
+            futures.append(writer.insert({**_entry(1), "id": f"w{worker}-{i}"}))
+    threads = [threading.Thread(target=submit, args=(w,)) for w in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    for f in futures:
+        f.result(timeout=10)
+
+    assert store.count() == 200
+    assert len(commits) < 200  # bursts share commits
+    assert writer.delete("w0-0").result(timeout=10) is True
+    assert writer.delete("w0-0").result(timeout=10) is False
+    writer.close()
+
+
+def test_reads_rows_written_before_payload_codec(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.db"))
+    store.insert(_entry(1))
+    # Rows from before the binary codec hold JSON text in the blob columns
+    store._conn.execute(
+        "UPDATE analysis_blobs SET extracted_data = ?, graph_data = ? WHERE id = 'id-1'",
+        (json.dumps({"metadata": {"title": "Legacy"}}), json.dumps({"nodes": [{"id": "x"}], "edges": []})),
+    )
+    entry = store.get("id-1", include_graph=True)
+    assert entry["extracted_data"]["metadata"]["title"] == "Legacy"
+    assert store.latest_graph()[1]["nodes"] == [{"id": "x"}]
@@ -0,0 +1,56 @@
+"""
+Bulk ingester tests: pipelined run into the history store, failure recording and manifest resume.
+
+Usage:
+    python -m pytest tests/test_ingest.py -q
+"""
+import sys
+import time
+from pathlib import Path
+
+backend_dir = Path(__file__).parent.parent
+sys.path.append(str(backend_dir))
+
+import app.ingest.pipeline as pipeline
+from app.core.history_store import HistoryStore
+from app.ingest import BulkIngester
+
+
+def _prepare(file_path):
+    if "broken" in file_path:
+        raise ValueError("File contains zero valid pages.")
+    time.sleep(0.01)
+    return {"markdown": Path(file_path).stem, "pages": 1}
+
+
+def _analyze(analysis_id, markdown):
+    time.sleep(0.02)
+    extracted = {"metadata": {"title": markdown, "authors": [{"name": "Ada"}]}, "methodologies": []}
+    return {"title": markdown, "extracted_data": extracted, "graph_data": None, "pipeline": {"chars_extracted": 1}}
+
+
+def test_ingest_pipeline_and_resume(tmp_path, monkeypatch):
+    monkeypatch.setattr(pipeline, "prepare_document", _prepare)
+    monkeypatch.setattr(pipeline, "analyze_document", _analyze)
+    papers = tmp_path / "papers"
+    (papers / "nested").mkdir(parents=True)
+    for name in ("a.pdf", "b.pdf", "nested/c.pdf", "broken.pdf"):
+        (papers / name).write_bytes(b"%PDF")
+    db = str(tmp_path / "history.db")
+
+    def ingester():
+        return BulkIngester(db, str(tmp_path / "manifest.jsonl"), layout_workers=2, llm_concurrency=2,
+                            buffer=1, layout_executor="thread")
+
+    report = ingester().run(str(papers))
+    assert (report.discovered, report.succeeded, report.failed, report.skipped) == (4, 3, 1, 0)
+    assert report.stages["layout"].failed == 1 and report.stages["persist"].completed == 3
+    assert 0 < report.stages["analyze"].utilization(report.wall_seconds) <= 1
+
+    store = HistoryStore(db)
+    assert sorted(s["title"] for s in store.list_summaries()) == ["a", "b", "c"]
+    store.close()
+
+    # Completed documents are skipped on the next run; the failure is retried
+    report = ingester().run(str(papers))
+    assert (report.skipped, report.succeeded, report.failed) == (3, 0, 1)
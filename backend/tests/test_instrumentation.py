@@ -0,0 +1,106 @@
+"""
+Instrumentation tests: stage timings, layout and token accounting, peak RSS
+only in dedicated processes, and the Prometheus text rendering behind /metrics
+and the workers' metrics server.
+
+Usage:
+    python -m pytest tests/test_instrumentation.py -q
+"""
+import os
+import subprocess
+import sys
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+import pytest
+
+backend_dir = Path(__file__).parent.parent
+sys.path.append(str(backend_dir))
+
+from app.core import instrumentation
+from app.core.instrumentation import StageTimer, peak_rss_bytes, record_layout, record_llm_usage, reset_peak_rss
+from app.core.metrics import MetricsRegistry, metrics, serve_metrics
+
+
+def test_layout_and_token_accounting():
+    pages = metrics.counter("pipeline_pages_total")
+    yolo_before, text_before = pages.value(mode="yolo"), pages.value(mode="text")
+    stage_seconds = metrics.histogram("pipeline_stage_seconds")
+    detect_before = stage_seconds.snapshot().get((("stage", "layout.detect"),), {"count": 0})["count"]
+
+    timer = StageTimer()
+    with timer.stage("layout"):
+        pass
+    # What extract_document returns from a layout worker process
+    record_layout({
+        "pages_processed": 12, "yolo_pages": 9, "timings": {"layout.detect": 1.5, "layout.rasterize": 0.25},
+        "peak_rss_bytes": 512 * 1024 * 1024, "model": "yolo-test", "pid": os.getpid(),
+    }, timer)
+
+    assert set(timer.to_dict()) == {"layout", "layout.detect", "layout.rasterize"}
+    assert timer.to_dict()["layout.detect"] == 1.5
+    assert stage_seconds.snapshot()[(("stage", "layout.detect"),)]["count"] == detect_before + 1
+    assert pages.value(mode="yolo") == yolo_before + 9 and pages.value(mode="text") == text_before + 3
+    assert metrics.gauge("models_loaded").value(model="yolo-test") == 1
+
+    totals = record_llm_usage("extraction", {"gemini-test": {"input_tokens": 1200, "output_tokens": 300, "total_tokens": 1500}})
+    assert totals == {"input_tokens": 1200, "output_tokens": 300}
+    assert metrics.counter("llm_tokens_total").value(call="extraction", model="gemini-test", direction="output") == 300
+    assert peak_rss_bytes() > 0
+
+
+def test_models_loaded_counts_live_processes_once():
+    models_loaded = metrics.gauge("models_loaded")
+    # A recycled layout pool worker: reported the model, then exited
+    exited = subprocess.Popen([sys.executable, "-c", "pass"])
+    exited.wait()
+    record_layout({"pages_processed": 1, "model": "yolo-pids", "pid": exited.pid})
+    assert models_loaded.value(model="yolo-pids") == 0
+
+    # The same process reporting twice, through a layout result and its own load, counts once
+    instrumentation.note_model_loaded("yolo-pids")
+    record_layout({"pages_processed": 1, "model": "yolo-pids", "pid": os.getpid()})
+    instrumentation.update_process_gauges()
+    assert models_loaded.value(model="yolo-pids") == 1
+
+
+def test_prometheus_exposition():
+    registry = MetricsRegistry()
+    registry.counter("papers_total", "Papers seen").inc(2, source='upload "web"')
+    latency = registry.histogram("stage_seconds", "Stage latency", buckets=(1.0, 5.0))
+    latency.observe(0.5, stage="graph")
+    latency.observe(7.0, stage="graph")
+
+    text = registry.exposition()
+    assert '# TYPE papers_total counter\npapers_total{source="upload \\"web\\""} 2\n' in text
+    assert 'stage_seconds_bucket{stage="graph",le="1"} 1' in text
+    assert 'stage_seconds_bucket{stage="graph",le="5"} 1' in text
+    assert 'stage_seconds_bucket{stage="graph",le="+Inf"} 2' in text
+    assert 'stage_seconds_sum{stage="graph"} 7.5' in text
+    assert 'stage_seconds_count{stage="graph"} 2' in text
+
+
+def test_peak_rss_only_reset_in_dedicated_process(monkeypatch):
+    # The test process runs other work alongside, like the API process
+    assert reset_peak_rss() is False
+    monkeypatch.setattr(instrumentation, "_dedicated_process", True)
+    assert reset_peak_rss() is (Path("/proc/self/clear_refs").exists())
+
+
+def test_metrics_server():
+    registry = MetricsRegistry()
+    registry.counter("worker_tasks_total").inc(3, stage="graph")
+    scrapes = []
+    server = serve_metrics(0, registry=registry, before_scrape=lambda: scrapes.append(1), host="127.0.0.1")
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        with urllib.request.urlopen(f"{base}/metrics", timeout=5) as response:
+            assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+            assert 'worker_tasks_total{stage="graph"} 3' in response.read().decode("utf-8")
+        assert scrapes == [1]
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(f"{base}/other", timeout=5)
+    finally:
+        server.shutdown()
+        server.server_close()
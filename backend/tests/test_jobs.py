@@ -0,0 +1,260 @@
+"""
+Job manager tests: eager in-process mode reports stage progress, runs completion hooks,
+re-analyzes a finished job from its kept source, and cancels queued and running jobs;
+jobs of a stopped API process are recovered as submitted, and slots freed by another
+replica's jobs wake the local queue.
+
+Usage:
+    python -m pytest tests/test_jobs.py -q
+"""
+import shutil
+import sys
+import threading
+import time
+import types
+from pathlib import Path
+
+backend_dir = Path(__file__).parent.parent
+sys.path.append(str(backend_dir))
+
+import app.core.executors as executors
+import app.services.lang_extract_engine as lang_extract_engine
+import app.services.pipeline_tasks as pipeline_tasks
+from app.core.artifact_store import ArtifactStore
+from app.services.jobs import JobManager
+from app.services.relational_engine import relational_builder
+
+
+def _wait_for(manager, job_id, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = manager.get(job_id)
+        if job["status"] in ("COMPLETE", "FAILED", "CANCELLED"):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def _spool(tmp_path):
+    import fitz
+
+    spooled = tmp_path / "job.pdf"
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), "hello")
+    doc.save(spooled)
+    return spooled
+
+
+def _stub_stages(tmp_path, monkeypatch, layout=None):
+    insights = {"metadata": {"title": "Paper"}, "methodologies": []}
+    store = ArtifactStore(str(tmp_path / "artifacts"))
+    monkeypatch.setattr(pipeline_tasks, "artifact_store", store)
+    monkeypatch.setattr("app.core.artifact_store.artifact_store", store)
+    monkeypatch.setattr(executors, "extract_layout", layout or (lambda path, deadline=None, cancel=None: {"markdown": "abc"}))
+    monkeypatch.setattr(lang_extract_engine, "run_lang_extract_pipeline", lambda clean_text, instructions=None, fast=False, timeout=None:
+                        types.SimpleNamespace(metadata=types.SimpleNamespace(title="Paper"), model_dump=lambda: insights))
+    monkeypatch.setattr(relational_builder, "build_knowledge_graph", lambda structured_data, timeout=None, cancel=None: {"success": False})
+
+
+def test_eager_job_reports_progress_and_completes(tmp_path, monkeypatch):
+    _stub_stages(tmp_path, monkeypatch)
+    spooled = _spool(tmp_path)
+    seen = []
+
+    manager = JobManager(mode="eager")
+    manager.on_complete(lambda job, outcome: seen.append((job["id"], outcome["paper_title"])))
+    submitted = manager.submit("job-1", str(spooled), "paper.pdf", "alice")
+    assert submitted["status"] == "PENDING"
+
+    job = _wait_for(manager, "job-1")
+    assert job["status"] == "COMPLETE" and job["progress"] == 100.0
+    assert job["paper_title"] == "Paper" and job["pipeline"]["chars_extracted"] == 3
+    assert seen == [("job-1", "Paper")]
+    assert not spooled.exists()
+
+    # Re-analysis with new instructions reuses the layout but re-runs extraction
+    manager.reanalyze("job-1", instructions="Focus on limitations")
+    job = _wait_for(manager, "job-1")
+    assert job["status"] == "COMPLETE"
+    assert job["skipped_stages"] == ["layout"]
+    assert seen[-1] == ("job-1", "Paper")
+
+
+def test_eager_job_failure_is_recorded(tmp_path, monkeypatch):
+    def layout(path, deadline=None, cancel=None, profile=False):
+        raise RuntimeError("layout model missing")
+
+    _stub_stages(tmp_path, monkeypatch, layout=layout)
+    manager = JobManager(mode="eager")
+    manager.submit("job-2", str(_spool(tmp_path)), "paper.pdf", "alice")
+
+    job = _wait_for(manager, "job-2")
+    assert job["status"] == "FAILED"
+    assert "layout model missing" in job["error_message"]
+
+
+def test_cancel_stops_running_job_between_pages_and_drops_queued_one(tmp_path, monkeypatch):
+    pages_done = []
+    started = threading.Event()
+
+    def layout(path, deadline=None, cancel=None, profile=False):
+        # Stands in for the page loop in MinerUExtractor.extract_document
+        for page in range(500):
+            started.set()
+            cancel.check(f"page {page + 1}")
+            pages_done.append(page)
+            time.sleep(0.01)
+        return {"markdown": "abc"}
+
+    _stub_stages(tmp_path, monkeypatch, layout=layout)
+    manager = JobManager(mode="eager", eager_concurrency=1)
+    running = _spool(tmp_path)
+    queued = tmp_path / "queued.pdf"
+    shutil.copy(running, queued)
+    manager.submit("job-3", str(running), "paper.pdf", "alice")
+    manager.submit("job-4", str(queued), "paper.pdf", "alice")
+    assert started.wait(5.0)
+
+    # The second job never reached a worker: it is dropped on the spot, with its spooled file
+    assert manager.cancel("job-4")["status"] == "CANCELLED"
+    assert not queued.exists()
+
+    assert manager.cancel("job-3")["status"] == "CANCELLING"
+    job = _wait_for(manager, "job-3")
+    assert job["status"] == "CANCELLED"
+    assert len(pages_done) < 500
+    # Its slot is free again: the scheduler has nothing running or waiting
+    assert manager.scheduler.stats()["dispatched"] == 0
+
+
+class _Registry:
+    """In-memory stand-in for RedisQueueRegistry with the same claim rule."""
+
+    ttl = 30.0
+
+    def __init__(self, instance, live=()):
+        self.instance = instance
+        self.live = set(live) | {instance}
+        self.owners = {}
+        self.payloads = {}
+
+    def heartbeat(self):
+        pass
+
+    def hold(self, job_id, payload=None):
+        self.owners[job_id] = self.instance
+        if payload is not None:
+            self.payloads[job_id] = payload
+
+    def dispatched(self, job_id):
+        self.owners[job_id] = "-"
+        self.payloads.pop(job_id, None)
+
+    def forget(self, job_id):
+        self.owners.pop(job_id, None)
+        self.payloads.pop(job_id, None)
+
+    def payload(self, job_id):
+        return self.payloads.get(job_id)
+
+    def claim(self, job_id):
+        owner = self.owners.get(job_id)
+        if owner == "-" or owner in self.live:
+            return False
+        self.owners[job_id] = self.instance
+        return True
+
+
+def test_recover_pending_requeues_jobs_of_a_stopped_process(tmp_path, monkeypatch):
+    from datetime import datetime, timedelta, timezone
+
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    import app.services.extraction_worker as extraction_worker
+    import app.services.jobs as jobs
+    from app.core.database import Base
+    from app.core.fair_scheduler import FairScheduler, MemoryTenantSlots
+    from app.models.task import ExtractionTask
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'tasks.db'}")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)
+    monkeypatch.setattr(jobs, "SessionLocal", session)
+    monkeypatch.setattr(jobs, "database_available", lambda: True)
+    failed = []
+    monkeypatch.setattr(extraction_worker, "update_db_task", lambda job_id, status, progress, **kw: failed.append((job_id, status)))
+
+    spooled = _spool(tmp_path)
+    old = datetime.now(timezone.utc) - timedelta(minutes=10)
+    with session() as db:
+        db.add_all([
+            ExtractionTask(id="orphan", user_id="alice", file_path=str(spooled), status="PENDING", created_at=old),
+            ExtractionTask(id="live", user_id="bob", file_path=str(spooled), status="PENDING", created_at=old),
+            ExtractionTask(id="sent", user_id="bob", file_path=str(spooled), status="PENDING", created_at=old),
+            ExtractionTask(id="fresh", user_id="carol", file_path=str(spooled), status="PENDING"),
+            ExtractionTask(id="gone", user_id="dave", file_path=str(tmp_path / "missing.pdf"), status="PENDING", created_at=old),
+            ExtractionTask(id="done", user_id="erin", file_path=str(spooled), status="COMPLETE", created_at=old),
+        ])
+        db.commit()
+
+    manager = JobManager(mode="celery")
+    manager.registry = _Registry("restarted", live={"replica-2"})
+    manager.registry.owners.update({"orphan": "crashed", "live": "replica-2", "sent": "-"})
+    # The orphan was a re-analysis: it must run with its instructions, forced stages and budget
+    manager.registry.payloads["orphan"] = {
+        "file_path": str(spooled), "filename": "paper.pdf", "instructions": "Focus on datasets",
+        "force": ["extract"], "budget_seconds": 120.0, "profile": True,
+    }
+    dispatched = []
+    manager.scheduler = FairScheduler(lambda job: dispatched.append(job), slots=MemoryTenantSlots())
+
+    assert manager.recover_pending() == 1
+    assert [(job.job_id, job.tenant) for job in dispatched] == [("orphan", "alice")]
+    assert dispatched[0].payload == {
+        "file_path": str(spooled), "filename": "paper.pdf", "instructions": "Focus on datasets",
+        "force": ["extract"], "budget_seconds": 120.0, "profile": True,
+    }
+    assert manager.registry.owners["orphan"] == "restarted"
+    # Held by a live replica, already with the workers, or too new to judge: untouched
+    assert manager.registry.owners["live"] == "replica-2" and manager.registry.owners["sent"] == "-"
+    # Nothing left to run it from
+    assert failed == [("gone", "FAILED")] and "gone" not in manager.registry.owners
+
+
+class _StopWatching(BaseException):
+    pass
+
+
+class _Subscription:
+    """Hands the watcher a scripted list of events (None = a quiet 5 s), then stops it."""
+
+    def __init__(self, events):
+        self.events = list(events)
+
+    def get(self, timeout=None):
+        if not self.events:
+            raise _StopWatching()
+        return self.events.pop(0)
+
+
+def test_slot_freed_by_another_replica_dispatches_local_job():
+    from app.core.fair_scheduler import FairScheduler, MemoryTenantSlots
+
+    # On a terminal event for a job this process never dispatched, and on a quiet spell
+    for events in ([{"id": "theirs", "status": "COMPLETE"}], [None]):
+        # Tenant caps are shared across replicas (RedisTenantSlots in production)
+        shared = MemoryTenantSlots()
+        shared.acquire("alice", "theirs", 1, 60.0)  # another replica's running job
+        manager = JobManager(mode="eager")
+        dispatched = []
+        manager.scheduler = FairScheduler(lambda job: dispatched.append(job.job_id), slots=shared, tenant_cap=1)
+        manager.scheduler.enqueue("ours", "alice")
+        assert dispatched == []
+
+        shared.release("alice", "theirs")
+        try:
+            manager._watch(_Subscription(events))
+        except _StopWatching:
+            pass
+        assert dispatched == ["ours"]
@@ -0,0 +1,46 @@
+"""
+Payload codec tests: round trips and transparent reads of legacy JSON payloads.
+
+Usage:
+    python -m pytest tests/test_payload_codec.py -q
+"""
+import json
+import sys
+from pathlib import Path
+
+backend_dir = Path(__file__).parent.parent
+sys.path.append(str(backend_dir))
+
+from app.core.payload_codec import MAGIC, PAYLOAD_VERSION, decode_payload, encode_payload, is_encoded
+
+PAYLOAD = {
+    "metadata": {"title": "Attention Is All You Need", "publication_year": 2017},
+    "methodologies": [{"datasets": ["WMT14"] * 50, "optimization": "Adam"}],
+    "scores": [0.25, 1e-9, None, True],
+}
+
+
+def test_round_trip_small_and_compressed():
+    for payload in (PAYLOAD, {"tiny": 1}):
+        data = encode_payload(payload)
+        assert is_encoded(data)
+        assert data[len(MAGIC)] == PAYLOAD_VERSION
+        assert decode_payload(data) == payload
+    assert len(encode_payload(PAYLOAD)) < len(json.dumps(PAYLOAD))
+
+
+def test_reads_legacy_formats():
+    assert decode_payload(json.dumps(PAYLOAD, indent=2)) == PAYLOAD
+    assert decode_payload(json.dumps(PAYLOAD).encode("utf-8")) == PAYLOAD
+    assert decode_payload(PAYLOAD) is PAYLOAD  # already deserialized by a JSON column
+    assert decode_payload(None) is None
+
+
+def test_rejects_newer_schema_version():
+    data = bytearray(encode_payload(PAYLOAD))
+    data[len(MAGIC)] = PAYLOAD_VERSION + 1
+    try:
+        decode_payload(bytes(data))
+    except ValueError:
+        return
+    raise AssertionError("expected ValueError for a newer payload version")
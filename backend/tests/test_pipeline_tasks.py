@@ -0,0 +1,176 @@
+"""
+Staged Celery pipeline tests: the chain runs end to end (applied locally, no broker),
+passes artifact references between stages, and re-runs only the stages whose inputs changed.
+
+Usage:
+    python -m pytest tests/test_pipeline_tasks.py -q
+"""
+import sys
+import types
+from pathlib import Path
+
+import pytest
+
+backend_dir = Path(__file__).parent.parent
+sys.path.append(str(backend_dir))
+
+import app.core.executors as executors
+import app.services.lang_extract_engine as lang_extract_engine
+import app.services.pipeline_tasks as pipeline_tasks
+from app.core.artifact_store import ArtifactStore
+from app.services.relational_engine import relational_builder
+
+INSIGHTS = {"metadata": {"title": "Staged"}, "methodologies": []}
+
+
+def _stub_stages(monkeypatch, calls):
+    def layout(path, deadline=None, cancel=None, profile=False):
+        calls.append("layout")
+        return {"markdown": "# Staged\n" + "x" * 5000}
+
+    def extract(clean_text, instructions=None, fast=False, timeout=None):
+        calls.append("extract-fast" if fast else "extract")
+        return types.SimpleNamespace(metadata=types.SimpleNamespace(title="Staged"), model_dump=lambda: INSIGHTS)
+
+    def graph(structured_data, timeout=None, cancel=None):
+        calls.append("graph")
+        return {"success": True, "triplet_count": 1, "node_count": 2, "edge_count": 1, "triplets": [["A", "uses", "B"]]}
+
+    monkeypatch.setattr(executors, "extract_layout", layout)
+    monkeypatch.setattr(lang_extract_engine, "run_lang_extract_pipeline", extract)
+    monkeypatch.setattr(relational_builder, "build_knowledge_graph", graph)
+
+
+def _pdf(tmp_path):
+    import fitz
+
+    pdf_path = tmp_path / "paper.pdf"
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), "hello")
+    doc.save(pdf_path)
+    return pdf_path
+
+
+def test_chain_passes_references(tmp_path, monkeypatch):
+    pdf_path = _pdf(tmp_path)
+    store = ArtifactStore(str(tmp_path / "artifacts"))
+    monkeypatch.setattr(pipeline_tasks, "artifact_store", store)
+    _stub_stages(monkeypatch, [])
+
+    seen_refs = []
+    original_stats = pipeline_tasks.stats_stage.run
+    monkeypatch.setattr(pipeline_tasks.stats_stage, "run",
+                        lambda ctx: seen_refs.append(dict(ctx["artifacts"])) or original_stats(ctx))
+
+    result = pipeline_tasks.build_pipeline("job-41", str(pdf_path), "alice").apply().get()
+
+    assert result["status"] == "COMPLETE"
+    assert result["pipeline"]["chars_extracted"] == 5009
+    assert result["skipped_stages"] == []
+    assert {"layout", "extraction", "statistics", "graph", "persist"} <= set(result["pipeline"]["timings"])
+    # Stages see short content-addressed references into the store, never the Markdown itself
+    assert set(seen_refs[0]) == {"markdown", "insights"}
+    assert seen_refs[0]["markdown"].startswith("job-41/layout-")
+    assert store.get(seen_refs[0]["insights"]) == INSIGHTS
+    # The upload is kept with the task's artifacts for re-analysis
+    assert not pdf_path.exists()
+    assert Path(store.source_path("job-41")).exists()
+
+
+def test_rerun_starts_at_first_changed_stage(tmp_path, monkeypatch):
+    pdf_path = _pdf(tmp_path)
+    store = ArtifactStore(str(tmp_path / "artifacts"))
+    monkeypatch.setattr(pipeline_tasks, "artifact_store", store)
+    calls = []
+    _stub_stages(monkeypatch, calls)
+
+    pipeline_tasks.build_pipeline("job-42", str(pdf_path), "alice").apply().get()
+    source = store.source_path("job-42")
+    assert calls == ["layout", "extract", "graph"]
+
+    # Same inputs: everything is reused
+    calls.clear()
+    result = pipeline_tasks.build_pipeline("job-42", source, "alice").apply().get()
+    assert calls == []
+    assert result["skipped_stages"] == ["layout", "extract", "stats", "graph"]
+    assert result["pipeline"]["graph_triplets"] == 1
+
+    # New extraction instructions: layout is reused, extraction onwards re-runs
+    calls.clear()
+    result = pipeline_tasks.build_pipeline("job-42", source, "alice", instructions="Focus on datasets").apply().get()
+    assert calls == ["extract", "graph"]
+    assert result["skipped_stages"] == ["layout"]
+
+    # Forcing a stage recomputes it even though its inputs are unchanged
+    calls.clear()
+    result = pipeline_tasks.build_pipeline("job-42", source, "alice", force=["layout"]).apply().get()
+    assert calls == ["layout"]
+    assert result["skipped_stages"] == ["extract", "stats", "graph"]
+
+
+def test_tight_budget_degrades_instead_of_overrunning(tmp_path, monkeypatch):
+    pdf_path = _pdf(tmp_path)
+    store = ArtifactStore(str(tmp_path / "artifacts"))
+    monkeypatch.setattr(pipeline_tasks, "artifact_store", store)
+    calls = []
+    _stub_stages(monkeypatch, calls)
+
+    # Too little time for the full model or the graph, but enough to finish
+    result = pipeline_tasks.build_pipeline("job-45", str(pdf_path), "alice", budget_seconds=10).apply().get()
+    assert result["status"] == "COMPLETE"
+    assert calls == ["layout", "extract-fast"]
+    assert result["degraded"] == ["fast_extraction", "graph"]
+    assert result["pipeline"]["degraded"] == ["fast_extraction", "graph"]
+
+    # The fast extraction isn't reused as the full one once there is time again
+    calls.clear()
+    result = pipeline_tasks.build_pipeline("job-45", store.source_path("job-45"), "alice").apply().get()
+    assert calls == ["extract", "graph"]
+    assert result["degraded"] == []
+
+
+def test_unexpected_error_outside_a_stage_call_fails_the_job(tmp_path, monkeypatch):
+    pdf_path = _pdf(tmp_path)
+    store = ArtifactStore(str(tmp_path / "artifacts"))
+    monkeypatch.setattr(pipeline_tasks, "artifact_store", store)
+    _stub_stages(monkeypatch, [])
+    statuses = []
+    monkeypatch.setattr(pipeline_tasks, "update_db_task",
+                        lambda task_id, status, progress, **fields: statuses.append((status, fields.get("error_message"))))
+    # Storing the stats artifact (outside the stage's own error handling) hits a full disk
+    original_put = store.put
+
+    def put(task_id, stage, key, obj):
+        if stage == "stats":
+            raise OSError("No space left on device")
+        return original_put(task_id, stage, key, obj)
+
+    monkeypatch.setattr(store, "put", put)
+    with pytest.raises(OSError):
+        pipeline_tasks.build_pipeline("job-47", str(pdf_path), "alice").apply().get()
+    assert statuses[-1] == ("FAILED", "stats: No space left on device")
+
+
+def test_cancel_during_graph_call_merges_nothing(tmp_path, monkeypatch):
+    from app.core.cancellation import CancelToken, Cancelled
+
+    pdf_path = _pdf(tmp_path)
+    store = ArtifactStore(str(tmp_path / "artifacts"))
+    monkeypatch.setattr(pipeline_tasks, "artifact_store", store)
+    calls = []
+    _stub_stages(monkeypatch, calls)
+    statuses = []
+    monkeypatch.setattr(pipeline_tasks, "update_db_task",
+                        lambda task_id, status, progress, **fields: statuses.append(status))
+
+    def graph(structured_data, timeout=None, cancel=None):
+        # DELETE arrives while the LLM call is in flight; the merge checks the token first
+        CancelToken("job-46").cancel("deleted")
+        cancel.check("graph merge")
+        calls.append("merged")
+
+    monkeypatch.setattr(relational_builder, "build_knowledge_graph", graph)
+    with pytest.raises(Cancelled):
+        pipeline_tasks.build_pipeline("job-46", str(pdf_path), "alice").apply().get()
+    assert "merged" not in calls
+    assert statuses[-1] == "CANCELLED"
@@ -0,0 +1,55 @@
+"""
+Profiling hook tests: the sampling profiler, staged profile artifacts and the
+admin gate.
+
+Usage:
+    python -m pytest tests/test_profiling.py -q
+"""
+import sys
+import threading
+import time
+from pathlib import Path
+
+backend_dir = Path(__file__).parent.parent
+sys.path.append(str(backend_dir))
+
+from app.core import profiling
+from app.core.artifact_store import ArtifactStore
+from app.core.profiling import PROFILE_ALLOCATIONS, PROFILE_STACKS, SamplingProfiler, save_profile
+from app.core.serialization import loads
+
+
+def _busy(seconds: float):
+    blocks = []
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        blocks.append(bytearray(4096))
+    return len(blocks)
+
+
+def test_sampling_profiler_and_staged_artifacts(tmp_path):
+    profiler = SamplingProfiler(thread_ids=[threading.get_ident()], interval=0.002).start()
+    _busy(0.2)
+    profile = profiler.stop()
+
+    assert profile["samples"] > 0
+    assert any("_busy" in stack for stack in profile["stacks"])
+    assert profile["allocations"]["peak_bytes"] > 0 and profile["allocations"]["top"]
+
+    store = ArtifactStore(str(tmp_path))
+    links = save_profile(store, "job-1", profile, part="extract")
+    save_profile(store, "job-1", profile, part="graph")
+    assert links["stacks"].endswith(f"/job-1/{PROFILE_STACKS}")
+
+    lines = store.read_file("job-1", PROFILE_STACKS).decode("utf-8").splitlines()
+    assert {line.split(";", 1)[0] for line in lines} == {"extract", "graph"}
+    assert set(loads(store.read_file("job-1", PROFILE_ALLOCATIONS))) == {"extract", "graph"}
+
+
+def test_profiling_requires_the_admin_token(monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILING_ADMIN_TOKEN", "")
+    assert not profiling.profiling_authorized("anything")
+    monkeypatch.setattr(profiling, "PROFILING_ADMIN_TOKEN", "s3cret")
+    assert not profiling.profiling_authorized(None)
+    assert not profiling.profiling_authorized("wrong")
+    assert profiling.profiling_authorized("s3cret")
@@ -0,0 +1,119 @@
+"""
+Serialization tests: the shared JSON encoder on both the orjson and the stdlib
+fallback path, and the default response class.
+
+Usage:
+    python -m pytest tests/test_serialization.py -q
+"""
+import datetime
+import decimal
+import json
+import sys
+import uuid
+from pathlib import Path
+
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+
+backend_dir = Path(__file__).parent.parent
+sys.path.append(str(backend_dir))
+
+from app.core import serialization
+from app.core.serialization import FastJSONResponse, dumps, dumps_str, loads
+
+
+class _Paper(BaseModel):
+    title: str
+    analyzed_at: datetime.datetime
+    scores: list
+
+
+class _Opaque:
+    def __str__(self):
+        return "opaque!"
+
+
+@pytest.fixture(params=["orjson", "stdlib"])
+def encoder(request, monkeypatch):
+    if request.param == "stdlib":
+        monkeypatch.setattr(serialization, "orjson", None)
+    return request.param
+
+
+def test_rich_types(encoder):
+    when = datetime.datetime(2024, 1, 2, 3, 4, 5, 600000, tzinfo=datetime.timezone.utc)
+    payload = {
+        "when": when,
+        "day": datetime.date(2024, 1, 2),
+        "id": uuid.UUID(int=1),
+        "matrix": np.arange(6).reshape(2, 3),
+        "f32": np.float32(0.5),
+        "i64": np.int64(7),
+        "paper": _Paper(title="ü", analyzed_at=when, scores=[1, 2]),
+        "tags": {"gan"},
+        "pair": (1, 2),
+    }
+    assert loads(dumps(payload)) == {
+        "when": "2024-01-02T03:04:05.600000+00:00",
+        "day": "2024-01-02",
+        "id": "00000000-0000-0000-0000-000000000001",
+        "matrix": [[0, 1, 2], [3, 4, 5]],
+        "f32": 0.5,
+        "i64": 7,
+        "paper": {"title": "ü", "analyzed_at": "2024-01-02T03:04:05.600000Z", "scores": [1, 2]},
+        "tags": ["gan"],
+        "pair": [1, 2],
+    }
+
+
+def test_pydantic_model_at_top_level(encoder):
+    paper = _Paper(title="T", analyzed_at=datetime.datetime(2024, 1, 1), scores=[])
+    assert dumps(paper) == paper.model_dump_json().encode("utf-8")
+    assert loads(dumps(paper, pretty=True)) == loads(paper.model_dump_json())
+
+
+def test_non_str_keys(encoder):
+    assert loads(dumps({1: "a", 2.5: "b", "c": 3})) == {"1": "a", "2.5": "b", "c": 3}
+
+
+def test_pretty_and_compact(encoder):
+    data = {"a": [1, {"b": None}], "ü": "ü"}
+    compact = dumps_str(data)
+    pretty = dumps_str(data, pretty=True)
+    assert "\n" not in compact and " " not in compact
+    assert pretty.splitlines()[1] == '  "a": ['
+    assert loads(compact) == loads(pretty) == data
+    # Non-ASCII stays UTF-8 rather than \u escapes
+    assert "ü" in compact
+
+
+def test_default_str_parity(encoder):
+    # Types the previous json.dumps(default=str) call handled through str() still do
+    values = [uuid.UUID(int=5), Path("/data/paper.pdf"), decimal.Decimal("1.10"), _Opaque()]
+    assert loads(dumps(values)) == loads(json.dumps(values, default=str))
+
+
+def test_loads_accepts_bytes_str_and_memoryview(encoder):
+    raw = dumps({"x": 1})
+    assert loads(raw) == loads(raw.decode("utf-8")) == loads(memoryview(raw)) == loads(bytearray(raw)) == {"x": 1}
+
+
+def test_fast_json_response(encoder):
+    app = FastAPI(default_response_class=FastJSONResponse)
+
+    @app.get("/direct")
+    def direct():
+        return FastJSONResponse({"id": uuid.UUID(int=3), "values": np.array([1.5])})
+
+    @app.get("/default")
+    def default():
+        return {"when": datetime.date(2024, 5, 6)}
+
+    client = TestClient(app)
+    response = client.get("/direct")
+    assert response.headers["content-type"] == "application/json"
+    assert response.json() == {"id": "00000000-0000-0000-0000-000000000003", "values": [1.5]}
+    assert client.get("/default").json() == {"when": "2024-05-06"}
@@ -0,0 +1,101 @@
+"""
+Job progress tests: transitions go to the live channel (and its subscribers) at once,
+while the ExtractionTask row gets terminal states immediately and the rest in batched snapshots.
+
+Usage:
+    python -m pytest tests/test_task_progress.py -q
+"""
+import sys
+from pathlib import Path
+
+backend_dir = Path(__file__).parent.parent
+sys.path.append(str(backend_dir))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import app.services.task_progress as task_progress_module
+from app.core.database import Base
+from app.core.progress_channel import ProgressChannel
+from app.models.task import ExtractionTask
+from app.services.task_progress import TaskProgressRecorder
+
+
+def _setup(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'tasks.db'}")
+    Base.metadata.create_all(engine, tables=[ExtractionTask.__table__])
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        db.add_all([ExtractionTask(id=f"job-{i}", user_id="alice", status="PENDING", progress=0.0) for i in range(3)])
+        db.commit()
+    channel = ProgressChannel(backend="memory")
+    monkeypatch.setattr(task_progress_module, "SessionLocal", Session)
+    monkeypatch.setattr(task_progress_module, "database_available", lambda: True)
+    monkeypatch.setattr(task_progress_module, "progress_channel", channel)
+    return Session, channel
+
+
+def _row(Session, task_id):
+    with Session() as db:
+        return db.get(ExtractionTask, task_id)
+
+
+def test_progress_is_live_and_flushed_in_batches(tmp_path, monkeypatch):
+    Session, channel = _setup(tmp_path, monkeypatch)
+    recorder = TaskProgressRecorder(snapshot_interval=3600)
+    subscription = channel.subscribe(["job-0"])
+
+    recorder.record("job-0", "EXTRACTING_LAYOUT", 10.0)
+    recorder.record("job-1", "ANALYZING", 60.0, paper_title="Second")
+    recorder.record("job-0", "ANALYZING", 50.0)
+
+    # Live immediately, including to subscribers (filtered to their jobs)
+    assert channel.get("job-1")["paper_title"] == "Second"
+    assert [subscription.get(0.1)["status"], subscription.get(0.1)["status"]] == ["EXTRACTING_LAYOUT", "ANALYZING"]
+    assert subscription.get(0.05) is None
+    subscription.close()
+    # ...but not yet in the database
+    assert _row(Session, "job-0").status == "PENDING"
+
+    recorder.flush()
+    assert (_row(Session, "job-0").status, _row(Session, "job-0").progress) == ("ANALYZING", 50.0)
+    assert _row(Session, "job-1").paper_title == "Second"
+
+    # Terminal states and results are written right away
+    recorder.record("job-2", "COMPLETE", 100.0, result_data={"metadata": {"title": "Third"}}, skipped_stages=["layout"])
+    row = _row(Session, "job-2")
+    assert row.status == "COMPLETE" and row.result == {"metadata": {"title": "Third"}}
+    assert row.skipped_stages == ["layout"]
+
+
+def test_snapshot_never_reverts_a_terminal_row(tmp_path, monkeypatch):
+    Session, channel = _setup(tmp_path, monkeypatch)
+    recorder = TaskProgressRecorder(snapshot_interval=3600)
+    other_worker = TaskProgressRecorder(snapshot_interval=3600)
+    recorder.record("job-0", "ANALYZING", 50.0)
+    recorder.record("job-1", "ANALYZING", 60.0)
+
+    # Both jobs finish after the flusher read their live state but before it commits
+    original_get_many = channel.get_many
+
+    def get_many_then_finish(task_ids):
+        states = original_get_many(task_ids)
+        monkeypatch.setattr(channel, "get_many", original_get_many)
+        other_worker.record("job-0", "COMPLETE", 100.0, result_data={"metadata": {}})
+        recorder.record("job-1", "FAILED", 0.0, error_message="graph: boom")
+        return states
+
+    monkeypatch.setattr(channel, "get_many", get_many_then_finish)
+    recorder.flush()
+    assert _row(Session, "job-0").status == "COMPLETE"
+    assert _row(Session, "job-1").status == "FAILED"
+
+    # A snapshot of a job whose channel state is already terminal is not written at all
+    recorder.record("job-2", "ANALYZING", 50.0)
+    channel.publish("job-2", "CANCELLED", 0.0)
+    recorder.flush()
+    assert _row(Session, "job-2").status == "PENDING"
+
+    # A re-analysis takes a finished row back to PENDING
+    recorder.record("job-0", "PENDING", 0.0, error_message="", restart=True)
+    assert _row(Session, "job-0").status == "PENDING"
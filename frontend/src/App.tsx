@@ -25,6 +25,7 @@ export interface ExtractedInsights {
   contradictions: Contradiction[];
 }
 export interface AnalysisResult {
+  id?: string;
   status: string;
   pipeline: {
     chars_extracted: number;
@@ -318,7 +319,7 @@ function App() {
         </main>
       </div>
 
-      <MathBotChat analysisData={analysisData?.extracted_data} />
+      <MathBotChat analysisData={analysisData?.extracted_data} analysisId={analysisData?.id} />
     </>
   );
 }
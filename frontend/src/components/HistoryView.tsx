@@ -16,6 +16,17 @@ interface HistoryEntry {
     };
 }
 
+interface HistoryPage {
+    history: HistoryEntry[];
+    // Counted on the first page only; null on the pages after it
+    total: number | null;
+    next_cursor: string | null;
+}
+
+// Only the fields this list renders; the server never loads extracted_data for listings
+const PAGE_SIZE = 20;
+const LIST_FIELDS = 'id,filename,title,authors,analyzed_at,pipeline';
+
 interface Props {
     onLoadAnalysis: (data: AnalysisResult) => void;
 }
@@ -24,22 +35,31 @@ export default function HistoryView({ onLoadAnalysis }: Props) {
     const [entries, setEntries] = useState<HistoryEntry[]>([]);
     const [loading, setLoading] = useState(true);
     const [loadingId, setLoadingId] = useState<string | null>(null);
+    const [nextCursor, setNextCursor] = useState<string | null>(null);
+    const [total, setTotal] = useState(0);
+    const [loadingMore, setLoadingMore] = useState(false);
 
     useEffect(() => {
         fetchHistory();
     }, []);
 
-    const fetchHistory = async () => {
+    const fetchHistory = async (cursor: string | null = null) => {
+        const params = new URLSearchParams({ limit: String(PAGE_SIZE), fields: LIST_FIELDS });
+        if (cursor) params.set('cursor', cursor);
+        if (cursor) setLoadingMore(true);
         try {
-            const res = await fetch('http://localhost:8000/api/v1/history');
+            const res = await fetch(`http://localhost:8000/api/v1/history?${params}`);
             if (!res.ok) throw new Error('Failed to fetch');
-            const data = await res.json();
-            // Backend returns { history: [...], total: N }
-            setEntries(data.history || []);
+            // Backend returns { history: [...], total: N | null, next_cursor }
+            const data: HistoryPage = await res.json();
+            setEntries(prev => (cursor ? [...prev, ...(data.history || [])] : data.history || []));
+            setNextCursor(data.next_cursor);
+            if (data.total !== null) setTotal(data.total);
         } catch {
             toast.error('Could not load history');
         } finally {
             setLoading(false);
+            setLoadingMore(false);
         }
     };
 
@@ -51,6 +71,7 @@ export default function HistoryView({ onLoadAnalysis }: Props) {
             const data = await res.json();
             // Map backend history response to AnalysisResult shape
             onLoadAnalysis({
+                id: data.id,
                 status: data.status || 'success',
                 pipeline: data.pipeline || {},
                 extracted_data: data.extracted_data || {},
@@ -68,6 +89,7 @@ export default function HistoryView({ onLoadAnalysis }: Props) {
             const res = await fetch(`http://localhost:8000/api/v1/history/${id}`, { method: 'DELETE' });
             if (!res.ok) throw new Error('Delete failed');
             setEntries(prev => prev.filter(entry => entry.id !== id));
+            setTotal(prev => Math.max(0, prev - 1));
             toast.success('Entry removed');
         } catch {
             toast.error('Could not delete entry');
@@ -166,6 +188,16 @@ export default function HistoryView({ onLoadAnalysis }: Props) {
                     )}
                 </button>
             ))}
+            {nextCursor && (
+                <button
+                    onClick={() => fetchHistory(nextCursor)}
+                    disabled={loadingMore}
+                    className="surface-neu w-full py-3 text-sm font-semibold text-textLight hover:text-primary transition-colors flex items-center justify-center gap-2"
+                >
+                    {loadingMore && <Loader2 className="w-4 h-4 animate-spin" />}
+                    Load more ({total - entries.length} remaining)
+                </button>
+            )}
         </div>
     );
 }
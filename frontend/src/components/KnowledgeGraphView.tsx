@@ -13,6 +13,8 @@ interface GraphNode {
     outDegree: number;
     x?: number;
     y?: number;
+    fx?: number;
+    fy?: number;
 }
 
 interface GraphEdge {
@@ -25,6 +27,7 @@ interface GraphData {
     nodes: GraphNode[];
     edges: GraphEdge[];
     stats: { node_count: number; edge_count: number };
+    precomputed?: boolean;
 }
 
 // ── Color palette by node group ─────────────────────────────────────────────
@@ -68,17 +71,23 @@ export default function KnowledgeGraphView() {
     useEffect(() => {
         const fetchGraph = async () => {
             try {
-                const res = await fetch('http://localhost:8000/api/v1/graph');
+                // Ask the server for precomputed coordinates so large graphs don't freeze the tab
+                const res = await fetch('http://localhost:8000/api/v1/graph?layout=true');
                 if (!res.ok) throw new Error('Failed to load graph');
                 const data = await res.json();
                 if (data.status === 'empty' || !data.graph?.nodes?.length) {
                     setGraphData(null);
                     setError(data.message || 'No graph data available.');
                 } else {
+                    const precomputed = Boolean(data.graph.layout?.precomputed);
                     setGraphData({
-                        nodes: data.graph.nodes,
+                        // Pin server-placed nodes so the client skips its own force simulation
+                        nodes: precomputed
+                            ? data.graph.nodes.map((n: GraphNode) => ({ ...n, fx: n.x, fy: n.y }))
+                            : data.graph.nodes,
                         edges: data.graph.edges,
                         stats: data.graph.stats,
+                        precomputed,
                     });
                 }
             } catch (err) {
@@ -107,7 +116,7 @@ export default function KnowledgeGraphView() {
 
     // Tune D3 physics for better node spacing
     useEffect(() => {
-        if (graphRef.current && graphData) {
+        if (graphRef.current && graphData && !graphData.precomputed) {
             // Increase repulsion
             graphRef.current.d3Force('charge').strength(-400).distanceMax(800);
             // Increase link distance
@@ -302,7 +311,7 @@ export default function KnowledgeGraphView() {
                     onNodeClick={handleNodeClick}
                     onBackgroundClick={() => setSelectedNode(null)}
                     backgroundColor="transparent"
-                    cooldownTicks={100}
+                    cooldownTicks={graphData.precomputed ? 0 : 100}
                     d3AlphaDecay={0.02}
                     d3VelocityDecay={0.3}
                     enableZoomInteraction={true}
@@ -9,6 +9,7 @@ interface ChatMessage {
 
 interface Props {
     analysisData?: ExtractedInsights | null;
+    analysisId?: string;
 }
 
 const SUGGESTIONS = [
@@ -20,7 +21,7 @@ const SUGGESTIONS = [
     "What optimization techniques were used?",
 ];
 
-export default function MathBotChat({ analysisData }: Props) {
+export default function MathBotChat({ analysisData, analysisId }: Props) {
     const [open, setOpen] = useState(false);
     const [messages, setMessages] = useState<ChatMessage[]>([
         { role: 'assistant', content: "Hi! I'm MathBot 🧠 — your Researcher Co-Pilot. Upload a paper and ask me anything about its methodology, gaps, or contradictions." }
@@ -55,9 +56,10 @@ export default function MathBotChat({ analysisData }: Props) {
         setInput('');
         setLoading(true);
 
-        // Build context string from analysis data so MathBot has structured info
+        // Build context string from analysis data so MathBot has structured info.
+        // When the analysis has a server-side id, the backend renders (and caches) this itself.
         let contextStr = '';
-        if (analysisData) {
+        if (analysisData && !analysisId) {
             const parts: string[] = [];
             const meta = analysisData.metadata;
             if (meta) {
@@ -93,17 +95,50 @@ export default function MathBotChat({ analysisData }: Props) {
         }
 
         try {
-            const response = await fetch('http://localhost:8000/api/v1/chat', {
+            const response = await fetch('http://localhost:8000/api/v1/chat/stream', {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
                 body: JSON.stringify({
                     message: msg,
+                    ...(analysisId ? { analysis_id: analysisId } : {}),
                     ...(contextStr ? { context: contextStr } : {}),
                 }),
             });
-            if (!response.ok) throw new Error(`Server error: ${response.status}`);
-            const data = await response.json();
-            setMessages(prev => [...prev, { role: 'assistant', content: data.reply || 'No response.' }]);
+            if (!response.ok || !response.body) throw new Error(`Server error: ${response.status}`);
+
+            // Append an empty assistant bubble and grow it as SSE token events arrive
+            setMessages(prev => [...prev, { role: 'assistant', content: '' }]);
+            const appendToReply = (delta: string) => setMessages(prev => {
+                const next = [...prev];
+                const last = next[next.length - 1];
+                next[next.length - 1] = { ...last, content: last.content + delta };
+                return next;
+            });
+
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+            let received = false;
+            while (true) {
+                const { done, value } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+                const events = buffer.split('\n\n');
+                buffer = events.pop() || '';
+                for (const raw of events) {
+                    const eventName = raw.match(/^event: (.*)$/m)?.[1];
+                    const data = raw.match(/^data: (.*)$/m)?.[1];
+                    if (!data) continue;
+                    const payload = JSON.parse(data);
+                    if (eventName === 'token') {
+                        received = true;
+                        appendToReply(payload.delta);
+                    } else if (eventName === 'error') {
+                        throw new Error(payload.message);
+                    }
+                }
+            }
+            if (!received) appendToReply('No response.');
         } catch (err) {
             setMessages(prev => [...prev, {
                 role: 'assistant',